@@ -6,26 +6,40 @@ Features:
 - Persistent queue survives restarts
 - Automatic retry with exponential backoff
 - Full audit logging
-- Thread-safe operations with file locking
+- Transactional storage in the shared SQLite state store
 """
 
 import json
 import time
+import uuid
 import os
 import csv
-import fcntl
 from datetime import datetime
 from telegram_utils import send_telegram_message
+from state_store import get_sent_signals_store, get_alert_queue_table, TableSession
+from csv_log_writer import get_csv_writer
 
 ALERTS_QUEUE_FILE = 'alerts_queue.json'
 ALERT_LOG_FILE = 'alert_log.csv'
-SENT_SIGNALS_FILE = 'sent_signals.json'
 MAX_RETRY_ATTEMPTS = 5
 RETRY_DELAYS = [10, 30, 60, 300, 900]  # 10s, 30s, 1m, 5m, 15m
+ALERT_LOG_HEADER = [
+    'timestamp',
+    'symbol',
+    'verdict',
+    'alert_type',
+    'status',
+    'message_id',
+    'attempts',
+    'error',
+    'signal_timestamp',
+    'entry_price',
+    'target_price'
+]
 
 def get_telegram_msg_id_by_signal_id(signal_id):
     """
-    Lookup telegram_msg_id from sent_signals.json using signal_id.
+    Lookup telegram_msg_id from the sent signals store using signal_id.
     This ensures reply-to functionality works even if signal data is reloaded.
     
     Args:
@@ -38,124 +52,59 @@ def get_telegram_msg_id_by_signal_id(signal_id):
         return None
     
     try:
-        if os.path.exists(SENT_SIGNALS_FILE):
-            with open(SENT_SIGNALS_FILE, 'r') as f:
-                sent_signals = json.load(f)
-                
-            # Search for signal_id in sent_signals
-            for entry in sent_signals:
-                if entry.get('signal_id') == signal_id:
-                    msg_id = entry.get('message_id')
-                    if msg_id and msg_id > 0:
-                        return msg_id
-        return None
+        # Indexed lookup (signal_id is UNIQUE) - cost doesn't grow with history size
+        return get_sent_signals_store().get_message_id(signal_id)
     except Exception as e:
         print(f"[ALERT] Error loading telegram_msg_id for signal_id {signal_id}: {e}")
         return None
 
-class AlertQueueManager:
-    """Thread-safe manager for persistent alert queue with file locking"""
-    
-    def __init__(self, queue_file=ALERTS_QUEUE_FILE):
-        self.queue_file = queue_file
-        self.lock_file = queue_file + '.lock'
-        
-        # Ensure lock file exists
-        if not os.path.exists(self.lock_file):
-            open(self.lock_file, 'w').close()
+class AlertQueueManager(TableSession):
+    """
+    Read-modify-write session over the persistent alert queue.
+    Backed by the alert_queue table of the state store: on exit only the
+    alerts that were added, changed or removed are written, in one transaction.
     
-    def __enter__(self):
-        """Acquire exclusive lock and load queue"""
-        self.lock_fd = open(self.lock_file, 'r')
-        fcntl.flock(self.lock_fd.fileno(), fcntl.LOCK_EX)
-        
-        # Load queue
-        if os.path.exists(self.queue_file):
-            try:
-                with open(self.queue_file, 'r') as f:
-                    self.queue = json.load(f)
-            except:
-                self.queue = []
-        else:
-            self.queue = []
-        
-        return self.queue
+    queue_file is the legacy alerts_queue.json, imported once on first use.
+    """
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Save queue and release lock"""
-        try:
-            # Write to temp file first
-            temp_file = self.queue_file + '.tmp'
-            with open(temp_file, 'w') as f:
-                json.dump(self.queue, f, indent=2)
-                f.flush()
-                os.fsync(f.fileno())
-            
-            # Atomic rename
-            os.replace(temp_file, self.queue_file)
-        finally:
-            fcntl.flock(self.lock_fd.fileno(), fcntl.LOCK_UN)
-            self.lock_fd.close()
+    def __init__(self, queue_file=ALERTS_QUEUE_FILE):
+        super().__init__(get_alert_queue_table(legacy_file=queue_file))
 
 def initialize_alert_log():
     """Initialize alert log CSV if it doesn't exist"""
     if not os.path.exists(ALERT_LOG_FILE):
         with open(ALERT_LOG_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'timestamp',
-                'symbol',
-                'verdict',
-                'alert_type',
-                'status',
-                'message_id',
-                'attempts',
-                'error',
-                'signal_timestamp',
-                'entry_price',
-                'target_price'
-            ])
+            writer.writerow(ALERT_LOG_HEADER)
 
 def log_alert_attempt(alert_data, status, message_id=None, error=None):
     """Log an alert attempt to CSV for audit trail"""
     try:
-        with open(ALERT_LOG_FILE, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                alert_data['symbol'],
-                alert_data['verdict'],
-                alert_data['alert_type'],
-                status,
-                message_id or '',
-                alert_data.get('attempts', 0),
-                error or '',
-                alert_data.get('signal_timestamp', ''),
-                alert_data.get('entry_price', 0),
-                alert_data.get('target_price', 0)
-            ])
+        # Audit trail: batched, but fsync'd after every flush
+        get_csv_writer(ALERT_LOG_FILE, ALERT_LOG_HEADER, fsync='flush').write_row([
+            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            alert_data['symbol'],
+            alert_data['verdict'],
+            alert_data['alert_type'],
+            status,
+            message_id or '',
+            alert_data.get('attempts', 0),
+            error or '',
+            alert_data.get('signal_timestamp', ''),
+            alert_data.get('entry_price', 0),
+            alert_data.get('target_price', 0)
+        ])
     except Exception as e:
         print(f"[ALERT LOG ERROR] Failed to log alert: {e}")
 
-def enqueue_alert(symbol, verdict, alert_type, signal_data, signal_id=None):
-    """
-    Add an alert to the persistent queue.
-    
-    Args:
-        symbol: Trading pair (e.g., DOGEUSDT)
-        verdict: BUY or SELL
-        alert_type: 'target_zone' or 'final_goal'
-        signal_data: Dict with entry_price, target_min/max, highest/lowest_reached
-        signal_id: UUID of original signal (used to lookup telegram_msg_id)
-        
-    Note: target_price is stored for logging but recalculated at send time
-          from active_signals.json to ensure accuracy with latest extremes
-    """
-    # Lookup telegram_msg_id from sent_signals.json using signal_id
+def _build_alert(symbol, verdict, alert_type, signal_data, signal_id=None):
+    """Build a pending alert payload from tracked signal data"""
+    # Lookup telegram_msg_id from sent signals store using signal_id
     telegram_msg_id = get_telegram_msg_id_by_signal_id(signal_id) if signal_id else None
     
-    alert = {
-        'id': f"{symbol}_{alert_type}_{int(time.time()*1000)}",
+    return {
+        # Random suffix keeps ids unique when several alerts are built in the same millisecond
+        'id': f"{symbol}_{alert_type}_{int(time.time()*1000)}_{uuid.uuid4().hex[:6]}",
         'symbol': symbol,
         'verdict': verdict,
         'alert_type': alert_type,
@@ -172,23 +121,62 @@ def enqueue_alert(symbol, verdict, alert_type, signal_data, signal_id=None):
         'last_attempt': None,
         'status': 'pending'
     }
+
+def _insert_alert(table, tx, alert):
+    """Insert alert inside an open transaction unless an equivalent one is queued"""
+    symbol = alert['symbol']
+    alert_type = alert['alert_type']
+    signal_id = alert.get('signal_id')
     
-    with AlertQueueManager() as queue:
-        # CRITICAL: Check for duplicates using symbol, alert_type, AND signal_id
-        # This prevents re-queuing same alert after restart even if in-memory flags are lost
-        existing = [a for a in queue if 
-                   a['symbol'] == symbol and 
-                   a['alert_type'] == alert_type and 
-                   a.get('signal_id') == signal_id and
-                   a['status'] in ('pending', 'failed')]
-        if existing:
-            print(f"[ALERT] {symbol} {alert_type} (signal_id: {signal_id}) already queued, skipping duplicate")
-            return False
+    # CRITICAL: Check for duplicates using symbol, alert_type, AND signal_id
+    # This prevents re-queuing same alert after restart even if in-memory flags are lost
+    existing = table.find(symbol=symbol, alert_type=alert_type, signal_id=signal_id or None,
+                          status=('pending', 'failed'))
+    if existing:
+        print(f"[ALERT] {symbol} {alert_type} (signal_id: {signal_id}) already queued, skipping duplicate")
+        return False
+    
+    table.insert(alert, conn=tx)
+    print(f"[ALERT] Queued {symbol} {alert['verdict']} {alert_type} alert (signal_id: {signal_id}, msg_id: {alert['telegram_msg_id']})")
+    log_alert_attempt(alert, 'QUEUED')
+    return True
+
+def _apply_alert_extremes(table, tx, signal_id, highest_reached, lowest_reached):
+    """Refresh extremes of pending/failed alerts for signal_id inside an open transaction"""
+    # Indexed (signal_id, status) lookup; only matching rows are rewritten
+    updated_count = 0
+    for alert in table.find(signal_id=signal_id, status=('pending', 'failed')):
+        if (alert.get('highest_reached') == highest_reached and
+            alert.get('lowest_reached') == lowest_reached):
+            continue
+        alert['highest_reached'] = highest_reached
+        alert['lowest_reached'] = lowest_reached
+        table.update(alert, conn=tx)
+        updated_count += 1
+    
+    if updated_count > 0:
+        print(f"[ALERT] Updated {updated_count} alert(s) with latest extremes (signal_id: {signal_id[:8]}...)")
+    return updated_count
+
+def enqueue_alert(symbol, verdict, alert_type, signal_data, signal_id=None):
+    """
+    Add an alert to the persistent queue.
+    
+    Args:
+        symbol: Trading pair (e.g., DOGEUSDT)
+        verdict: BUY or SELL
+        alert_type: 'target_zone' or 'final_goal'
+        signal_data: Dict with entry_price, target_min/max, highest/lowest_reached
+        signal_id: UUID of original signal (used to lookup telegram_msg_id)
         
-        queue.append(alert)
-        print(f"[ALERT] Queued {symbol} {verdict} {alert_type} alert (signal_id: {signal_id}, msg_id: {telegram_msg_id})")
-        log_alert_attempt(alert, 'QUEUED')
-        return True
+    Note: target_price is stored for logging but recalculated at send time
+          from the latest extremes pushed by signal_tracker
+    """
+    alert = _build_alert(symbol, verdict, alert_type, signal_data, signal_id)
+    
+    table = get_alert_queue_table(legacy_file=ALERTS_QUEUE_FILE)
+    with table.store.transaction() as tx:
+        return _insert_alert(table, tx, alert)
 
 def update_alert_extremes(signal_id, highest_reached, lowest_reached):
     """
@@ -203,17 +191,69 @@ def update_alert_extremes(signal_id, highest_reached, lowest_reached):
     if not signal_id:
         return
     
-    with AlertQueueManager() as queue:
-        updated_count = 0
-        for alert in queue:
-            if (alert.get('signal_id') == signal_id and 
-                alert['status'] in ('pending', 'failed')):
-                alert['highest_reached'] = highest_reached
-                alert['lowest_reached'] = lowest_reached
-                updated_count += 1
+    table = get_alert_queue_table(legacy_file=ALERTS_QUEUE_FILE)
+    with table.store.transaction() as tx:
+        _apply_alert_extremes(table, tx, signal_id, highest_reached, lowest_reached)
+
+class AlertBatch:
+    """
+    Unit of work for alert queue mutations during one tracker tick.
+    
+    Collects enqueue_alert / update_alert_extremes calls in memory and applies
+    them all in a single transaction on commit (or on context exit), so a tick
+    costs one queue write regardless of how many signals are tracked.
+    
+    Usage:
+        with AlertBatch() as alerts:
+            alerts.update_alert_extremes(signal_id, high, low)
+            alerts.enqueue_alert(symbol, 'BUY', 'target_zone', signal, signal_id)
+    """
+    
+    def __init__(self, queue_file=ALERTS_QUEUE_FILE):
+        self.queue_file = queue_file
+        self.pending_extremes = {}  # signal_id -> (highest_reached, lowest_reached), last write wins
+        self.pending_alerts = []
+    
+    def enqueue_alert(self, symbol, verdict, alert_type, signal_data, signal_id=None):
+        """Stage an alert; payload is built now so it captures current extremes"""
+        self.pending_alerts.append(_build_alert(symbol, verdict, alert_type, signal_data, signal_id))
+    
+    def update_alert_extremes(self, signal_id, highest_reached, lowest_reached):
+        """Stage an extremes refresh for already-queued alerts of signal_id"""
+        if signal_id:
+            self.pending_extremes[signal_id] = (highest_reached, lowest_reached)
+    
+    def commit(self):
+        """
+        Apply all staged mutations in one transaction.
         
-        if updated_count > 0:
-            print(f"[ALERT] Updated {updated_count} alert(s) with latest extremes (signal_id: {signal_id[:8]}...)")
+        Returns:
+            int: Number of alerts newly queued (duplicates are skipped)
+        """
+        if not self.pending_extremes and not self.pending_alerts:
+            return 0
+        
+        queued = 0
+        table = get_alert_queue_table(legacy_file=self.queue_file)
+        with table.store.transaction() as tx:
+            # Refresh existing alerts first; new alerts already carry current extremes
+            for signal_id, (highest, lowest) in self.pending_extremes.items():
+                _apply_alert_extremes(table, tx, signal_id, highest, lowest)
+            for alert in self.pending_alerts:
+                if _insert_alert(table, tx, alert):
+                    queued += 1
+        
+        self.pending_extremes = {}
+        self.pending_alerts = []
+        return queued
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Commit even on error: signals already flagged as alerted must not lose their alerts
+        self.commit()
+        return False
 
 def process_alert_queue():
     """
@@ -280,7 +320,7 @@ def process_alert_queue():
 def send_alert(alert):
     """
     Send a single alert via Telegram.
-    Fetches latest extreme prices from active_signals.json for accuracy.
+    Uses latest extreme prices kept fresh in the alert payload by signal_tracker.
     Re-lookups telegram_msg_id from signal_id to ensure reply-to works.
     
     Returns:
@@ -295,7 +335,7 @@ def send_alert(alert):
         target_max = alert['target_max']
         
         # CRITICAL: Re-lookup telegram_msg_id from signal_id
-        # This ensures we get the latest telegram_msg_id even if sent_signals.json
+        # This ensures we get the latest telegram_msg_id even if the sent signals store
         # was updated after the alert was enqueued
         signal_id = alert.get('signal_id')
         telegram_msg_id = get_telegram_msg_id_by_signal_id(signal_id) if signal_id else None
@@ -367,16 +407,16 @@ def get_queue_status():
         dict: Statistics about pending/sent/failed alerts
     """
     try:
-        with AlertQueueManager() as queue:
-            pending = [a for a in queue if a['status'] == 'pending']
-            failed = [a for a in queue if a['status'] == 'failed']
-            
-            return {
-                'total': len(queue),
-                'pending': len(pending),
-                'failed': len(failed),
-                'pending_alerts': pending
-            }
+        # Read-only indexed queries by status (no queue rewrite)
+        table = get_alert_queue_table(legacy_file=ALERTS_QUEUE_FILE)
+        pending = table.find(status='pending')
+        
+        return {
+            'total': table.count(),
+            'pending': len(pending),
+            'failed': table.count(status='failed'),
+            'pending_alerts': pending
+        }
     except:
         return {'total': 0, 'pending': 0, 'failed': 0, 'pending_alerts': []}
 
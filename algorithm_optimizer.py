@@ -11,6 +11,7 @@ import json
 from scipy import stats
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
+from log_join import asof_join
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -52,45 +53,34 @@ class AlgorithmOptimizer:
         self.effectiveness_df['timestamp_sent'] = pd.to_datetime(self.effectiveness_df['timestamp_sent'])
         self.analysis_df['timestamp'] = pd.to_datetime(self.analysis_df['timestamp'])
         
-        merged = []
-        for idx, eff_row in self.effectiveness_df.iterrows():
-            # Find matching analysis within 2-minute window
-            time_diff = (self.analysis_df['timestamp'] - eff_row['timestamp_sent']).abs()
-            matches = self.analysis_df[
-                (self.analysis_df['symbol'] == eff_row['symbol']) &
-                (time_diff <= timedelta(minutes=2))
-            ]
-            
-            if len(matches) > 0:
-                # Take closest match
-                closest = matches.loc[time_diff[matches.index].idxmin()]
-                
-                # Merge the rows
-                merged_row = {
-                    'timestamp': eff_row['timestamp_sent'],
-                    'symbol': eff_row['symbol'],
-                    'verdict': eff_row['verdict'],
-                    'confidence': eff_row['confidence'],
-                    'result': eff_row['result'],
-                    'profit_pct': eff_row['profit_pct'],
-                    'entry_price': eff_row['entry_price'],
-                    'target_min': eff_row['target_min'],
-                    'target_max': eff_row['target_max'],
-                    'highest_reached': eff_row['highest_reached'],
-                    'lowest_reached': eff_row['lowest_reached'],
-                    'cvd': closest.get('cvd', 0),
-                    'oi_change': closest.get('oi_change', 0),
-                    'oi_change_pct': closest.get('oi_change_pct', 0),
-                    'price_vs_vwap_pct': closest.get('price_vs_vwap_pct', 0),
-                    'volume': closest.get('volume', 0),
-                    'volume_median': closest.get('volume_median', 1),
-                    'volume_spike': closest.get('volume_spike', False),
-                    'rsi': closest.get('rsi', 50),
-                    'atr': closest.get('atr', 0),
-                }
-                merged.append(merged_row)
-        
-        self.merged_df = pd.DataFrame(merged)
+        # Closest analysis row per symbol within a 2-minute window (sorted as-of join)
+        matched = asof_join(self.effectiveness_df, self.analysis_df, left_on='timestamp_sent', right_on='timestamp',
+                            by=('symbol',), tolerance=timedelta(minutes=2), suffixes=('', '_analysis'))
+        
+        merged = pd.DataFrame({
+            'timestamp': matched['timestamp_sent'],
+            'symbol': matched['symbol'],
+            'verdict': matched['verdict'],
+            'confidence': matched['confidence'],
+            'result': matched['result'],
+            'profit_pct': matched['profit_pct'],
+            'entry_price': matched['entry_price'],
+            'target_min': matched['target_min'],
+            'target_max': matched['target_max'],
+            'highest_reached': matched['highest_reached'],
+            'lowest_reached': matched['lowest_reached'],
+            'cvd': matched.get('cvd', 0),
+            'oi_change': matched.get('oi_change', 0),
+            'oi_change_pct': matched.get('oi_change_pct', 0),
+            'price_vs_vwap_pct': matched.get('price_vs_vwap_pct', 0),
+            'volume': matched.get('volume', 0),
+            'volume_median': matched.get('volume_median', 1),
+            'volume_spike': matched.get('volume_spike', False),
+            'rsi': matched.get('rsi', 50),
+            'atr': matched.get('atr', 0),
+        }).reset_index(drop=True)
+        
+        self.merged_df = merged
         print(f"✅ Merged {len(self.merged_df)} signals with indicator data")
         print(f"   Win rate in merged data: {(self.merged_df['result'] == 'WIN').mean() * 100:.1f}%")
         
@@ -18,9 +18,14 @@ from statsmodels.tsa.stattools import grangercausalitytests
 from statsmodels.tsa.api import VAR
 from sklearn.linear_model import LinearRegression
 from datetime import datetime
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from lead_lag import lag_correlations
+
 
 class BTCLeadLagAnalyzer:
     """Comprehensive BTC-Altcoin Lead-Lag Statistical Analyzer"""
@@ -161,23 +166,10 @@ class BTCLeadLagAnalyzer:
         btc_arr = aligned['btc'].values
         alt_arr = aligned['alt'].values
         
-        # Normalize
-        btc_norm = (btc_arr - np.mean(btc_arr)) / np.std(btc_arr)
-        alt_norm = (alt_arr - np.mean(alt_arr)) / np.std(alt_arr)
-        
-        ccf_values = []
+        # All lags in one FFT pass; lag >= 0 is ALT(t) vs BTC(t-lag)
+        all_lags, curve = lag_correlations(btc_arr, alt_arr, max_lag, min_periods=2)
         lags = range(0, max_lag + 1)
-        
-        for lag in lags:
-            if lag == 0:
-                corr = np.corrcoef(btc_norm, alt_norm)[0, 1]
-            else:
-                # ALT(t) vs BTC(t-lag)
-                corr = np.corrcoef(alt_norm[lag:], btc_norm[:-lag])[0, 1]
-            
-            ccf_values.append(corr)
-        
-        ccf_values = np.array(ccf_values)
+        ccf_values = curve[all_lags >= 0]
         
         # Find maximum correlation and corresponding lag
         max_idx = np.argmax(np.abs(ccf_values))
@@ -3,11 +3,16 @@ Correlation Analysis Module for BTC vs Altcoins
 Computes lag correlations and directional similarity
 """
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 from scipy import stats
 from typing import Dict, Tuple
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from lead_lag import lag_correlations, best_lags
+
 
 def compute_returns(df: pd.DataFrame) -> pd.Series:
     """
@@ -50,51 +55,22 @@ def compute_lag_correlation(
         - optimal_lag_minutes: Lag in minutes (negative=leads BTC, positive=lags BTC)
         - p_value: Statistical significance
     """
-    btc_clean = btc_returns.dropna()
-    alt_clean = alt_returns.dropna()
-    
-    min_len = min(len(btc_clean), len(alt_clean))
-    btc_clean = btc_clean.iloc[:min_len]
-    alt_clean = alt_clean.iloc[:min_len]
-    
-    best_corr = 0
-    best_lag = 0
-    
-    for lag in range(-max_lag, max_lag + 1):
-        if lag == 0:
-            btc_slice = btc_clean
-            alt_slice = alt_clean
-        elif lag > 0:
-            btc_slice = btc_clean.iloc[:-lag]
-            alt_slice = alt_clean.iloc[lag:]
-        else:
-            abs_lag = abs(lag)
-            btc_slice = btc_clean.iloc[abs_lag:]
-            alt_slice = alt_clean.iloc[:-abs_lag]
-        
-        if len(btc_slice) < 10:
-            continue
-        
-        btc_slice = btc_slice.reset_index(drop=True)
-        alt_slice = alt_slice.reset_index(drop=True)
-        
-        corr = btc_slice.corr(alt_slice)
-        
-        if abs(corr) > abs(best_corr):
-            best_corr = corr
-            best_lag = lag
-    
-    if best_lag == 0:
-        correlation, p_value = stats.pearsonr(btc_clean, alt_clean)
-    elif best_lag > 0:
-        btc_slice = btc_clean.iloc[:-best_lag].reset_index(drop=True)
-        alt_slice = alt_clean.iloc[best_lag:].reset_index(drop=True)
-        correlation, p_value = stats.pearsonr(btc_slice, alt_slice)
+    aligned = pd.concat([btc_returns, alt_returns], axis=1, join='inner')
+    btc_arr = aligned.iloc[:, 0].to_numpy(dtype=float)
+    alt_arr = aligned.iloc[:, 1].to_numpy(dtype=float)
+    
+    # Whole lag curve in one vectorized pass, NaN rows skipped pairwise
+    lags, curve = lag_correlations(btc_arr, alt_arr, max_lag)
+    best_lag, _ = best_lags(lags, curve)
+    best_lag = int(best_lag)
+    
+    # Significance at the chosen lag only
+    if best_lag >= 0:
+        btc_slice, alt_slice = btc_arr[:len(btc_arr) - best_lag], alt_arr[best_lag:]
     else:
-        abs_lag = abs(best_lag)
-        btc_slice = btc_clean.iloc[abs_lag:].reset_index(drop=True)
-        alt_slice = alt_clean.iloc[:-abs_lag].reset_index(drop=True)
-        correlation, p_value = stats.pearsonr(btc_slice, alt_slice)
+        btc_slice, alt_slice = btc_arr[-best_lag:], alt_arr[:len(alt_arr) + best_lag]
+    valid = np.isfinite(btc_slice) & np.isfinite(alt_slice)
+    correlation, p_value = stats.pearsonr(btc_slice[valid], alt_slice[valid])
     
     lag_minutes = best_lag * 5
     
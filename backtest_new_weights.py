@@ -7,6 +7,7 @@ import pandas as pd
 import json
 import yaml
 from datetime import datetime, timedelta
+from log_join import asof_join
 
 def load_optimized_weights():
     """Load optimized weights from weight_optimization_results.json"""
@@ -93,34 +94,25 @@ def backtest_weights():
     
     print(f"\n📊 Dataset: {len(eff_df)} signals from last 2 days")
     
-    # Merge effectiveness with analysis
-    merged_data = []
-    for idx, eff_row in eff_df.iterrows():
-        time_diff = abs(analysis_df['timestamp'] - eff_row['timestamp_sent'])
-        matches = analysis_df[
-            (analysis_df['symbol'] == eff_row['symbol']) &
-            (analysis_df['verdict'] == eff_row['verdict']) &
-            (time_diff < timedelta(minutes=2))
-        ]
-        
-        if len(matches) > 0:
-            closest_match = matches.loc[time_diff[matches.index].idxmin()]
-            
-            merged_row = {
-                'symbol': eff_row['symbol'],
-                'verdict': eff_row['verdict'],
-                'result': eff_row['result'],
-                'old_confidence': eff_row['confidence'],
-                'cvd': closest_match.get('cvd', 0),
-                'oi_change_pct': closest_match.get('oi_change_pct', 0),
-                'price_vs_vwap_pct': closest_match.get('price_vs_vwap_pct', 0),
-                'volume_spike': int(closest_match.get('volume_spike', 0)),
-                'liq_ratio': closest_match.get('liq_ratio', 0),
-                'rsi': closest_match.get('rsi', 50),
-            }
-            merged_data.append(merged_row)
-    
-    df = pd.DataFrame(merged_data)
+    # Merge effectiveness with analysis (closest row, same symbol + verdict, < 2 minutes apart)
+    matched = asof_join(eff_df, analysis_df, left_on='timestamp_sent', right_on='timestamp',
+                        by=('symbol', 'verdict'), tolerance=timedelta(minutes=2), inclusive=False,
+                        suffixes=('', '_analysis'))
+    
+    merged_data = {
+        'symbol': matched['symbol'],
+        'verdict': matched['verdict'],
+        'result': matched['result'],
+        'old_confidence': matched['confidence'],
+        'cvd': matched.get('cvd', 0),
+        'oi_change_pct': matched.get('oi_change_pct', 0),
+        'price_vs_vwap_pct': matched.get('price_vs_vwap_pct', 0),
+        'volume_spike': matched['volume_spike'].fillna(0).astype(int),
+        'liq_ratio': matched.get('liq_ratio', 0),
+        'rsi': matched.get('rsi', 50),
+    }
+    
+    df = pd.DataFrame(merged_data).reset_index(drop=True)
     print(f"✅ Matched {len(df)} signals with indicator data\n")
     
     # Recalculate confidence with NEW weights
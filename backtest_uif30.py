@@ -17,12 +17,13 @@ def load_feeds_data():
     print("="*80)
     
     # Define expected column names (handle schema evolution)
-    # Original 15 columns + basis_pct + basis_provider = 17 columns
+    # Original 15 columns + basis_pct + basis_provider = 17 columns, + obi_depth_ema = 18
     expected_cols = [
         'timestamp', 'symbol', 'oi', 'oi_pct', 'funding', 'basis',
         'liq_long_usd', 'liq_short_usd', 'liq_ratio', 'obi_top',
         'basis_pct', 'basis_provider',  # NEW columns added
-        'latency_ms', 'source_errors', 'provider_oi', 'provider_funding', 'provider_basis'
+        'latency_ms', 'source_errors', 'provider_oi', 'provider_funding', 'provider_basis',
+        'obi_depth_ema'
     ]
     
     # Load feeds_log.csv with explicit column names (skip bad lines)
@@ -10,15 +10,28 @@ import numpy as np
 from pathlib import Path
 import json
 from datetime import datetime, timedelta
+import os
+import sys
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix
 from scipy.stats import pearsonr, spearmanr
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_training import FeatureCache, cross_val_scores, data_hash
+
+ENRICH_VERSION = 'v1'  # Bump when calculate_indicators / calculate_future_returns change
+
+
+def top_decile_precision(y_true, y_pred):
+    """Hit rate of the top 10% predictions (NaN when no prediction clears the threshold)"""
+    signals = y_pred > np.percentile(y_pred, 90)
+    return y_true[signals].mean() if signals.sum() > 0 else np.nan
+
+
 class FormulaDiscoveryEngine:
     """
     Multi-phase engine for discovering optimal trading formula:
@@ -29,8 +42,10 @@ class FormulaDiscoveryEngine:
     Phase 6: Validation & benchmarking
     """
     
-    def __init__(self, data_dir='backtesting/data'):
+    def __init__(self, data_dir='backtesting/data', n_jobs=-1):
         self.data_dir = Path(data_dir)
+        self.n_jobs = n_jobs
+        self.feature_cache = FeatureCache(str(self.data_dir / 'feature_cache'))
         self.symbols = [
             'BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'AVAXUSDT',
             'DOGEUSDT', 'LINKUSDT', 'XRPUSDT', 'TRXUSDT', 'ADAUSDT', 'HYPEUSDT'
@@ -157,15 +172,11 @@ class FormulaDiscoveryEngine:
             
             print(f"  Raw data: {len(df)} candles")
             
-            # Calculate indicators
-            df = self.calculate_indicators(df)
-            
-            # Calculate future returns (our prediction targets)
-            df = self.calculate_future_returns(df)
-            
-            # Drop rows with NaN (from rolling calculations)
+            # Indicators + future returns (our prediction targets), cached by raw data hash
             initial_len = len(df)
-            df = df.dropna()
+            df = self.feature_cache.get_or_build(
+                f"{symbol}_enriched", data_hash(ENRICH_VERSION, df), lambda: self._enrich(df)
+            )
             print(f"  Enriched: {len(df)} candles ({initial_len - len(df)} dropped for warmup)")
             
             # Save enriched data
@@ -179,6 +190,12 @@ class FormulaDiscoveryEngine:
         print(f"✅ PHASE 2 COMPLETE: {len(self.all_data)} symbols enriched")
         print("="*80)
     
+    def _enrich(self, df):
+        df = self.calculate_indicators(df)
+        df = self.calculate_future_returns(df)
+        # Drop rows with NaN (from rolling calculations)
+        return df.dropna()
+    
     # ============================================================================
     # PHASE 3: STATISTICAL ANALYSIS
     # ============================================================================
@@ -363,6 +380,21 @@ class FormulaDiscoveryEngine:
         # Test different TTL values
         ttl_values = [15, 30, 60, 90, 120]
         
+        # Prepare data
+        X = all_symbols_df[feature_cols].fillna(0)
+        
+        # Every (TTL, side, time-series fold) fit is independent: one parallel pool
+        # BUY: future gain > 1%, SELL: future drop > 1% (binary targets)
+        jobs = {}
+        for ttl in ttl_values:
+            for side, col in (('buy', f'max_gain_{ttl}m'), ('sell', f'max_drop_{ttl}m')):
+                y = (all_symbols_df[col] > 1.0).astype(int).to_numpy()
+                model = GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
+                jobs[(ttl, side)] = (model, X, y, top_decile_precision)
+        
+        print(f"\nFitting {len(jobs)} models x 5 time-series folds in parallel (n_jobs={self.n_jobs})...")
+        scores = cross_val_scores(jobs, n_splits=5, n_jobs=self.n_jobs)
+        
         results = {}
         
         for ttl in ttl_values:
@@ -370,67 +402,8 @@ class FormulaDiscoveryEngine:
             print(f"Testing TTL = {ttl} minutes")
             print('='*80)
             
-            # Define profitable trade (binary classification)
-            # BUY: future gain > 1%
-            # SELL: future drop > 1%
-            
-            gain_col = f'max_gain_{ttl}m'
-            drop_col = f'max_drop_{ttl}m'
-            
-            # Create binary targets
-            all_symbols_df['buy_signal'] = (all_symbols_df[gain_col] > 1.0).astype(int)
-            all_symbols_df['sell_signal'] = (all_symbols_df[drop_col] > 1.0).astype(int)
-            
-            # Prepare data
-            X = all_symbols_df[feature_cols].fillna(0)
-            
-            # Time series split (no future data leakage)
-            tscv = TimeSeriesSplit(n_splits=5)
-            
-            # Train BUY model
-            buy_scores = []
-            for train_idx, test_idx in tscv.split(X):
-                X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-                y_train = all_symbols_df['buy_signal'].iloc[train_idx]
-                y_test = all_symbols_df['buy_signal'].iloc[test_idx]
-                
-                model = GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
-                model.fit(X_train, y_train)
-                
-                # Predict probabilities
-                y_pred = model.predict(X_test)
-                
-                # Calculate metrics
-                # Only consider top 10% predictions as signals
-                threshold = np.percentile(y_pred, 90)
-                signals = y_pred > threshold
-                
-                if signals.sum() > 0:
-                    precision = y_test[signals].mean()
-                    buy_scores.append(precision)
-            
-            buy_precision = np.mean(buy_scores) if buy_scores else 0
-            
-            # Train SELL model
-            sell_scores = []
-            for train_idx, test_idx in tscv.split(X):
-                X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-                y_train = all_symbols_df['sell_signal'].iloc[train_idx]
-                y_test = all_symbols_df['sell_signal'].iloc[test_idx]
-                
-                model = GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
-                model.fit(X_train, y_train)
-                
-                y_pred = model.predict(X_test)
-                
-                threshold = np.percentile(y_pred, 90)
-                signals = y_pred > threshold
-                
-                if signals.sum() > 0:
-                    precision = y_test[signals].mean()
-                    sell_scores.append(precision)
-            
-            sell_precision = np.mean(sell_scores) if sell_scores else 0
+            buy_precision = np.mean(scores[(ttl, 'buy')]) if scores[(ttl, 'buy')] else 0
+            sell_precision = np.mean(scores[(ttl, 'sell')]) if scores[(ttl, 'sell')] else 0
             
             print(f"\n  BUY Model Precision: {buy_precision*100:.1f}%")
             print(f"  SELL Model Precision: {sell_precision*100:.1f}%")
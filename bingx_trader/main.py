@@ -15,6 +15,7 @@ from .signal_reader import SignalReader
 from .telegram_notifier import TelegramNotifier
 from .trade_logger import TradeLogger
 from .cancellation_monitor import CancellationMonitor
+import metrics_registry
 
 class TradingService:
     def __init__(self):
@@ -84,8 +85,11 @@ class TradingService:
             self.stop()
     
     def _main_loop(self):
+        metrics_registry.start_metrics_server('trader')
+        open_positions = metrics_registry.gauge('trader_open_positions', 'Open positions held by the trader')
         while self.running:
             try:
+                cycle_start = time.time()
                 self._process_signals()
                 
                 self._check_cancelled_signals()
@@ -94,9 +98,12 @@ class TradingService:
                 
                 self._send_hourly_report()
                 
+                open_positions.set(self.position_manager.positions.count())
+                metrics_registry.observe_cycle('trader_loop', time.time() - cycle_start)
                 time.sleep(TradingConfig.POLL_INTERVAL_SECONDS)
             
             except Exception as e:
+                metrics_registry.CYCLE_ERRORS.labels(loop='trader_loop').inc()
                 print(f"❌ Error in main loop: {e}")
                 traceback.print_exc()
                 time.sleep(10)
@@ -6,6 +6,8 @@ import requests
 import time
 from typing import Dict, Optional
 
+import http_client
+
 _last_prices = {}
 
 def get_simulated_price(symbol: str, max_retries: int = 3) -> float:
@@ -19,7 +21,7 @@ def get_simulated_price(symbol: str, max_retries: int = 3) -> float:
     
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10, api='bingx')
             data = response.json()
             
             if data.get('code') == 0:
@@ -9,20 +9,17 @@ from datetime import datetime
 from .config import TradingConfig, PaperTradingConfig
 from .bingx_client import BingXClient
 from .risk_manager import RiskManager
+from state_store import get_positions_table
 
 class PositionManager:
     def __init__(self, client: BingXClient, risk_manager: RiskManager):
         self.client = client
         self.risk_manager = risk_manager
         self.positions_file = TradingConfig.POSITIONS_FILE
-        self._ensure_positions_file()
+        # Positions live in the shared state store; the JSON file is imported once
+        self.positions = get_positions_table(legacy_file=self.positions_file)
         self._ensure_last_close_file()
     
-    def _ensure_positions_file(self):
-        os.makedirs(os.path.dirname(self.positions_file), exist_ok=True)
-        if not os.path.exists(self.positions_file):
-            self._save_positions([])
-    
     def _ensure_last_close_file(self):
         if TradingConfig.MODE != "PAPER" or not PaperTradingConfig.ALL_IN_MODE:
             return
@@ -59,15 +56,11 @@ class PositionManager:
     
     def _load_positions(self) -> List[Dict]:
         try:
-            with open(self.positions_file, 'r') as f:
-                return json.load(f)
-        except:
+            return self.positions.all()
+        except Exception as e:
+            print(f"⚠️  Failed to load positions: {e}")
             return []
     
-    def _save_positions(self, positions: List[Dict]):
-        with open(self.positions_file, 'w') as f:
-            json.dump(positions, f, indent=2)
-    
     def get_active_positions(self) -> List[Dict]:
         return self._load_positions()
     
@@ -416,8 +409,7 @@ class PositionManager:
             'telegram_msg_id': None  # Will be set after Telegram notification
         }
         
-        positions.append(position)
-        self._save_positions(positions)
+        self.positions.insert(position)
         
         return position
     
@@ -480,14 +472,7 @@ class PositionManager:
             print(f"📝 PAPER MODE: Simulating position close for {position['symbol']}")
         
         # Only remove from local storage after successful BingX close (or in PAPER mode)
-        positions = self.get_active_positions()
-        
-        positions = [p for p in positions if not (
-            p['symbol'] == position['symbol'] and 
-            p['timestamp_open'] == position['timestamp_open']
-        )]
-        
-        self._save_positions(positions)
+        self.positions.delete(self.positions.key_fn(position))
         
         entry = position['entry_price']
         side = position['side']
@@ -589,30 +574,31 @@ class PositionManager:
         })
     
     def update_position_extremes(self, position: Dict, current_price: float):
-        positions = self.get_active_positions()
+        key = self.positions.key_fn(position)
         
-        for p in positions:
-            if (p['symbol'] == position['symbol'] and 
-                p['timestamp_open'] == position['timestamp_open']):
+        with self.positions.store.transaction() as tx:
+            for p in self.positions.find(symbol=position['symbol']):
+                if self.positions.key_fn(p) != key:
+                    continue
                 
-                p['highest_price'] = max(p.get('highest_price', current_price), current_price)
-                p['lowest_price'] = min(p.get('lowest_price', current_price), current_price)
+                highest = max(p.get('highest_price', current_price), current_price)
+                lowest = min(p.get('lowest_price', current_price), current_price)
+                if highest != p.get('highest_price') or lowest != p.get('lowest_price'):
+                    p['highest_price'] = highest
+                    p['lowest_price'] = lowest
+                    self.positions.update(p, conn=tx)
                 break
-        
-        self._save_positions(positions)
     
     def update_telegram_msg_id(self, position: Dict, telegram_msg_id: Optional[int]):
         """Update telegram_msg_id for a position."""
         if not telegram_msg_id:
             return
         
-        positions = self.get_active_positions()
-        
-        for p in positions:
-            if (p['symbol'] == position['symbol'] and 
-                p['timestamp_open'] == position['timestamp_open']):
-                
-                p['telegram_msg_id'] = telegram_msg_id
-                break
+        key = self.positions.key_fn(position)
         
-        self._save_positions(positions)
+        with self.positions.store.transaction() as tx:
+            for p in self.positions.find(symbol=position['symbol']):
+                if self.positions.key_fn(p) == key:
+                    p['telegram_msg_id'] = telegram_msg_id
+                    self.positions.update(p, conn=tx)
+                    break
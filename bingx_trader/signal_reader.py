@@ -2,15 +2,18 @@
 Signal Reader
 Monitors signals_log.csv for new trading signals
 """
-import csv
 import os
-from typing import Optional, Dict, Set
+from typing import Optional, Dict
 from datetime import datetime, timedelta
+from log_stats import RecentKeys, read_tail_rows
+
+RECENT_SIGNAL_ROWS = 500  # Only the log tail can hold signals still inside their TTL
+PROCESSED_SIGNALS_WINDOW = 5000
 
 class SignalReader:
     def __init__(self, signal_file: str):
         self.signal_file = signal_file
-        self.processed_signals: Set[str] = set()
+        self.processed_signals = RecentKeys(PROCESSED_SIGNALS_WINDOW)
         self.last_check_time = datetime.now() - timedelta(minutes=10)
     
     def get_latest_signal(self) -> Optional[Dict]:
@@ -18,9 +21,7 @@ class SignalReader:
             return None
         
         try:
-            with open(self.signal_file, 'r') as f:
-                reader = csv.DictReader(f)
-                signals = list(reader)
+            signals = read_tail_rows(self.signal_file, RECENT_SIGNAL_ROWS)
             
             if not signals:
                 return None
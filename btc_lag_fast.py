@@ -2,9 +2,13 @@
 """Fast BTC Lag Analysis - key lags only"""
 
 import csv
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
-import statistics
+
+import numpy as np
+import pandas as pd
+
+from lead_lag import grid_returns, lag_curve_frame
 
 # Load data
 data_by_symbol = defaultdict(list)
@@ -26,22 +30,10 @@ with open('analysis_log.csv', 'r') as f:
 for symbol in data_by_symbol:
     data_by_symbol[symbol].sort(key=lambda x: x[0])
 
-btc_data = data_by_symbol['BTCUSDT']
-
-def simple_correlation(btc_changes, alt_changes):
-    """Calculate simple correlation"""
-    if len(btc_changes) < 10:
-        return None
-    
-    btc_mean = statistics.mean(btc_changes)
-    alt_mean = statistics.mean(alt_changes)
-    
-    numerator = sum((b - btc_mean) * (a - alt_mean) 
-                   for b, a in zip(btc_changes, alt_changes))
-    btc_std = (sum((b - btc_mean)**2 for b in btc_changes)) ** 0.5
-    alt_std = (sum((a - alt_mean)**2 for a in alt_changes)) ** 0.5
-    
-    return numerator / (btc_std * alt_std) if btc_std > 0 and alt_std > 0 else 0
+# Align every coin on the 2-minute collection grid, then lags 0, ±2 .. ±10 min in one pass
+rows = [(ts, symbol, price) for symbol, points in data_by_symbol.items() for ts, price in points]
+returns = grid_returns(pd.DataFrame(rows, columns=['timestamp', 'symbol', 'price']), step='2min')
+curves = lag_curve_frame(returns, base='BTCUSDT', max_lag=5)
 
 print("\n⏱️  FAST LAG ANALYSIS\n")
 print("Testing key lags: 0, ±2, ±4, ±6, ±8, ±10 minutes\n")
@@ -52,39 +44,7 @@ for symbol in sorted(data_by_symbol.keys()):
     if symbol == 'BTCUSDT' or len(data_by_symbol[symbol]) < 20:
         continue
     
-    alt_data = data_by_symbol[symbol]
-    
-    # Test only key lags: 0, ±2, ±4, ±6, ±8, ±10
-    test_lags = [0, -2, 2, -4, 4, -6, 6, -8, 8, -10, 10]
-    correlations = {}
-    
-    for lag_min in test_lags:
-        btc_changes = []
-        alt_changes = []
-        
-        for i in range(1, min(len(alt_data), 400)):  # Limit to 400 points for speed
-            alt_time = alt_data[i][0]
-            btc_target_time = alt_time - timedelta(minutes=lag_min)
-            
-            # Find closest BTC timestamp (within 3 minutes)
-            candidates = [(j, abs((btc_data[j][0] - btc_target_time).total_seconds())) 
-                         for j in range(len(btc_data))]
-            closest_btc_idx, time_diff = min(candidates, key=lambda x: x[1])
-            
-            if time_diff > 180:  # Skip if more than 3 minutes off
-                continue
-            
-            if closest_btc_idx > 0 and closest_btc_idx < len(btc_data):
-                btc_pct = ((btc_data[closest_btc_idx][1] - btc_data[closest_btc_idx-1][1]) / 
-                          btc_data[closest_btc_idx-1][1]) * 100
-                alt_pct = ((alt_data[i][1] - alt_data[i-1][1]) / alt_data[i-1][1]) * 100
-                
-                btc_changes.append(btc_pct)
-                alt_changes.append(alt_pct)
-        
-        corr = simple_correlation(btc_changes, alt_changes)
-        if corr is not None:
-            correlations[lag_min] = corr
+    correlations = {int(lag) * 2: corr for lag, corr in curves[symbol].items() if not np.isnan(corr)}
     
     if not correlations:
         continue
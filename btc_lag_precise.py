@@ -2,9 +2,13 @@
 """BTC Lag Analysis with 2-minute precision"""
 
 import csv
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
-import statistics
+
+import numpy as np
+import pandas as pd
+
+from lead_lag import grid_returns, lag_curve_frame, best_lags
 
 # Load data
 data_by_symbol = defaultdict(list)
@@ -26,44 +30,12 @@ with open('analysis_log.csv', 'r') as f:
 for symbol in data_by_symbol:
     data_by_symbol[symbol].sort(key=lambda x: x[0])
 
-btc_data = data_by_symbol['BTCUSDT']
+# Align every coin on the 2-minute collection grid
+rows = [(ts, symbol, price) for symbol, points in data_by_symbol.items() for ts, price in points]
+returns = grid_returns(pd.DataFrame(rows, columns=['timestamp', 'symbol', 'price']), step='2min')
 
-def calculate_correlation_with_lag(btc_data, alt_data, lag_minutes):
-    """Calculate correlation with time lag (2-minute precision)"""
-    btc_changes = []
-    alt_changes = []
-    
-    for i in range(1, len(alt_data)):
-        alt_time = alt_data[i][0]
-        # Shift BTC time by lag
-        btc_target_time = alt_time - timedelta(minutes=lag_minutes)
-        
-        # Find closest BTC timestamp
-        closest_btc_idx = min(range(len(btc_data)), 
-                             key=lambda j: abs((btc_data[j][0] - btc_target_time).total_seconds()))
-        
-        if closest_btc_idx > 0 and closest_btc_idx < len(btc_data):
-            btc_pct = ((btc_data[closest_btc_idx][1] - btc_data[closest_btc_idx-1][1]) / 
-                      btc_data[closest_btc_idx-1][1]) * 100
-            alt_pct = ((alt_data[i][1] - alt_data[i-1][1]) / alt_data[i-1][1]) * 100
-            
-            btc_changes.append(btc_pct)
-            alt_changes.append(alt_pct)
-    
-    if len(btc_changes) < 10:
-        return None
-    
-    # Calculate correlation
-    btc_mean = statistics.mean(btc_changes)
-    alt_mean = statistics.mean(alt_changes)
-    
-    numerator = sum((b - btc_mean) * (a - alt_mean) 
-                   for b, a in zip(btc_changes, alt_changes))
-    btc_std = (sum((b - btc_mean)**2 for b in btc_changes)) ** 0.5
-    alt_std = (sum((a - alt_mean)**2 for a in alt_changes)) ** 0.5
-    
-    correlation = numerator / (btc_std * alt_std) if btc_std > 0 and alt_std > 0 else 0
-    return correlation
+# Lags from -30min to +30min in 2-minute steps, all coins in one pass
+curves = lag_curve_frame(returns, base='BTCUSDT', max_lag=15)
 
 # Analyze lag for each coin with 2-minute precision
 print("\n⏱️  PRECISE LAG ANALYSIS (2-minute resolution)\n")
@@ -75,25 +47,12 @@ for symbol in sorted(data_by_symbol.keys()):
     if symbol == 'BTCUSDT' or len(data_by_symbol[symbol]) < 20:
         continue
     
-    alt_data = data_by_symbol[symbol]
-    
-    # Test lags from -30min to +30min with 2-minute steps
-    best_lag = 0
-    best_corr = 0
-    zero_lag_corr = 0
-    
-    for lag in range(-15, 16):  # -30 to +30 minutes in 2-min steps
-        lag_min = lag * 2
-        corr = calculate_correlation_with_lag(btc_data, alt_data, lag_min)
-        
-        if corr is not None:
-            if lag == 0:
-                zero_lag_corr = corr
-            if abs(corr) > abs(best_corr):
-                best_corr = corr
-                best_lag = lag_min
+    curve = curves[symbol]
+    zero_lag_corr = curve.loc[0]
+    best_lag, best_corr = best_lags(curve.index, curve.to_numpy())
+    best_lag, best_corr = int(best_lag) * 2, float(best_corr)
     
-    if zero_lag_corr == 0:
+    if np.isnan(zero_lag_corr):
         continue
     
     # Interpretation
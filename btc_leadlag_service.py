@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+BTC Lead-Lag Feature Service
+Streams 1-minute klines for BTC and all alts from Binance Futures WebSocket and
+publishes a live BTC-impulse feature per alt for the signal bot.
+
+Rolling 1m close buffers are kept per symbol. When a minute closes, the lead-lag
+curve of every alt against BTC is recomputed over the buffer in one vectorized
+call (lead_lag.lag_correlations, a few ms for all coins). Between closes only
+the BTC impulse is refreshed from the forming candle, so the published feature
+follows BTC tick by tick. A publisher thread writes data/btc_leadlag_snapshot.json
+in the UIF snapshot format (atomic replace, per-symbol 'updated') at most once
+per PUBLISH_INTERVAL_SEC; smart_signal.fetch_btc_leadlag() reads it.
+No API key required - uses public market data.
+"""
+
+from websocket._app import WebSocketApp
+from websocket._abnf import ABNF
+import json
+import time
+import threading
+
+import numpy as np
+
+from lead_lag import lag_correlations, best_lags
+from services.uif_feature_engine.snapshot import write_snapshot
+import metrics_registry
+
+# Configuration
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'AVAXUSDT', 'DOGEUSDT', 'LINKUSDT', 'XRPUSDT', 'TRXUSDT', 'ADAUSDT', 'HYPEUSDT']
+BASE_SYMBOL = 'BTCUSDT'
+SNAPSHOT_PATH = 'data/btc_leadlag_snapshot.json'
+WEBSOCKET_URL = 'wss://fstream.binance.com/stream?streams=' + '/'.join(f'{s.lower()}@kline_1m' for s in SYMBOLS)
+
+# Lead-lag curve
+BUFFER_MINUTES = 240  # Rolling 1m return buffer per symbol
+MAX_LAG_MINUTES = 15  # Lags tested: -15 .. +15 minutes
+MIN_PERIODS = 30  # Minimum overlapping 1m returns for a lag to count
+
+# Publishing
+PUBLISH_INTERVAL_SEC = 1.0  # Max snapshot write rate (klines tick several times per second)
+HEARTBEAT_SEC = 15.0  # Republish while quiet so 'updated' stays fresh
+
+
+class ReturnBuffers:
+    """
+    Last `minutes` 1m closes for a fixed symbol list, aligned on the minute grid.
+
+    Row -1 is the forming minute (its close is the latest trade price), rows
+    before it are closed minutes. Minutes without a kline stay NaN and are
+    skipped pairwise by the correlation engine.
+    """
+
+    def __init__(self, symbols, minutes=BUFFER_MINUTES):
+        self.symbols = list(symbols)
+        self.column = {s: i for i, s in enumerate(self.symbols)}
+        self.closes = np.full((minutes + 1, len(self.symbols)), np.nan)
+        self.minute = None  # Minute number (open time // 60s) of row -1
+
+    def update(self, symbol, open_time_ms, close):
+        """
+        Set the close of `symbol` for the minute starting at open_time_ms.
+
+        Returns:
+            Number of minutes the buffer advanced (0 for an in-minute update)
+        """
+        col = self.column.get(symbol)
+        if col is None:
+            return 0
+        minute = int(open_time_ms // 60000)
+
+        advanced = 0
+        if self.minute is None:
+            self.minute = minute
+        elif minute > self.minute:
+            advanced = minute - self.minute
+            if advanced >= len(self.closes):
+                self.closes[:] = np.nan
+            else:
+                self.closes[:-advanced] = self.closes[advanced:]
+                self.closes[-advanced:] = np.nan
+            self.minute = minute
+
+        row = len(self.closes) - 1 - (self.minute - minute)
+        if row >= 0:
+            self.closes[row, col] = close
+        return advanced
+
+    def returns(self):
+        """1m % returns, shape (minutes, symbols); the last row is the forming minute"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.closes[1:] / self.closes[:-1] - 1) * 100
+
+
+class LeadLagFeed:
+    """Lead-lag curve per closed minute plus a per-tick BTC impulse for every alt"""
+
+    def __init__(self, symbols=SYMBOLS, base=BASE_SYMBOL, minutes=BUFFER_MINUTES,
+                 max_lag=MAX_LAG_MINUTES, min_periods=MIN_PERIODS):
+        self.base = base
+        self.alts = [s for s in symbols if s != base]
+        self.buffers = ReturnBuffers([base] + self.alts, minutes)
+        self.max_lag = max_lag
+        self.min_periods = min_periods
+        self.curve = {}  # alt -> {'best_lag', 'best_corr', 'corr_0', 'curve_minute'}
+
+    def on_kline(self, symbol, open_time_ms, close):
+        """Fold one kline update; recompute the curves when a minute closes"""
+        if self.buffers.update(symbol, open_time_ms, close):
+            self.recompute()
+
+    def recompute(self):
+        """Lead-lag curve of all alts vs BTC over the closed minutes (one engine call)"""
+        closed = self.buffers.returns()[:-1]
+        lags, corr = lag_correlations(closed[:, 0], closed[:, 1:], self.max_lag, self.min_periods)
+        best_lag, best_corr = best_lags(lags, corr)
+        zero = corr[self.max_lag]
+        self.curve = {
+            alt: {
+                'best_lag': int(best_lag[i]),
+                'best_corr': float(best_corr[i]),
+                'corr_0': float(zero[i]),
+                'curve_minute': self.buffers.minute
+            }
+            for i, alt in enumerate(self.alts)
+            if np.isfinite(best_corr[i])
+        }
+
+    def features(self, now=None):
+        """
+        Snapshot entries: BTC returns plus, per alt, the lead-lag curve summary
+        and the BTC move that has not reached the alt yet.
+
+        btc_impulse_pct is BTC's cumulative return over the alt's lag (forming
+        minute included) when the alt follows BTC, else 0. impulse_score scales
+        it by the lag correlation: the expected alt move in BTC % terms.
+        """
+        now = time.time() if now is None else now
+        btc = self.buffers.returns()[:, 0]
+        data = {
+            self.base: {
+                'ret_1m': _round(btc[-1], 4),
+                'ret_5m': _round(np.nansum(btc[-5:]), 4),
+                'updated': now
+            }
+        }
+        for alt, c in self.curve.items():
+            impulse = float(np.nansum(btc[-c['best_lag']:])) if c['best_lag'] > 0 else 0.0
+            data[alt] = {
+                'best_lag_min': c['best_lag'],
+                'best_corr': round(c['best_corr'], 4),
+                'corr_0': _round(c['corr_0'], 4),
+                'btc_impulse_pct': round(impulse, 4),
+                'impulse_score': round(impulse * c['best_corr'], 4),
+                'updated': now
+            }
+        return data
+
+
+def _round(value, digits):
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+# Global state
+feed = LeadLagFeed()
+state_lock = threading.Lock()
+dirty = threading.Event()
+message_count = 0
+pending_since = None  # First kline update not yet in the published snapshot (publish lag; under state_lock)
+
+# Metrics children bound once (on_message runs for every kline update)
+_ws_messages = metrics_registry.WS_MESSAGES.labels(stream='kline_1m')
+_ws_errors = metrics_registry.WS_ERRORS.labels(stream='kline_1m')
+_ws_connected = metrics_registry.WS_CONNECTED.labels(stream='kline_1m')
+
+
+def save_data():
+    """Publish the current features atomically"""
+    global pending_since
+    with state_lock:
+        since, pending_since = pending_since, None
+        data = feed.features()
+    write_snapshot(data, path=SNAPSHOT_PATH)
+    metrics_registry.observe_publish('btc_leadlag', since)
+
+
+def publish_loop(stop_event=None):
+    """Throttled publisher: coalesces kline bursts into one write per PUBLISH_INTERVAL_SEC"""
+    last_publish = 0.0
+    while stop_event is None or not stop_event.is_set():
+        triggered = dirty.wait(timeout=HEARTBEAT_SEC)
+        wait = PUBLISH_INTERVAL_SEC - (time.time() - last_publish)
+        if triggered and wait > 0:
+            time.sleep(wait)
+        dirty.clear()
+        try:
+            save_data()
+        except Exception as e:
+            print(f"[ERR] Failed to publish lead-lag snapshot: {e}")
+        last_publish = time.time()
+
+
+def on_message(ws, message):
+    """Process incoming 1m kline updates"""
+    global message_count, pending_since
+
+    _ws_messages.inc()
+    try:
+        data = json.loads(message)
+
+        # Handle combined stream format
+        if 'data' in data:
+            data = data['data']
+
+        kline = data.get('k')
+        if not kline:
+            return
+
+        with state_lock:
+            feed.on_kline(kline['s'], kline['t'], float(kline['c']))
+            if pending_since is None:
+                pending_since = time.time()
+
+        message_count += 1
+        dirty.set()
+
+        # Log the refreshed curve once per closed BTC minute
+        if kline['s'] == BASE_SYMBOL and kline.get('x'):
+            with state_lock:
+                leaders = sorted(feed.curve.items(), key=lambda kv: -abs(kv[1]['best_corr']))[:3]
+            summary = ', '.join(f"{s} {c['best_lag']:+d}m ({c['best_corr']:+.2f})" for s, c in leaders)
+            print(f"[LEADLAG] Minute closed | {len(feed.curve)} curves | top: {summary or 'warming up'}")
+
+    except Exception as e:
+        _ws_errors.inc()
+        print(f"[ERR] Error processing message: {e}")
+
+
+def on_error(ws, error):
+    """Handle WebSocket errors"""
+    _ws_errors.inc()
+    print(f"[ERR] WebSocket error: {error}")
+
+
+def on_close(ws, close_status_code, close_msg):
+    """Handle WebSocket close"""
+    print(f"[LEADLAG] WebSocket connection closed")
+    _ws_connected.set(0)
+
+
+def on_open(ws):
+    """Handle WebSocket open"""
+    print("=" * 70)
+    print("BTC LEAD-LAG SERVICE - Binance Futures 1m kline streams")
+    print("=" * 70)
+    print(f"[LEADLAG] Tracking {len(SYMBOLS)} symbols vs {BASE_SYMBOL}: {', '.join(SYMBOLS)}")
+    print(f"[LEADLAG] Buffer {BUFFER_MINUTES}m, lags ±{MAX_LAG_MINUTES}m, min {MIN_PERIODS} pairs")
+    print(f"[LEADLAG] Snapshot: {SNAPSHOT_PATH} (max every {PUBLISH_INTERVAL_SEC}s)")
+    print("-" * 70)
+    print("[LEADLAG] ✅ Connected to Binance kline streams")
+    _ws_connected.set(1)
+
+
+def on_ping(ws, message):
+    """Handle ping from server"""
+    ws.send(message, ABNF.OPCODE_PONG)
+
+
+def main():
+    """Main function to start the lead-lag service"""
+    print("\n[LEADLAG] Starting BTC Lead-Lag Feature Service...")
+    metrics_registry.start_metrics_server('btc_leadlag')
+
+    threading.Thread(target=publish_loop, name='leadlag-publisher', daemon=True).start()
+
+    ws = WebSocketApp(
+        WEBSOCKET_URL,
+        on_message=on_message,
+        on_error=on_error,
+        on_close=on_close,
+        on_open=on_open,
+        on_ping=on_ping
+    )
+
+    # Run forever with auto-reconnect
+    while True:
+        try:
+            ws.run_forever(ping_interval=60, ping_timeout=10)
+            print("[LEADLAG] Connection lost. Reconnecting in 5 seconds...")
+            time.sleep(5)
+        except KeyboardInterrupt:
+            print("\n[LEADLAG] Shutting down lead-lag service...")
+            break
+        except Exception as e:
+            print(f"[ERR] Unexpected error: {e}")
+            print("[LEADLAG] Reconnecting in 10 seconds...")
+            time.sleep(10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Compiled inference artifacts for the enhanced formula models
+
+A pickled scikit-learn bundle ({'model', 'scaler', 'feature_names', ...})
+needs sklearn to load, keeps every tree as Python objects, and goes through
+the general predict path for each single row. compile_model() flattens the
+model into a directory of plain .npy arrays plus meta.json:
+
+    forest / gbm / tree  all trees' nodes concatenated: feature, threshold,
+                         children (left/right interleaved), value, roots
+    linear               coef, intercept
+    scaler               mean, scale (applied before the model, as in training)
+
+CompiledModel evaluates it with NumPy only. Arrays are memory-mapped, so load
+is a few file opens and the OS shares the pages between processes. Trees are
+walked level by level for all trees at once: leaves point to themselves, so
+max_depth vectorized steps reach every leaf without per-node Python code.
+Predictions match sklearn exactly (features are compared as float32, like
+sklearn's tree code does).
+"""
+
+import fcntl
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+COMPILED_SUFFIX = '.compiled'
+FORMAT_VERSION = 1
+LOAD_RETRIES = 20
+LOAD_RETRY_SEC = 0.05
+
+
+def compiled_path(pickle_path: str) -> str:
+    """enhanced_formula_v2.pkl -> enhanced_formula_v2.compiled"""
+    root, ext = os.path.splitext(pickle_path)
+    return (root if ext == '.pkl' else pickle_path) + COMPILED_SUFFIX
+
+
+def _flatten_trees(trees):
+    """Concatenate sklearn tree_ structures; leaves loop back to themselves"""
+    parts = {name: [] for name in ('feature', 'threshold', 'children', 'value')}
+    roots = []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        t = tree.tree_
+        n = t.node_count
+        idx = np.arange(offset, offset + n, dtype=np.int32)
+        leaf = t.children_left < 0
+
+        parts['feature'].append(np.where(leaf, 0, t.feature).astype(np.int32))
+        parts['threshold'].append(np.where(leaf, np.inf, t.threshold).astype(np.float64))
+        # children[2 * node + went_right]
+        left = np.where(leaf, idx, t.children_left + offset)
+        right = np.where(leaf, idx, t.children_right + offset)
+        parts['children'].append(np.column_stack([left, right]).ravel().astype(np.int32))
+        parts['value'].append(t.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, t.max_depth)
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    arrays['roots'] = np.asarray(roots, dtype=np.int32)
+    return arrays, max_depth
+
+
+def _model_arrays(model):
+    """(kind, arrays, params) for the supported sklearn regressors"""
+    name = type(model).__name__
+    if hasattr(model, 'estimators_') and name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        arrays, depth = _flatten_trees(model.estimators_)
+        return 'trees', arrays, {'base': 0.0, 'tree_weight': 1.0 / len(model.estimators_), 'max_depth': depth}
+
+    if name == 'GradientBoostingRegressor':
+        arrays, depth = _flatten_trees(model.estimators_[:, 0])
+        n_features = model.n_features_in_
+        base = 0.0 if model.init_ == 'zero' else float(np.ravel(model.init_.predict(np.zeros((1, n_features))))[0])
+        return 'trees', arrays, {'base': base, 'tree_weight': float(model.learning_rate), 'max_depth': depth}
+
+    if name in ('DecisionTreeRegressor', 'ExtraTreeRegressor'):
+        arrays, depth = _flatten_trees([model])
+        return 'trees', arrays, {'base': 0.0, 'tree_weight': 1.0, 'max_depth': depth}
+
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_') and np.ndim(model.coef_) == 1:
+        arrays = {'coef': np.asarray(model.coef_, dtype=np.float64)}
+        return 'linear', arrays, {'intercept': float(model.intercept_)}
+
+    raise TypeError(f"Cannot compile {name}: supported are forests, gradient boosting, trees and linear models")
+
+
+def _json_safe(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep metadata values that survive a JSON round trip"""
+    safe = {}
+    for key, value in metadata.items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+@contextmanager
+def _artifact_lock(path: str):
+    """Exclusive lock (path + '.lock') serializing compiles and swaps across processes"""
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _build_artifact(model, feature_names: Sequence[str], path: str, scaler=None,
+                    metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Write the artifact into a fresh private directory next to `path` and return it"""
+    kind, arrays, params = _model_arrays(model)
+    if scaler is not None:
+        arrays['mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'kind': kind,
+        'model_class': type(model).__name__,
+        'feature_names': list(feature_names),
+        'params': params,
+        'arrays': sorted(arrays),
+        'metadata': _json_safe(metadata or {})
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path) + '.tmp.', dir=parent)
+    try:
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return tmp_path
+
+
+def _swap_in(tmp_path: str, path: str):
+    """Replace `path` with tmp_path (caller holds _artifact_lock)"""
+    old_path = f"{path}.old.{os.getpid()}"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def compile_model(model, feature_names: Sequence[str], path: str, scaler=None,
+                  metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Write `model` (and the StandardScaler applied before it) as a compiled artifact.
+
+    The directory is built in a private temp directory next to `path` and
+    swapped in under the artifact lock, so concurrent compiles never share
+    scratch space and readers never see a half-written artifact.
+    """
+    tmp_path = _build_artifact(model, feature_names, path, scaler, metadata)
+    with _artifact_lock(path):
+        _swap_in(tmp_path, path)
+    return path
+
+
+def _build_from_pickle(pickle_path: str, path: str) -> str:
+    with open(pickle_path, 'rb') as f:
+        bundle = pickle.load(f)
+    metadata = {k: v for k, v in bundle.items() if k not in ('model', 'scaler')}
+    return _build_artifact(bundle['model'], bundle['feature_names'], path,
+                           scaler=bundle.get('scaler'), metadata=metadata)
+
+
+def compile_pickle(pickle_path: str, path: Optional[str] = None) -> str:
+    """Compile a pickled training bundle ({'model', 'scaler', 'feature_names', ...})"""
+    path = path or compiled_path(pickle_path)
+    tmp_path = _build_from_pickle(pickle_path, path)
+    with _artifact_lock(path):
+        _swap_in(tmp_path, path)
+    return path
+
+
+class CompiledModel:
+    """NumPy-only evaluator for artifacts written by compile_model()"""
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.kind = meta['kind']
+        self.model_class = meta['model_class']
+        self.feature_names = meta['feature_names']
+        self.metadata = meta.get('metadata', {})
+        self.params = meta['params']
+        self.arrays = arrays
+        self.mean = arrays.get('mean')
+        self.scale = arrays.get('scale')
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CompiledModel':
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format {meta.get('format_version')} in {path}")
+        # Plain ndarray views over the mapping: no np.memmap overhead per indexing op
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None))
+            for name in meta['arrays']
+        }
+        return cls(meta, arrays)
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[-1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {X.shape[-1]}")
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        return X
+
+    def predict(self, X) -> np.ndarray:
+        """Predict a 2-D batch (rows x features, in feature_names order)"""
+        X = self._prepare(X)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        if self.kind == 'linear':
+            return X @ self.arrays['coef'] + self.params['intercept']
+
+        a = self.arrays
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(np.asarray(a['roots']), (len(X), len(a['roots'])))
+        for _ in range(self.params['max_depth']):
+            went_right = X[rows, a['feature'][node]] > a['threshold'][node]
+            node = a['children'][2 * node + went_right]
+        return self.params['base'] + self.params['tree_weight'] * a['value'][node].sum(axis=1)
+
+    def predict_one(self, row) -> float:
+        """
+        Predict a single row.
+
+        Args:
+            row: sequence in feature_names order, or dict keyed by feature name
+        """
+        if isinstance(row, dict):
+            row = [row[name] for name in self.feature_names]
+        x = self._prepare(row)
+
+        if self.kind == 'linear':
+            return float(x @ self.arrays['coef'] + self.params['intercept'])
+
+        a = self.arrays
+        x = x.astype(np.float32)
+        node = np.asarray(a['roots'])
+        for _ in range(self.params['max_depth']):
+            node = a['children'][2 * node + (x[a['feature'][node]] > a['threshold'][node])]
+        return float(self.params['base'] + self.params['tree_weight'] * a['value'][node].sum())
+
+
+def _is_stale(pickle_path: str, path: str) -> bool:
+    meta_file = os.path.join(path, 'meta.json')
+    try:
+        compiled_mtime = os.path.getmtime(meta_file)
+    except FileNotFoundError:
+        return True
+    return os.path.exists(pickle_path) and os.path.getmtime(pickle_path) > compiled_mtime
+
+
+def load_compiled(pickle_path: str) -> CompiledModel:
+    """
+    Compiled artifact for a training pickle, compiling it first when missing or
+    older than the pickle (needs scikit-learn only for that one-time step).
+
+    Processes loading the same pickle compile it once: the staleness check is
+    repeated under the artifact lock. A load that races a swap is retried.
+    """
+    path = compiled_path(pickle_path)
+    if _is_stale(pickle_path, path):
+        with _artifact_lock(path):
+            if _is_stale(pickle_path, path):
+                _swap_in(_build_from_pickle(pickle_path, path), path)
+
+    for attempt in range(LOAD_RETRIES):
+        try:
+            return CompiledModel.load(path)
+        except FileNotFoundError:
+            if attempt == LOAD_RETRIES - 1:
+                raise
+            time.sleep(LOAD_RETRY_SEC)  # Between the two renames of a concurrent swap
+
+
+if __name__ == '__main__':
+    import sys
+    for pkl in sys.argv[1:] or ['enhanced_formula/enhanced_formula_v2.pkl']:
+        out = compile_pickle(pkl)
+        compiled = CompiledModel.load(out)
+        print(f"✅ {pkl} -> {out} ({compiled.model_class}, {len(compiled.feature_names)} features)")
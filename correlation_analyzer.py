@@ -18,6 +18,7 @@ from sklearn.feature_selection import mutual_info_classif
 from scipy.stats import pearsonr
 import json
 from datetime import datetime, timedelta
+from log_join import asof_join
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -84,24 +85,16 @@ class CorrelationAnalyzer:
                 analysis_df = pd.read_csv(self.analysis_file, on_bad_lines='skip')
                 analysis_df['timestamp'] = pd.to_datetime(analysis_df['timestamp'])
                 
-                # Attempt to merge
-                merged_data = []
-                for idx, eff_row in eff_df.iterrows():
-                    time_diff = abs(analysis_df['timestamp'] - eff_row['timestamp_sent'])
-                    matches = analysis_df[
-                        (analysis_df['symbol'] == eff_row['symbol']) &
-                        (analysis_df['verdict'] == eff_row['verdict']) &
-                        (time_diff < timedelta(minutes=2))
-                    ]
-                    
-                    if len(matches) > 0:
-                        closest_match = matches.loc[time_diff[matches.index].idxmin()]
-                        
-                        # Add analysis indicators to effectiveness data
-                        eff_df.loc[idx, 'cvd'] = closest_match['cvd']
-                        eff_df.loc[idx, 'oi_change_pct'] = closest_match['oi_change_pct']
-                        eff_df.loc[idx, 'price_vs_vwap_pct'] = closest_match['price_vs_vwap_pct']
-                        eff_df.loc[idx, 'volume_spike'] = int(closest_match['volume_spike'])
+                # Attach the closest analysis row (same symbol + verdict, < 2 minutes apart)
+                enriched = asof_join(eff_df, analysis_df, left_on='timestamp_sent', right_on='timestamp',
+                                     by=('symbol', 'verdict'), tolerance=timedelta(minutes=2), how='left',
+                                     inclusive=False, suffixes=('', '_analysis'))
+                
+                # Add analysis indicators to effectiveness data
+                eff_df['cvd'] = enriched['cvd']
+                eff_df['oi_change_pct'] = enriched['oi_change_pct']
+                eff_df['price_vs_vwap_pct'] = enriched['price_vs_vwap_pct']
+                eff_df['volume_spike'] = enriched['volume_spike'].map(lambda v: int(v) if pd.notna(v) else np.nan)
                 
                 if 'cvd' in eff_df.columns:
                     print(f"[CORRELATION] Enriched {eff_df['cvd'].notna().sum()} signals with analysis data")
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Buffered CSV Log Writer - shared writer for the append-only CSV logs
+
+The signal loop, AI analyst, alert manager, trader and UIF engine used to
+open, append one row and close their CSV log for every event. A
+CsvLogWriter instead queues rows in memory and a background thread appends
+them in one write per batch, after flush_interval seconds or as soon as
+max_buffer_rows are waiting. Callers only pay for a list append.
+
+fsync policy:
+- 'never':  leave durability to the OS page cache (default, logs are analytics)
+- 'flush':  fsync once after every batch (audit / trade logs)
+- 'always': write and fsync synchronously on every row (nothing is buffered)
+
+Rotation follows services/data_feeds/writer.FeedWriter: once the file
+exceeds rotate_mb it is renamed to <stem>_<YYYYmmdd_HHMMSS><suffix>, a new
+file with the header is started and only the newest keep_files rotations
+are kept. All writers are drained by close_all() at interpreter exit and on
+SIGTERM (process_supervisor stops children with it), after which any
+handler installed before this module runs, or the process exits with 143.
+Forked children (multiprocessing workers) keep the SIGTERM behaviour they
+had before this module was imported.
+"""
+
+import atexit
+import csv
+import io
+import os
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import metrics_registry
+
+FLUSH_INTERVAL_SEC = 1.0
+MAX_BUFFER_ROWS = 256
+MAX_PENDING_BATCHES = 20  # Rows kept for retry after failed writes: MAX_BUFFER_ROWS * this
+FSYNC_POLICIES = ('never', 'flush', 'always')
+SIGTERM_DRAIN_TIMEOUT = 5.0  # Max seconds SIGTERM waits for the drain (supervisor kills after 10)
+
+Row = Union[Sequence, Dict[str, object]]
+
+
+class CsvLogWriter:
+    """Thread-safe buffered appender for one CSV file"""
+
+    def __init__(self, path: str, header: Sequence[str], flush_interval: float = FLUSH_INTERVAL_SEC,
+                 max_buffer_rows: int = MAX_BUFFER_ROWS, fsync: str = 'never',
+                 rotate_mb: Optional[float] = None, keep_files: int = 14, encoding: str = 'utf-8'):
+        """
+        Args:
+            path: CSV file path (parent directory is created)
+            header: Column names, written to every new file; dict rows are mapped by them
+            flush_interval: Max seconds a row waits in memory
+            max_buffer_rows: Buffered rows that trigger an immediate flush
+            fsync: One of FSYNC_POLICIES
+            rotate_mb: Rotate when the file exceeds this size (None = never)
+            keep_files: Number of rotated files to keep
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = Path(path)
+        self.header = list(header)
+        self.flush_interval = flush_interval
+        self.max_buffer_rows = max_buffer_rows
+        self.fsync = fsync
+        self.rotate_bytes = rotate_mb * 1024 * 1024 if rotate_mb else None
+        self.keep_files = keep_files
+        self.encoding = encoding
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+        self._buffer: List[tuple] = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # One batch on disk at a time
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._io_lock:
+            self._write_rows([])  # Create the file with its header, as the old loggers did at init
+
+    def write_row(self, row: Row):
+        """Queue one row (sequence in header order, or dict keyed by header)"""
+        self.write_rows([row])
+
+    def write_rows(self, rows: Iterable[Row]):
+        """Queue rows; values are captured now, formatting happens on the flush thread"""
+        captured = [tuple(r.get(h) for h in self.header) if isinstance(r, dict) else tuple(r) for r in rows]
+        if not captured:
+            return
+        if self.fsync == 'always' or self._closed:
+            with self._io_lock:
+                self._write_rows(captured)
+            return
+        with self._cond:
+            self._buffer.extend(captured)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'csv-log:{self.path.name}', daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.max_buffer_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """Write all buffered rows now"""
+        with self._io_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            if not self._write_rows(rows):
+                with self._cond:
+                    self._buffer[:0] = rows
+                    excess = len(self._buffer) - self.max_buffer_rows * MAX_PENDING_BATCHES
+                    if excess > 0:
+                        del self._buffer[:excess]
+                        self.dropped += excess
+                        print(f"[WRITER] {self.path.name}: dropped {excess} rows after repeated write failures")
+
+    def close(self):
+        """Drain the buffer and stop the flush thread; later rows are written synchronously"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.max_buffer_rows:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _write_rows(self, rows: List[tuple]) -> bool:
+        """Append rows (header first for a new or empty file); caller holds _io_lock"""
+        try:
+            if self.rotate_bytes and self.path.exists() and self.path.stat().st_size > self.rotate_bytes:
+                self._rotate_file()
+
+            out = io.StringIO()
+            writer = csv.writer(out)
+            if not self.path.exists() or self.path.stat().st_size == 0:
+                writer.writerow(self.header)
+            writer.writerows(rows)
+            data = out.getvalue()
+            if not data:
+                return True
+
+            with open(self.path, 'a', newline='', encoding=self.encoding) as f:
+                f.write(data)
+                if self.fsync != 'never':
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.rows_written += len(rows)
+            if rows:
+                self.flushes += 1
+            return True
+        except Exception as e:
+            print(f"[WRITER] Failed to write {self.path}: {e}")
+            return False
+
+    def _rotate_file(self):
+        """Rotate the current file and remove rotations beyond keep_files"""
+        file_size = self.path.stat().st_size
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        rotated_path = self.path.parent / f"{self.path.stem}_{timestamp}{self.path.suffix}"
+        self.path.rename(rotated_path)
+        print(f"[WRITER] Rotated: {rotated_path.name} ({file_size / 1024 / 1024:.1f} MB)")
+
+        rotated_files = sorted(
+            self.path.parent.glob(f"{self.path.stem}_*{self.path.suffix}"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for old_file in rotated_files[self.keep_files:]:
+            old_file.unlink()
+            print(f"[WRITER] Removed old file: {old_file.name}")
+
+    def get_stats(self) -> dict:
+        """Writer counters"""
+        with self._cond:
+            buffered = len(self._buffer)
+        return {
+            'path': str(self.path),
+            'buffered': buffered,
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'dropped': self.dropped,
+            'fsync': self.fsync
+        }
+
+
+_writers: Dict[str, CsvLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_csv_writer(path: str, header: Sequence[str], **kwargs) -> CsvLogWriter:
+    """Process-wide writer for path (one buffer per file, however many loggers share it)"""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = CsvLogWriter(path, header, **kwargs)
+        return writer
+
+
+def flush_all():
+    """Write every writer's buffered rows now"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def close_all():
+    """Drain and stop every writer (registered with atexit)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
+
+
+def _on_sigterm(signum, frame):
+    """Drain every writer, then hand over to the previous handler or exit"""
+    # Drain on a helper thread: the interrupted main thread may hold a writer lock
+    drain = threading.Thread(target=close_all, name='csv-log:sigterm', daemon=True)
+    drain.start()
+    drain.join(SIGTERM_DRAIN_TIMEOUT)
+    if callable(_previous_sigterm):
+        _previous_sigterm(signum, frame)
+    else:
+        raise SystemExit(128 + signum)
+
+
+def _block_sigterm():
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+
+
+def _unblock_sigterm():
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+
+
+def _restore_sigterm_in_child():
+    """
+    Forked children (multiprocessing workers) get the old SIGTERM behaviour
+    back: their writers are copies of the parent's. SIGTERM stays blocked
+    across fork(), since a child drops Python-level signals that arrive
+    before it is set up, and is delivered once the handler is restored.
+    """
+    try:
+        if signal.getsignal(signal.SIGTERM) is _on_sigterm:
+            signal.signal(signal.SIGTERM, _previous_sigterm if _previous_sigterm is not None else signal.SIG_DFL)
+    finally:
+        _unblock_sigterm()
+
+
+def _install_sigterm_handler():
+    """SIGTERM skips atexit, so supervised restarts would lose buffered rows without this"""
+    global _previous_sigterm
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+        if previous is signal.SIG_IGN:
+            return
+        signal.signal(signal.SIGTERM, _on_sigterm)
+        _previous_sigterm = previous
+    except ValueError:
+        return  # Imported off the main thread: atexit still drains on normal exit
+    os.register_at_fork(before=_block_sigterm, after_in_parent=_unblock_sigterm,
+                        after_in_child=_restore_sigterm_in_child)
+
+
+def _collect():
+    """metrics_registry collector: buffered rows (queue depth) and dropped rows per log file"""
+    with _writers_lock:
+        stats = [writer.get_stats() for writer in _writers.values()]
+    yield ('csv_log_buffered_rows', 'gauge', 'Rows waiting in a CsvLogWriter buffer',
+           [({'file': os.path.basename(s['path'])}, s['buffered']) for s in stats])
+    yield ('csv_log_rows_written_total', 'counter', 'Rows appended by a CsvLogWriter',
+           [({'file': os.path.basename(s['path'])}, s['rows_written']) for s in stats])
+    yield ('csv_log_dropped_rows_total', 'counter', 'Rows dropped after repeated write failures',
+           [({'file': os.path.basename(s['path'])}, s['dropped']) for s in stats])
+
+
+_previous_sigterm = None
+atexit.register(close_all)
+_install_sigterm_handler()
+metrics_registry.REGISTRY.register_collector(_collect)
@@ -6,12 +6,15 @@ No API key required - uses public market data.
 """
 
 import json
+import os
 import time
 from websocket._app import WebSocketApp
 import threading
 from datetime import datetime
 from pathlib import Path
 import pytz
+import snapshot_bus
+import metrics_registry
 
 # Timezone configuration - GMT+3
 TZ = pytz.timezone('Etc/GMT-3')
@@ -28,6 +31,12 @@ cvd_history = {}  # Rolling history for each symbol (timestamp, cvd_value)
 trade_counts = {}
 last_save_time = time.time()
 last_reset_time = time.time()
+pending_since = None  # First trade not yet in the saved file (publish lag)
+
+# Metrics children bound once (on_message runs for every trade)
+_ws_messages = metrics_registry.WS_MESSAGES.labels(stream='aggTrade')
+_ws_errors = metrics_registry.WS_ERRORS.labels(stream='aggTrade')
+_ws_connected = metrics_registry.WS_CONNECTED.labels(stream='aggTrade')
 
 # History configuration
 MAX_HISTORY_SIZE = 1000  # Keep last 1000 CVD snapshots (~16 minutes at 1 snapshot/sec)
@@ -53,7 +62,8 @@ def load_cvd_data():
         last_reset_time = time.time()
 
 def save_cvd_data():
-    """Save CVD data to file including rolling history"""
+    """Atomically save CVD data to file including rolling history (temp file + rename), then publish the bus"""
+    global pending_since
     try:
         data = {
             'cvd': cvd_values,
@@ -63,8 +73,13 @@ def save_cvd_data():
             'last_update': time.time(),
             'timestamp': datetime.now(TZ).isoformat()
         }
-        with open(CVD_DATA_FILE, 'w') as f:
+        tmp_file = f"{CVD_DATA_FILE}.tmp"
+        with open(tmp_file, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_file, CVD_DATA_FILE)
+        snapshot_bus.publish_cvd(data)
+        metrics_registry.observe_publish('cvd', pending_since, data['last_update'])
+        pending_since = None
     except Exception as e:
         print(f"[CVD] Error saving data: {e}")
 
@@ -72,7 +87,7 @@ def save_cvd_data():
 
 def on_message(ws, message):
     """Handle incoming trade messages from Binance WebSocket"""
-    global cvd_values, cvd_history, trade_counts, last_save_time
+    global cvd_values, cvd_history, trade_counts, last_save_time, pending_since
     
     try:
         data = json.loads(message)
@@ -110,6 +125,9 @@ def on_message(ws, message):
         
         # Update rolling history (append current CVD value with timestamp)
         current_time = time.time()
+        if pending_since is None:
+            pending_since = current_time
+        _ws_messages.inc()
         cvd_history[symbol].append({
             'timestamp': current_time,
             'cvd': cvd_values[symbol]
@@ -131,21 +149,25 @@ def on_message(ws, message):
             last_save_time = time.time()
         
     except Exception as e:
+        _ws_errors.inc()
         print(f"[CVD] Error processing message: {e}")
 
 def on_error(ws, error):
     """Handle WebSocket errors"""
+    _ws_errors.inc()
     print(f"[CVD] WebSocket error: {error}")
 
 def on_close(ws, close_status_code, close_msg):
     """Handle WebSocket connection close"""
     print(f"[CVD] WebSocket connection closed: {close_status_code} - {close_msg}")
     print("[CVD] Will attempt to reconnect in 5 seconds...")
+    _ws_connected.set(0)
     save_cvd_data()
 
 def on_open(ws):
     """Handle WebSocket connection open"""
     print(f"[CVD] ✅ Connected to Binance Futures WebSocket")
+    _ws_connected.set(1)
     print(f"[CVD] Monitoring {len(SYMBOLS)} symbols: {', '.join(SYMBOLS)}")
     print(f"[CVD] Storing full history (no automatic reset)")
     print(f"[CVD] Data saved to: {CVD_DATA_FILE}")
@@ -174,6 +196,7 @@ def start_cvd_service():
     
     # Load existing data
     load_cvd_data()
+    metrics_registry.start_metrics_server('cvd_service')
     
     # Create WebSocket URL
     ws_url = create_websocket_url()
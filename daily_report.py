@@ -7,13 +7,15 @@ Computes per-symbol metrics from analysis_log.csv and effectiveness_log.csv:
 - blocked_share: % of potential signals blocked by dev_sigma filter
 - avg_ttl_min: Average signal duration in minutes
 
+Appends the per-stage decide_signal latency table (stage_timing.py).
 Sends compact table to Telegram and prints to console.
 """
 
-import csv
 import datetime
 from collections import defaultdict
 from telegram_utils import send_telegram_message
+from log_stats import get_analysis_stats, get_effectiveness_stats, group_counts
+import stage_timing
 
 
 def compute_daily_metrics(analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv'):
@@ -23,10 +25,8 @@ def compute_daily_metrics(analysis_log_path='analysis_log.csv', effectiveness_lo
     Returns:
         dict: {symbol: {profit_factor, win_rate, blocked_share, avg_ttl_min}}
     """
-    # Get today's date range (00:00 to 23:59 UTC)
-    today = datetime.datetime.utcnow().date()
-    today_start = datetime.datetime.combine(today, datetime.time.min)
-    today_end = datetime.datetime.combine(today, datetime.time.max)
+    # Today's counters (UTC), maintained incrementally from the log tails
+    today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
     
     # Data structures for metrics
     symbol_data = defaultdict(lambda: {
@@ -41,66 +41,24 @@ def compute_daily_metrics(analysis_log_path='analysis_log.csv', effectiveness_lo
         'loss_pnl': 0.0
     })
     
-    # Parse analysis_log.csv for blocked and TTL data
-    try:
-        with open(analysis_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    ts = datetime.datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S')
-                    if not (today_start <= ts <= today_end):
-                        continue
-                    
-                    symbol = row['symbol']
-                    verdict = row['verdict']
-                    
-                    # Track TTL (for BUY/SELL only)
-                    if verdict in ['BUY', 'SELL']:
-                        ttl = float(row.get('ttl_minutes', 0))
-                        if ttl > 0:
-                            symbol_data[symbol]['ttl_sum'] += ttl
-                            symbol_data[symbol]['ttl_count'] += 1
-                    
-                    # Track blocked signals
-                    blocked = int(row.get('dev_sigma_blocked', 0))
-                    if blocked == 1:
-                        symbol_data[symbol]['blocked_count'] += 1
-                    
-                    # Count total potential verdicts (BUY, SELL, or blocked)
-                    if verdict in ['BUY', 'SELL'] or blocked == 1:
-                        symbol_data[symbol]['total_verdicts'] += 1
-                        
-                except (ValueError, KeyError) as e:
-                    continue
-    except FileNotFoundError:
+    # analysis_log.csv: blocked and TTL data
+    analysis_stats = get_analysis_stats(analysis_log_path)
+    if analysis_stats.exists():
+        for symbol, counts in analysis_stats.day_counts(today).items():
+            symbol_data[symbol].update(counts)
+    else:
         print(f'[WARN] Daily report: {analysis_log_path} not found')
     
-    # Parse effectiveness_log.csv for win/loss data
-    try:
-        with open(effectiveness_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    ts_sent = datetime.datetime.strptime(row['timestamp_sent'], '%Y-%m-%d %H:%M:%S')
-                    if not (today_start <= ts_sent <= today_end):
-                        continue
-                    
-                    symbol = row['symbol']
-                    outcome = row['outcome']
-                    pnl_pct = float(row.get('pnl_pct', 0.0))
-                    
-                    if outcome == 'win':
-                        symbol_data[symbol]['wins'] += 1
-                        symbol_data[symbol]['win_pnl'] += abs(pnl_pct)
-                    elif outcome == 'loss':
-                        symbol_data[symbol]['losses'] += 1
-                        symbol_data[symbol]['loss_pnl'] += abs(pnl_pct)
-                    elif outcome == 'cancelled':
-                        symbol_data[symbol]['cancelled'] += 1
-                        
-                except (ValueError, KeyError) as e:
-                    continue
-    except FileNotFoundError:
+    # effectiveness_log.csv: win/loss data
+    eff_stats = get_effectiveness_stats(effectiveness_log_path)
+    if eff_stats.exists():
+        for symbol, counts in group_counts(eff_stats.counts(day=today), 0).items():
+            symbol_data[symbol]['wins'] = counts.wins
+            symbol_data[symbol]['losses'] = counts.losses
+            symbol_data[symbol]['cancelled'] = counts.cancelled
+            symbol_data[symbol]['win_pnl'] = counts.win_pnl
+            symbol_data[symbol]['loss_pnl'] = counts.loss_pnl
+    else:
         print(f'[WARN] Daily report: {effectiveness_log_path} not found')
     
     # Compute metrics per symbol
@@ -184,8 +142,8 @@ def send_daily_report():
     # Compute daily metrics
     metrics = compute_daily_metrics()
     
-    # Format report
-    report = format_daily_report_table(metrics)
+    # Format report (plus decide_signal stage latencies recorded in this process)
+    report = format_daily_report_table(metrics) + "\n\n" + stage_timing.format_report()
     
     # Print to console
     print('\n' + '=' * 60)
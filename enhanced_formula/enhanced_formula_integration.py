@@ -4,16 +4,20 @@ Enhanced Formula Integration Module
 Loads trained 12-factor model and provides predictions for price targets
 """
 
-import pickle
 import json
+import os
+import sys
 import numpy as np
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_model import load_compiled
+
 # Global cache for loaded model
 _MODEL_CACHE = None
 
 def load_enhanced_model():
-    """Load trained enhanced formula model"""
+    """Load trained enhanced formula model (compiled NumPy artifact, memory-mapped)"""
     global _MODEL_CACHE
     
     if _MODEL_CACHE is not None:
@@ -26,12 +30,11 @@ def load_enhanced_model():
         return None
     
     try:
-        with open(model_path, 'rb') as f:
-            _MODEL_CACHE = pickle.load(f)
+        _MODEL_CACHE = load_compiled(str(model_path))
         
-        print(f"[ENHANCED] ✅ Loaded model v{_MODEL_CACHE['version']}")
-        print(f"[ENHANCED] R² score: {_MODEL_CACHE['r2_score']:.3f}")
-        print(f"[ENHANCED] Features: {len(_MODEL_CACHE['feature_names'])}")
+        print(f"[ENHANCED] ✅ Loaded model v{_MODEL_CACHE.metadata.get('version')}")
+        print(f"[ENHANCED] R² score: {_MODEL_CACHE.metadata.get('r2_score', 0.0):.3f}")
+        print(f"[ENHANCED] Features: {len(_MODEL_CACHE.feature_names)}")
         
         return _MODEL_CACHE
     except Exception as e:
@@ -58,16 +61,13 @@ def predict_price_movement(indicator_data):
         float: Predicted price movement percentage
         None: If model not available or missing data
     """
-    model_data = load_enhanced_model()
+    model = load_enhanced_model()
     
-    if model_data is None:
+    if model is None:
         return None
     
     try:
-        # Extract model components
-        model = model_data['model']
-        scaler = model_data['scaler']
-        feature_names = model_data['feature_names']
+        feature_names = model.feature_names
         
         # Calculate derived factors
         derived = calculate_derived_factors_from_indicators(indicator_data)
@@ -81,16 +81,8 @@ def predict_price_movement(indicator_data):
                 print(f"[ENHANCED] ⚠️  Missing feature: {feat_name}")
                 return None
         
-        # Reshape for prediction
-        X = np.array(features).reshape(1, -1)
-        
-        # Scale features
-        X_scaled = scaler.transform(X)
-        
-        # Predict
-        prediction = model.predict(X_scaled)[0]
-        
-        return prediction
+        # Scale + predict one row (scaler is part of the compiled artifact)
+        return model.predict_one(features)
         
     except Exception as e:
         print(f"[ENHANCED] ⚠️  Prediction failed: {e}")
@@ -186,9 +178,9 @@ def calculate_enhanced_targets(
 
 def get_model_status():
     """Get current status of enhanced model"""
-    model_data = load_enhanced_model()
+    model = load_enhanced_model()
     
-    if model_data is None:
+    if model is None:
         return {
             'available': False,
             'message': 'Enhanced model not trained yet'
@@ -196,10 +188,10 @@ def get_model_status():
     
     return {
         'available': True,
-        'version': model_data['version'],
-        'r2_score': model_data['r2_score'],
-        'features': len(model_data['feature_names']),
-        'trained_at': model_data['trained_at']
+        'version': model.metadata.get('version'),
+        'r2_score': model.metadata.get('r2_score'),
+        'features': len(model.feature_names),
+        'trained_at': model.metadata.get('trained_at')
     }
 
 # Example usage
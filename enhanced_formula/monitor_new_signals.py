@@ -6,15 +6,19 @@ Automatically tests model on signals that weren't in training set
 
 import pandas as pd
 import numpy as np
-import pickle
 from datetime import datetime
 import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_model import load_compiled
 
 TRAINING_CUTOFF = "2025-11-04 12:21:00"  # Training completed at this time
 
 def load_model():
-    with open('enhanced_formula/enhanced_formula_v2.pkl', 'rb') as f:
-        return pickle.load(f)
+    """Compiled Enhanced Formula v2 (scaler included, no sklearn needed)"""
+    return load_compiled('enhanced_formula/enhanced_formula_v2.pkl')
 
 def prepare_features(df, feature_names):
     numeric_cols = ['score', 'confidence', 'entry_price', 'vwap', 'oi', 'oi_change', 
@@ -71,10 +75,8 @@ def main():
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
-    model_data = load_model()
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_names = model_data['feature_names']
+    model = load_model()
+    feature_names = model.feature_names
     
     print("Waiting for new completed signals...")
     print("Press Ctrl+C to stop\n")
@@ -99,8 +101,7 @@ def main():
                 X = df_clean[feature_names]
                 y_actual = df_clean['profit_pct']
                 
-                X_scaled = scaler.transform(X)
-                y_pred = model.predict(X_scaled)
+                y_pred = model.predict(X)
                 
                 from sklearn.metrics import r2_score, mean_absolute_error
                 r2 = r2_score(y_actual, y_pred)
@@ -6,14 +6,16 @@ Tests on historical completed signals from effectiveness_log.csv
 
 import pandas as pd
 import numpy as np
-import pickle
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_model import load_compiled
 
 def load_model():
-    """Load trained model"""
-    with open('enhanced_formula/enhanced_formula_v2.pkl', 'rb') as f:
-        model_data = pickle.load(f)
-    return model_data
+    """Compiled Enhanced Formula v2 (scaler included, no sklearn needed)"""
+    return load_compiled('enhanced_formula/enhanced_formula_v2.pkl')
 
 def load_test_data():
     """Load signals and effectiveness data"""
@@ -66,14 +68,12 @@ def main():
     print("="*70)
     
     print("\n📥 Loading model...")
-    model_data = load_model()
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_names = model_data['feature_names']
+    model = load_model()
+    feature_names = model.feature_names
     
-    print(f"   Model: {model_data['model_type']}")
+    print(f"   Model: {model.metadata['model_type']}")
     print(f"   Features: {len(feature_names)}")
-    print(f"   Trained R²: {model_data['r2_test']:.4f}")
+    print(f"   Trained R²: {model.metadata['r2_test']:.4f}")
     
     print("\n📥 Loading test data...")
     df = load_test_data()
@@ -85,8 +85,7 @@ def main():
     X = df_clean[feature_names]
     y_actual = df_clean['profit_pct']
     
-    X_scaled = scaler.transform(X)
-    y_pred = model.predict(X_scaled)
+    y_pred = model.predict(X)
     
     r2 = r2_score(y_actual, y_pred)
     mae = mean_absolute_error(y_actual, y_pred)
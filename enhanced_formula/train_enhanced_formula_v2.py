@@ -9,14 +9,25 @@ import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression, Ridge, Lasso
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-import pickle
 from datetime import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_join import asof_join
+from compiled_model import compile_model, compiled_path
+from model_training import (
+    FeatureCache, data_hash, expand_grid, export_model, feature_schema, time_series_holdout, train_candidates
+)
 
 MIN_SAMPLES = 50
+CV_SPLITS = 5
+HOLDOUT = 0.2  # Most recent share of signals kept for the test score
+N_JOBS = -1  # All cores
+FEATURES_VERSION = 'v2.1'  # Bump when prepare_features changes to invalidate the feature cache
+MODEL_PATH = 'enhanced_formula/enhanced_formula_v2.pkl'
+METADATA_PATH = 'enhanced_formula/enhanced_formula_v2_metadata.json'
 
 def load_signals_log():
     """Load signals_log.csv - contains all sent trading signals"""
@@ -50,16 +61,16 @@ def merge_data(df_analysis, df_effectiveness):
     """Merge analysis log with effectiveness results"""
     print("\n🔗 Merging datasets...")
     
-    # Create merge keys - use timestamp + symbol
-    df_analysis['merge_key'] = df_analysis['timestamp'] + '_' + df_analysis['symbol']
-    df_effectiveness['merge_key'] = df_effectiveness['timestamp_sent'] + '_' + df_effectiveness['symbol']
-    
-    # Merge
-    df_merged = df_analysis.merge(
-        df_effectiveness[['merge_key', 'result', 'profit_pct', 'duration_actual']], 
-        on='merge_key', 
-        how='inner'
-    )
+    # Closest effectiveness row per symbol + verdict within 2 minutes (sorted as-of join):
+    # the two logs are written by different processes, so timestamps may differ by seconds
+    df_merged = asof_join(
+        df_analysis,
+        df_effectiveness[['timestamp_sent', 'symbol', 'verdict', 'result', 'profit_pct', 'duration_actual']],
+        left_on='timestamp',
+        right_on='timestamp_sent',
+        by=('symbol', 'verdict'),
+        tolerance=pd.Timedelta(minutes=2)
+    ).reset_index(drop=True)
     
     print(f"   Merged records: {len(df_merged)}")
     
@@ -150,79 +161,44 @@ def prepare_features(df):
     
     return df_clean, available_features
 
-def train_models(X, y, feature_names):
-    """Train multiple models and compare"""
+def build_candidates():
+    """Model candidates and their hyper-parameter grids"""
+    candidates = {'Linear Regression': LinearRegression()}
+    candidates.update(expand_grid('Ridge (L2)', Ridge(), {'alpha': [0.1, 1.0, 10.0]}))
+    candidates.update(expand_grid('Lasso (L1)', Lasso(max_iter=10000), {'alpha': [0.001, 0.01, 0.1]}))
+    candidates.update(expand_grid('Random Forest', RandomForestRegressor(n_estimators=100, random_state=42),
+                                  {'max_depth': [5, 10], 'min_samples_leaf': [1, 5]}))
+    return candidates
+
+def train_models(X, y, feature_names, n_splits=CV_SPLITS, n_jobs=N_JOBS):
+    """Train all candidates with time-series CV in parallel and compare"""
     print("\n🚀 Training models...")
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    
-    print(f"   Training set: {len(X_train)} samples")
-    print(f"   Test set: {len(X_test)} samples")
-    
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    candidates = build_candidates()
+    train_idx, test_idx = time_series_holdout(len(y), HOLDOUT)
     
-    # Train multiple models
-    models = {
-        'Linear Regression': LinearRegression(),
-        'Ridge (L2)': Ridge(alpha=1.0),
-        'Lasso (L1)': Lasso(alpha=0.01, max_iter=10000),
-        'Random Forest': RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
-    }
+    print(f"   Training set: {len(train_idx)} samples (oldest)")
+    print(f"   Test set: {len(test_idx)} samples (most recent)")
+    print(f"   Candidates: {len(candidates)} x {n_splits} time-series folds (n_jobs={n_jobs})")
     
-    results = {}
+    results = train_candidates(candidates, X, y, n_splits=n_splits, holdout=HOLDOUT, n_jobs=n_jobs)
     
     print("\n" + "="*70)
     print("MODEL COMPARISON")
     print("="*70)
     
-    for name, model in models.items():
-        # Train
-        model.fit(X_train_scaled, y_train)
-        
-        # Predict
-        y_train_pred = model.predict(X_train_scaled)
-        y_test_pred = model.predict(X_test_scaled)
-        
-        # Metrics
-        r2_train = r2_score(y_train, y_train_pred)
-        r2_test = r2_score(y_test, y_test_pred)
-        mae_test = mean_absolute_error(y_test, y_test_pred)
-        rmse_test = np.sqrt(mean_squared_error(y_test, y_test_pred))
-        
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='r2')
-        
-        results[name] = {
-            'model': model,
-            'r2_train': r2_train,
-            'r2_test': r2_test,
-            'mae_test': mae_test,
-            'rmse_test': rmse_test,
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std()
-        }
-        
-        # Print results
+    baseline_r2 = 0.014
+    for name, result in results.items():
         print(f"\n{name}:")
-        print(f"  R² Train:  {r2_train:7.4f}")
-        print(f"  R² Test:   {r2_test:7.4f}")
-        print(f"  CV Mean:   {cv_scores.mean():7.4f} (±{cv_scores.std():.4f})")
-        print(f"  MAE Test:  {mae_test:7.4f}%")
-        print(f"  RMSE Test: {rmse_test:7.4f}%")
-        
-        # Improvement vs baseline
-        baseline_r2 = 0.014
-        improvement = r2_test / baseline_r2
-        print(f"  Improvement: {improvement:.1f}x better than baseline (R²=0.014)")
-    
-    # Select best model based on test R²
-    best_name = max(results.keys(), key=lambda k: results[k]['r2_test'])
+        print(f"  R² Train:  {result['r2_train']:7.4f}")
+        print(f"  R² Test:   {result['r2_test']:7.4f}")
+        print(f"  CV Mean:   {result['cv_mean']:7.4f} (±{result['cv_std']:.4f})")
+        print(f"  MAE Test:  {result['mae_test']:7.4f}%")
+        print(f"  RMSE Test: {result['rmse_test']:7.4f}%")
+        print(f"  Improvement: {result['r2_test'] / baseline_r2:.1f}x better than baseline (R²=0.014)")
+    
+    # Select best model on time-series CV (holdout is reported, not tuned on)
+    best_name = max(results.keys(), key=lambda k: results[k]['cv_mean'])
     best_result = results[best_name]
     
     print("\n" + "="*70)
@@ -242,7 +218,7 @@ def train_models(X, y, feature_names):
     else:
         print(f"\n⚠️  WEAK: Limited predictive power")
     
-    return best_result['model'], scaler, best_name, results
+    return best_result['model'], best_result['scaler'], best_name, results
 
 def analyze_feature_importance(model, feature_names, model_name):
     """Analyze feature importance"""
@@ -282,36 +258,40 @@ def analyze_feature_importance(model, feature_names, model_name):
                      "🟡 Med" if row['Importance'] > 0.05 else "🟢 Low"
             print(f"{row['Feature']:<20} {row['Importance']:>12.4f} {impact:>10}")
 
-def save_model(model, scaler, feature_names, model_name, metrics):
-    """Save trained model"""
+def save_model(model, scaler, X, model_name, metrics, data_key):
+    """Export the best model with its feature schema"""
+    feature_names = list(X.columns)
     
     model_data = {
         'model': model,
         'scaler': scaler,
         'feature_names': feature_names,
+        'feature_schema': feature_schema(X),
         'model_type': model_name,
         'r2_test': metrics['r2_test'],
         'cv_mean': metrics['cv_mean'],
         'cv_std': metrics['cv_std'],
         'trained_at': datetime.now().isoformat(),
         'version': 'enhanced_v2_full_features',
-        'training_samples': len(feature_names)
+        'training_samples': len(X),
+        'data_hash': data_key
     }
     
-    with open('enhanced_formula/enhanced_formula_v2.pkl', 'wb') as f:
-        pickle.dump(model_data, f)
-    
     # Metadata
     metadata = {
         'model_type': model_name,
         'feature_names': feature_names,
+        'feature_schema': model_data['feature_schema'],
         'r2_test': float(metrics['r2_test']),
         'cv_mean': float(metrics['cv_mean']),
         'cv_std': float(metrics['cv_std']),
+        'cv_scores': [float(v) for v in metrics['cv_scores']],
         'mae_test': float(metrics['mae_test']),
         'rmse_test': float(metrics['rmse_test']),
-        'trained_at': datetime.now().isoformat(),
+        'trained_at': model_data['trained_at'],
         'version': 'enhanced_v2_full_features',
+        'training_samples': len(X),
+        'data_hash': data_key,
         'baseline_r2': 0.014,
         'improvement_factor': float(metrics['r2_test'] / 0.014)
     }
@@ -320,13 +300,24 @@ def save_model(model, scaler, feature_names, model_name, metrics):
         metadata['coefficients'] = {name: float(coef) for name, coef in zip(feature_names, model.coef_)}
         metadata['intercept'] = float(model.intercept_)
     
-    with open('enhanced_formula/enhanced_formula_v2_metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2)
+    export_model(MODEL_PATH, model_data, metadata, METADATA_PATH)
     
-    print(f"\n✅ Model saved to: enhanced_formula/enhanced_formula_v2.pkl")
-    print(f"✅ Metadata saved to: enhanced_formula/enhanced_formula_v2_metadata.json")
+    # Flat NumPy artifact for fast, sklearn-free inference
+    compiled = compile_model(model, feature_names, compiled_path(MODEL_PATH), scaler=scaler, metadata=metadata)
+    
+    print(f"\n✅ Model saved to: {MODEL_PATH}")
+    print(f"✅ Compiled model saved to: {compiled}")
+    print(f"✅ Metadata saved to: {METADATA_PATH}")
+
+def trained_data_hash():
+    """data_hash of the currently exported model, None if there is none"""
+    try:
+        with open(METADATA_PATH, 'r') as f:
+            return json.load(f).get('data_hash')
+    except (OSError, ValueError):
+        return None
 
-def main():
+def main(force=False):
     print("="*70)
     print("ENHANCED FORMULA V2 TRAINING - Full Feature Model")
     print("="*70)
@@ -346,8 +337,17 @@ def main():
         print(f"   Minimum required: {MIN_SAMPLES}")
         return
     
-    # Prepare features
-    df_clean, feature_names = prepare_features(df_merged)
+    # Retraining on unchanged logs would reproduce the exported model
+    data_key = data_hash(FEATURES_VERSION, df_merged)
+    if not force and data_key == trained_data_hash() and os.path.exists(MODEL_PATH):
+        print(f"\n✅ Model is up to date with current logs (data hash {data_key}), nothing to retrain")
+        print("   Run with --force to retrain anyway")
+        return
+    
+    # Prepare features (cached on disk by data hash)
+    df_clean, feature_names = FeatureCache().get_or_build(
+        'enhanced_v2', data_key, lambda: prepare_features(df_merged)
+    )
     
     if len(df_clean) < MIN_SAMPLES:
         print(f"\n⚠️  NOT ENOUGH CLEAN DATA!")
@@ -355,6 +355,8 @@ def main():
         print(f"   Minimum required: {MIN_SAMPLES}")
         return
     
+    # Chronological order for time-series CV
+    df_clean = df_clean.sort_values('timestamp', kind='mergesort')
     X = df_clean[feature_names]
     y = df_clean['profit_pct']
     
@@ -366,7 +368,7 @@ def main():
     
     # Save best model
     best_metrics = all_results[model_name]
-    save_model(best_model, scaler, feature_names, model_name, best_metrics)
+    save_model(best_model, scaler, X, model_name, best_metrics, data_key)
     
     print("\n" + "="*70)
     print("🎯 TRAINING COMPLETE!")
@@ -382,4 +384,4 @@ def main():
     print("="*70)
 
 if __name__ == '__main__':
-    main()
+    main(force='--force' in sys.argv)
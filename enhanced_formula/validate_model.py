@@ -7,15 +7,19 @@ Uses analysis_log.csv for full feature data
 
 import pandas as pd
 import numpy as np
-import pickle
 from datetime import datetime
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_model import load_compiled
 
 TRAINING_CUTOFF = "2025-11-04 12:21:00"
 
 def load_model():
-    with open('enhanced_formula/enhanced_formula_v2.pkl', 'rb') as f:
-        return pickle.load(f)
+    """Compiled Enhanced Formula v2 (scaler included, no sklearn needed)"""
+    return load_compiled('enhanced_formula/enhanced_formula_v2.pkl')
 
 def get_new_completed_signals():
     """Get all completed signals after training cutoff using signals_log"""
@@ -89,13 +93,11 @@ def main():
     print()
     
     # Load model
-    model_data = load_model()
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_names = model_data['feature_names']
+    model = load_model()
+    feature_names = model.feature_names
     
-    print(f"Model: {model_data['model_type']}")
-    print(f"Training R²: {model_data['r2_test']:.4f}")
+    print(f"Model: {model.metadata['model_type']}")
+    print(f"Training R²: {model.metadata['r2_test']:.4f}")
     print(f"Features: {', '.join(feature_names)}")
     print()
     
@@ -129,8 +131,7 @@ def main():
     X = df_clean[feature_names]
     y_actual = df_clean['profit_pct']
     
-    X_scaled = scaler.transform(X)
-    y_pred = model.predict(X_scaled)
+    y_pred = model.predict(X)
     
     # Calculate metrics
     r2 = r2_score(y_actual, y_pred)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Heartbeat - last-cycle timestamps shared between supervised children and the supervisor
+
+The supervisor (process_supervisor.py) maps one small file of float64 slots,
+one slot per child, and passes the file and slot index to each child through
+the environment. A child's beat() is a single 8-byte store into its slot: no
+syscall, no pipe to drain, and nothing to block on when the supervisor is slow.
+
+metrics_registry.observe_cycle()/observe_publish() beat on every finished
+loop cycle and snapshot publish, so services need no extra wiring. Outside a
+supervisor (no environment variables) beat() is a no-op.
+"""
+
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+ENV_FILE = 'SUPERVISOR_HEARTBEAT_FILE'
+ENV_SLOT = 'SUPERVISOR_HEARTBEAT_SLOT'
+
+_cell = None
+_resolved = False
+
+
+def _open_cell():
+    """This process's slot as a 1-element writable view, or None when unsupervised"""
+    path = os.environ.get(ENV_FILE)
+    slot = os.environ.get(ENV_SLOT)
+    if not path or slot is None:
+        return None
+    try:
+        slot = int(slot)
+        table = np.memmap(path, dtype=np.float64, mode='r+')
+        if not 0 <= slot < len(table):
+            raise ValueError(f"slot {slot} outside table of {len(table)}")
+        return table[slot:slot + 1]
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Heartbeat table unavailable ({path}): {e}")
+        return None
+
+
+def beat(now: Optional[float] = None):
+    """Record that this process just finished a unit of work"""
+    global _cell, _resolved
+    if not _resolved:
+        _cell = _open_cell()
+        _resolved = True
+    if _cell is not None:
+        _cell[0] = time.time() if now is None else now
+
+
+class HeartbeatTable:
+    """Supervisor side: creates the slot file and reads/clears slots"""
+
+    def __init__(self, path: str, n_slots: int):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._table = np.memmap(path, dtype=np.float64, mode='w+', shape=(max(n_slots, 1),))
+        self._table[:] = 0.0
+
+    def child_env(self, slot: int) -> dict:
+        """Environment variables that point a child at its slot"""
+        return {ENV_FILE: os.path.abspath(self.path), ENV_SLOT: str(slot)}
+
+    def last(self, slot: int) -> float:
+        """Last heartbeat time of a slot (0 = none since clear)"""
+        return float(self._table[slot])
+
+    def clear(self, slot: int):
+        self._table[slot] = 0.0
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - pooled keep-alive sessions, retry/backoff and per-host circuit breakers
+
+The signal loop, tracker, paper trader and Telegram helpers used to call
+requests.get/post directly, paying a TCP+TLS handshake on every request.
+This module keeps one pooled session per host instead:
+
+    data = http_client.get_json(url, params=p, timeout=20, api='coinalyze',
+                                retry=http_client.RetryPolicy(attempts=5, backoff=1.5))
+
+RetryPolicy generalizes smart_signal._get's 429 handling: retried statuses
+back off exponentially (or by the server's Retry-After). A CircuitBreaker per
+host opens after consecutive connection errors, timeouts or 5xx responses and
+fails calls fast with CircuitOpenError (a requests ConnectionError, so
+existing handlers keep working) until a trial request succeeds; a trial
+cut short by anything else (KeyboardInterrupt, a replay ending) is released
+so the next call can try again. Callers
+that run their own retry loop (the Telegram senders) pass use_breaker=False,
+so an open breaker cannot cut their retries short.
+
+Outcomes are counted in api_requests_total{api, outcome} when api is given.
+The sync client goes through requests.Session.request, so market_replay
+records and replays it like before.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Sequence
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics_registry import API_REQUESTS
+
+POOL_SIZE = 10  # Keep-alive connections per host
+BREAKER_THRESHOLD = 5  # Consecutive failures that open a host's breaker
+BREAKER_RESET = 30.0  # Seconds before an open breaker lets a trial request through
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's breaker is open"""
+
+
+class RetryPolicy:
+    """Which responses to retry and how long to wait between attempts"""
+
+    def __init__(self, attempts: int = 1, backoff: float = 1.0, backoff_max: float = 30.0,
+                 statuses: Sequence[int] = (429,), retry_errors: bool = False):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.statuses = tuple(statuses)
+        self.retry_errors = retry_errors  # Also retry connection errors and timeouts
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Wait before retry number attempt+1: Retry-After if given, else backoff * 2**attempt"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return min(self.backoff * 2 ** attempt, self.backoff_max)
+
+
+NO_RETRY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open after `reset_timeout`"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.time() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        """True if a request may go out (one trial at a time while half-open)"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release_trial(self):
+        """Half-open trial ended without an outcome; let the next request try"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.time()
+            self._trial = False
+
+
+class _NoBreaker:
+    """Stand-in for requests that bypass the breaker"""
+
+    def allow(self) -> bool:
+        return True
+
+    def record_success(self):
+        pass
+
+    def release_trial(self):
+        pass
+
+    def record_failure(self):
+        pass
+
+
+_NO_BREAKER = _NoBreaker()
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    """Process-wide breaker of a host"""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker())
+    return breaker
+
+
+def breaker_states() -> Dict[str, str]:
+    """{host: closed|open|half_open}"""
+    return {host: breaker.state for host, breaker in list(_breakers.items())}
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _count(api: Optional[str], outcome: str):
+    if api:
+        API_REQUESTS.labels(api=api, outcome=outcome).inc()
+
+
+class HttpClient:
+    """Sync façade: one keep-alive requests.Session per host"""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        host = _host(url)
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method: str, url: str, params: Optional[dict] = None, json: Optional[dict] = None,
+                timeout: float = 10, retry: RetryPolicy = NO_RETRY, api: Optional[str] = None,
+                raise_for_status: bool = False, use_breaker: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request with retries and the host's circuit breaker.
+
+        Retried statuses are returned (or raised with raise_for_status) after
+        the last attempt; connection errors raise unless retry.retry_errors.
+        use_breaker=False bypasses the breaker (callers with their own retry loop).
+        """
+        breaker = breaker_for(_host(url)) if use_breaker else _NO_BREAKER
+        session = self.session(url)
+        for attempt in range(retry.attempts):
+            last = attempt == retry.attempts - 1
+            if not breaker.allow():
+                _count(api, 'circuit_open')
+                raise CircuitOpenError(f"Circuit open for {_host(url)}")
+            try:
+                response = session.request(method, url, params=params, json=json, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException:
+                breaker.record_failure()
+                if retry.retry_errors and not last:
+                    time.sleep(retry.delay(attempt))
+                    continue
+                _count(api, 'error')
+                raise
+            except BaseException:
+                breaker.release_trial()
+                raise
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code in retry.statuses and not last:
+                _count(api, 'rate_limited' if response.status_code == 429 else 'retried')
+                time.sleep(retry.delay(attempt, response.headers.get('Retry-After')))
+                continue
+
+            _count(api, 'ok' if response.ok else 'error')
+            if raise_for_status:
+                response.raise_for_status()
+            return response
+
+    def get(self, url: str, params: Optional[dict] = None, **kwargs) -> requests.Response:
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url: str, json: Optional[dict] = None, **kwargs) -> requests.Response:
+        return self.request('POST', url, json=json, **kwargs)
+
+    def get_json(self, url: str, params: Optional[dict] = None, **kwargs):
+        """GET and decode JSON; non-2xx responses raise HTTPError"""
+        return self.get(url, params=params, raise_for_status=True, **kwargs).json()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client = HttpClient()
+
+
+def get_client() -> HttpClient:
+    """Process-wide sync client used by the module-level helpers"""
+    return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return _client.request(method, url, **kwargs)
+
+
+def get(url: str, params: Optional[dict] = None, **kwargs) -> requests.Response:
+    return _client.get(url, params=params, **kwargs)
+
+
+def post(url: str, json: Optional[dict] = None, **kwargs) -> requests.Response:
+    return _client.post(url, json=json, **kwargs)
+
+
+def get_json(url: str, params: Optional[dict] = None, **kwargs):
+    return _client.get_json(url, params=params, **kwargs)
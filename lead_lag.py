@@ -0,0 +1,243 @@
+"""
+Vectorized BTC lead-lag cross-correlation
+
+Computes the whole lag curve corr(btc[t], alt[t + lag]) for every lag in
+[-max_lag, max_lag] and every altcoin in one call. The six pair moments
+behind a Pearson correlation (n, Σx, Σy, Σx², Σy², Σxy) are each a masked
+cross-correlation, evaluated with real FFTs: BTC is transformed once and
+shared by all coins, so a full curve costs O(K · T log T) instead of one
+Python loop per (coin, lag). Missing samples (NaN) are excluded pairwise,
+which gives exactly the same values as np.corrcoef on the overlapping,
+non-missing slice for each lag.
+
+Lag convention (same as the analysis scripts):
+    lag > 0  -> alt follows BTC by `lag` steps
+    lag < 0  -> alt leads BTC by `|lag|` steps
+
+rolling_lag_correlations() gives the same curve over a trailing window
+ending at each step (causal), for use as a live feature feed.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIN_PERIODS = 10
+
+# Relative variance floor below which a side is treated as constant
+_VAR_EPS = 1e-9
+
+
+def lag_range(max_lag: int) -> np.ndarray:
+    """Lags tested by the engine: -max_lag .. +max_lag"""
+    return np.arange(-max_lag, max_lag + 1)
+
+
+def _as_columns(alts) -> Tuple[np.ndarray, bool]:
+    arr = np.asarray(alts, dtype=float)
+    if arr.ndim == 1:
+        return arr[:, None], True
+    if arr.ndim != 2:
+        raise ValueError(f"alts must be 1-D or 2-D (time x coins), got shape {arr.shape}")
+    return arr, False
+
+
+def _masked(values: np.ndarray):
+    """(mask, demeaned values, squares) with missing samples zeroed"""
+    mask = np.isfinite(values)
+    centered = np.where(mask, values, 0.0)
+    count = mask.sum(axis=0)
+    mean = np.divide(centered.sum(axis=0), count, out=np.zeros(count.shape), where=count > 0)
+    centered = np.where(mask, centered - mean, 0.0)
+    return mask.astype(float), centered, centered * centered
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy, min_periods):
+    """Correlation from pair moments; NaN where too few pairs or a side is constant"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        cov = sxy - sx * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    tiny = np.finfo(float).tiny
+    valid = (
+        (n >= max(min_periods, 2))
+        & (var_x > _VAR_EPS * np.maximum(sxx, tiny))
+        & (var_y > _VAR_EPS * np.maximum(syy, tiny))
+    )
+    return np.where(valid, np.clip(corr, -1.0, 1.0), np.nan)
+
+
+def lag_correlations(btc, alts, max_lag: int, min_periods: int = DEFAULT_MIN_PERIODS):
+    """
+    Full lead-lag curve of each altcoin against BTC.
+
+    Args:
+        btc: (T,) BTC returns on a regular time grid, NaN where missing
+        alts: (T,) or (T, K) altcoin returns on the same grid
+        max_lag: largest lag to test, in grid steps
+        min_periods: minimum overlapping pairs for a lag to get a value
+
+    Returns:
+        (lags, corr) - lags is (L,) from lag_range(max_lag); corr is (L,) for a
+        1-D `alts` or (L, K), NaN where a lag has too few pairs
+    """
+    x = np.asarray(btc, dtype=float)
+    y, squeeze = _as_columns(alts)
+    if x.ndim != 1 or len(x) != len(y):
+        raise ValueError(f"btc must be 1-D with the same length as alts ({x.shape} vs {y.shape})")
+
+    lags = lag_range(max_lag)
+    T = len(x)
+    if T == 0:
+        corr = np.full((len(lags), y.shape[1]), np.nan)
+        return lags, corr[:, 0] if squeeze else corr
+
+    # Zero padding to >= 2T-1 makes the circular correlation linear
+    nfft = 1 << int(2 * T - 1).bit_length()
+    rfft = np.fft.rfft
+
+    mx, cx, cxx = _masked(x)
+    my, cy, cyy = _masked(y)
+    fmx, fcx, fcxx = (np.conj(rfft(a, nfft))[:, None] for a in (mx, cx, cxx))
+    fmy, fcy, fcyy = (rfft(b, nfft, axis=0) for b in (my, cy, cyy))
+
+    # C_ab[lag] = sum_t a[t] * b[t + lag], negative lags wrap to the end
+    idx = lags % nfft
+
+    def xcorr(fa, fb):
+        return np.fft.irfft(fa * fb, nfft, axis=0)[idx]
+
+    n = np.rint(xcorr(fmx, fmy))
+    corr = _pearson(
+        n,
+        xcorr(fcx, fmy),
+        xcorr(fmx, fcy),
+        xcorr(fcxx, fmy),
+        xcorr(fmx, fcyy),
+        xcorr(fcx, fcy),
+        min_periods
+    )
+    return lags, corr[:, 0] if squeeze else corr
+
+
+def rolling_lag_correlations(btc, alts, max_lag: int, window: int,
+                             min_periods: int = DEFAULT_MIN_PERIODS):
+    """
+    Lead-lag curve over a trailing window ending at every step.
+
+    corr[t] equals lag_correlations(btc[t-window+1:t+1], alts[t-window+1:t+1])
+    so the value at t only uses data up to t. Steps before the first full
+    window are NaN.
+
+    Returns:
+        (lags, corr) - corr is (T, L) for a 1-D `alts` or (T, L, K)
+    """
+    x = np.asarray(btc, dtype=float)
+    y, squeeze = _as_columns(alts)
+    if x.ndim != 1 or len(x) != len(y):
+        raise ValueError(f"btc must be 1-D with the same length as alts ({x.shape} vs {y.shape})")
+    if window <= max_lag:
+        raise ValueError(f"window ({window}) must be larger than max_lag ({max_lag})")
+
+    lags = lag_range(max_lag)
+    T, K = y.shape
+    corr = np.full((T, len(lags), K), np.nan)
+
+    mx, cx, _ = _masked(x)
+    my, cy, _ = _masked(y)
+    mx, cx = mx[:, None], cx[:, None]
+
+    def window_sum(values, span):
+        """Sum over the last `span` pair rows ending at each step"""
+        csum = np.concatenate([np.zeros((1, K)), np.cumsum(values, axis=0)])
+        return csum[span:] - csum[:-span]
+
+    for j, lag in enumerate(lags):
+        # Pair (btc[s], alt[s + lag]) is indexed by its later sample, so a
+        # window ending at t holds the last window - |lag| pairs
+        k = abs(lag)
+        if lag >= 0:
+            pmx, pcx, pmy, pcy = mx[:T - k], cx[:T - k], my[k:], cy[k:]
+        else:
+            pmx, pcx, pmy, pcy = mx[k:], cx[k:], my[:T - k], cy[:T - k]
+
+        m = pmx * pmy
+        px, py = pcx * m, pcy * m
+        span = window - k
+        if len(m) < span:
+            continue
+        corr[window - 1:, j] = _pearson(
+            np.rint(window_sum(m, span)),
+            window_sum(px, span),
+            window_sum(py, span),
+            window_sum(px * pcx, span),
+            window_sum(py * pcy, span),
+            window_sum(px * pcy, span),
+            min_periods
+        )
+
+    return lags, corr[..., 0] if squeeze else corr
+
+
+def best_lags(lags, corr) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lag with the largest |correlation| along the first axis of `corr`.
+
+    Returns:
+        (best_lag, best_corr) - best_corr is NaN (and best_lag 0) where the
+        whole curve is missing
+    """
+    lags = np.asarray(lags)
+    corr = np.asarray(corr, dtype=float)
+    strength = np.where(np.isfinite(corr), np.abs(corr), -1.0)
+    pos = np.argmax(strength, axis=0)
+    best_corr = np.take_along_axis(corr, np.expand_dims(pos, 0), axis=0)[0]
+    best_lag = np.where(np.isfinite(best_corr), lags[pos], 0)
+    return best_lag, best_corr
+
+
+def grid_returns(df: pd.DataFrame, step: str = '1min', time_col: str = 'timestamp',
+                 symbol_col: str = 'symbol', price_col: str = 'price') -> pd.DataFrame:
+    """
+    Long (time, symbol, price) rows -> % returns per symbol on a regular grid.
+
+    The last price in each `step` bucket is used; buckets without a price stay
+    NaN so the engine skips them instead of interpolating.
+    """
+    frame = df[[time_col, symbol_col, price_col]].copy()
+    frame[time_col] = pd.to_datetime(frame[time_col], errors='coerce')
+    frame[price_col] = pd.to_numeric(frame[price_col], errors='coerce')
+    frame = frame.dropna().sort_values(time_col, kind='mergesort')
+    if frame.empty:
+        return pd.DataFrame()
+
+    frame['_bucket'] = frame[time_col].dt.floor(step)
+    prices = frame.pivot_table(index='_bucket', columns=symbol_col, values=price_col, aggfunc='last')
+    grid = pd.date_range(prices.index.min(), prices.index.max(), freq=step)
+    prices = prices.reindex(grid)
+    prices.index.name = time_col
+    return prices.pct_change(fill_method=None) * 100
+
+
+def lag_curve_frame(returns: pd.DataFrame, base: str = 'BTCUSDT', max_lag: int = 15,
+                    min_periods: int = DEFAULT_MIN_PERIODS,
+                    window: Optional[int] = None) -> pd.DataFrame:
+    """
+    Lag curve of every column of `returns` against `base`.
+
+    Args:
+        returns: grid returns (e.g. from grid_returns), one column per symbol
+        window: if set, only the trailing `window` rows are used
+
+    Returns:
+        DataFrame indexed by lag (grid steps), one column per non-base symbol
+    """
+    if base not in returns.columns:
+        raise KeyError(f"{base} not in returns columns")
+    if window is not None:
+        returns = returns.iloc[-window:]
+    alts = returns.drop(columns=[base])
+    lags, corr = lag_correlations(returns[base].to_numpy(), alts.to_numpy(), max_lag, min_periods)
+    return pd.DataFrame(corr, index=pd.Index(lags, name='lag'), columns=alts.columns)
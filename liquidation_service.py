@@ -3,15 +3,26 @@
 Binance Futures Liquidation Service
 Tracks real-time liquidations via WebSocket forceOrder stream
 Stores aggregated liquidation data for the signal bot
+
+Per-symbol liquidations are kept in 1-second buckets over the last hour, so the
+published snapshot carries accurate last-N-minute totals next to the all-time
+counters. Publishing is decoupled from the stream: on_message only updates
+memory, and a publisher thread atomically rewrites the snapshot at most once
+per PUBLISH_INTERVAL_SEC (and every HEARTBEAT_SEC while quiet so windows decay).
 """
 
 from websocket._app import WebSocketApp
 from websocket._abnf import ABNF
+import os
 import json
 import time
+import threading
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import pytz
+import snapshot_bus
+import metrics_registry
 
 # Timezone configuration - GMT+3
 TZ = pytz.timezone('Etc/GMT-3')
@@ -22,26 +33,153 @@ OUTPUT_FILE = 'liquidation_data.json'
 # RESET_INTERVAL removed - now storing full history without reset
 WEBSOCKET_URL = 'wss://fstream.binance.com/ws/!forceOrder@arr'
 
+# Rolling windows
+BUCKET_SEC = 1
+WINDOW_SEC = 3600
+WINDOW_MINUTES = (1, 5, 15, 30, 60)  # Published last-N-minute aggregates
+
+# Publishing
+PUBLISH_INTERVAL_SEC = 1.0  # Max snapshot write rate during cascades
+HEARTBEAT_SEC = 15.0  # Republish while quiet so windows decay and last_update stays fresh
+
+def _empty_summary():
+    return {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0}
+
+
+class LiquidationWindow:
+    """
+    Per-symbol time buckets over the last WINDOW_SEC seconds.
+    
+    Only non-empty buckets are stored (liquidations are bursty and sparse), so
+    both memory and a last-N-minutes query scale with active seconds, not with
+    the window length.
+    """
+    
+    def __init__(self, bucket_sec=BUCKET_SEC, window_sec=WINDOW_SEC):
+        self.bucket_sec = bucket_sec
+        self.window_sec = window_sec
+        # symbol -> deque of [bucket_start, long_count, short_count, long_usd, short_usd]
+        self.buckets = {}
+    
+    def add(self, symbol, side, usd, ts=None):
+        """Add one liquidation (side: 'long' or 'short' position liquidated)"""
+        ts = time.time() if ts is None else ts
+        start = int(ts // self.bucket_sec) * self.bucket_sec
+        q = self.buckets.setdefault(symbol, deque())
+        if q and start < q[-1][0]:
+            start = q[-1][0]  # Clock stepped back: keep buckets ordered
+        if not q or q[-1][0] != start:
+            q.append([start, 0, 0, 0.0, 0.0])
+        bucket = q[-1]
+        if side == 'long':
+            bucket[1] += 1
+            bucket[3] += usd
+        else:
+            bucket[2] += 1
+            bucket[4] += usd
+        self._expire(q, ts)
+    
+    def _expire(self, q, now):
+        cutoff = now - self.window_sec
+        while q and q[0][0] + self.bucket_sec <= cutoff:
+            q.popleft()
+    
+    def totals(self, symbol, minutes, now=None):
+        """Liquidation summary for symbol over the last `minutes` minutes"""
+        return self.windows(symbol, (minutes,), now)[minutes]
+    
+    def windows(self, symbol, minutes_list=WINDOW_MINUTES, now=None):
+        """Summaries for several lookbacks in one backward pass over the buckets"""
+        now = time.time() if now is None else now
+        q = self.buckets.get(symbol, ())
+        if q:
+            self._expire(q, now)
+        
+        result = {}
+        pending = sorted(minutes_list)
+        long_count = short_count = 0
+        long_usd = short_usd = 0.0
+        for start, lc, sc, lu, su in reversed(q):
+            while pending and start + self.bucket_sec <= now - pending[0] * 60:
+                result[pending.pop(0)] = {'long_count': long_count, 'short_count': short_count,
+                                          'long_usd': long_usd, 'short_usd': short_usd}
+            if not pending:
+                break
+            long_count += lc
+            short_count += sc
+            long_usd += lu
+            short_usd += su
+        for m in pending:
+            result[m] = {'long_count': long_count, 'short_count': short_count,
+                         'long_usd': long_usd, 'short_usd': short_usd}
+        return result
+
+
 # Global state
-liquidation_data = {symbol: {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0} for symbol in SYMBOLS}
+liquidation_data = {symbol: _empty_summary() for symbol in SYMBOLS}
+liquidation_window = LiquidationWindow()
 message_count = 0
+state_lock = threading.Lock()
+publish_lock = threading.Lock()
+dirty = threading.Event()
+pending_since = None  # First liquidation not yet in the published snapshot (publish lag)
+
+# Metrics children bound once (on_message runs for every forceOrder event)
+_ws_messages = metrics_registry.WS_MESSAGES.labels(stream='forceOrder')
+_ws_errors = metrics_registry.WS_ERRORS.labels(stream='forceOrder')
+_ws_connected = metrics_registry.WS_CONNECTED.labels(stream='forceOrder')
+
+def build_snapshot(now=None):
+    """Snapshot of all-time counters plus last-N-minute windows per symbol"""
+    now = time.time() if now is None else now
+    with state_lock:
+        windows = {}
+        for symbol in SYMBOLS:
+            per_symbol = liquidation_window.windows(symbol, WINDOW_MINUTES, now)
+            windows[symbol] = {str(m): per_symbol[m] for m in WINDOW_MINUTES}
+        return {
+            'last_update': now,
+            'timestamp': datetime.now(TZ).isoformat(),
+            'liquidations': {symbol: dict(totals) for symbol, totals in liquidation_data.items()},
+            'window_minutes': list(WINDOW_MINUTES),
+            'windows': windows
+        }
 
 def save_data():
-    """Save liquidation data to JSON file"""
-    data = {
-        'last_update': time.time(),
-        'timestamp': datetime.now(TZ).isoformat(),
-        'liquidations': liquidation_data
-    }
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Atomically write the liquidation snapshot (temp file + rename)"""
+    global pending_since
+    since, pending_since = pending_since, None
+    data = build_snapshot()
+    tmp_file = f"{OUTPUT_FILE}.tmp"
+    with publish_lock:
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_file, OUTPUT_FILE)
+        snapshot_bus.publish_liquidations(data)
+    metrics_registry.observe_publish('liquidations', since, data['last_update'])
+
+def publish_loop(stop_event=None):
+    """Throttled publisher: coalesces bursts into one write per PUBLISH_INTERVAL_SEC"""
+    last_publish = 0.0
+    while stop_event is None or not stop_event.is_set():
+        triggered = dirty.wait(timeout=HEARTBEAT_SEC)
+        wait = PUBLISH_INTERVAL_SEC - (time.time() - last_publish)
+        if triggered and wait > 0:
+            time.sleep(wait)
+        dirty.clear()
+        try:
+            save_data()
+        except Exception as e:
+            print(f"[ERR] Failed to publish liquidation snapshot: {e}")
+        last_publish = time.time()
 
 # Reset function removed - liquidation data now accumulates indefinitely for full history
 
 def on_message(ws, message):
     """Process incoming liquidation messages"""
-    global message_count
+    global message_count, pending_since
     
+    _ws_messages.inc()
     try:
         data = json.loads(message)
         
@@ -61,37 +199,65 @@ def on_message(ws, message):
         avg_price = float(order['ap'])
         total_usd = quantity * avg_price
         
-        # Update counters
-        if side == 'SELL':
-            # Long position liquidated (price went down)
-            liquidation_data[symbol]['long_count'] += 1
-            liquidation_data[symbol]['long_usd'] += total_usd
-        elif side == 'BUY':
-            # Short position liquidated (price went up)
-            liquidation_data[symbol]['short_count'] += 1
-            liquidation_data[symbol]['short_usd'] += total_usd
+        # Update counters (all-time + rolling buckets)
+        with state_lock:
+            if side == 'SELL':
+                # Long position liquidated (price went down)
+                liquidation_data[symbol]['long_count'] += 1
+                liquidation_data[symbol]['long_usd'] += total_usd
+                liquidation_window.add(symbol, 'long', total_usd)
+            elif side == 'BUY':
+                # Short position liquidated (price went up)
+                liquidation_data[symbol]['short_count'] += 1
+                liquidation_data[symbol]['short_usd'] += total_usd
+                liquidation_window.add(symbol, 'short', total_usd)
         
         message_count += 1
         
-        # Save data after every liquidation for real-time updates
-        save_data()
+        # Publisher thread writes the snapshot (throttled, off the stream thread)
+        if pending_since is None:
+            pending_since = time.time()
+        dirty.set()
         
         # Print summary
         liq_type = "Long" if side == 'SELL' else "Short"
         print(f"[{symbol}] {liq_type} liquidation: ${total_usd:,.2f} at ${avg_price:,.2f}")
             
     except Exception as e:
+        _ws_errors.inc()
         print(f"[ERR] Error processing message: {e}")
 
 def on_error(ws, error):
     """Handle WebSocket errors"""
+    _ws_errors.inc()
     print(f"[ERR] WebSocket error: {error}")
 
 def on_close(ws, close_status_code, close_msg):
     """Handle WebSocket close"""
     print(f"[LIQ] WebSocket connection closed")
+    _ws_connected.set(0)
     save_data()
 
+def load_saved_data():
+    """Restore all-time counters from the last snapshot (once, before publishing starts)"""
+    if not Path(OUTPUT_FILE).exists():
+        return
+    try:
+        with open(OUTPUT_FILE, 'r') as f:
+            saved = json.load(f)
+        with state_lock:
+            for symbol, totals in saved.get('liquidations', {}).items():
+                if symbol in liquidation_data:
+                    liquidation_data[symbol].update(totals)
+        print(f"[LIQ] Loaded existing liquidation data from {OUTPUT_FILE}")
+        
+        # Show current counts
+        for symbol in SYMBOLS:
+            liq = liquidation_data[symbol]
+            print(f"  {symbol}: Long {liq['long_count']} (${liq['long_usd']:,.0f}) | Short {liq['short_count']} (${liq['short_usd']:,.0f})")
+    except Exception as e:
+        print(f"[WARN] Could not load existing data: {e}")
+
 def on_open(ws):
     """Handle WebSocket open"""
     print("=" * 70)
@@ -103,27 +269,12 @@ def on_open(ws):
     print(f"Authentication: None required (public market data)")
     print("=" * 70)
     
-    # Load existing data if available
-    if Path(OUTPUT_FILE).exists():
-        try:
-            with open(OUTPUT_FILE, 'r') as f:
-                saved = json.load(f)
-                global liquidation_data
-                liquidation_data = saved.get('liquidations', liquidation_data)
-                print(f"[LIQ] Loaded existing liquidation data from {OUTPUT_FILE}")
-                print(f"[LIQ] Tracking {len(SYMBOLS)} symbols: {', '.join(SYMBOLS)}")
-                
-                # Show current counts
-                for symbol in SYMBOLS:
-                    liq = liquidation_data[symbol]
-                    print(f"  {symbol}: Long {liq['long_count']} (${liq['long_usd']:,.0f}) | Short {liq['short_count']} (${liq['short_usd']:,.0f})")
-        except Exception as e:
-            print(f"[WARN] Could not load existing data: {e}")
-    
-    print(f"[LIQ] Storing full history (no automatic reset)")
-    print(f"[LIQ] Data saved to: {OUTPUT_FILE}")
+    print(f"[LIQ] Tracking {len(SYMBOLS)} symbols: {', '.join(SYMBOLS)}")
+    print(f"[LIQ] Storing full history (no automatic reset) + {WINDOW_SEC // 60}min rolling windows {list(WINDOW_MINUTES)}")
+    print(f"[LIQ] Data saved to: {OUTPUT_FILE} (max every {PUBLISH_INTERVAL_SEC}s)")
     print("-" * 70)
     print("[LIQ] ✅ Connected to Binance liquidation stream")
+    _ws_connected.set(1)
     print("[LIQ] Monitoring for liquidations...")
     print("-" * 70)
 
@@ -135,6 +286,10 @@ def main():
     """Main function to start the liquidation service"""
     print("\n[LIQ] Starting Binance Futures Liquidation Service...")
     
+    load_saved_data()
+    metrics_registry.start_metrics_server('liquidation_service')
+    threading.Thread(target=publish_loop, name='liq-publisher', daemon=True).start()
+    
     # Create WebSocket connection
     ws = WebSocketApp(
         WEBSOCKET_URL,
@@ -0,0 +1,82 @@
+"""
+As-of join for matching log rows by time
+
+effectiveness_log.csv and analysis_log.csv / signals_log.csv are written by
+different processes, so the same signal carries slightly different timestamps
+in each file. asof_join attaches to every left row the closest right row with
+the same keys (symbol, verdict) within a tolerance, using a sorted
+pandas.merge_asof: O((N + M) log M) instead of scanning the right frame once
+per left row.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOLERANCE = pd.Timedelta(minutes=2)
+
+_ORDER_COL = '_asof_order'
+_INDEX_COL = '_asof_index'
+_MATCH_COL = '_asof_match_ts'
+
+
+def asof_join(left, right, left_on='timestamp_sent', right_on='timestamp', by=('symbol', 'verdict'),
+              tolerance=DEFAULT_TOLERANCE, direction='nearest', how='inner', inclusive=True,
+              suffixes=('', '_right')):
+    """
+    Match each left row to the nearest right row with equal `by` keys.
+
+    Args:
+        left: DataFrame driving the join (e.g. effectiveness rows)
+        right: DataFrame to look up (e.g. analysis rows)
+        left_on / right_on: timestamp columns (parsed with pd.to_datetime)
+        by: columns that must match exactly
+        tolerance: max |left_ts - right_ts| (pd.Timedelta or datetime.timedelta)
+        direction: 'nearest', 'backward' or 'forward' (see pandas.merge_asof)
+        how: 'inner' drops unmatched left rows, 'left' keeps them with NaN
+        inclusive: False requires |diff| < tolerance instead of <=
+        suffixes: applied to overlapping non-key column names (left, right)
+
+    Returns:
+        DataFrame in the left frame's row order and index, with right columns appended
+    """
+    by = list(by)
+    tolerance = pd.Timedelta(tolerance)
+
+    left = left.copy()
+    left[left_on] = pd.to_datetime(left[left_on], errors='coerce')
+    left[_ORDER_COL] = np.arange(len(left))
+    left[_INDEX_COL] = left.index
+
+    right = right.copy()
+    right[right_on] = pd.to_datetime(right[right_on], errors='coerce')
+    right = right.dropna(subset=[right_on] + by)
+    right[_MATCH_COL] = right[right_on]
+    right = right.sort_values(right_on, kind='mergesort')
+
+    # merge_asof needs non-null, sorted keys on both sides
+    valid = left[left_on].notna() & left[by].notna().all(axis=1)
+    sorted_left = left[valid].sort_values(left_on, kind='mergesort')
+
+    if left_on == right_on:
+        on_kwargs = {'on': left_on}
+    else:
+        on_kwargs = {'left_on': left_on, 'right_on': right_on}
+    merged = pd.merge_asof(sorted_left, right, by=by, tolerance=tolerance, direction=direction,
+                           suffixes=suffixes, **on_kwargs)
+
+    matched = merged[_MATCH_COL].notna()
+    if not inclusive:
+        matched &= (merged[left_on] - merged[_MATCH_COL]).abs() < tolerance
+        right_cols = [c for c in merged.columns if c not in left.columns]
+        merged[right_cols] = merged[right_cols].where(matched, np.nan)
+
+    if how == 'inner':
+        merged = merged[matched]
+    elif how == 'left':
+        merged = pd.concat([merged, left[~valid]], ignore_index=True, sort=False)
+    else:
+        raise ValueError(f"Unsupported how={how!r} (expected 'inner' or 'left')")
+
+    merged = merged.sort_values(_ORDER_COL, kind='mergesort').set_index(_INDEX_COL)
+    merged.index.name = left.index.name
+    return merged.drop(columns=[_ORDER_COL, _MATCH_COL])
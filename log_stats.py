@@ -0,0 +1,373 @@
+"""
+Incremental statistics over the append-only CSV logs
+
+effectiveness_log.csv and analysis_log.csv only ever grow, so instead of
+re-reading them for every /ask_ai question, daily report or controller
+check, each process keeps one stats object per log that follows the file
+tail: refresh() parses only the rows appended since the previous call and
+folds them into per-day / per-symbol counters and fixed-size recent windows.
+A truncated or replaced file is detected (size shrink / new inode) and the
+counters are rebuilt from scratch.
+"""
+
+import csv
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+EFFECTIVENESS_LOG = 'effectiveness_log.csv'
+ANALYSIS_LOG = 'analysis_log.csv'
+
+RECENT_SIGNALS_WINDOW = 100
+RECENT_ANALYSIS_WINDOW = 150
+RECENT_OUTCOMES_WINDOW = 5000  # Closed signals kept for outcome_for() (covers the analysis window)
+
+INDICATOR_FIELDS = ('rsi', 'oi_change_pct', 'cvd', 'dev_sigma', 'adx14', 'funding_rate')
+
+
+def _safe_float(val, default=0.0):
+    try:
+        return float(val) if val else default
+    except (TypeError, ValueError):
+        return default
+
+
+class CsvTail:
+    """Reads complete CSV rows appended to a file since the last call"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.inode = None
+        self.fieldnames = None
+
+    def read_new_rows(self) -> Tuple[bool, List[dict]]:
+        """
+        Returns:
+            (reset, rows) - reset is True when the file was (re)opened from the
+            start and previously folded rows must be discarded
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            reset = self.inode is not None
+            self.offset, self.inode, self.fieldnames = 0, None, None
+            return reset, []
+
+        reset = False
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.offset, self.inode, self.fieldnames = 0, st.st_ino, None
+            reset = True
+
+        if st.st_size == self.offset:
+            return reset, []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(st.st_size - self.offset)
+
+        # Leave a partially written last line for the next call
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            return reset, []
+        chunk = chunk[:end + 1]
+        self.offset += len(chunk)
+
+        rows = []
+        for values in csv.reader(chunk.decode('utf-8', errors='replace').splitlines()):
+            if not values:
+                continue
+            if self.fieldnames is None:
+                self.fieldnames = values
+                continue
+            rows.append(dict(zip(self.fieldnames, values)))
+        return reset, rows
+
+
+def read_tail_rows(path: str, max_rows: int, block_size: int = 65536) -> List[dict]:
+    """
+    Last max_rows rows of a one-row-per-line CSV as dicts, found by seeking
+    backwards from the end of the file (cost independent of file size).
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return []
+    with f:
+        header = f.readline()
+        data_start = f.tell()
+        end = f.seek(0, os.SEEK_END)
+        pos, chunk = end, b''
+        # One extra newline: the first line of the chunk may be partial
+        while pos > data_start and chunk.count(b'\n') <= max_rows:
+            step = min(block_size, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+
+    lines = chunk.split(b'\n')
+    if pos > data_start:
+        lines = lines[1:]
+    lines = [line for line in lines if line.strip()][-max_rows:] if max_rows > 0 else []
+    if not header.strip() or not lines:
+        return []
+    fieldnames = next(csv.reader([header.decode('utf-8', errors='replace')]))
+    text = b'\n'.join(lines).decode('utf-8', errors='replace')
+    return [dict(zip(fieldnames, values)) for values in csv.reader(text.splitlines()) if values]
+
+
+class RecentKeys:
+    """Bounded set remembering the last maxlen keys added (oldest evicted first)"""
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._order = deque()
+        self._keys = set()
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key) -> bool:
+        """Remember key; False if it was already present"""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self.maxlen:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+class OutcomeCounts:
+    """Win/loss/cancel counters with PnL sums for a group of signals"""
+
+    __slots__ = ('rows', 'wins', 'losses', 'cancelled', 'pnl', 'win_pnl', 'loss_pnl')
+
+    def __init__(self):
+        self.rows = 0
+        self.wins = 0
+        self.losses = 0
+        self.cancelled = 0
+        self.pnl = 0.0
+        self.win_pnl = 0.0
+        self.loss_pnl = 0.0
+
+    def add(self, result: str, profit: float, sign: int = 1):
+        self.rows += sign
+        if result == 'WIN':
+            self.wins += sign
+            self.pnl += sign * profit
+            self.win_pnl += sign * abs(profit)
+        elif result == 'LOSS':
+            self.losses += sign
+            self.pnl += sign * profit
+            self.loss_pnl += sign * abs(profit)
+        elif result == 'CANCELLED':
+            self.cancelled += sign
+
+    def merge(self, other: 'OutcomeCounts'):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    @property
+    def decided(self) -> int:
+        return self.wins + self.losses
+
+    def win_rate(self) -> Optional[float]:
+        """WIN / (WIN + LOSS) in percent, None when nothing was decided"""
+        return self.wins / self.decided * 100 if self.decided > 0 else None
+
+
+def group_counts(counts: Dict[Tuple[str, str], OutcomeCounts], index: int) -> Dict[str, OutcomeCounts]:
+    """Collapse (symbol, verdict) counters by symbol (index=0) or verdict (index=1)"""
+    grouped = defaultdict(OutcomeCounts)
+    for key, c in counts.items():
+        grouped[key[index]].merge(c)
+    return dict(grouped)
+
+
+def total_counts(counts: Dict[Tuple[str, str], OutcomeCounts]) -> OutcomeCounts:
+    total = OutcomeCounts()
+    for c in counts.values():
+        total.merge(c)
+    return total
+
+
+class _LogStats(ABC):
+    """Tail-following base: subclasses implement _reset() and _add(row)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tail = CsvTail(path)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def refresh(self):
+        """Fold rows appended since the last refresh; returns self for chaining"""
+        with self._lock:
+            reset, rows = self._tail.read_new_rows()
+            if reset:
+                self._reset()
+            for row in rows:
+                self._add(row)
+        return self
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @abstractmethod
+    def _reset(self):
+        """Drop all folded state (called at init and when the file is replaced)"""
+
+    @abstractmethod
+    def _add(self, row: dict):
+        """Fold one appended row into the counters"""
+
+
+class EffectivenessStats(_LogStats):
+    """Counters over effectiveness_log.csv (one row per closed signal)"""
+
+    def _reset(self):
+        self.total = OutcomeCounts()
+        self.by_key: Dict[Tuple[str, str], OutcomeCounts] = defaultdict(OutcomeCounts)
+        self.by_day: Dict[str, Dict[Tuple[str, str], OutcomeCounts]] = defaultdict(lambda: defaultdict(OutcomeCounts))
+        self.recent = deque()
+        self.recent_total = OutcomeCounts()
+        self.recent_by_symbol: Dict[str, OutcomeCounts] = defaultdict(OutcomeCounts)
+        self.outcome_by_ts: "OrderedDict[str, str]" = OrderedDict()  # Last RECENT_OUTCOMES_WINDOW signals
+
+    def _add(self, row: dict):
+        ts = row.get('timestamp_sent') or ''
+        symbol = row.get('symbol', '')
+        verdict = row.get('verdict', '')
+        result = row.get('result', '')
+        profit = _safe_float(row.get('profit_pct'))
+
+        self.total.add(result, profit)
+        self.by_key[(symbol, verdict)].add(result, profit)
+        self.by_day[ts[:10]][(symbol, verdict)].add(result, profit)
+        if ts:
+            self.outcome_by_ts[ts] = result
+            self.outcome_by_ts.move_to_end(ts)
+            if len(self.outcome_by_ts) > RECENT_OUTCOMES_WINDOW:
+                self.outcome_by_ts.popitem(last=False)
+
+        # Rolling window: add the new row, subtract the one falling out
+        self.recent.append((symbol, result, profit))
+        self.recent_total.add(result, profit)
+        self.recent_by_symbol[symbol].add(result, profit)
+        if len(self.recent) > RECENT_SIGNALS_WINDOW:
+            old_symbol, old_result, old_profit = self.recent.popleft()
+            self.recent_total.add(old_result, old_profit, sign=-1)
+            self.recent_by_symbol[old_symbol].add(old_result, old_profit, sign=-1)
+            if self.recent_by_symbol[old_symbol].rows == 0:
+                del self.recent_by_symbol[old_symbol]
+
+    def counts(self, since: Optional[str] = None, day: Optional[str] = None) -> Dict[Tuple[str, str], OutcomeCounts]:
+        """
+        Per (symbol, verdict) counters
+
+        Args:
+            since: 'YYYY-MM-DD' - only signals sent on or after this date
+            day: 'YYYY-MM-DD' - only signals sent on this date
+        """
+        with self._lock:
+            if day is not None:
+                days = [self.by_day[day]] if day in self.by_day else []
+            elif since is not None:
+                days = [d for date, d in self.by_day.items() if date >= since]
+            else:
+                days = [self.by_key]
+
+            merged = defaultdict(OutcomeCounts)
+            for d in days:
+                for key, c in d.items():
+                    merged[key].merge(c)
+            return dict(merged)
+
+    def outcome_for(self, timestamp_sent: str) -> Optional[str]:
+        """Result of a signal among the last RECENT_OUTCOMES_WINDOW closed ones (None if unknown)"""
+        with self._lock:
+            return self.outcome_by_ts.get(timestamp_sent)
+
+
+class AnalysisStats(_LogStats):
+    """Recent indicator window and per-day filter counters over analysis_log.csv"""
+
+    def _reset(self):
+        self.recent = deque(maxlen=RECENT_ANALYSIS_WINDOW)
+        self.by_day: Dict[str, Dict[str, dict]] = defaultdict(lambda: defaultdict(lambda: {
+            'blocked_count': 0,
+            'total_verdicts': 0,  # BUY + SELL + blocked
+            'ttl_sum': 0.0,
+            'ttl_count': 0
+        }))
+
+    def _add(self, row: dict):
+        ts = row.get('timestamp') or ''
+        self.recent.append({k: row.get(k) for k in ('timestamp', 'regime') + INDICATOR_FIELDS})
+
+        try:
+            verdict = row['verdict']
+            ttl = float(row.get('ttl_minutes') or 0)
+            blocked = int(row.get('dev_sigma_blocked') or 0)
+            day = self.by_day[ts[:10]][row['symbol']]
+        except (ValueError, KeyError):
+            return
+
+        if verdict in ['BUY', 'SELL'] and ttl > 0:
+            day['ttl_sum'] += ttl
+            day['ttl_count'] += 1
+        if blocked == 1:
+            day['blocked_count'] += 1
+        if verdict in ['BUY', 'SELL'] or blocked == 1:
+            day['total_verdicts'] += 1
+
+    def recent_rows(self) -> List[dict]:
+        with self._lock:
+            return list(self.recent)
+
+    def day_counts(self, day: str) -> Dict[str, dict]:
+        """Per-symbol blocked/TTL counters for 'YYYY-MM-DD'"""
+        with self._lock:
+            return {sym: dict(c) for sym, c in self.by_day.get(day, {}).items()}
+
+    def indicator_summary(self) -> Dict[str, dict]:
+        """avg/min/max of each indicator over the recent window"""
+        rows = self.recent_rows()
+        summary = {}
+        for field in INDICATOR_FIELDS:
+            values = [_safe_float(r.get(field)) for r in rows if r.get(field)]
+            summary[field] = {
+                'avg': sum(values) / len(values) if values else 0,
+                'min': min(values) if values else 0,
+                'max': max(values) if values else 0
+            }
+        return summary
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[Tuple[type, str], _LogStats] = {}
+
+
+def _get_stats(cls, path: str):
+    with _stats_lock:
+        key = (cls, path)
+        if key not in _stats:
+            _stats[key] = cls(path)
+        return _stats[key]
+
+
+def get_effectiveness_stats(path: str = EFFECTIVENESS_LOG) -> EffectivenessStats:
+    """Process-wide stats for effectiveness_log.csv, refreshed to the current tail"""
+    return _get_stats(EffectivenessStats, path).refresh()
+
+
+def get_analysis_stats(path: str = ANALYSIS_LOG) -> AnalysisStats:
+    """Process-wide stats for analysis_log.csv, refreshed to the current tail"""
+    return _get_stats(AnalysisStats, path).refresh()
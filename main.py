@@ -1,17 +1,23 @@
 import time, yaml, datetime, os, csv, json, fcntl, sys, atexit, uuid
 from collections import defaultdict, deque
 from dotenv import load_dotenv
-from smart_signal import decide_signal, format_signal_telegram, calculate_price_targets
+from smart_signal import decide_signal, format_signal_telegram, signal_result
 from telegram_utils import send_telegram_message
 from signal_tracker import ActiveSignalsManager, log_cancelled_signal, format_effectiveness_report
 from services.ai_analyst.runner import AIAnalystService
+from state_store import get_sent_signals_store, get_active_signals_table
+from log_stats import RecentKeys, read_tail_rows
+from csv_log_writer import get_csv_writer
+import heartbeat
+from metrics_registry import CYCLE_ERRORS, observe_cycle, start_metrics_server
 load_dotenv()
 
 LOG_FILE='analysis_log.csv'
 SIGNAL_FILE='signals_log.csv'
-TRACKING_FILE='sent_signals.json'
 ACTIVE_SIGNALS_FILE='active_signals.json'
 PID_FILE='signal_bot.pid'
+ANALYSIS_LOG_COLUMNS=['timestamp','symbol','interval','verdict','confidence','score','min_score','max_score','price','vwap','price_vs_vwap_pct','cvd','oi','oi_change','oi_change_pct','volume','volume_median','volume_spike','liq_long_count','liq_short_count','liq_long_usd','liq_short_usd','liq_ratio','funding_rate','rsi','ema_short','ema_long','atr','ttl_minutes','base_interval','regime','vwap_cross_up','vwap_cross_down','ema_cross_up','ema_cross_down','adx','confirm2_passed','vwap_sigma','dev_sigma','dev_sigma_blocked','dev_sigma_boost','ab_set_used','quote_vol_pctl','boost_applied','gate_action','min_score_delta','sell_enabled','basis_pct','basis_age_sec','basis_score_component','adx14','adx14_score_component','psar','psar_score_component','momentum5','momentum5_score_component','vol_accel','vol_accel_score_component','zcvd','zcvd_score_component','doi_pct','doi_pct_score_component','dev_sigma_uif','dev_sigma_uif_score_component','rsi_dist','rsi_dist_score_component']
+SIGNAL_DEDUP_WINDOW=500  # Recent signals_log.csv keys kept for duplicate detection
 
 # Global AI Analyst instance (initialized in main)
 ai_analyst = None
@@ -50,119 +56,46 @@ def init_logs():
     if not os.path.exists(LOG_FILE):
         with open(LOG_FILE,'w',encoding='utf-8',newline='') as f:
             writer=csv.writer(f)
-            writer.writerow(['timestamp','symbol','interval','verdict','confidence','score','min_score','max_score','price','vwap','price_vs_vwap_pct','cvd','oi','oi_change','oi_change_pct','volume','volume_median','volume_spike','liq_long_count','liq_short_count','liq_long_usd','liq_short_usd','liq_ratio','funding_rate','rsi','ema_short','ema_long','atr','ttl_minutes','base_interval','regime','vwap_cross_up','vwap_cross_down','ema_cross_up','ema_cross_down','adx','confirm2_passed','vwap_sigma','dev_sigma','dev_sigma_blocked','dev_sigma_boost','ab_set_used','quote_vol_pctl','boost_applied','gate_action','min_score_delta','sell_enabled','basis_pct','basis_age_sec','basis_score_component','adx14','adx14_score_component','psar','psar_score_component','momentum5','momentum5_score_component','vol_accel','vol_accel_score_component','zcvd','zcvd_score_component','doi_pct','doi_pct_score_component','dev_sigma_uif','dev_sigma_uif_score_component','rsi_dist','rsi_dist_score_component'])
+            writer.writerow(ANALYSIS_LOG_COLUMNS)
     if not os.path.exists(SIGNAL_FILE):
         with open(SIGNAL_FILE,'w',encoding='utf-8',newline='') as f:
             writer=csv.writer(f)
             writer.writerow(['timestamp','symbol','interval','verdict','confidence','score','min_score','max_score','entry_price','vwap','oi','oi_change','volume_spike','liq_long','liq_short','components','ttl_minutes','target_min','target_max','signal_id'])
 
 def load_sent_signals():
-    """Load tracking of previously sent signals (append-only list)"""
-    if not os.path.exists(TRACKING_FILE):
-        return []
-    try:
-        with open(TRACKING_FILE, 'r') as f:
-            data = json.load(f)
-            # Handle both old dict format and new list format
-            if isinstance(data, dict):
-                # Convert old dict format to list
-                return list(data.values())
-            return data
-    except:
-        return []
-
-def save_sent_signals(tracking):
-    """Save tracking of sent signals"""
-    try:
-        with open(TRACKING_FILE, 'w') as f:
-            json.dump(tracking, f, indent=2)
-    except Exception as e:
-        print(f'[WARN] Failed to save tracking: {e}')
+    """Open tracking of previously sent signals (indexed append-only store)"""
+    return get_sent_signals_store()
 
 def load_active_signals():
-    """Load active signals being tracked for effectiveness with file locking"""
-    if not os.path.exists(ACTIVE_SIGNALS_FILE):
-        return []
+    """Load active signals being tracked for effectiveness (state store snapshot read)"""
     try:
-        with open(ACTIVE_SIGNALS_FILE, 'r') as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-            try:
-                data = json.load(f)
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            return data
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f'[WARN] JSON decode error in active signals: {e}')
-        return []
+        return get_active_signals_table(legacy_file=ACTIVE_SIGNALS_FILE).all()
     except Exception as e:
         print(f'[WARN] Error loading active signals: {e}')
         return []
 
 def save_active_signals(signals):
     """
-    Save active signals with atomic write protected by exclusive lock.
-    CRITICAL: Must coordinate with signal_tracker.py to prevent lost updates.
+    Save active signals as one transaction in the state store.
+    Only rows that differ from the stored state are written.
     """
-    import tempfile
-    from pathlib import Path
-    
-    # Create lock file if it doesn't exist
-    lock_file_path = ACTIVE_SIGNALS_FILE + '.lock'
-    Path(lock_file_path).touch(exist_ok=True)
-    
     try:
-        # Acquire exclusive lock to prevent concurrent read-modify-write
-        with open(lock_file_path, 'r') as lock_file:
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
-            try:
-                # Write to temp file first
-                temp_fd, temp_path = tempfile.mkstemp(
-                    dir=os.path.dirname(ACTIVE_SIGNALS_FILE) or '.', 
-                    prefix='.active_signals_tmp_', 
-                    suffix='.json'
-                )
-                try:
-                    with os.fdopen(temp_fd, 'w') as f:
-                        json.dump(signals, f, indent=2)
-                        f.flush()
-                        os.fsync(f.fileno())
-                    
-                    # Atomic rename overwrites destination (POSIX guarantees atomicity)
-                    os.replace(temp_path, ACTIVE_SIGNALS_FILE)
-                except Exception as e:
-                    # Clean up temp file if write/rename fails
-                    if os.path.exists(temp_path):
-                        os.unlink(temp_path)
-                    raise e
-            finally:
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        with ActiveSignalsManager(ACTIVE_SIGNALS_FILE) as active_signals:
+            active_signals[:] = signals
     except Exception as e:
         print(f'[WARN] Failed to save active signals: {e}')
 
 def register_signal_for_tracking(res, cfg, telegram_msg_id=None):
     """Register a signal for real-time effectiveness tracking"""
     try:
-        min_pct, max_pct, duration, move_str, multiplier, strength_icon, strength_label, ttl_minutes, base_interval = calculate_price_targets(
-            res['last_close'],
-            res['confidence'],
-            res['cvd'],
-            res['symbol'],
-            res.get('coin_config'),
-            klines=res.get('klines'),
-            volume_data=res.get('volume'),
-            oi_change=res.get('oi_change', 0),
-            verdict=res['verdict']
-        )
-        
-        if res['verdict'] == 'BUY':
-            target_min = res['last_close'] * (1 + min_pct / 100)
-            target_max = res['last_close'] * (1 + max_pct / 100)
-        else:
-            target_min = res['last_close'] * (1 - max_pct / 100)
-            target_max = res['last_close'] * (1 - min_pct / 100)
+        # Same cached targets as the Telegram message and signal log
+        res = signal_result(res)
+        targets = res.targets
+        multiplier = targets.multiplier
+        target_min, target_max = res.target_prices
         
         # Use dynamic TTL from calculate_price_targets
-        duration_minutes = ttl_minutes
+        duration_minutes = targets.ttl_minutes
         
         signal_data = {
             'timestamp': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
@@ -186,9 +119,8 @@ def register_signal_for_tracking(res, cfg, telegram_msg_id=None):
             'regime': res.get('regime', 'neutral')  # CRITICAL: regime for cancellation logic
         }
         
-        # Use context manager for atomic read-modify-write
-        with ActiveSignalsManager(ACTIVE_SIGNALS_FILE) as active_signals:
-            active_signals.append(signal_data)
+        # Single-row insert into the state store (no read-modify-write of the whole set)
+        get_active_signals_table(legacy_file=ACTIVE_SIGNALS_FILE).insert(signal_data)
         
         print(f'[TRACK] Registered {res["symbol"]} {res["verdict"]} for effectiveness tracking (duration: {duration_minutes}min)')
         
@@ -253,15 +185,33 @@ def append_analysis_log(res: dict):
         dev_sigma_uif_score_component=uif_components.get('dev_sigma_uif', 0.0)
         rsi_dist=res.get('rsi_dist', 0.0)
         rsi_dist_score_component=uif_components.get('rsi_dist', 0.0)
-        with open(LOG_FILE,'a',encoding='utf-8',newline='') as f:
-            writer=csv.writer(f)
-            writer.writerow([ts,res.get('symbol'),res.get('interval'),res.get('verdict'),res.get('confidence'),res.get('score',0),res.get('min_score',0),res.get('max_score',0),price,vwap,price_vs_vwap,res.get('cvd',0),oi,oi_chg,oi_chg_pct,vol.get('last',0),vol.get('median',0),vol.get('spike',False),liq.get('long_count',0),liq.get('short_count',0),liq.get('long_usd',0),liq.get('short_usd',0),liq_ratio,funding_rate,rsi,ema_short,ema_long,atr,ttl_minutes,base_interval,regime,vwap_cross_up,vwap_cross_down,ema_cross_up,ema_cross_down,adx,confirm2_passed,vwap_sigma,dev_sigma,dev_sigma_blocked,dev_sigma_boost,ab_set_used,quote_vol_pctl,boost_applied,gate_action,min_score_delta,sell_enabled,basis_pct,basis_age_sec,basis_score_component,adx14,adx14_score_component,psar,psar_score_component,momentum5,momentum5_score_component,vol_accel,vol_accel_score_component,zcvd,zcvd_score_component,doi_pct,doi_pct_score_component,dev_sigma_uif,dev_sigma_uif_score_component,rsi_dist,rsi_dist_score_component])
+        # Buffered: rows reach the file on the writer's flush thread, not in the signal loop
+        get_csv_writer(LOG_FILE, ANALYSIS_LOG_COLUMNS).write_row([ts,res.get('symbol'),res.get('interval'),res.get('verdict'),res.get('confidence'),res.get('score',0),res.get('min_score',0),res.get('max_score',0),price,vwap,price_vs_vwap,res.get('cvd',0),oi,oi_chg,oi_chg_pct,vol.get('last',0),vol.get('median',0),vol.get('spike',False),liq.get('long_count',0),liq.get('short_count',0),liq.get('long_usd',0),liq.get('short_usd',0),liq_ratio,funding_rate,rsi,ema_short,ema_long,atr,ttl_minutes,base_interval,regime,vwap_cross_up,vwap_cross_down,ema_cross_up,ema_cross_down,adx,confirm2_passed,vwap_sigma,dev_sigma,dev_sigma_blocked,dev_sigma_boost,ab_set_used,quote_vol_pctl,boost_applied,gate_action,min_score_delta,sell_enabled,basis_pct,basis_age_sec,basis_score_component,adx14,adx14_score_component,psar,psar_score_component,momentum5,momentum5_score_component,vol_accel,vol_accel_score_component,zcvd,zcvd_score_component,doi_pct,doi_pct_score_component,dev_sigma_uif,dev_sigma_uif_score_component,rsi_dist,rsi_dist_score_component])
     except Exception as e: print(f'[WARN] analysis log failed: {e}')
 
+_signal_log_keys = None
+
+def _signal_log_key(ts, symbol, interval, verdict):
+    """Dedup key of a signals_log.csv row, as written by csv (None -> '')"""
+    return tuple('' if v is None else str(v) for v in (ts, symbol, interval, verdict))
+
+def recent_signal_log_keys():
+    """Keys of the last SIGNAL_DEDUP_WINDOW signal rows, seeded once from the file tail"""
+    global _signal_log_keys
+    if _signal_log_keys is None:
+        keys = RecentKeys(SIGNAL_DEDUP_WINDOW)
+        try:
+            for row in read_tail_rows(SIGNAL_FILE, SIGNAL_DEDUP_WINDOW):
+                keys.add(_signal_log_key(row.get('timestamp'), row.get('symbol'), row.get('interval'), row.get('verdict')))
+        except Exception as e:
+            print(f'[WARN] Could not seed signal dedup index: {e}')
+        _signal_log_keys = keys
+    return _signal_log_keys
+
 def append_signal_log(res: dict):
     if res.get('verdict')=='NO_TRADE': return
     try:
-        # Generate signal_id if not already present (for timestamp consistency with sent_signals.json)
+        # Generate signal_id if not already present (for consistency with the sent signals store)
         if 'signal_id' not in res:
             res['signal_id'] = uuid.uuid4().hex
         
@@ -269,42 +219,17 @@ def append_signal_log(res: dict):
         comp_str='|'.join([k for k,v in comp.items() if v])
         ttl_minutes=res.get('ttl_minutes',0)
         
-        # DEDUPLICATION: Check last entry to avoid writing duplicate signals
-        # This prevents the same signal from being logged twice in consecutive rows
-        try:
-            if os.path.exists(SIGNAL_FILE):
-                with open(SIGNAL_FILE, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if len(lines) > 1:  # Has header + at least one data row
-                        last_line = lines[-1].strip()
-                        if last_line:
-                            parts = last_line.split(',')
-                            if len(parts) >= 4:
-                                last_ts, last_sym, last_interval, last_verdict = parts[0], parts[1], parts[2], parts[3]
-                                current_key = (ts, res.get('symbol'), res.get('interval'), res.get('verdict'))
-                                last_key = (last_ts, last_sym, last_interval, last_verdict)
-                                
-                                if current_key == last_key:
-                                    print(f'[SIGNAL LOG] Skipping duplicate: {res.get("symbol")} {res.get("verdict")} @ {ts}')
-                                    return
-        except Exception as e:
-            # If dedup check fails, log warning but continue with write
-            print(f'[WARN] Dedup check failed: {e}')
+        # DEDUPLICATION: Skip a signal already logged with the same (timestamp, symbol, interval, verdict)
+        # In-memory index of recent rows, so the check does not grow with the log file
+        signal_keys = recent_signal_log_keys()
+        current_key = _signal_log_key(ts, res.get('symbol'), res.get('interval'), res.get('verdict'))
+        if current_key in signal_keys:
+            print(f'[SIGNAL LOG] Skipping duplicate: {res.get("symbol")} {res.get("verdict")} @ {ts}')
+            return
         
         # Calculate target_min and target_max for trading signals (matches register_signal_for_tracking logic)
         try:
-            min_pct, max_pct, _, _, _, _, _, _, _ = calculate_price_targets(
-                res['last_close'],
-                res['confidence'],
-                res['cvd'],
-                res['symbol'],
-                res.get('coin_config'),
-                klines=res.get('klines'),
-                volume_data=res.get('volume'),
-                oi_change=res.get('oi_change', 0),
-                verdict=res['verdict'],
-                vwap=res.get('vwap_ref')
-            )
+            min_pct, max_pct = signal_result(res).targets[:2]
         except Exception as e:
             # If calculate_price_targets fails, use default values based on confidence
             print(f'[WARN] calculate_price_targets failed for {res.get("symbol")}: {e}')
@@ -327,6 +252,7 @@ def append_signal_log(res: dict):
         with open(SIGNAL_FILE,'a',encoding='utf-8',newline='') as f:
             writer=csv.writer(f)
             writer.writerow([ts,res.get('symbol'),res.get('interval'),res.get('verdict'),res.get('confidence'),res.get('score',0),res.get('min_score',0),res.get('max_score',0),res.get('last_close'),res.get('vwap_ref'),res.get('oi_now'),res.get('oi_change'),res.get('volume',{}).get('spike',False),liq.get('long_count',0),liq.get('short_count',0),comp_str,ttl_minutes,target_min,target_max,res.get('signal_id', '')])
+        signal_keys.add(current_key)
     except Exception as e: print(f'[WARN] signal log failed: {e}')
 
 def check_cancellation(symbol, res, tracking, cfg):
@@ -344,7 +270,7 @@ def check_cancellation(symbol, res, tracking, cfg):
     Args:
         symbol: Trading symbol
         res: Current signal analysis result
-        tracking: Tracking data (deprecated, using active_signals.json instead)
+        tracking: Tracking data (deprecated, using active signals table instead)
         cfg: Configuration
     
     Returns:
@@ -353,12 +279,11 @@ def check_cancellation(symbol, res, tracking, cfg):
     # Find active signal for this symbol with matching verdict
     active_signal = None
     try:
-        with ActiveSignalsManager(ACTIVE_SIGNALS_FILE) as active_signals:
-            for sig in active_signals:
-                # Match by symbol AND verdict (BUY vs SELL)
-                if sig['symbol'] == symbol and sig['verdict'] == res.get('verdict', 'NO_TRADE'):
-                    active_signal = sig
-                    break
+        # Indexed read by symbol AND verdict (BUY vs SELL) - no rewrite needed
+        matches = get_active_signals_table(legacy_file=ACTIVE_SIGNALS_FILE).find(
+            symbol=symbol, verdict=res.get('verdict', 'NO_TRADE'))
+        if matches:
+            active_signal = matches[0]
     except Exception as e:
         print(f'[CANCEL WARN] Failed to load active signals: {e}')
         return False
@@ -463,7 +388,9 @@ def run_once(cfg, tracking, gate_results=None):
     symbols=cfg['symbols']; interval=cfg.get('interval','15m'); lookback=int(cfg.get('lookback_minutes',15)); vwap_window=int(cfg.get('vwap_window',30)); volume_spike_mult=float(cfg.get('volume_spike_mult',1.6)); min_components=int(cfg.get('min_components',2))
     if gate_results is None:
         gate_results = {}
+    cycle_start = time.time()
     for idx, sym in enumerate(symbols):
+        heartbeat.beat()  # Per symbol, so a hung call shows up before the ~2 minute pass would have ended
         try:
             # Pass full config to decide_signal for weighted scoring
             start_time = time.time()
@@ -571,8 +498,8 @@ def run_once(cfg, tracking, gate_results=None):
                     # NOW write to signals_log.csv (AFTER Telegram success)
                     append_signal_log(res)
                     
-                    # Track this signal for potential future cancellation (append-only list)
-                    tracking.append({
+                    # Track this signal for potential future cancellation (append-only store)
+                    tracking.record({
                         'symbol': sym,
                         'message_id': message_id,
                         'timestamp': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
@@ -581,7 +508,6 @@ def run_once(cfg, tracking, gate_results=None):
                         'entry_price': res.get('last_close', 0),
                         'signal_id': res.get('signal_id', '')  # CRITICAL: signal_id for reply-to lookup
                     })
-                    save_sent_signals(tracking)
                     
                     # Register for real-time effectiveness tracking (with message_id for reply-to alerts)
                     register_signal_for_tracking(res, cfg, telegram_msg_id=message_id)
@@ -629,7 +555,10 @@ def run_once(cfg, tracking, gate_results=None):
             # Coinalyze free tier: 40 API calls/minute, each symbol makes ~3 API calls
             if idx < len(symbols) - 1:
                 time.sleep(6.0)
-        except Exception as e: print(f"[ERR] {sym}: {e}")
+        except Exception as e:
+            CYCLE_ERRORS.labels(loop='signal_loop').inc()
+            print(f"[ERR] {sym}: {e}")
+    observe_cycle('signal_loop', time.time() - cycle_start)
 
 def main():
     global ai_analyst
@@ -652,6 +581,10 @@ def main():
         run_once(cfg, tracking)
         return
     
+    # /metrics (metrics.ports.signal_bot) plus per-stage decide_signal latency on /latency
+    import stage_timing
+    start_metrics_server('signal_bot', cfg, json_routes={'/latency': stage_timing.snapshot})
+    
     # Get daily report settings from config (MVP freeze)
     report_config = cfg.get('report', {})
     daily_time_utc = report_config.get('time_utc', '23:59')
@@ -662,7 +595,7 @@ def main():
     print(f'[INFO] Smart Money Futures Signal Bot (MVP) started. Signal Generation: every {interval_min} min | Candle timeframe: {cfg.get("interval")}')
     print(f'[INFO] Monitoring {len(cfg["symbols"])} symbols: {", ".join(cfg["symbols"])}')
     print(f'[INFO] Logs: {LOG_FILE} (all analysis), {SIGNAL_FILE} (signals only)')
-    print(f'[INFO] Tracking: {TRACKING_FILE} (sent signals for cancellation)')
+    print(f'[INFO] Tracking: {get_state_store().db_path} (sent signals for cancellation)')
     print(f'[INFO] Hourly effectiveness reports: DISABLED (handled by Signal Tracker)')
     print(f'[INFO] Daily basic reports: ENABLED (UTC {daily_time_utc})')
     print(f'[INFO] Quality gates: {"ENABLED" if quality_gates_enabled else "DISABLED (MVP freeze)"}')
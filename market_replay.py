@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Record / replay of external market data for offline benchmarks
+
+Recorder captures everything the bot reads from outside into one compact log
+(gzip JSONL when the path ends in .gz), each record stamped with seconds since
+the recording started:
+
+    http   every requests call (Coinalyze, Binance REST, BingX, Telegram):
+           request key -> status + body, or the connection error
+    ws     every websocket-client message, per stream URL
+    file   the feature-service snapshot files (cvd_data.json, data/*_snapshot.json ...)
+           whenever their content changes
+
+Replayer serves the same inputs back through the same interfaces: requests
+calls are answered from the log (per-key FIFO, signed/volatile query params
+ignored), WebSocketApp.run_forever() plays the recorded messages, snapshot
+files are rewritten when their record time is reached, and time.time() /
+time.sleep() follow a virtual clock anchored at the recording (datetime.now()/
+utcnow() and uuid4() are pinned to it too, so timestamps and ids in the
+target's logs repeat across replays).
+
+    speed=0   as fast as possible: the clock only moves when the code under
+              test waits (sleep, a response recorded later), so a replay is
+              deterministic and its outputs (the CSV logs and state-store
+              tables it leaves in the workdir) can be compared bit for bit
+    speed=N   real time divided by N (1 = live pace)
+
+Once a sleep or a stream runs past the end of the log, ReplayFinished (a
+BaseException, so service loops' broad excepts do not swallow it) ends the run.
+
+    python market_replay.py record session.jsonl.gz --target decide --cycles 5
+    python market_replay.py replay session.jsonl.gz --target decide --repeat 5 --workdir /tmp/replay
+    python market_replay.py replay session.jsonl.gz --target signal_tracker:main
+
+A replay always runs inside a scratch directory (--workdir, or a fresh temp
+directory), so replayed snapshot files and the target's logs never overwrite
+the live ones in the current directory. With --repeat every run gets its own
+copy of --workdir (or an empty directory), so no run starts from the logs and
+state left by the one before.
+"""
+
+import argparse
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from websocket._app import WebSocketApp
+
+import csv_log_writer
+import snapshot_bus
+
+FORMAT_VERSION = 1
+
+# Query params that differ on every call (auth / request signing, clock-derived
+# windows) and never select a response; calls are matched FIFO without them
+VOLATILE_PARAMS = frozenset({'api_key', 'timestamp', 'signature', 'recvWindow',
+                             'from', 'to', 'startTime', 'endTime'})
+
+SNAPSHOT_FILES = (
+    'cvd_data.json',
+    'liquidation_data.json',
+    'data/feeds_snapshot.json',
+    'data/uif_snapshot.json',
+    'data/btc_leadlag_snapshot.json',
+    'data/market_snapshot.json'
+)
+FILE_POLL_SEC = 0.5
+# Left out of the output digest: harness input, SQLite sidecars, scratch files
+DIGEST_SKIP_NAMES = frozenset({'config.yaml'})
+DIGEST_SKIP_SUFFIXES = ('-wal', '-shm', '-journal', '.pid', '.tmp', '.lock')
+
+_real_time = time.time
+_real_sleep = time.sleep
+_original_request = requests.Session.request
+_original_ws_init = WebSocketApp.__init__
+_original_run_forever = WebSocketApp.run_forever
+_original_ws_send = WebSocketApp.send
+_original_bus_read = snapshot_bus.read
+_real_datetime = datetime.datetime
+_real_uuid4 = uuid.uuid4
+
+
+class ReplayFinished(BaseException):
+    """Raised into the code under test once the recorded session is exhausted"""
+
+
+class _VirtualDatetime(_real_datetime):
+    """datetime.datetime whose now()/utcnow() read the (patched) time.time()"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.fromtimestamp(time.time(), tz)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.utcfromtimestamp(time.time())
+
+
+def request_key(method, url, params=None) -> str:
+    """'GET https://host/path?a=1&b=2' with params merged, sorted and volatile ones dropped"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query)
+    if isinstance(params, dict):
+        query += list(params.items())
+    elif params:
+        query += list(params)
+    query = sorted((str(k), str(v)) for k, v in query if k not in VOLATILE_PARAMS)
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return f"{method.upper()} {base}?{urlencode(query)}" if query else f"{method.upper()} {base}"
+
+
+def _open_log(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _encode_body(content: bytes) -> dict:
+    try:
+        return {'body': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_body(record: dict) -> bytes:
+    if 'b64' in record:
+        return base64.b64decode(record['b64'])
+    return record.get('body', '').encode('utf-8')
+
+
+class Recorder:
+    """Capture external inputs into a replay log while the real code runs"""
+
+    def __init__(self, path, files=SNAPSHOT_FILES, poll_sec=FILE_POLL_SEC):
+        self.path = path
+        self.files = list(files)
+        self.poll_sec = poll_sec
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._file_state = {}
+        self._log = None
+        self._thread = None
+        self.t0 = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def install(self):
+        self.t0 = _real_time()
+        self._log = _open_log(self.path, 'w')
+        self._log.write(json.dumps({'format': 'market_replay', 'version': FORMAT_VERSION, 'started': self.t0}) + '\n')
+        self._poll_files()
+
+        recorder = self
+
+        def request(session, method, url, params=None, **kwargs):
+            key = request_key(method, url, params)
+            try:
+                response = _original_request(session, method, url, params=params, **kwargs)
+            except requests.RequestException as e:
+                recorder._write({'k': 'http', 'key': key, 'error': type(e).__name__})
+                raise
+            recorder._write(dict({'k': 'http', 'key': key, 'status': response.status_code,
+                                  'ctype': response.headers.get('Content-Type')},
+                                 **_encode_body(response.content)))
+            return response
+
+        def ws_init(app, url, *args, **kwargs):
+            on_message = kwargs.get('on_message')
+            if on_message is not None:
+                def record_message(ws, message):
+                    recorder._write({'k': 'ws', 'url': url, 'm': message})
+                    return on_message(ws, message)
+                kwargs['on_message'] = record_message
+            _original_ws_init(app, url, *args, **kwargs)
+
+        requests.Session.request = request
+        WebSocketApp.__init__ = ws_init
+        self._thread = threading.Thread(target=self._file_loop, name='replay-recorder', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        requests.Session.request = _original_request
+        WebSocketApp.__init__ = _original_ws_init
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._log is not None:
+            self._poll_files()
+            self._log.close()
+            self._log = None
+
+    def _write(self, record):
+        with self._lock:
+            if self._log is None:
+                return
+            record['t'] = round(_real_time() - self.t0, 6)
+            self._log.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self.counts[record['k']] += 1
+
+    def _file_loop(self):
+        while not self._stop.wait(self.poll_sec):
+            self._poll_files()
+
+    def _poll_files(self):
+        for path in self.files:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self._file_state.get(path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            self._file_state[path] = (stat.st_mtime_ns, stat.st_size)
+            with open(path, 'rb') as f:
+                self._write(dict({'k': 'file', 'path': path}, **_encode_body(f.read())))
+
+
+class Replayer:
+    """Serve a replay log through requests, websocket-client, snapshot files and the clock"""
+
+    def __init__(self, path, speed=0.0):
+        self.speed = speed
+        self.http = defaultdict(deque)
+        self.ws = defaultdict(deque)
+        self.files = deque()
+        with _open_log(path, 'r') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != 'market_replay' or header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a market_replay v{FORMAT_VERSION} log")
+            records = [json.loads(line) for line in f if line.strip()]
+        for record in records:
+            if record['k'] == 'http':
+                self.http[record['key']].append(record)
+            elif record['k'] == 'ws':
+                self.ws[record['url']].append(record)
+            elif record['k'] == 'file':
+                self.files.append(record)
+        self.input_paths = {os.path.normpath(r['path']) for r in self.files}
+
+        self.started = header['started']
+        self.end = max((r['t'] for r in records), default=0.0)
+        self.counts = defaultdict(int)
+        self._last_http = {}
+        self._offset = 0.0
+        self._real_start = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- clock -----------------------------------------------------------
+
+    def elapsed(self) -> float:
+        """Virtual seconds since the start of the recording"""
+        if self.speed > 0:
+            return (_real_time() - self._real_start) * self.speed
+        return self._offset
+
+    def time(self) -> float:
+        return self.started + self.elapsed()
+
+    def wait_until(self, t):
+        """Move the clock to recording offset t (sleeps for real when speed > 0)"""
+        if self.speed > 0:
+            delay = (t - self.elapsed()) / self.speed
+            if delay > 0:
+                _real_sleep(delay)
+        else:
+            with self._lock:
+                self._offset = max(self._offset, t)
+        self._apply_files()
+
+    def sleep(self, seconds):
+        if self.elapsed() > self.end:
+            raise ReplayFinished(f"Recording exhausted at +{self.end:.1f}s")
+        if self.speed > 0:
+            _real_sleep(max(0.0, seconds) / self.speed)
+        else:
+            with self._lock:
+                self._offset += max(0.0, seconds)
+        self._apply_files()
+
+    def _apply_files(self):
+        with self._lock:
+            while self.files and self.files[0]['t'] <= self.elapsed():
+                record = self.files.popleft()
+                os.makedirs(os.path.dirname(record['path']) or '.', exist_ok=True)
+                tmp_path = record['path'] + '.replay.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(_decode_body(record))
+                os.replace(tmp_path, record['path'])
+                self.counts['file'] += 1
+
+    # --- interfaces ------------------------------------------------------
+
+    def _response(self, method, url, params=None, **kwargs):
+        key = request_key(method, url, params)
+        with self._lock:
+            queue = self.http.get(key)
+            if queue:
+                record = queue.popleft()
+                self.counts['http'] += 1
+            else:
+                # More calls than recorded (e.g. after a cache change): repeat the last answer
+                record = self._last_http.get(key)
+                if record is None:
+                    self.counts['http_miss'] += 1
+                    raise requests.ConnectionError(f"No recorded response for {key}")
+                self.counts['http_reused'] += 1
+            self._last_http[key] = record
+        self.wait_until(record['t'])
+
+        if 'error' in record:
+            raise requests.ConnectionError(f"Recorded {record['error']} for {key}")
+        response = requests.Response()
+        response.status_code = record['status']
+        response._content = _decode_body(record)
+        response.headers = CaseInsensitiveDict({'Content-Type': record.get('ctype') or 'application/json'})
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    def _run_forever(self, app, *args, **kwargs):
+        queue = self.ws.get(app.url, deque())
+        if app.on_open:
+            app.on_open(app)
+        while queue:
+            record = queue.popleft()
+            self.wait_until(record['t'])
+            self.counts['ws'] += 1
+            if app.on_message:
+                app.on_message(app, record['m'])
+        if app.on_close:
+            app.on_close(app, None, None)
+        raise ReplayFinished(f"Stream exhausted: {app.url}")
+
+    def install(self):
+        self._real_start = _real_time()
+        self._apply_files()
+        replayer = self
+        requests.Session.request = lambda session, method, url, params=None, **kwargs: \
+            replayer._response(method, url, params, **kwargs)
+        WebSocketApp.run_forever = lambda app, *args, **kwargs: replayer._run_forever(app, *args, **kwargs)
+        WebSocketApp.send = lambda app, *args, **kwargs: None
+        # Live snapshot buses are not recorded: readers fall back to the replayed JSON files
+        snapshot_bus.read = lambda name, bus_dir=snapshot_bus.BUS_DIR: None
+        time.time = self.time
+        time.sleep = self.sleep
+        # Modules that bind datetime/uuid4 after this point see the virtual clock and seeded ids
+        datetime.datetime = _VirtualDatetime
+        ids = random.Random(self.started)
+        uuid.uuid4 = lambda: uuid.UUID(int=ids.getrandbits(128), version=4)
+
+    def close(self):
+        requests.Session.request = _original_request
+        WebSocketApp.run_forever = _original_run_forever
+        WebSocketApp.send = _original_ws_send
+        snapshot_bus.read = _original_bus_read
+        time.time = _real_time
+        time.sleep = _real_sleep
+        datetime.datetime = _real_datetime
+        uuid.uuid4 = _real_uuid4
+
+
+def result_digest(value) -> str:
+    """Stable hash of a target's return value (for bit-for-bit replay comparisons)"""
+    payload = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _sqlite_digest(path) -> str:
+    """Hash of every table's rows (file bytes depend on page layout and WAL state)"""
+    digest = hashlib.sha1()
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        for table in tables:
+            rows = sorted(repr(row) for row in conn.execute(f'SELECT * FROM "{table}"'))
+            digest.update(f"{table}\n{len(rows)}\n".encode('utf-8'))
+            for row in rows:
+                digest.update(row.encode('utf-8') + b'\n')
+    finally:
+        conn.close()
+    return digest.hexdigest()[:16]
+
+
+def output_digests(workdir, skip=()) -> dict:
+    """{relative path: digest} of everything the target left in workdir (skip = replayed inputs)"""
+    digests = {}
+    for root, dirs, files in os.walk(workdir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, workdir)
+            if rel in skip or name in DIGEST_SKIP_NAMES or name.endswith(DIGEST_SKIP_SUFFIXES):
+                continue
+            with open(path, 'rb') as f:
+                is_sqlite = f.read(16) == b'SQLite format 3\x00'
+            if is_sqlite:
+                digests[rel] = _sqlite_digest(path)
+            else:
+                with open(path, 'rb') as f:
+                    digests[rel] = hashlib.sha1(f.read()).hexdigest()[:16]
+    return digests
+
+
+def _load_config():
+    import yaml
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def _decide_all():
+    """decide_signal for every configured symbol, with run_once's arguments"""
+    from smart_signal import decide_signal
+    cfg = _load_config()
+    return [
+        decide_signal(sym, cfg.get('interval', '15m'), config=cfg,
+                      lookback_minutes=int(cfg.get('lookback_minutes', 15)),
+                      vwap_window=int(cfg.get('vwap_window', 30)),
+                      volume_spike_mult=float(cfg.get('volume_spike_mult', 1.6)),
+                      min_components=int(cfg.get('min_components', 2)))
+        for sym in cfg['symbols']
+    ]
+
+
+def _run_once():
+    import main
+    main.run_once(_load_config(), main.load_sent_signals())
+
+
+TARGETS = {'decide': _decide_all, 'run_once': _run_once}
+
+
+def load_target(spec):
+    """'decide', 'run_once' or 'module:function' (called without arguments)"""
+    if spec in TARGETS:
+        return TARGETS[spec]
+    module_name, _, func_name = spec.partition(':')
+    module = __import__(module_name, fromlist=[func_name])
+    return getattr(module, func_name or 'main')
+
+
+def _prepare_workdir(workdir):
+    """Run inside a scratch directory so replays never touch the live logs and state"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(workdir, exist_ok=True)
+    if not os.path.exists(os.path.join(workdir, 'config.yaml')):
+        shutil.copy(os.path.join(root, 'config.yaml'), workdir)
+    sys.path.insert(0, root)
+    os.chdir(workdir)
+
+
+def record(args):
+    target = load_target(args.target)
+    with Recorder(args.log) as recorder:
+        try:
+            for cycle in range(args.cycles):
+                if cycle:
+                    time.sleep(args.interval)
+                target()
+                print(f"[REPLAY] Recorded cycle {cycle + 1}/{args.cycles}: {dict(recorder.counts)}")
+        except KeyboardInterrupt:
+            print("[REPLAY] Recording stopped")
+    print(f"[REPLAY] ✅ {args.log}: {dict(recorder.counts)}")
+
+
+def replay_once(args) -> dict:
+    """
+    One replay of the log through the target; returns latency, digests and counters.
+
+    'digest' covers the target's return value and every output file it left in
+    the workdir ('outputs': CSV logs by content, SQLite databases by table rows).
+    """
+    if not args.workdir:
+        args.workdir = tempfile.mkdtemp(prefix='market_replay_')
+    _prepare_workdir(args.workdir)
+    finished = False
+    with Replayer(args.log, speed=args.speed) as replayer:
+        target = load_target(args.target)  # Imported under the virtual clock
+        start = time.perf_counter()
+        try:
+            result = target()
+        except ReplayFinished:
+            result, finished = None, True
+        wall_ms = (time.perf_counter() - start) * 1000
+        csv_log_writer.flush_all()
+        outputs = output_digests(os.getcwd(), skip=replayer.input_paths)
+    return {
+        'wall_ms': round(wall_ms, 3),
+        'digest': result_digest({'result': result_digest(result), 'outputs': outputs}),
+        'outputs': outputs,
+        'finished': finished,
+        'counts': dict(replayer.counts),
+        'workdir': args.workdir
+    }
+
+
+def replay(args):
+    if args.child or args.repeat == 1:
+        summary = replay_once(args)
+        print(json.dumps(summary) if args.child else f"[REPLAY] {summary}")
+        return
+
+    # Fresh interpreter and fresh copy of the workdir per run: module-level caches,
+    # logs and bot_state.db would otherwise leak from one repeat into the next
+    runs_root = tempfile.mkdtemp(prefix='market_replay_')
+    runs = []
+    for n in range(args.repeat):
+        run_dir = os.path.join(runs_root, f'run{n + 1}')
+        if args.workdir:
+            shutil.copytree(args.workdir, run_dir)
+        else:
+            os.makedirs(run_dir)
+        cmd = [sys.executable, os.path.abspath(__file__), 'replay', args.log, '--target', args.target,
+               '--speed', str(args.speed), '--child', '--workdir', run_dir]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:])
+            sys.exit(f"[REPLAY] Run {len(runs) + 1} failed")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    wall = [r['wall_ms'] for r in runs]
+    digests = {r['digest'] for r in runs}
+    print(f"[REPLAY] {args.target} x{len(runs)}: p50 {statistics.median(wall):.1f} ms | "
+          f"min {min(wall):.1f} | max {max(wall):.1f} | counts {runs[-1]['counts']}")
+    print(f"[REPLAY] Output digest: {', '.join(sorted(digests))} "
+          f"({'identical' if len(digests) == 1 else 'DIFFERS between runs'}) over {len(runs[0]['outputs'])} files")
+    if len(digests) > 1:
+        paths = sorted({path for r in runs for path in r['outputs']})
+        differing = [p for p in paths if len({r['outputs'].get(p) for r in runs}) > 1]
+        print(f"[REPLAY] Differing outputs: {', '.join(differing) or 'return value only'}")
+    print(f"[REPLAY] Scratch directories: {runs_root}/run1..run{len(runs)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record / replay external market data')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='Run a target live and capture its inputs')
+    rec.add_argument('log')
+    rec.add_argument('--target', default='decide')
+    rec.add_argument('--cycles', type=int, default=1)
+    rec.add_argument('--interval', type=float, default=60.0)
+
+    rep = sub.add_parser('replay', help='Run a target offline against a recorded log')
+    rep.add_argument('log')
+    rep.add_argument('--target', default='decide')
+    rep.add_argument('--speed', type=float, default=0.0, help='0 = as fast as possible, 1 = live pace')
+    rep.add_argument('--repeat', type=int, default=1)
+    rep.add_argument('--workdir', default=None,
+                     help='Scratch directory for replayed files and logs (default: a fresh temp directory); '
+                          'with --repeat, the starting state copied for every run')
+    rep.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+    else:
+        if args.workdir:
+            args.workdir = os.path.abspath(args.workdir)
+        args.log = os.path.abspath(args.log)
+        replay(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry - in-process counters, gauges and histograms with a
+Prometheus text exposition endpoint
+
+Every long-running service records into the process-wide REGISTRY and serves
+it on GET /metrics (text format 0.0.4), so the watchdog and dashboards scrape
+an HTTP endpoint instead of spawning pgrep or parsing per-service JSON.
+
+    API_REQUESTS.labels(api='coinalyze', outcome='ok').inc()
+    observe_cycle('signal_loop', seconds)
+    start_metrics_server('signal_bot', cfg)
+
+The shared metric families below keep names identical across services:
+cycle latency, queue depths, API outcomes, WebSocket message rates and
+snapshot publish lag. Values that already live elsewhere (CSV writer
+buffers, stage_timing reservoirs) are exported by collectors registered with
+Registry.register_collector and read only at scrape time.
+
+Ports come from config.yaml (metrics.ports.<service>); data_feeds serves
+/metrics on its existing StatusServer port. observe_cycle()/observe_publish()
+also beat the process supervisor's heartbeat slot (heartbeat.py).
+"""
+
+import math
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import heartbeat
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_NAME_RE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$')
+
+# (labels, value) pairs of one family, as produced by collectors
+Sample = Tuple[Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+class _Metric(ABC):
+    """One metric family; labelled children are created on first use"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid metric name: {name!r}")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[tuple, object] = {}
+
+    def labels(self, *values, **kwargs):
+        """Child for one label combination (positional in labelnames order, or by name)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """Fresh value holder for one label combination"""
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            children = list(self._children.items())
+        out = []
+        for key, child in children:
+            labels = dict(zip(self.labelnames, key))
+            out.extend((self.name + suffix, dict(labels, **extra), value) for suffix, extra, value in child.samples())
+        return out
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self):
+        return [('', {}, self._value)]
+
+
+class Counter(_Metric):
+    """Monotonic count (exposed as <name>; name it *_total)"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_to_current_time(self):
+        self._value = time.time()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self):
+        return [('', {}, self._value)]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # Last slot: +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        out, cumulative = [], 0
+        for bound, n in zip(self._buckets + (math.inf,), counts):
+            cumulative += n
+            out.append(('_bucket', {'le': _format_value(bound)}, cumulative))
+        out.append(('_sum', {}, total))
+        out.append(('_count', {}, cumulative))
+        return out
+
+
+class Histogram(_Metric):
+    """Bucketed observations (seconds by default) with _bucket/_sum/_count series"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    """Named metric families plus scrape-time collectors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name} {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """collector() -> [(name, type, help, [(labels, value), ...]), ...], called on every scrape"""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every family"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(f"{_series(name, labels)} {_format_value(value)}" for name, labels, value in samples)
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"[METRICS] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                lines.extend(f"{_series(name, labels)} {_format_value(value)}" for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Shared families: same names in every service, told apart by the scrape target
+SERVICE_INFO = REGISTRY.gauge('service_info', 'Service running in this process (always 1)', ('service',))
+PROCESS_START = REGISTRY.gauge('process_start_time_seconds', 'Unix time the process registered its metrics')
+CYCLE_SECONDS = REGISTRY.histogram('service_cycle_seconds', 'Duration of one main-loop cycle', ('loop',))
+LAST_CYCLE = REGISTRY.gauge('service_last_cycle_timestamp_seconds', 'Unix time the loop last finished a cycle',
+                            ('loop',))
+CYCLE_ERRORS = REGISTRY.counter('service_cycle_errors_total', 'Cycles (or per-symbol steps) that raised', ('loop',))
+API_REQUESTS = REGISTRY.counter('api_requests_total', 'Outbound API requests by outcome', ('api', 'outcome'))
+WS_MESSAGES = REGISTRY.counter('ws_messages_total', 'WebSocket messages processed', ('stream',))
+WS_ERRORS = REGISTRY.counter('ws_errors_total', 'WebSocket message or connection errors', ('stream',))
+WS_CONNECTED = REGISTRY.gauge('ws_connections', 'Open WebSocket connections', ('stream',))
+PUBLISH_LAG = REGISTRY.gauge('snapshot_publish_lag_seconds',
+                             'Seconds the oldest unpublished input waited for the last publish', ('snapshot',))
+LAST_PUBLISH = REGISTRY.gauge('snapshot_last_publish_timestamp_seconds', 'Unix time of the last snapshot publish',
+                              ('snapshot',))
+QUEUE_DEPTH = REGISTRY.gauge('queue_depth', 'Items waiting in an in-process queue or buffer', ('queue',))
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def observe_cycle(loop: str, seconds: float, now: Optional[float] = None):
+    """Record one finished main-loop cycle"""
+    now = time.time() if now is None else now
+    CYCLE_SECONDS.labels(loop=loop).observe(seconds)
+    LAST_CYCLE.labels(loop=loop).set(now)
+    heartbeat.beat(now)
+
+
+def observe_publish(snapshot: str, pending_since: Optional[float] = None, now: Optional[float] = None):
+    """Record a snapshot publish; pending_since is when its oldest not-yet-published input arrived"""
+    now = time.time() if now is None else now
+    LAST_PUBLISH.labels(snapshot=snapshot).set(now)
+    heartbeat.beat(now)
+    if pending_since:
+        PUBLISH_LAG.labels(snapshot=snapshot).set(max(0.0, now - pending_since))
+
+
+def parse_exposition(text: str) -> Dict[str, float]:
+    """{series: value} from a text exposition, series as rendered (name{labels})"""
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, _, value = line.rpartition(' ')
+        try:
+            values[series] = float(value)
+        except ValueError:
+            continue
+    return values
+
+
+def scrape(url: str, timeout: float = 2.0) -> Dict[str, float]:
+    """GET a /metrics endpoint and parse it (raises on connection errors)"""
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return parse_exposition(response.read().decode('utf-8'))
+
+
+class MetricsServer:
+    """Lightweight HTTP server for /metrics (plus optional JSON endpoints)"""
+
+    def __init__(self, port: int, registry: Optional[Registry] = None,
+                 json_routes: Optional[Dict[str, Callable[[], dict]]] = None):
+        self.port = port
+        self.registry = registry or REGISTRY
+        self.json_routes = json_routes or {}
+        self.app = None
+        self.runner = None
+        self.site = None
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        """Start the HTTP server"""
+        from aiohttp import web
+
+        self.app = web.Application()
+        self.app.router.add_get('/metrics', self.handle_metrics)
+        for path, provider in self.json_routes.items():
+            self.app.router.add_get(path, self._json_handler(provider))
+
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+
+        self.site = web.TCPSite(self.runner, '0.0.0.0', self.port)
+        await self.site.start()
+
+        print(f"[HTTP] Metrics server running on http://0.0.0.0:{self.port}/metrics")
+
+    async def stop(self):
+        """Stop the HTTP server"""
+        if self.site:
+            await self.site.stop()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def handle_metrics(self, request):
+        """Handle GET /metrics requests"""
+        return metrics_response(self.registry)
+
+    def _json_handler(self, provider):
+        async def handle(request):
+            import json
+            from aiohttp import web
+
+            try:
+                return web.Response(text=json.dumps(provider(), indent=2), content_type='application/json')
+            except Exception as e:
+                return web.Response(text=json.dumps({'error': str(e)}), content_type='application/json', status=500)
+        return handle
+
+    def start_in_thread(self):
+        """Run the server on its own event loop (for synchronous services)"""
+        import asyncio
+
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start())
+            except Exception as e:
+                print(f"[WARN] Metrics server failed to start on port {self.port}: {e}")
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='metrics-server', daemon=True)
+        self._thread.start()
+        started.wait(timeout=5)
+
+
+def metrics_response(registry: Optional[Registry] = None):
+    """aiohttp response with the text exposition (for servers that add a /metrics route)"""
+    from aiohttp import web
+
+    body = (registry or REGISTRY).render()
+    return web.Response(body=body.encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+
+def metrics_port(service: str, config: Optional[dict] = None) -> Optional[int]:
+    """Configured /metrics port of a service (None if metrics are disabled or no port is set)"""
+    if config is None:
+        try:
+            import yaml
+            with open('config.yaml', 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        except Exception:
+            return None
+    metrics_cfg = config.get('metrics', {})
+    if not metrics_cfg.get('enabled', False):
+        return None
+    port = metrics_cfg.get('ports', {}).get(service)
+    return int(port) if port else None
+
+
+def register_service(service: str):
+    """Mark this process as `service` in service_info / process_start_time_seconds"""
+    SERVICE_INFO.labels(service=service).set(1)
+    PROCESS_START.set(time.time())
+
+
+def start_metrics_server(service: str, config: Optional[dict] = None,
+                         json_routes: Optional[Dict[str, Callable[[], dict]]] = None) -> Optional[MetricsServer]:
+    """Register the service and serve /metrics on its configured port in a background thread"""
+    register_service(service)
+    port = metrics_port(service, config)
+    if port is None:
+        return None
+    server = MetricsServer(port, json_routes=json_routes)
+    server.start_in_thread()
+    return server
@@ -0,0 +1,245 @@
+"""
+Parallel model training helpers
+
+Every (candidate, fold) fit is an independent job, so candidate models,
+hyper-parameter grids and time-series CV folds are fanned out over all cores
+with joblib instead of being fitted one after another. Folds come from
+TimeSeriesSplit (train on the past, score on the following block) and the
+final holdout is the most recent slice, so no future rows leak into training.
+
+Engineered feature frames are cached on disk keyed by a hash of the raw input
+rows: re-running a training script on unchanged logs skips feature
+engineering, and a new effectiveness row changes the key.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_CACHE_DIR = 'data/feature_cache'
+DEFAULT_CACHE_ENTRIES = 20
+
+
+def data_hash(*parts) -> str:
+    """Stable content hash of DataFrames / Series / arrays / plain values"""
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            names = part.columns if isinstance(part, pd.DataFrame) else [part.name]
+            h.update(','.join(map(str, names)).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            h.update(str(part.shape).encode('utf-8'))
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode('utf-8'))
+        h.update(b'|')
+    return h.hexdigest()[:16]
+
+
+class FeatureCache:
+    """Pickled feature frames under cache_dir, one file per (tag, data hash)"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, tag: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{tag}-{key}.pkl")
+
+    def get_or_build(self, tag: str, key: str, build: Callable[[], Any]) -> Any:
+        """Return the cached value for (tag, key) or build, store and return it"""
+        if not self.cache_dir:
+            return build()
+
+        path = self._path(tag, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            self.hits += 1
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARN] Feature cache entry {path} unreadable ({e}), rebuilding")
+
+        self.misses += 1
+        value = build()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._prune()
+        except Exception as e:
+            print(f"[WARN] Feature cache write failed: {e}")
+        return value
+
+    def _prune(self):
+        """Keep the most recently used max_entries files"""
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.pkl')]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[self.max_entries:]:
+            os.remove(path)
+
+
+def expand_grid(name: str, estimator, param_grid: Dict[str, list]) -> Dict[str, Any]:
+    """{'Ridge (alpha=0.1)': Ridge(alpha=0.1), ...} for every grid point"""
+    candidates = {}
+    for params in ParameterGrid(param_grid):
+        label = ', '.join(f"{k}={v}" for k, v in params.items())
+        candidates[f"{name} ({label})" if label else name] = clone(estimator).set_params(**params)
+    return candidates
+
+
+def time_series_holdout(n: int, holdout: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+    """Chronological split: first (1 - holdout) rows train, the latest rows test"""
+    split = int(round(n * (1 - holdout)))
+    return np.arange(split), np.arange(split, n)
+
+
+def _take(data, idx):
+    return data.iloc[idx] if isinstance(data, (pd.DataFrame, pd.Series)) else data[idx]
+
+
+def _fit_score(estimator, X, y, train_idx, test_idx, scorer, scale):
+    """One job: fit on train_idx, score on test_idx. Returns (score, fitted, scaler)"""
+    model = clone(estimator)
+    scaler = None
+    X_train, X_test = _take(X, train_idx), _take(X, test_idx)
+    if scale:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
+    y_train, y_test = _take(y, train_idx), _take(y, test_idx)
+    model.fit(X_train, y_train)
+    return scorer(np.asarray(y_test), model.predict(X_test)), model, scaler
+
+
+def cross_val_scores(jobs: Dict[Any, tuple], n_splits: int = 5, n_jobs: int = -1,
+                     scale: bool = False) -> Dict[Any, List[float]]:
+    """
+    TimeSeriesSplit CV for several independent (estimator, X, y, scorer) jobs.
+
+    All job x fold fits run in one joblib pool. A scorer may return NaN to
+    mark a fold as not scorable; it is dropped from that job's list.
+
+    Returns:
+        {job key: [fold scores in fold order]}
+    """
+    tasks = []
+    for key, (estimator, X, y, scorer) in jobs.items():
+        for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+            tasks.append((key, delayed(_fit_score)(estimator, X, y, train_idx, test_idx, scorer, scale)))
+
+    outputs = Parallel(n_jobs=n_jobs)(task for _, task in tasks)
+    scores = {key: [] for key in jobs}
+    for (key, _), (score, _, _) in zip(tasks, outputs):
+        if score is not None and np.isfinite(score):
+            scores[key].append(float(score))
+    return scores
+
+
+def _regression_metrics(y_true, y_pred) -> Dict[str, float]:
+    return {
+        'r2': r2_score(y_true, y_pred),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred)))
+    }
+
+
+def train_candidates(candidates: Dict[str, Any], X, y, n_splits: int = 5, holdout: float = 0.2,
+                     n_jobs: int = -1, scale: bool = True) -> Dict[str, dict]:
+    """
+    Time-series CV plus a chronological holdout for every regression candidate.
+
+    CV folds run on the training part only (scaler fitted per fold), and each
+    candidate is refitted on the whole training part for the holdout score.
+    All fits share one joblib pool.
+
+    Returns:
+        {name: {'model', 'scaler', 'r2_train', 'r2_test', 'mae_test',
+                'rmse_test', 'cv_mean', 'cv_std', 'cv_scores'}}
+    """
+    train_idx, test_idx = time_series_holdout(len(y), holdout)
+    X_train, y_train = _take(X, train_idx), _take(y, train_idx)
+
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X_train))
+    tasks = []
+    for name, estimator in candidates.items():
+        for fold_train, fold_test in folds:
+            tasks.append((name, 'cv', delayed(_fit_score)(
+                make_pipeline(StandardScaler(), estimator) if scale else estimator,
+                X_train, y_train, fold_train, fold_test, r2_score, False)))
+        tasks.append((name, 'holdout', delayed(_fit_score)(
+            estimator, X, y, train_idx, test_idx, _regression_metrics, scale)))
+
+    outputs = Parallel(n_jobs=n_jobs)(task for _, _, task in tasks)
+
+    results = {name: {'cv_scores': []} for name in candidates}
+    for (name, kind, _), (score, model, scaler) in zip(tasks, outputs):
+        result = results[name]
+        if kind == 'cv':
+            result['cv_scores'].append(float(score))
+            continue
+        X_fit = scaler.transform(X_train) if scaler is not None else X_train
+        result.update({
+            'model': model,
+            'scaler': scaler,
+            'r2_train': r2_score(y_train, model.predict(X_fit)),
+            'r2_test': score['r2'],
+            'mae_test': score['mae'],
+            'rmse_test': score['rmse']
+        })
+
+    for result in results.values():
+        cv = np.asarray(result['cv_scores'])
+        result['cv_mean'] = float(cv.mean()) if len(cv) else float('nan')
+        result['cv_std'] = float(cv.std()) if len(cv) else float('nan')
+    return results
+
+
+def feature_schema(X: pd.DataFrame) -> List[Dict[str, str]]:
+    """Column order and dtypes a model was trained on"""
+    return [{'name': str(col), 'dtype': str(dtype)} for col, dtype in X.dtypes.items()]
+
+
+def export_model(path: str, model_data: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None,
+                 metadata_path: Optional[str] = None):
+    """
+    Atomically write a pickled model bundle (plus an optional JSON metadata file).
+
+    model_data should carry 'model', 'feature_names' and 'feature_schema' so
+    consumers can validate their input columns before predicting.
+    """
+    model_data = dict(model_data)
+    model_data.setdefault('exported_at', datetime.now().isoformat())
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(tmp_path, path)
+
+    if metadata is not None and metadata_path:
+        tmp_path = metadata_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, metadata_path)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Process Supervisor - runs the bot's services as child processes and restarts
+them when they exit or stop heartbeating
+
+    python watchdog.py --supervise
+
+Each child gets one slot in a shared heartbeat file (heartbeat.py) and beats
+it whenever a loop cycle finishes or a snapshot is published. Every second
+the supervisor reads the slots: a child that exited, or whose last beat is
+older than its max_heartbeat_age (startup_grace before the first beat), is
+stopped (SIGTERM to its process group, SIGKILL after STOP_TIMEOUT) and started
+again after an exponential backoff. The backoff resets once a child has run
+for STABLE_AFTER seconds and is beating.
+
+Children, timeouts and backoff can be tuned in config.yaml (supervisor:).
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+import metrics_registry
+from heartbeat import HeartbeatTable
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+HEARTBEAT_FILE = 'data/supervisor/heartbeats.bin'
+CHECK_INTERVAL = 1.0  # Seconds between heartbeat checks
+STATUS_INTERVAL = 30.0  # Seconds between status callbacks
+STOP_TIMEOUT = 10.0  # SIGTERM -> SIGKILL
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 300.0  # Healthy run time that resets the backoff
+
+# args: argv after the interpreter (relative to PROJECT_DIR)
+# max_heartbeat_age: longest normal gap between beats; startup_grace: allowed time to the first beat
+CHILDREN = [
+    {'name': 'signal_bot', 'args': ['main.py'], 'max_heartbeat_age': 300, 'startup_grace': 300},
+    {'name': 'signal_tracker', 'args': ['signal_tracker.py'], 'max_heartbeat_age': 300, 'startup_grace': 300},
+    {'name': 'cvd_service', 'args': ['cvd_service.py'], 'max_heartbeat_age': 120, 'startup_grace': 120},
+    {'name': 'liquidation_service', 'args': ['liquidation_service.py'], 'max_heartbeat_age': 120,
+     'startup_grace': 120},
+    {'name': 'btc_leadlag', 'args': ['btc_leadlag_service.py'], 'max_heartbeat_age': 120, 'startup_grace': 120},
+    {'name': 'data_feeds', 'args': ['services/data_feeds/runner.py'], 'max_heartbeat_age': 180,
+     'startup_grace': 180},
+    {'name': 'uif_engine', 'args': ['services/uif_feature_engine/runner.py'], 'max_heartbeat_age': 900,
+     'startup_grace': 900},  # One cycle per 5m bar
+    {'name': 'trader', 'args': ['bingx_trader_service.py'], 'max_heartbeat_age': 120, 'startup_grace': 120}
+]
+
+RESTARTS = metrics_registry.counter('supervisor_restarts_total', 'Child restarts by reason', ('child', 'reason'))
+CHILD_UP = metrics_registry.gauge('supervisor_child_up', 'Child process running (1) or not (0)', ('child',))
+HEARTBEAT_AGE = metrics_registry.gauge('supervisor_heartbeat_age_seconds',
+                                       'Seconds since the child last beat (or since start before the first beat)',
+                                       ('child',))
+
+
+def backoff_delay(failures: int, base: float = BACKOFF_BASE, maximum: float = BACKOFF_MAX) -> float:
+    """Restart delay after `failures` consecutive failures (base, 2*base, 4*base, ... capped)"""
+    if failures <= 0:
+        return 0.0
+    return min(base * 2 ** (failures - 1), maximum)
+
+
+class Child:
+    """One supervised process and its restart state"""
+
+    def __init__(self, spec: dict, slot: int):
+        self.name = spec['name']
+        self.args = list(spec['args'])
+        self.max_heartbeat_age = float(spec.get('max_heartbeat_age', 300))
+        self.startup_grace = float(spec.get('startup_grace', self.max_heartbeat_age))
+        self.slot = slot
+        self.proc: Optional[subprocess.Popen] = None
+        self.started = 0.0
+        self.stopping_since: Optional[float] = None
+        self.stop_reason: Optional[str] = None
+        self.killed = False
+        self.failures = 0
+        self.restarts = 0
+        self.next_start = 0.0
+
+
+class Supervisor:
+    """Starts children, watches their heartbeats and restarts them with backoff"""
+
+    def __init__(self, children: List[dict], heartbeat_file: str = HEARTBEAT_FILE, cwd: str = PROJECT_DIR,
+                 python: str = sys.executable, check_interval: float = CHECK_INTERVAL,
+                 stop_timeout: float = STOP_TIMEOUT, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, stable_after: float = STABLE_AFTER,
+                 log: Callable[[str], None] = print):
+        self.children = [Child(spec, slot) for slot, spec in enumerate(children)]
+        self.table = HeartbeatTable(heartbeat_file, len(self.children))
+        self.cwd = cwd
+        self.python = python
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.log = log
+        self.stopping = False
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs) -> 'Supervisor':
+        """CHILDREN with config.yaml supervisor.children overrides; disabled children are skipped"""
+        sup_cfg = config.get('supervisor', {}) or {}
+        overrides = sup_cfg.get('children', {}) or {}
+        children = []
+        for spec in CHILDREN:
+            spec = dict(spec, **(overrides.get(spec['name']) or {}))
+            if spec.pop('enabled', True):
+                children.append(spec)
+        kwargs.setdefault('check_interval', float(sup_cfg.get('check_interval_sec', CHECK_INTERVAL)))
+        kwargs.setdefault('backoff_base', float(sup_cfg.get('backoff_base_sec', BACKOFF_BASE)))
+        kwargs.setdefault('backoff_max', float(sup_cfg.get('backoff_max_sec', BACKOFF_MAX)))
+        kwargs.setdefault('stable_after', float(sup_cfg.get('stable_after_sec', STABLE_AFTER)))
+        return cls(children, **kwargs)
+
+    def start_child(self, child: Child, now: float):
+        self.table.clear(child.slot)
+        env = dict(os.environ)
+        env.update(self.table.child_env(child.slot))
+        child.stopping_since = None
+        child.stop_reason = None
+        child.killed = False
+        try:
+            child.proc = subprocess.Popen([self.python] + child.args, cwd=self.cwd, env=env, start_new_session=True)
+        except OSError as e:
+            self.log(f"[SUPERVISOR] ❌ Could not start {child.name}: {e}")
+            child.proc = None
+            self._schedule_restart(child, now, 'spawn_failed')
+            return
+        child.started = now
+        CHILD_UP.labels(child=child.name).set(1)
+        self.log(f"[SUPERVISOR] 🟢 Started {child.name} (pid {child.proc.pid})")
+
+    def stop_child(self, child: Child, now: float, reason: str):
+        """Ask the child's process group to exit; tick() escalates to SIGKILL after stop_timeout"""
+        if child.proc is None or child.stopping_since is not None:
+            return
+        child.stop_reason = reason
+        child.stopping_since = now
+        self._signal(child, signal.SIGTERM)
+
+    def _signal(self, child: Child, sig: int):
+        try:
+            os.killpg(child.proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _schedule_restart(self, child: Child, now: float, reason: str):
+        child.failures += 1
+        child.restarts += 1
+        delay = backoff_delay(child.failures, self.backoff_base, self.backoff_max)
+        child.next_start = now + delay
+        RESTARTS.labels(child=child.name, reason=reason).inc()
+        self.log(f"[SUPERVISOR] 🔄 Restarting {child.name} in {delay:.1f}s ({reason}, failure #{child.failures})")
+
+    def heartbeat_age(self, child: Child, now: float):
+        """(age, limit): seconds since the last beat, or since start before the first beat"""
+        last = self.table.last(child.slot)
+        if last > 0:
+            return now - last, child.max_heartbeat_age
+        return now - child.started, child.startup_grace
+
+    def tick(self, now: Optional[float] = None):
+        """One pass: reap exited children, stop hung ones, start the ones whose backoff is over"""
+        now = time.time() if now is None else now
+        for child in self.children:
+            if child.proc is None:
+                if not self.stopping and now >= child.next_start:
+                    self.start_child(child, now)
+                continue
+
+            code = child.proc.poll()
+            if code is not None:
+                CHILD_UP.labels(child=child.name).set(0)
+                reason = child.stop_reason or 'exited'
+                self.log(f"[SUPERVISOR] {child.name} (pid {child.proc.pid}) exited with code {code}")
+                child.proc = None
+                if not self.stopping:
+                    self._schedule_restart(child, now, reason)
+                continue
+
+            if child.stopping_since is not None:
+                if not child.killed and now - child.stopping_since > self.stop_timeout:
+                    self.log(f"[SUPERVISOR] ⚠️  {child.name} ignored SIGTERM for {self.stop_timeout:.0f}s, killing")
+                    self._signal(child, signal.SIGKILL)
+                    child.killed = True
+                continue
+
+            age, limit = self.heartbeat_age(child, now)
+            HEARTBEAT_AGE.labels(child=child.name).set(age)
+            if age > limit:
+                self.log(f"[SUPERVISOR] 🔴 {child.name} hung: no heartbeat for {age:.0f}s (limit {limit:.0f}s)")
+                self.stop_child(child, now, 'hung')
+            elif child.failures and self.table.last(child.slot) > 0 and now - child.started >= self.stable_after:
+                child.failures = 0
+
+    def status(self, now: Optional[float] = None) -> Dict[str, dict]:
+        """Per-child health in the watchdog_health.json 'services' shape"""
+        now = time.time() if now is None else now
+        services = {}
+        for child in self.children:
+            if child.proc is None:
+                health = {'healthy': False, 'reason': f"Down, restart in {max(0.0, child.next_start - now):.0f}s"}
+            elif child.stopping_since is not None:
+                health = {'healthy': False, 'reason': f"Stopping ({child.stop_reason})"}
+            else:
+                age, limit = self.heartbeat_age(child, now)
+                beating = self.table.last(child.slot) > 0
+                health = {'healthy': age <= limit,
+                          'reason': f"Heartbeat {age:.0f}s ago" if beating else f"Starting ({age:.0f}s)"}
+            health.update({'pid': child.proc.pid if child.proc else None, 'restarts': child.restarts})
+            services[child.name] = health
+        return services
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop every child (SIGTERM, then SIGKILL after timeout) and wait for them"""
+        self.stopping = True
+        timeout = self.stop_timeout if timeout is None else timeout
+        now = time.time()
+        for child in self.children:
+            self.stop_child(child, now, 'shutdown')
+        deadline = now + timeout
+        while time.time() < deadline and any(c.proc and c.proc.poll() is None for c in self.children):
+            time.sleep(0.1)
+        for child in self.children:
+            if child.proc and child.proc.poll() is None:
+                self._signal(child, signal.SIGKILL)
+                child.proc.wait()
+            if child.proc:
+                CHILD_UP.labels(child=child.name).set(0)
+            child.proc = None
+
+    def run(self, on_status: Optional[Callable[[dict], None]] = None, status_interval: float = STATUS_INTERVAL):
+        """Supervise until SIGTERM/SIGINT, then stop the children"""
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        last_status = 0.0
+        try:
+            while not self.stopping:
+                self.tick()
+                if on_status and time.time() - last_status >= status_interval:
+                    last_status = time.time()
+                    on_status({'timestamp': datetime.now().isoformat(), 'mode': 'supervisor',
+                               'services': self.status(last_status)})
+                time.sleep(self.check_interval)
+        finally:
+            self.log("[SUPERVISOR] 🛑 Stopping children")
+            self.shutdown()
+
+
+def main(log: Callable[[str], None] = print, on_status: Optional[Callable[[dict], None]] = None):
+    try:
+        with open(os.path.join(PROJECT_DIR, 'config.yaml'), 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except Exception as e:
+        log(f"[SUPERVISOR] [WARN] Could not load config.yaml ({e}), using defaults")
+        config = {}
+
+    os.chdir(PROJECT_DIR)
+    supervisor = Supervisor.from_config(config, log=log)
+    metrics_registry.start_metrics_server('supervisor', config)
+
+    print("=" * 70)
+    print("PROCESS SUPERVISOR - heartbeat-based liveness")
+    print("=" * 70)
+    for child in supervisor.children:
+        print(f"  - {child.name}: {' '.join(child.args)} (heartbeat <= {child.max_heartbeat_age:.0f}s)")
+    print("-" * 70)
+    supervisor.run(on_status=on_status)
+
+
+if __name__ == '__main__':
+    main()
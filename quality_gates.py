@@ -17,6 +17,7 @@ import os
 import sys
 import csv
 import datetime
+import numpy as np
 from pathlib import Path
 from collections import defaultdict
 from telegram_utils import send_telegram_message
@@ -61,255 +62,300 @@ def backup_config(config):
         print(f'[QUALITY_GATES] Failed to backup config: {e}')
         return None
 
-def compute_regime_metrics(analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv'):
+REGIMES = ('bear_trend', 'sideways', 'other')  # bull_trend, neutral, unknown -> 'other'
+OUTCOME_NONE, OUTCOME_WIN, OUTCOME_LOSS, OUTCOME_CANCELLED = 0, 1, 2, 3
+OUTCOME_CODES = {'win': OUTCOME_WIN, 'loss': OUTCOME_LOSS, 'cancelled': OUTCOME_CANCELLED}
+
+
+def _profit_factor(win_pnl, loss_pnl):
+    """sum(wins) / sum(losses), 999 when there are only wins (works on scalars and arrays)"""
+    win_pnl = np.asarray(win_pnl, dtype=float)
+    loss_pnl = np.asarray(loss_pnl, dtype=float)
+    safe_loss = np.where(loss_pnl > 0, loss_pnl, 1.0)
+    return np.where(loss_pnl > 0, win_pnl / safe_loss, np.where(win_pnl > 0, 999.0, 0.0))
+
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.where(den > 0, num / np.where(den > 0, den, 1.0), 0.0)
+
+
+class GateFrame:
     """
-    Compute metrics per (symbol, regime) combination from logs.
+    Yesterday's and today's analysis/effectiveness rows as columnar arrays.
+    
+    Both logs are streamed once; every gate metric (per symbol/regime) and every
+    shadow threshold is then a vectorized reduction over these arrays instead of
+    another pass over the CSV files.
+    """
+    
+    def __init__(self, days):
+        self.days = list(days)
+        self.symbols = []
+        self._symbol_codes = {}
+        
+        # analysis_log rows
+        self.a_day = []
+        self.a_symbol = []
+        self.a_regime = []
+        self.a_signal = []  # verdict in BUY/SELL
+        self.a_blocked = []
+        self.a_confidence = []
+        self.a_key = []
+        
+        # effectiveness_log rows
+        self.e_day = []
+        self.e_symbol = []
+        self.e_regime = []
+        self.e_outcome = []
+        self.e_pnl = []
+    
+    def _symbol_code(self, symbol):
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+    
+    def _finalize(self, outcome_by_key):
+        """Convert row lists to arrays and join outcomes onto analysis signals"""
+        self.a_day = np.asarray(self.a_day, dtype=np.int8)
+        self.a_symbol = np.asarray(self.a_symbol, dtype=np.int32)
+        self.a_regime = np.asarray(self.a_regime, dtype=np.int8)
+        self.a_signal = np.asarray(self.a_signal, dtype=bool)
+        self.a_blocked = np.asarray(self.a_blocked, dtype=bool)
+        self.a_confidence = np.asarray(self.a_confidence, dtype=float)
+        
+        joined = [outcome_by_key.get(k, (OUTCOME_NONE, 0.0)) if k else (OUTCOME_NONE, 0.0) for k in self.a_key]
+        self.a_outcome = np.asarray([o for o, _ in joined], dtype=np.int8)
+        self.a_pnl = np.asarray([p for _, p in joined], dtype=float)
+        
+        self.e_day = np.asarray(self.e_day, dtype=np.int8)
+        self.e_symbol = np.asarray(self.e_symbol, dtype=np.int32)
+        self.e_regime = np.asarray(self.e_regime, dtype=np.int8)
+        self.e_outcome = np.asarray(self.e_outcome, dtype=np.int8)
+        self.e_pnl = np.asarray(self.e_pnl, dtype=float)
+    
+    def _day_index(self, day):
+        return self.days.index(day) if day is not None else len(self.days) - 1
+    
+    def regime_metrics(self, day=None):
+        """
+        Metrics per (symbol, regime) for one day (default: today).
+        
+        Returns:
+            dict: {symbol: {regime: {profit_factor, win_rate, blocked_share, signals_total}}}
+        """
+        d = self._day_index(day)
+        n_groups = len(self.symbols) * len(REGIMES)
+        
+        a = self.a_day == d
+        a_idx = self.a_symbol[a] * len(REGIMES) + self.a_regime[a]
+        blocked = np.bincount(a_idx, weights=self.a_blocked[a], minlength=n_groups)
+        total_verdicts = np.bincount(a_idx, weights=self.a_signal[a] | self.a_blocked[a], minlength=n_groups)
+        
+        e = self.e_day == d
+        e_idx = self.e_symbol[e] * len(REGIMES) + self.e_regime[e]
+        outcome = self.e_outcome[e]
+        pnl = np.abs(self.e_pnl[e])
+        wins = np.bincount(e_idx, weights=outcome == OUTCOME_WIN, minlength=n_groups)
+        losses = np.bincount(e_idx, weights=outcome == OUTCOME_LOSS, minlength=n_groups)
+        cancelled = np.bincount(e_idx, weights=outcome == OUTCOME_CANCELLED, minlength=n_groups)
+        win_pnl = np.bincount(e_idx, weights=np.where(outcome == OUTCOME_WIN, pnl, 0.0), minlength=n_groups)
+        loss_pnl = np.bincount(e_idx, weights=np.where(outcome == OUTCOME_LOSS, pnl, 0.0), minlength=n_groups)
+        
+        signals_total = wins + losses + cancelled
+        profit_factor = _profit_factor(win_pnl, loss_pnl)
+        win_rate = _ratio(wins, signals_total)  # wins / (wins + losses + cancelled)
+        blocked_share = _ratio(blocked, total_verdicts)  # blocked / (blocked + actual signals)
+        
+        metrics = defaultdict(dict)
+        for g in np.flatnonzero((total_verdicts > 0) | (signals_total > 0)):
+            symbol = self.symbols[g // len(REGIMES)]
+            metrics[symbol][REGIMES[g % len(REGIMES)]] = {
+                'profit_factor': float(profit_factor[g]),
+                'win_rate': float(win_rate[g]),
+                'blocked_share': float(blocked_share[g]),
+                'signals_total': int(signals_total[g])
+            }
+        return metrics
+    
+    def shadow_grid(self, thresholds, day=None):
+        """
+        Shadow effect of every candidate min_score threshold for every symbol.
+        
+        The verdict decision uses confidence >= min_score_pct (0-1 range), so each
+        signal of the day passes threshold t when confidence >= t.
+        
+        Args:
+            thresholds: candidate min_score_pct values
+            day: ISO date (default: yesterday)
+        
+        Returns:
+            dict: {symbol: {threshold: {shadow_filtered, shadow_pf, shadow_win_rate}}}
+        """
+        d = self._day_index(day) if day is not None else 0
+        thresholds = np.asarray(list(thresholds), dtype=float)
+        
+        m = (self.a_day == d) & self.a_signal & ~np.isnan(self.a_confidence)
+        n = int(m.sum())
+        onehot = np.zeros((len(self.symbols), n))
+        onehot[self.a_symbol[m], np.arange(n)] = 1.0
+        
+        passed = self.a_confidence[m][:, None] >= thresholds[None, :]  # (signals, thresholds)
+        outcome = self.a_outcome[m][:, None]
+        pnl = np.abs(self.a_pnl[m])[:, None]
+        
+        filtered = onehot @ ~passed
+        win_pnl = onehot @ np.where(passed & (outcome == OUTCOME_WIN), pnl, 0.0)
+        loss_pnl = onehot @ np.where(passed & (outcome == OUTCOME_LOSS), pnl, 0.0)
+        wins = onehot @ (passed & (outcome == OUTCOME_WIN))
+        resolved = onehot @ (passed & (outcome != OUTCOME_NONE))
+        shadow_pf = _profit_factor(win_pnl, loss_pnl)
+        shadow_wr = _ratio(wins, resolved)
+        
+        grid = {}
+        for s, symbol in enumerate(self.symbols):
+            grid[symbol] = {
+                float(t): {
+                    'shadow_filtered': int(filtered[s, k]),
+                    'shadow_pf': float(shadow_pf[s, k]),
+                    'shadow_win_rate': float(shadow_wr[s, k])
+                }
+                for k, t in enumerate(thresholds)
+            }
+        return grid
+    
+    def shadow_effect(self, symbol, new_min_score, day=None):
+        """Shadow effect of one threshold for one symbol (see shadow_grid)"""
+        effect = self.shadow_grid([new_min_score], day).get(symbol, {}).get(float(new_min_score))
+        return effect or {'shadow_filtered': 0, 'shadow_pf': 0.0, 'shadow_win_rate': 0.0}
+
+
+def load_gate_frame(analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv', days=None):
+    """
+    Stream both logs once, keeping only rows from `days` (default: yesterday and today UTC).
     
     Returns:
-        dict: {symbol: {regime: {profit_factor, win_rate, blocked_share, signals_total, ...}}}
+        GateFrame
     """
-    # Get today's date range (00:00 to 23:59 UTC)
-    today = datetime.datetime.utcnow().date()
-    today_start = datetime.datetime.combine(today, datetime.time.min)
-    today_end = datetime.datetime.combine(today, datetime.time.max)
-    
-    # Data structures for regime-specific metrics
-    regime_data = defaultdict(lambda: defaultdict(lambda: {
-        'blocked_count': 0,
-        'total_verdicts': 0,  # BUY + SELL + blocked
-        'wins': 0,
-        'losses': 0,
-        'cancelled': 0,
-        'win_pnl': 0.0,
-        'loss_pnl': 0.0
-    }))
-    
-    # Map signal IDs to (symbol, regime) for effectiveness matching
+    if days is None:
+        today = datetime.datetime.utcnow().date()
+        days = [(today - datetime.timedelta(days=1)).isoformat(), today.isoformat()]
+    frame = GateFrame(days)
+    day_codes = {day: i for i, day in enumerate(days)}
+    
+    # Map signal IDs (symbol + second timestamp) to regime for effectiveness matching
     signal_to_regime = {}
     
-    # Parse analysis_log.csv for regime and blocked data
     try:
         with open(analysis_log_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
                 try:
-                    ts = datetime.datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S')
-                    if not (today_start <= ts <= today_end):
+                    ts = row['timestamp']
+                    d = day_codes.get(ts[:10])
+                    if d is None:
                         continue
                     
                     symbol = row['symbol']
                     verdict = row['verdict']
+                    blocked = int(row.get('dev_sigma_blocked') or 0)
                     regime = row.get('regime', 'unknown')
+                    regime_code = REGIMES.index(regime) if regime in REGIMES else REGIMES.index('other')
                     
-                    # Normalize regime to bear_trend or sideways
-                    if regime in ['bear_trend', 'sideways']:
-                        pass  # Keep as is
-                    else:
-                        regime = 'other'  # Group bull_trend, neutral, unknown
-                    
-                    # Track blocked signals
-                    blocked = int(row.get('dev_sigma_blocked', 0))
-                    if blocked == 1:
-                        regime_data[symbol][regime]['blocked_count'] += 1
+                    is_signal = verdict in ['BUY', 'SELL']
+                    key = f"{symbol}_{ts}" if is_signal else None
+                    if key:
+                        signal_to_regime[key] = regime_code
                     
-                    # Count total potential verdicts (BUY, SELL, or blocked)
-                    if verdict in ['BUY', 'SELL'] or blocked == 1:
-                        regime_data[symbol][regime]['total_verdicts'] += 1
+                    # Confidence (0-1 range) is what min_score_pct gates; NaN keeps the row for regime metrics
+                    try:
+                        confidence = float(row['confidence'])
+                    except (ValueError, KeyError, TypeError):
+                        confidence = float('nan')
                     
-                    # Track signal ID for regime matching
-                    if verdict in ['BUY', 'SELL']:
-                        signal_id = f"{symbol}_{ts.strftime('%Y%m%d_%H%M%S')}"
-                        signal_to_regime[signal_id] = (symbol, regime)
-                        
-                except (ValueError, KeyError) as e:
+                    frame.a_day.append(d)
+                    frame.a_symbol.append(frame._symbol_code(symbol))
+                    frame.a_regime.append(regime_code)
+                    frame.a_signal.append(is_signal)
+                    frame.a_blocked.append(blocked == 1)
+                    frame.a_confidence.append(confidence)
+                    frame.a_key.append(key)
+                except (ValueError, KeyError, TypeError):
                     continue
     except FileNotFoundError:
         print(f'[WARN] Quality gates: {analysis_log_path} not found')
     
-    # Parse effectiveness_log.csv for win/loss data
+    # effectiveness_log.csv writes result/profit_pct (WIN/LOSS/CANCELLED); outcome/pnl_pct kept as fallback
+    outcome_by_key = {}
     try:
         with open(effectiveness_log_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
                 try:
-                    ts_sent = datetime.datetime.strptime(row['timestamp_sent'], '%Y-%m-%d %H:%M:%S')
-                    if not (today_start <= ts_sent <= today_end):
+                    ts_sent = row['timestamp_sent']
+                    d = day_codes.get(ts_sent[:10])
+                    if d is None:
                         continue
                     
                     symbol = row['symbol']
-                    outcome = row['outcome']
-                    pnl_pct = float(row.get('pnl_pct', 0.0))
+                    outcome = OUTCOME_CODES.get(str(row.get('result') or row.get('outcome') or '').lower(), OUTCOME_NONE)
+                    pnl_pct = float(row.get('profit_pct') or row.get('pnl_pct') or 0.0)
                     
                     # Try to match to regime (fallback to 'other' if not found)
-                    signal_id = f"{symbol}_{ts_sent.strftime('%Y%m%d_%H%M%S')}"
-                    _, regime = signal_to_regime.get(signal_id, (symbol, 'other'))
+                    key = f"{symbol}_{ts_sent}"
+                    regime_code = signal_to_regime.get(key, REGIMES.index('other'))
+                    outcome_by_key[key] = (outcome, pnl_pct)
                     
-                    if outcome == 'win':
-                        regime_data[symbol][regime]['wins'] += 1
-                        regime_data[symbol][regime]['win_pnl'] += abs(pnl_pct)
-                    elif outcome == 'loss':
-                        regime_data[symbol][regime]['losses'] += 1
-                        regime_data[symbol][regime]['loss_pnl'] += abs(pnl_pct)
-                    elif outcome == 'cancelled':
-                        regime_data[symbol][regime]['cancelled'] += 1
-                        
-                except (ValueError, KeyError) as e:
+                    frame.e_day.append(d)
+                    frame.e_symbol.append(frame._symbol_code(symbol))
+                    frame.e_regime.append(regime_code)
+                    frame.e_outcome.append(outcome)
+                    frame.e_pnl.append(pnl_pct)
+                except (ValueError, KeyError, TypeError):
                     continue
     except FileNotFoundError:
         print(f'[WARN] Quality gates: {effectiveness_log_path} not found')
     
-    # Compute metrics per (symbol, regime)
-    metrics = defaultdict(dict)
-    for symbol, regimes in regime_data.items():
-        for regime, data in regimes.items():
-            # Profit factor: sum(wins) / sum(losses)
-            profit_factor = data['win_pnl'] / data['loss_pnl'] if data['loss_pnl'] > 0 else (
-                999.0 if data['win_pnl'] > 0 else 0.0
-            )
-            
-            # Win rate: wins / (wins + losses + cancelled)
-            total_signals = data['wins'] + data['losses'] + data['cancelled']
-            win_rate = data['wins'] / total_signals if total_signals > 0 else 0.0
-            
-            # Blocked share: blocked / (blocked + actual signals)
-            blocked_share = data['blocked_count'] / data['total_verdicts'] if data['total_verdicts'] > 0 else 0.0
-            
-            metrics[symbol][regime] = {
-                'profit_factor': profit_factor,
-                'win_rate': win_rate,
-                'blocked_share': blocked_share,
-                'signals_total': total_signals
-            }
+    frame._finalize(outcome_by_key)
+    return frame
+
+def compute_regime_metrics(analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv'):
+    """
+    Compute metrics per (symbol, regime) combination from logs.
     
-    return metrics
+    Returns:
+        dict: {symbol: {regime: {profit_factor, win_rate, blocked_share, signals_total, ...}}}
+    """
+    return load_gate_frame(analysis_log_path, effectiveness_log_path).regime_metrics()
 
-def compute_shadow_effect(symbol, new_min_score, analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv'):
+def compute_shadow_effect(symbol, new_min_score, analysis_log_path='analysis_log.csv', effectiveness_log_path='effectiveness_log.csv', frame=None):
     """
     Compute shadow effect of increasing min_score: how many signals would be filtered
-    and what the new PF estimate would be.
+    and what the new PF estimate would be (yesterday's signals).
     
     Args:
         symbol: Trading symbol
         new_min_score: Proposed new min_score threshold
+        frame: Preloaded GateFrame (avoids re-reading the logs)
         
     Returns:
-        dict: {shadow_filtered: int, shadow_pf: float}
+        dict: {shadow_filtered: int, shadow_pf: float, shadow_win_rate: float}
     """
-    # Get yesterday's date range
-    yesterday = (datetime.datetime.utcnow() - datetime.timedelta(days=1)).date()
-    yesterday_start = datetime.datetime.combine(yesterday, datetime.time.min)
-    yesterday_end = datetime.datetime.combine(yesterday, datetime.time.max)
-    
-    # Collect yesterday's signals with scores
-    signals = []
-    try:
-        with open(analysis_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    ts = datetime.datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S')
-                    if not (yesterday_start <= ts <= yesterday_end):
-                        continue
-                    
-                    if row['symbol'] != symbol:
-                        continue
-                    
-                    verdict = row['verdict']
-                    if verdict not in ['BUY', 'SELL']:
-                        continue
-                    
-                    # CRITICAL FIX: Use score (not confidence) for min_score comparison
-                    # min_score_pct operates on score field (values like 1.9, 2.4)
-                    # confidence is in 0-1 range (0.82, 0.75, etc.)
-                    score = float(row.get('score', 0.0))
-                    confidence = float(row['confidence'])
-                    signal_id = f"{symbol}_{ts.strftime('%Y%m%d_%H%M%S')}"
-                    
-                    signals.append({
-                        'signal_id': signal_id,
-                        'score': score,
-                        'confidence': confidence
-                    })
-                    
-                except (ValueError, KeyError):
-                    continue
-    except FileNotFoundError:
-        return {'shadow_filtered': 0, 'shadow_pf': 0.0}
-    
-    # Match with effectiveness outcomes
-    signal_outcomes = {}
-    try:
-        with open(effectiveness_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    ts_sent = datetime.datetime.strptime(row['timestamp_sent'], '%Y-%m-%d %H:%M:%S')
-                    if not (yesterday_start <= ts_sent <= yesterday_end):
-                        continue
-                    
-                    if row['symbol'] != symbol:
-                        continue
-                    
-                    signal_id = f"{symbol}_{ts_sent.strftime('%Y%m%d_%H%M%S')}"
-                    outcome = row['outcome']
-                    pnl_pct = float(row.get('pnl_pct', 0.0))
-                    
-                    signal_outcomes[signal_id] = {
-                        'outcome': outcome,
-                        'pnl_pct': pnl_pct
-                    }
-                    
-                except (ValueError, KeyError):
-                    continue
-    except FileNotFoundError:
-        return {'shadow_filtered': 0, 'shadow_pf': 0.0}
-    
-    # Compute shadow metrics
-    # CRITICAL: The verdict decision uses confidence >= min_score_pct (see smart_signal.py:1394, 1421)
-    # So we compare confidence (0-1 range) against new_min_score (also 0-1 range percentage)
-    
-    filtered_count = 0
-    new_win_pnl = 0.0
-    new_loss_pnl = 0.0
-    
-    for sig in signals:
-        signal_id = sig['signal_id']
-        confidence = sig['confidence']
-        
-        # Would this signal pass the new threshold?
-        # Compare confidence against new min_score_pct threshold
-        if confidence < new_min_score:
-            filtered_count += 1
-            continue
-        
-        # Include in new PF calculation
-        if signal_id in signal_outcomes:
-            outcome_data = signal_outcomes[signal_id]
-            outcome = outcome_data['outcome']
-            pnl = abs(outcome_data['pnl_pct'])
-            
-            if outcome == 'win':
-                new_win_pnl += pnl
-            elif outcome == 'loss':
-                new_loss_pnl += pnl
-    
-    # Calculate new PF
-    shadow_pf = new_win_pnl / new_loss_pnl if new_loss_pnl > 0 else (
-        999.0 if new_win_pnl > 0 else 0.0
-    )
-    
-    return {
-        'shadow_filtered': filtered_count,
-        'shadow_pf': shadow_pf
-    }
+    if frame is None:
+        frame = load_gate_frame(analysis_log_path, effectiveness_log_path)
+    return frame.shadow_effect(symbol, new_min_score, day=frame.days[0])
 
-def apply_quality_gates(regime_metrics, dry_run=False):
+def apply_quality_gates(regime_metrics, dry_run=False, frame=None):
     """
     Apply quality gates and auto-tuning rules based on per-regime daily KPI metrics.
     
     Args:
         regime_metrics: Dict of {symbol: {regime: {profit_factor, win_rate, ...}}}
         dry_run: If True, simulate without writing config
+        frame: GateFrame already loaded for the metrics (shadow effects reuse it)
     
     Returns:
         Dict of {symbol: {regime: {gate_action, min_score_delta, sell_enabled, ...}}}
@@ -409,7 +455,7 @@ def apply_quality_gates(regime_metrics, dry_run=False):
                     new_min_intraday = min(current_min_intraday + delta, 0.98)
                     
                     # SHADOW EFFECT ANALYSIS: Compute before applying
-                    shadow = compute_shadow_effect(symbol, new_min_scalp)
+                    shadow = compute_shadow_effect(symbol, new_min_scalp, frame=frame)
                     result['shadow_filtered'] = shadow['shadow_filtered']
                     result['shadow_pf'] = shadow['shadow_pf']
                     result['gate_shadow_effect'] = f"would_filter_{shadow['shadow_filtered']}_signals_pf_{shadow['shadow_pf']:.2f}"
@@ -585,11 +631,14 @@ if __name__ == '__main__':
     if dry_run:
         print('[QUALITY_GATES] Running in DRY-RUN mode (no changes will be saved)')
     
+    # Load yesterday + today once; metrics and shadow effects are computed from memory
+    frame = load_gate_frame()
+    
     # Compute regime-specific metrics
-    regime_metrics = compute_regime_metrics()
+    regime_metrics = frame.regime_metrics()
     
     # Apply quality gates
-    results = apply_quality_gates(regime_metrics, dry_run=dry_run)
+    results = apply_quality_gates(regime_metrics, dry_run=dry_run, frame=frame)
     
     # Print results
     print(f'\n[QUALITY_GATES] Processed {len(results)} symbols')
@@ -13,6 +13,7 @@ import time
 from datetime import datetime, timedelta
 import yaml
 from telegram_utils import send_telegram_message
+from log_stats import get_effectiveness_stats, group_counts, total_counts
 
 # Statistical guardrails configuration
 # CRITICAL FIX: Raised from 20 to 50 to prevent premature optimization on noisy data
@@ -192,9 +193,9 @@ def analyze_effectiveness(start_date='2025-11-09'):
     - ready_for_optimization: Boolean indicating if we should optimize
     - indicator_correlations: Correlation analysis of indicators with price movement
     """
-    df = load_effectiveness_log()
+    eff_stats = get_effectiveness_stats()
     
-    if df is None or len(df) == 0:
+    if not eff_stats.exists() or eff_stats.total.rows == 0:
         return {
             'overall_stats': {'total': 0, 'wins': 0, 'win_rate': 0.0, 'ready': False},
             'per_symbol': {},
@@ -203,17 +204,13 @@ def analyze_effectiveness(start_date='2025-11-09'):
             'ready_for_optimization': False
         }
     
-    # Filter to signals from start_date onwards
-    try:
-        df['timestamp_sent'] = pd.to_datetime(df['timestamp_sent'])
-        cutoff = pd.to_datetime(start_date)
-        df = df[df['timestamp_sent'] >= cutoff]
-    except:
-        pass  # If timestamp parsing fails, use all data
+    # Signals from start_date onwards, served from incrementally maintained counters
+    counts = eff_stats.counts(since=start_date)
     
     # Overall statistics
-    total = len(df)
-    wins = len(df[df['result'] == 'WIN'])
+    overall = total_counts(counts)
+    total = overall.rows
+    wins = overall.wins
     lower, upper, win_rate = calculate_confidence_interval(wins, total, CONFIDENCE_LEVEL)
     
     overall_stats = {
@@ -228,10 +225,9 @@ def analyze_effectiveness(start_date='2025-11-09'):
     
     # Per-symbol analysis
     per_symbol = {}
-    for symbol in df['symbol'].unique():
-        sym_df = df[df['symbol'] == symbol]
-        sym_total = len(sym_df)
-        sym_wins = len(sym_df[sym_df['result'] == 'WIN'])
+    for symbol, sym_counts in group_counts(counts, 0).items():
+        sym_total = sym_counts.rows
+        sym_wins = sym_counts.wins
         sym_lower, sym_upper, sym_wr = calculate_confidence_interval(sym_wins, sym_total)
         
         per_symbol[symbol] = {
@@ -244,11 +240,12 @@ def analyze_effectiveness(start_date='2025-11-09'):
         }
     
     # Per-verdict analysis
+    by_verdict = group_counts(counts, 1)
     per_verdict = {}
     for verdict in ['BUY', 'SELL']:
-        verd_df = df[df['verdict'] == verdict]
-        verd_total = len(verd_df)
-        verd_wins = len(verd_df[verd_df['result'] == 'WIN'])
+        verd_counts = by_verdict.get(verdict)
+        verd_total = verd_counts.rows if verd_counts else 0
+        verd_wins = verd_counts.wins if verd_counts else 0
         verd_lower, verd_upper, verd_wr = calculate_confidence_interval(verd_wins, verd_total)
         
         per_verdict[verdict] = {
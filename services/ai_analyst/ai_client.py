@@ -7,12 +7,15 @@ VERSION: 2.0 - All logger.debug removed to fix Unicode encoding issue
 import os
 import time
 import json
-import hashlib
 import requests
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import logging
 
+from services.ai_analyst.cache import (
+    CompletionCache, make_cache_key, DEFAULT_CACHE_PATH, DEFAULT_TTL_SEC, DEFAULT_MAX_ENTRIES
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,8 +32,13 @@ class AIClient:
         self.max_calls_per_hour = config.get('max_calls_per_hour', 60)
         self.max_tokens_per_day = config.get('max_tokens_per_day', 200000)
         
-        self.cache = {}
-        self.cache_ttl = 1800
+        # Shared on-disk LRU: every process building an AIClient reuses the same store
+        self.cache_ttl = config.get('cache_ttl_sec', DEFAULT_TTL_SEC)
+        self.cache = CompletionCache(
+            path=config.get('cache_path', DEFAULT_CACHE_PATH),
+            ttl_sec=self.cache_ttl,
+            max_entries=config.get('cache_max_entries', DEFAULT_MAX_ENTRIES)
+        )
         
         self.call_history = []
         self.token_history = []
@@ -41,27 +49,18 @@ class AIClient:
     
     def _get_cache_key(self, system_prompt: str, user_prompt: str) -> str:
         """Generate cache key from prompts"""
-        combined = f"{system_prompt}|{user_prompt}"
-        return hashlib.md5(combined.encode('utf-8')).hexdigest()
+        return make_cache_key(system_prompt, user_prompt)
     
     def _check_cache(self, cache_key: str) -> Optional[str]:
         """Check if response is cached and still valid"""
-        if cache_key in self.cache:
-            cached_time, cached_response = self.cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl:
-                logger.info(f"Cache hit for key={cache_key[:8]}")
-                return cached_response
-            else:
-                del self.cache[cache_key]
-        return None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for key={cache_key[:8]}")
+        return cached
     
     def _update_cache(self, cache_key: str, response: str):
-        """Update cache with new response"""
-        self.cache[cache_key] = (time.time(), response)
-        
-        if len(self.cache) > 100:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][0])
-            del self.cache[oldest_key]
+        """Update cache with new response (LRU eviction handled by the cache)"""
+        self.cache.put(cache_key, response)
     
     def _check_rate_limits(self) -> bool:
         """Check if rate limits are exceeded"""
@@ -96,11 +95,15 @@ class AIClient:
         system_prompt: str,
         user_prompt: str,
         max_tokens: int = 500,
-        use_cache: bool = True
+        use_cache: bool = True,
+        cache_prompt: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Get completion from OpenAI with retry and rate limiting
         
+        cache_prompt: optional normalized form of user_prompt used only for the
+        cache key, so near-identical prompts share a cached response
+        
         Returns:
             {
                 'response': str,
@@ -111,7 +114,7 @@ class AIClient:
                 'error': str or None
             }
         """
-        cache_key = self._get_cache_key(system_prompt, user_prompt)
+        cache_key = self._get_cache_key(system_prompt, cache_prompt or user_prompt)
         
         if use_cache:
             cached = self._check_cache(cache_key)
@@ -331,10 +334,11 @@ class AIClient:
         day_ago = now - 86400
         tokens_day = sum(tokens for t, tokens in self.token_history if t > day_ago)
         
-        return {
+        stats = {
             'calls_hour': calls_hour,
             'calls_limit': self.max_calls_per_hour,
             'tokens_day': tokens_day,
-            'tokens_limit': self.max_tokens_per_day,
-            'cache_size': len(self.cache)
+            'tokens_limit': self.max_tokens_per_day
         }
+        stats.update(self.cache.stats())
+        return stats
@@ -0,0 +1,196 @@
+"""
+Persistent LRU cache for AI completions
+
+In-process OrderedDict (O(1) get/put/evict) in front of a SQLite store that
+is shared by every process building an AIClient (main.py, webhook server,
+Telegram command service, combined runners), so identical prompts are only
+paid for once and the cache survives restarts.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'data/ai_cache.db'
+DEFAULT_TTL_SEC = 1800
+DEFAULT_MAX_ENTRIES = 1000
+EVICT_MARGIN = 0.1  # Disk rows may exceed max_entries by this share before a COUNT(*) + trim
+
+
+def make_cache_key(system_prompt: str, user_prompt: str) -> str:
+    """Generate cache key from prompts"""
+    combined = f"{system_prompt}|{user_prompt}"
+    return hashlib.md5(combined.encode('utf-8')).hexdigest()
+
+
+def round_significant(value: float, digits: int) -> float:
+    """Round to N significant digits (0.012345 -> 0.012 for digits=2)"""
+    if value == 0 or not math.isfinite(value) or digits <= 0:
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def normalize_features(features: Dict[str, Any], digits: int) -> Dict[str, Any]:
+    """
+    Semantic-key normalization: round float features to N significant digits
+    so near-identical market states map to the same cache key.
+    """
+    normalized = {}
+    for name, value in features.items():
+        if isinstance(value, float):
+            normalized[name] = round_significant(value, digits)
+        else:
+            normalized[name] = value
+    return normalized
+
+
+class CompletionCache:
+    """Size-bounded LRU with TTL, backed by an on-disk SQLite store"""
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl_sec: int = DEFAULT_TTL_SEC,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._evict_margin = max(1, int(max_entries * EVICT_MARGIN))
+        self._disk_rows = 0  # Upper bound on rows in the store (other processes' puts not included)
+
+        self.conn = None
+        if path:
+            try:
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+                self.conn.execute('PRAGMA journal_mode=WAL')
+                self.conn.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                ''')
+                self.conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_cache(last_access)')
+                self.conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_cache_created_at ON ai_cache(created_at)')
+                self._disk_rows = self.conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+            except Exception as e:
+                logger.warning(f"AI cache disk store unavailable ({e}), using memory only")
+                self.conn = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached response if present and not expired"""
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if now - created_at < self.ttl_sec:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self.memory[key]
+
+            response = self._disk_get(key, now)
+            if response is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return response
+
+    def put(self, key: str, response: str):
+        """Store response, evicting least recently used entries over the size bound"""
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, now, response)
+            if self.conn is not None:
+                try:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO ai_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)',
+                        (key, response, now, now)
+                    )
+                    self._disk_rows += 1
+                    self._disk_evict(now)
+                except Exception as e:
+                    logger.warning(f"AI cache write failed: {e}")
+
+    def _memory_put(self, key: str, created_at: float, response: str):
+        self.memory[key] = (created_at, response)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        """Shared-store lookup; promotes hits into the in-process LRU"""
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute(
+                'SELECT response, created_at FROM ai_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at >= self.ttl_sec:
+                self.conn.execute('DELETE FROM ai_cache WHERE key = ?', (key,))
+                return None
+            self.conn.execute('UPDATE ai_cache SET last_access = ? WHERE key = ?', (now, key))
+            self._memory_put(key, created_at, response)
+            return response
+        except Exception as e:
+            logger.warning(f"AI cache read failed: {e}")
+            return None
+
+    def _disk_evict(self, now: float):
+        """
+        Drop expired rows and trim to max_entries by last access (both indexed).
+
+        The row count is only taken once the running estimate passes
+        max_entries by the eviction margin, so a put does not scan the table.
+        """
+        expired = self.conn.execute('DELETE FROM ai_cache WHERE created_at < ?', (now - self.ttl_sec,))
+        self._disk_rows = max(0, self._disk_rows - expired.rowcount)
+        if self._disk_rows <= self.max_entries + self._evict_margin:
+            return
+        rows = self.conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+        excess = rows - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                'DELETE FROM ai_cache WHERE key IN '
+                '(SELECT key FROM ai_cache ORDER BY last_access ASC LIMIT ?)',
+                (excess,)
+            )
+        self._disk_rows = min(rows, self.max_entries)
+
+    def __len__(self):
+        if self.conn is not None:
+            try:
+                with self._lock:
+                    return self.conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+            except Exception:
+                pass
+        return len(self.memory)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'cache_size': len(self),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': round(self.hits / total * 100, 1) if total else 0.0
+        }
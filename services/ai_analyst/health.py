@@ -2,12 +2,17 @@
 Health monitoring and status reporting for AI Analyst service
 """
 
+import os
+import sys
 import time
 import logging
 from typing import Dict, Any, Optional
 from collections import deque
 from datetime import datetime, timedelta
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from metrics_registry import API_REQUESTS
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +43,7 @@ class HealthMonitor:
         self.total_calls += 1
         
         self.call_history.append((now, success))
+        API_REQUESTS.labels(api='ai_analyst', outcome='ok' if success else 'error').inc()
         
         if not success:
             self.total_errors += 1
@@ -20,6 +20,8 @@ if sys.stdout.encoding != 'utf-8':
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from services.ai_analyst.ai_client import AIClient
+from services.ai_analyst.cache import normalize_features, round_significant
+from log_stats import get_effectiveness_stats, get_analysis_stats, total_counts
 from services.ai_analyst.render import ResponseRenderer
 from services.ai_analyst.sinks import OutputSink
 from services.ai_analyst.health import HealthMonitor
@@ -119,11 +121,21 @@ class AIAnalystService:
         try:
             user_prompt = self._build_signal_prompt(symbol, verdict, confidence, features)
             
+            # Semantic cache key: same prompt with features rounded to N significant digits
+            key_digits = self.ai_config.get('cache_key_sig_digits', 2)
+            cache_prompt = None
+            if key_digits:
+                cache_prompt = self._build_signal_prompt(
+                    symbol, verdict, round_significant(float(confidence), key_digits),
+                    normalize_features(features, key_digits)
+                )
+            
             result = self.ai_client.get_completion(
                 system_prompt=self.market_context_prompt,
                 user_prompt=user_prompt,
                 max_tokens=200,
-                use_cache=True
+                use_cache=True,
+                cache_prompt=cache_prompt
             )
             
             self.health.record_call(
@@ -293,44 +305,23 @@ class AIAnalystService:
     def _load_daily_data(self, date_str: str) -> Optional[Dict[str, Any]]:
         """Load and aggregate data for a specific date"""
         try:
-            import csv
-            
-            effectiveness_file = 'effectiveness_log.csv'
-            if not os.path.exists(effectiveness_file):
-                return None
-            
-            signals = []
-            with open(effectiveness_file) as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('timestamp_sent', '').startswith(date_str):
-                        signals.append(row)
-            
-            if not signals:
+            eff_stats = get_effectiveness_stats()
+            if not eff_stats.exists():
                 return None
             
-            wins = sum(1 for s in signals if s.get('result') == 'WIN')
-            losses = sum(1 for s in signals if s.get('result') == 'LOSS')
-            total = wins + losses
+            day = total_counts(eff_stats.counts(day=date_str))
             
-            if total == 0:
+            if day.rows == 0 or day.decided == 0:
                 return None
             
-            wr = wins / total * 100
-            
-            pnls = [float(s.get('profit_pct', 0)) for s in signals if s.get('result') in ['WIN', 'LOSS']]
-            total_pnl = sum(pnls)
-            avg_pnl = total_pnl / len(pnls) if pnls else 0
-            
             return {
                 'date': date_str,
-                'total_signals': len(signals),
-                'wins': wins,
-                'losses': losses,
-                'wr': wr,
-                'total_pnl': total_pnl,
-                'avg_pnl': avg_pnl,
-                'signals': signals
+                'total_signals': day.rows,
+                'wins': day.wins,
+                'losses': day.losses,
+                'wr': day.win_rate(),
+                'total_pnl': day.pnl,
+                'avg_pnl': day.pnl / day.decided
             }
         
         except Exception as e:
@@ -508,168 +499,97 @@ Analyze what worked and what didn't. Identify feature patterns and provide actio
         context = {}
         
         try:
-            if os.path.exists('effectiveness_log.csv'):
-                signals = []
-                with open('effectiveness_log.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        signals.append(row)
-                
+            # Counters are maintained incrementally from the log tails (log_stats)
+            eff_stats = get_effectiveness_stats()
+            if eff_stats.exists():
                 # ALL-TIME statistics
-                all_wins = sum(1 for s in signals if s.get('result') == 'WIN')
-                all_losses = sum(1 for s in signals if s.get('result') == 'LOSS')
-                all_cancelled = sum(1 for s in signals if s.get('result') == 'CANCELLED')
-                all_total = all_wins + all_losses
+                alltime = eff_stats.total
                 
-                if all_total > 0:
-                    context['alltime_win_rate'] = round(all_wins / all_total * 100, 1)
-                    context['alltime_wins'] = all_wins
-                    context['alltime_losses'] = all_losses
-                    context['alltime_cancelled'] = all_cancelled
-                    context['alltime_total_signals'] = len(signals)
+                if alltime.decided > 0:
+                    context['alltime_win_rate'] = round(alltime.win_rate(), 1)
+                    context['alltime_wins'] = alltime.wins
+                    context['alltime_losses'] = alltime.losses
+                    context['alltime_cancelled'] = alltime.cancelled
+                    context['alltime_total_signals'] = alltime.rows
                 
                 # RECENT (last 100) statistics
-                recent_signals = signals[-100:] if len(signals) > 100 else signals
-                
-                wins = sum(1 for s in recent_signals if s.get('result') == 'WIN')
-                losses = sum(1 for s in recent_signals if s.get('result') == 'LOSS')
-                cancelled = sum(1 for s in recent_signals if s.get('result') == 'CANCELLED')
-                total = wins + losses
+                recent = eff_stats.recent_total
                 
-                if total > 0:
-                    context['win_rate'] = round(wins / total * 100, 1)
-                    context['total_signals'] = len(recent_signals)
-                    context['wins'] = wins
-                    context['losses'] = losses
-                    context['cancelled'] = cancelled
-                    
-                    profits = [float(s.get('profit_pct', 0)) for s in recent_signals if s.get('result') in ['WIN', 'LOSS']]
-                    if profits:
-                        context['avg_profit'] = round(sum(profits) / len(profits), 2)
-                        context['total_profit'] = round(sum(profits), 2)
-                    
-                    by_symbol = defaultdict(lambda: {'wins': 0, 'losses': 0, 'profits': []})  # type: ignore
-                    for s in recent_signals:
-                        if s.get('result') in ['WIN', 'LOSS']:
-                            symbol = s.get('symbol', '')
-                            if s.get('result') == 'WIN':
-                                by_symbol[symbol]['wins'] += 1  # type: ignore
-                            else:
-                                by_symbol[symbol]['losses'] += 1  # type: ignore
-                            by_symbol[symbol]['profits'].append(float(s.get('profit_pct', 0)))  # type: ignore
+                if recent.decided > 0:
+                    context['win_rate'] = round(recent.win_rate(), 1)
+                    context['total_signals'] = recent.rows
+                    context['wins'] = recent.wins
+                    context['losses'] = recent.losses
+                    context['cancelled'] = recent.cancelled
+                    context['avg_profit'] = round(recent.pnl / recent.decided, 2)
+                    context['total_profit'] = round(recent.pnl, 2)
                     
                     symbol_stats = {}
-                    for sym, data in by_symbol.items():
-                        total_sym = data['wins'] + data['losses']  # type: ignore
-                        if total_sym > 0:
+                    for sym, data in eff_stats.recent_by_symbol.items():
+                        if data.decided > 0:
                             symbol_stats[sym] = {
-                                'wr': round(data['wins'] / total_sym * 100, 1),  # type: ignore
-                                'total': total_sym,
-                                'avg_profit': round(sum(data['profits']) / len(data['profits']), 2) if data['profits'] else 0  # type: ignore
+                                'wr': round(data.win_rate(), 1),
+                                'total': data.decided,
+                                'avg_profit': round(data.pnl / data.decided, 2)
                             }
                     
                     context['by_symbol'] = symbol_stats
             
-            # LOAD HISTORICAL INDICATOR DATA from analysis_log.csv
-            if os.path.exists('analysis_log.csv'):
-                analysis_rows = []
-                with open('analysis_log.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        analysis_rows.append(row)
+            # HISTORICAL INDICATOR DATA (last 150 rows of analysis_log.csv)
+            analysis_stats = get_analysis_stats()
+            recent_analysis = analysis_stats.recent_rows()
+            
+            if recent_analysis:
+                hist = analysis_stats.indicator_summary()
                 
-                # Take last 150 rows for historical analysis
-                recent_analysis = analysis_rows[-150:] if len(analysis_rows) > 150 else analysis_rows
+                context['historical_indicators'] = {
+                    'data_points': len(recent_analysis),
+                    'rsi': {k: round(v, 1) for k, v in hist['rsi'].items()},
+                    'oi_change_pct': {k: round(v, 2) for k, v in hist['oi_change_pct'].items()},
+                    'dev_sigma': {k: round(v, 2) for k, v in hist['dev_sigma'].items()},
+                    'adx14': {k: round(v, 1) for k, v in hist['adx14'].items()}
+                }
                 
-                if recent_analysis:
-                    # Calculate indicator statistics
-                    def safe_float(val, default=0.0):
-                        try:
-                            return float(val) if val else default
-                        except:
-                            return default
-                    
-                    rsi_values = [safe_float(r.get('rsi')) for r in recent_analysis if r.get('rsi')]
-                    oi_changes = [safe_float(r.get('oi_change_pct')) for r in recent_analysis if r.get('oi_change_pct')]
-                    cvd_values = [safe_float(r.get('cvd')) for r in recent_analysis if r.get('cvd')]
-                    dev_sigma_values = [safe_float(r.get('dev_sigma')) for r in recent_analysis if r.get('dev_sigma')]
-                    adx_values = [safe_float(r.get('adx14')) for r in recent_analysis if r.get('adx14')]
-                    funding_values = [safe_float(r.get('funding_rate')) for r in recent_analysis if r.get('funding_rate')]
+                # Regime distribution
+                regime_counts = defaultdict(int)
+                for r in recent_analysis:
+                    if r.get('regime'):
+                        regime_counts[r['regime']] += 1
+                context['regime_distribution'] = dict(regime_counts)
+                
+                # Correlate indicators with outcomes by matching timestamps
+                def safe_float(val, default=0.0):
+                    try:
+                        return float(val) if val else default
+                    except (TypeError, ValueError):
+                        return default
+                
+                outcomes = {'WIN': defaultdict(list), 'LOSS': defaultdict(list)}
+                for row in recent_analysis:
+                    result = eff_stats.outcome_for(row.get('timestamp'))
+                    if result in outcomes:
+                        for field in ('rsi', 'oi_change_pct', 'dev_sigma'):
+                            outcomes[result][field].append(safe_float(row.get(field)))
+                
+                win, loss = outcomes['WIN'], outcomes['LOSS']
+                if win['rsi'] and loss['rsi']:
+                    def avg(values, digits):
+                        return round(sum(values) / len(values), digits) if values else 0
                     
-                    context['historical_indicators'] = {
-                        'data_points': len(recent_analysis),
+                    context['indicator_correlations'] = {
                         'rsi': {
-                            'avg': round(sum(rsi_values) / len(rsi_values), 1) if rsi_values else 0,
-                            'min': round(min(rsi_values), 1) if rsi_values else 0,
-                            'max': round(max(rsi_values), 1) if rsi_values else 0
+                            'win_avg': avg(win['rsi'], 1),
+                            'loss_avg': avg(loss['rsi'], 1)
                         },
                         'oi_change_pct': {
-                            'avg': round(sum(oi_changes) / len(oi_changes), 2) if oi_changes else 0,
-                            'min': round(min(oi_changes), 2) if oi_changes else 0,
-                            'max': round(max(oi_changes), 2) if oi_changes else 0
+                            'win_avg': avg(win['oi_change_pct'], 2),
+                            'loss_avg': avg(loss['oi_change_pct'], 2)
                         },
                         'dev_sigma': {
-                            'avg': round(sum(dev_sigma_values) / len(dev_sigma_values), 2) if dev_sigma_values else 0,
-                            'min': round(min(dev_sigma_values), 2) if dev_sigma_values else 0,
-                            'max': round(max(dev_sigma_values), 2) if dev_sigma_values else 0
-                        },
-                        'adx14': {
-                            'avg': round(sum(adx_values) / len(adx_values), 1) if adx_values else 0,
-                            'min': round(min(adx_values), 1) if adx_values else 0,
-                            'max': round(max(adx_values), 1) if adx_values else 0
+                            'win_avg': avg(win['dev_sigma'], 2),
+                            'loss_avg': avg(loss['dev_sigma'], 2)
                         }
                     }
-                    
-                    # Regime distribution
-                    regimes = [r.get('regime', 'unknown') for r in recent_analysis if r.get('regime')]
-                    regime_counts = defaultdict(int)
-                    for regime in regimes:
-                        regime_counts[regime] += 1
-                    context['regime_distribution'] = dict(regime_counts)
-                    
-                    # Correlate indicators with outcomes (if we have matched data)
-                    # Find signals with matching timestamps in effectiveness_log
-                    if os.path.exists('effectiveness_log.csv'):
-                        with open('effectiveness_log.csv', 'r') as f:
-                            eff_reader = csv.DictReader(f)
-                            eff_signals = {r['timestamp_sent']: r for r in eff_reader if r.get('timestamp_sent')}
-                        
-                        # Compute indicator correlations with WIN/LOSS
-                        win_rsi = []
-                        loss_rsi = []
-                        win_oi = []
-                        loss_oi = []
-                        win_dev_sigma = []
-                        loss_dev_sigma = []
-                        
-                        for row in recent_analysis:
-                            ts = row.get('timestamp')
-                            if ts in eff_signals:
-                                result = eff_signals[ts].get('result')
-                                if result == 'WIN':
-                                    win_rsi.append(safe_float(row.get('rsi')))
-                                    win_oi.append(safe_float(row.get('oi_change_pct')))
-                                    win_dev_sigma.append(safe_float(row.get('dev_sigma')))
-                                elif result == 'LOSS':
-                                    loss_rsi.append(safe_float(row.get('rsi')))
-                                    loss_oi.append(safe_float(row.get('oi_change_pct')))
-                                    loss_dev_sigma.append(safe_float(row.get('dev_sigma')))
-                        
-                        if win_rsi and loss_rsi:
-                            context['indicator_correlations'] = {
-                                'rsi': {
-                                    'win_avg': round(sum(win_rsi) / len(win_rsi), 1),
-                                    'loss_avg': round(sum(loss_rsi) / len(loss_rsi), 1)
-                                },
-                                'oi_change_pct': {
-                                    'win_avg': round(sum(win_oi) / len(win_oi), 2) if win_oi else 0,
-                                    'loss_avg': round(sum(loss_oi) / len(loss_oi), 2) if loss_oi else 0
-                                },
-                                'dev_sigma': {
-                                    'win_avg': round(sum(win_dev_sigma) / len(win_dev_sigma), 2) if win_dev_sigma else 0,
-                                    'loss_avg': round(sum(loss_dev_sigma) / len(loss_dev_sigma), 2) if loss_dev_sigma else 0
-                                }
-                            }
             
             # LOAD BTC PRICE CORRELATION DATA (optional - safe fallback if file missing)
             try:
@@ -2,7 +2,6 @@
 Output sinks: CSV logging and Telegram messaging
 """
 
-import csv
 import os
 import logging
 from datetime import datetime
@@ -11,6 +10,7 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from telegram_utils import send_telegram_message
+from csv_log_writer import get_csv_writer
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +26,8 @@ class OutputSink:
     """Handle CSV logging and Telegram output"""
     
     def __init__(self):
-        self._ensure_csv_exists()
-    
-    def _ensure_csv_exists(self):
-        """Create CSV file with headers if it doesn't exist"""
-        if not os.path.exists(CSV_FILE):
-            with open(CSV_FILE, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                writer.writeheader()
-            logger.info(f"Created {CSV_FILE}")
+        # Buffered writer; creates CSV_FILE with headers if it doesn't exist
+        self.csv_writer = get_csv_writer(CSV_FILE, CSV_HEADERS)
     
     def log_signal_analysis(
         self,
@@ -86,9 +79,7 @@ class OutputSink:
                 'cached': 'yes' if ai_result.get('cached', False) else 'no'
             }
             
-            with open(CSV_FILE, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                writer.writerow(row)
+            self.csv_writer.write_row(row)
             
             logger.info(f"Logged AI analysis for {symbol} {verdict} to CSV (bot:{bot_confidence:.0f}% ai:{ai_confidence or 'N/A'}% ttl:{ai_ttl_minutes or 'N/A'}min target:{ai_target_pct or 'N/A'}%)")
         
@@ -85,6 +85,21 @@ class BinanceRESTClient:
         except Exception as e:
             print(f"[REST ERROR] Basis {symbol}: {e}")
         return None
+    
+    async def get_depth_snapshot(self, symbol: str, limit: int = 1000) -> Optional[dict]:
+        """Get order book snapshot ({'lastUpdateId', 'E', 'T', 'bids', 'asks'}) to seed a local book"""
+        endpoint = f"{self.BASE_URL}/fapi/v1/depth"
+        params = {"symbol": symbol, "limit": limit}
+        
+        try:
+            async with self.session.get(endpoint, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                if resp.status == 200:
+                    return await resp.json()
+                else:
+                    print(f"[REST ERROR] Depth {symbol}: HTTP {resp.status}")
+        except Exception as e:
+            print(f"[REST ERROR] Depth {symbol}: {e}")
+        return None
 
 
 class BinanceWebSocketClient:
@@ -141,6 +156,17 @@ class BinanceWebSocketClient:
         
         asyncio.create_task(self._ws_loop(stream_url, callback_key))
     
+    async def subscribe_diff_depth(self, symbols: List[str], callback: Callable):
+        """
+        Subscribe to combined diff-depth stream for all symbols (local order book updates).
+        Stream: wss://fstream.binance.com/stream?streams=symbol1@depth@100ms/...
+        """
+        streams = '/'.join([f"{symbol.lower()}@depth@100ms" for symbol in symbols])
+        stream_url = f"{self.WS_BASE}/stream?streams={streams}"
+        
+        self.callbacks['diff_depth'] = callback
+        asyncio.create_task(self._ws_loop(stream_url, 'diff_depth'))
+    
     async def _ws_loop(self, url: str, callback_key: str):
         """WebSocket connection loop with auto-reconnect"""
         retry_delay = 1
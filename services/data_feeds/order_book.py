@@ -0,0 +1,284 @@
+"""
+Local order book from Binance Futures diff-depth updates.
+
+Each symbol keeps a book in preallocated NumPy price-level arrays (bids stored
+as negated prices so both sides are ascending and share one code path). The
+book is seeded from a REST depth snapshot and then follows <symbol>@depth@100ms
+diff events using the USDⓈ-M sequencing rules:
+
+    - events with u < lastUpdateId of the snapshot are dropped
+    - the first applied event must have U <= lastUpdateId <= u
+    - every later event must have pu == u of the previous event
+
+Any break is a sequence gap: the book is marked unsynced and re-seeded from a
+fresh snapshot (events arriving meanwhile are buffered and replayed).
+
+After every applied event the depth metrics are recomputed over the top
+depth_levels levels:
+
+    obi          weighted multi-level imbalance, level i weighted 1 - i/levels
+                 (bid share in 0..1, >0.5 = more resting bids)
+    obi_ema      EMA(ema_periods) of obi at update rate
+    obi_top      best-level imbalance (what bookTicker OBI measured)
+    microprice   best bid/ask weighted by the opposite side's quantity
+    microprice_bps  microprice - mid in bps of mid
+    depth_slope_bid / depth_slope_ask
+                 cumulative quantity per bps away from mid (least-squares slope
+                 through the origin); a steeper side absorbs more flow
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .calculators import FeedCalculators
+
+MAX_LEVELS = 1000  # Matches the deepest REST snapshot (limit=1000)
+PENDING_EVENTS = 2000  # Buffered diffs while a snapshot is in flight
+
+
+class _BookSide:
+    """Ascending price keys with quantities; bids use key = -price"""
+
+    __slots__ = ('sign', 'keys', 'qty', 'n')
+
+    def __init__(self, sign: int, capacity: int):
+        self.sign = sign
+        self.keys = np.empty(capacity)
+        self.qty = np.empty(capacity)
+        self.n = 0
+
+    def load(self, levels):
+        levels = sorted(((self.sign * float(p), float(q)) for p, q in levels if float(q) > 0))[:len(self.keys)]
+        self.n = len(levels)
+        if levels:
+            self.keys[:self.n], self.qty[:self.n] = zip(*levels)
+
+    def set(self, price: float, qty: float):
+        """Set one level (qty 0 removes it); levels beyond capacity are dropped"""
+        key = self.sign * price
+        n = self.n
+        i = int(np.searchsorted(self.keys[:n], key))
+        if i < n and self.keys[i] == key:
+            if qty > 0:
+                self.qty[i] = qty
+            else:
+                self.keys[i:n - 1] = self.keys[i + 1:n]
+                self.qty[i:n - 1] = self.qty[i + 1:n]
+                self.n = n - 1
+        elif qty > 0 and i < len(self.keys):
+            if n == len(self.keys):
+                n -= 1  # Full: the deepest level falls off
+            self.keys[i + 1:n + 1] = self.keys[i:n]
+            self.qty[i + 1:n + 1] = self.qty[i:n]
+            self.keys[i] = key
+            self.qty[i] = qty
+            self.n = n + 1
+
+    def top(self, levels: int):
+        """(prices, quantities) of the best `levels` levels"""
+        k = min(levels, self.n)
+        return self.sign * self.keys[:k], self.qty[:k]
+
+
+class OrderBook:
+    """One symbol's local book plus depth metrics recomputed on every update"""
+
+    def __init__(self, symbol: str, depth_levels: int = 3, max_levels: int = MAX_LEVELS, ema_periods: int = 5):
+        self.symbol = symbol
+        self.depth_levels = depth_levels
+        self.ema_periods = ema_periods
+        self.bids = _BookSide(-1, max_levels)
+        self.asks = _BookSide(1, max_levels)
+        self.weights = 1 - np.arange(depth_levels) / depth_levels
+
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+        self.awaiting_first = False
+        self.pending = deque(maxlen=PENDING_EVENTS)
+
+        self.updates = 0
+        self.gaps = 0
+        self.metrics: Dict[str, Any] = {}
+
+    def load_snapshot(self, snapshot: Dict[str, Any]):
+        """Seed from a REST depth snapshot ({'lastUpdateId', 'bids', 'asks'})"""
+        self.bids.load(snapshot['bids'])
+        self.asks.load(snapshot['asks'])
+        self.last_update_id = int(snapshot['lastUpdateId'])
+        self.synced = True
+        self.awaiting_first = True
+        self._update_metrics(snapshot.get('E'))
+
+    def apply(self, event: Dict[str, Any]) -> str:
+        """
+        Apply one diff-depth event.
+
+        Returns:
+            'applied', 'stale' (already in the snapshot), 'pending' (no
+            snapshot yet, buffered) or 'gap' (book unsynced, resync needed)
+        """
+        if not self.synced:
+            self.pending.append(event)
+            return 'pending'
+
+        first_id, final_id = int(event['U']), int(event['u'])
+        if final_id < self.last_update_id:
+            return 'stale'
+        if self.awaiting_first:
+            in_sequence = first_id <= self.last_update_id
+        else:
+            in_sequence = int(event.get('pu', -1)) == self.last_update_id
+        if not in_sequence:
+            self.synced = False
+            self.gaps += 1
+            self.pending.clear()
+            self.pending.append(event)
+            return 'gap'
+
+        for price, qty in event.get('b', ()):
+            self.bids.set(float(price), float(qty))
+        for price, qty in event.get('a', ()):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = final_id
+        self.awaiting_first = False
+        self.updates += 1
+        self._update_metrics(event.get('E'))
+        return 'applied'
+
+    def resync(self, snapshot: Dict[str, Any]) -> str:
+        """Load a fresh snapshot and replay the buffered events; returns the last apply status"""
+        pending = list(self.pending)
+        self.pending.clear()
+        self.load_snapshot(snapshot)
+        status = 'applied'
+        for i, event in enumerate(pending):
+            status = self.apply(event)
+            if status == 'gap':
+                # apply() re-buffered the gap event; keep the unreplayed tail behind it
+                self.pending.extend(pending[i + 1:])
+                break
+        return status
+
+    def _update_metrics(self, event_time_ms: Optional[int] = None):
+        bid_px, bid_qty = self.bids.top(self.depth_levels)
+        ask_px, ask_qty = self.asks.top(self.depth_levels)
+        if not len(bid_px) or not len(ask_px):
+            self.metrics = {}
+            return
+
+        best_bid, best_ask = bid_px[0], ask_px[0]
+        mid = (best_bid + best_ask) / 2
+        k = min(len(bid_qty), len(ask_qty))
+        w = self.weights[:k]
+        weighted_bid = float(w @ bid_qty[:k])
+        weighted_ask = float(w @ ask_qty[:k])
+        obi = weighted_bid / (weighted_bid + weighted_ask)
+        microprice = (best_bid * ask_qty[0] + best_ask * bid_qty[0]) / (bid_qty[0] + ask_qty[0])
+
+        self.metrics = {
+            'obi': obi,
+            'obi_ema': FeedCalculators.smooth_ema(obi, self.metrics.get('obi_ema'), self.ema_periods),
+            'obi_top': float(bid_qty[0] / (bid_qty[0] + ask_qty[0])),
+            'microprice': float(microprice),
+            'microprice_bps': float((microprice - mid) / mid * 10000),
+            'spread_bps': float((best_ask - best_bid) / mid * 10000),
+            'depth_slope_bid': _depth_slope(mid - bid_px, bid_qty, mid),
+            'depth_slope_ask': _depth_slope(ask_px - mid, ask_qty, mid),
+            'updated': event_time_ms / 1000 if event_time_ms else time.time()
+        }
+
+
+def _depth_slope(distance: np.ndarray, qty: np.ndarray, mid: float) -> Optional[float]:
+    """Least-squares slope (through the origin) of cumulative qty vs distance from mid in bps"""
+    bps = distance / mid * 10000
+    denom = float(bps @ bps)
+    if denom <= 0:
+        return None
+    return float(bps @ np.cumsum(qty) / denom)
+
+
+class OrderBookManager:
+    """
+    Books for all symbols fed from a combined <symbol>@depth@100ms stream.
+
+    fetch_snapshot(symbol) is an async callable returning the REST depth
+    snapshot (or None on failure). With record_path set, every snapshot and
+    diff message is appended as JSONL so sessions can be replayed offline.
+    """
+
+    def __init__(self, symbols: List[str], fetch_snapshot: Callable[[str], Awaitable[Optional[dict]]],
+                 depth_levels: int = 3, max_levels: int = MAX_LEVELS, record_path: Optional[str] = None):
+        self.books = {s: OrderBook(s, depth_levels, max_levels) for s in symbols}
+        self.fetch_snapshot = fetch_snapshot
+        self.record_path = record_path
+        self._resyncing = set()
+
+    async def on_depth(self, data: dict):
+        """Handle one diff-depth message (combined stream envelope or bare event)"""
+        event = data.get('data', data)
+        book = self.books.get(str(event.get('s', '')).upper())
+        if book is None:
+            return
+        self._record({'t': time.time(), 'depth': event})
+
+        if book.apply(event) in ('pending', 'gap') and book.symbol not in self._resyncing:
+            # Snapshot fetch runs beside the stream; diffs keep buffering meanwhile
+            self._resyncing.add(book.symbol)
+            asyncio.create_task(self._resync(book))
+
+    async def _resync(self, book: OrderBook, attempts: int = 3):
+        try:
+            for attempt in range(attempts):
+                snapshot = await self.fetch_snapshot(book.symbol)
+                if snapshot:
+                    self._record({'t': time.time(), 'snapshot': dict(snapshot, s=book.symbol)})
+                    if book.resync(snapshot) != 'gap':
+                        return
+                await asyncio.sleep(attempt + 1)
+            print(f"[DEPTH] {book.symbol}: still unsynced after {attempts} snapshots")
+        finally:
+            self._resyncing.discard(book.symbol)
+
+    def metrics(self, symbol: str) -> Dict[str, Any]:
+        """Latest depth metrics for a synced book, else {}"""
+        book = self.books.get(symbol)
+        return dict(book.metrics) if book is not None and book.synced else {}
+
+    def _record(self, record: dict):
+        if not self.record_path:
+            return
+        with open(self.record_path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def load_recording(path: str) -> List[dict]:
+    """Records written by OrderBookManager(record_path=...)"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay_depth(records: Iterable[dict], depth_levels: int = 3,
+                 max_levels: int = MAX_LEVELS) -> Dict[str, List[dict]]:
+    """
+    Replay recorded snapshots and diffs through fresh books, offline and in order.
+
+    Returns:
+        {symbol: [{'status', 'u', **metrics} per diff event]}
+    """
+    books: Dict[str, OrderBook] = {}
+    history: Dict[str, List[dict]] = {}
+    for record in records:
+        if 'snapshot' in record:
+            snapshot = record['snapshot']
+            book = books.setdefault(snapshot['s'], OrderBook(snapshot['s'], depth_levels, max_levels))
+            book.resync(snapshot)
+            continue
+        event = record['depth']
+        book = books.setdefault(event['s'], OrderBook(event['s'], depth_levels, max_levels))
+        status = book.apply(event)
+        history.setdefault(event['s'], []).append(dict(book.metrics, status=status, u=event['u']))
+    return history
@@ -22,10 +22,21 @@ from services.data_feeds.coinalyze_client import CoinalyzeRESTClient
 from services.data_feeds.spot_clients import BinanceSpotWebSocket, OKXSpotClient, BybitSpotClient, CoinbaseSpotClient
 from services.data_feeds.synthetic_basis import SyntheticBasisCalculator
 from services.data_feeds.calculators import FeedCalculators
+from services.data_feeds.order_book import OrderBookManager
 from services.data_feeds.schemas import FeedRow
 from services.data_feeds.writer import FeedWriter
 from services.data_feeds.health import HealthMonitor
 from services.data_feeds.status_server import StatusServer
+import metrics_registry
+import snapshot_bus
+
+
+# Depth-book metrics published per symbol in feeds_snapshot.json (None while the book is unsynced)
+DEPTH_SNAPSHOT_FIELDS = ('obi', 'obi_ema', 'microprice', 'microprice_bps', 'spread_bps',
+                         'depth_slope_bid', 'depth_slope_ask')
+
+# Numeric fields mirrored to the 'feeds' snapshot bus (provider is a string and stays JSON-only)
+FEEDS_BUS_FIELDS = ('basis_pct', 'funding', 'oi_pct') + DEPTH_SNAPSHOT_FIELDS
 
 
 class DataFeedsService:
@@ -49,8 +60,11 @@ class DataFeedsService:
         self.depth_levels = self.data_feeds_config.get('depth_levels', 3)
         self.rest_batch_size = self.data_feeds_config.get('concurrency', {}).get('rest_batch_size', 5)
         self.enable_synthetic_basis = self.feature_flags.get('enable_synthetic_basis', False)
+        self.enable_depth_book = self.feature_flags.get('enable_depth_book', False)
+        self.depth_record_path = self.data_feeds_config.get('depth_record_path')
         
         print(f"[INIT] Synthetic Basis: {'ENABLED' if self.enable_synthetic_basis else 'DISABLED'}")
+        print(f"[INIT] Depth Book (multi-level OBI): {'ENABLED' if self.enable_depth_book else 'DISABLED'}")
         
         # Components
         self.writer = FeedWriter(
@@ -78,6 +92,7 @@ class DataFeedsService:
         self.coinbase_client: Optional[CoinbaseSpotClient] = None
         self.synthetic_basis: Optional[SyntheticBasisCalculator] = None
         self.status_server: Optional[StatusServer] = None
+        self.order_books: Optional[OrderBookManager] = None
     
     async def start(self):
         """Start the service"""
@@ -100,7 +115,12 @@ class DataFeedsService:
                     coinbase_client=self.coinbase_client
                 )
             
-            # Start HTTP status server (internal-only port)
+            # Local order books from diff-depth (multi-level OBI, microprice, depth slope)
+            if self.enable_depth_book:
+                await self._start_order_books(session)
+            
+            # Start HTTP status server (internal-only port, also serves /metrics)
+            metrics_registry.register_service('data_feeds')
             self.status_server = StatusServer(self.health, port=8081)
             await self.status_server.start()
             
@@ -119,6 +139,21 @@ class DataFeedsService:
         print("[WS] OBI: Disabled (bookTicker unavailable)")
         print("[WS] Synthetic Basis: Using REST-only approach (OKX/Bybit/Coinbase)")
     
+    async def _start_order_books(self, session: aiohttp.ClientSession):
+        """Seed local books from REST depth snapshots and follow the diff-depth stream"""
+        self.rest_client = BinanceRESTClient(session=session)
+        self.ws_client = BinanceWebSocketClient()
+        self.order_books = OrderBookManager(
+            self.symbols,
+            fetch_snapshot=self.rest_client.get_depth_snapshot,
+            depth_levels=self.depth_levels,
+            record_path=self.depth_record_path
+        )
+        await self.ws_client.subscribe_diff_depth(self.symbols, self.order_books.on_depth)
+        print(f"[WS] Diff-depth books: {len(self.symbols)} symbols, top {self.depth_levels} levels")
+        if self.depth_record_path:
+            print(f"[WS] Recording depth stream to {self.depth_record_path}")
+    
     async def _on_liquidation(self, data: dict):
         """Handle liquidation WebSocket message"""
         liq_event = self.ws_client.parse_liquidation(data)
@@ -204,6 +239,7 @@ class DataFeedsService:
                 # Calculate latency
                 latency_ms = int((time.time() - cycle_start) * 1000)
                 self.health.record_cycle(latency_ms)
+                metrics_registry.observe_cycle('feeds_cycle', latency_ms / 1000)
                 
                 print(f"[CYCLE {cycle_num}] ✅ Collected {len(rows)} symbols in {latency_ms}ms")
                 
@@ -226,6 +262,7 @@ class DataFeedsService:
                     print(f"[WARNING] Cycle took {elapsed:.1f}s (>{self.interval_sec}s), skipping sleep")
             
             except Exception as e:
+                metrics_registry.CYCLE_ERRORS.labels(loop='feeds_cycle').inc()
                 print(f"[ERROR] Collection cycle failed: {e}")
                 import traceback
                 traceback.print_exc()
@@ -263,6 +300,7 @@ class DataFeedsService:
         try:
             # === OI from Coinalyze ONLY (Binance blocked with HTTP 451) ===
             oi_data = await self.coinalyze_client.get_open_interest(symbol)
+            metrics_registry.API_REQUESTS.labels(api='coinalyze_oi', outcome='ok' if oi_data else 'error').inc()
             if oi_data:
                 current_oi = oi_data.sumOpenInterest
                 row_data['oi'] = current_oi
@@ -275,6 +313,7 @@ class DataFeedsService:
             
             # === Funding from Coinalyze ONLY (Binance blocked with HTTP 451) ===
             funding_data = await self.coinalyze_client.get_funding_rate(symbol)
+            metrics_registry.API_REQUESTS.labels(api='coinalyze_funding', outcome='ok' if funding_data else 'error').inc()
             if funding_data:
                 row_data['funding'] = funding_data.fundingRate
                 row_data['provider_funding'] = 'coinalyze'
@@ -289,8 +328,10 @@ class DataFeedsService:
             row_data['liq_short_usd'] = liq['short']
             row_data['liq_ratio'] = self.calculator.calculate_liq_ratio(liq['short'], liq['long'])
             
-            # Get OBI from WebSocket state
+            # OBI: top-of-book EMA from bookTicker; multi-level EMA from the local depth book in its own column
             row_data['obi_top'] = self.previous_obi.get(symbol)
+            if self.order_books:
+                row_data['obi_depth_ema'] = self.order_books.metrics(symbol).get('obi_ema')
             
             # === Synthetic Basis (if enabled) ===
             if self.enable_synthetic_basis and self.synthetic_basis:
@@ -299,6 +340,9 @@ class DataFeedsService:
                 row_data['basis_provider'] = basis_provider
                 
                 # Track basis health
+                metrics_registry.API_REQUESTS.labels(
+                    api='synthetic_basis', outcome='ok' if basis_pct is not None and basis_provider else 'error'
+                ).inc()
                 if basis_pct is not None and basis_provider:
                     self.health.record_basis_success(basis_provider)
                 else:
@@ -348,6 +392,9 @@ class DataFeedsService:
                         'oi_pct': row.oi_pct if row.oi_pct is not None else None,
                         'updated': int(row.timestamp.timestamp()) if row.timestamp else int(time.time())
                     }
+                    depth = self.order_books.metrics(row.symbol) if self.order_books else {}
+                    for key in DEPTH_SNAPSHOT_FIELDS:
+                        snapshot['symbols'][row.symbol][key] = depth.get(key)
             
             # Atomic write: temp file + fsync + rename
             snapshot_path = Path('data/feeds_snapshot.json')
@@ -381,6 +428,19 @@ class DataFeedsService:
             
         except Exception as e:
             print(f"[SNAPSHOT ERROR] Failed to write feeds_snapshot.json: {e}")
+            return
+        
+        # Lag: oldest row timestamp (collection start) to file publish
+        oldest = min((row.timestamp.timestamp() for row in rows if row and row.timestamp), default=None)
+        metrics_registry.observe_publish('feeds', oldest)
+        
+        try:
+            snapshot_bus.publish('feeds', {
+                symbol: {key: data.get(key) for key in FEEDS_BUS_FIELDS + ('updated',)}
+                for symbol, data in snapshot['symbols'].items()
+            }, FEEDS_BUS_FIELDS)
+        except Exception as e:
+            print(f"[SNAPSHOT ERROR] Failed to publish feeds bus: {e}")
 
 
 def load_config() -> dict:
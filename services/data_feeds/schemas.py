@@ -25,6 +25,7 @@ class FeedRow(BaseModel):
     provider_oi: Optional[str] = None
     provider_funding: Optional[str] = None
     provider_basis: Optional[str] = None
+    obi_depth_ema: Optional[float] = None  # Multi-level OBI EMA (enable_depth_book)
 
     class Config:
         json_encoders = {
@@ -1,11 +1,14 @@
 """
-Lightweight HTTP server for health status monitoring.
+Lightweight HTTP server for health status monitoring (/status) and the
+process metrics registry (/metrics, Prometheus text format).
 """
 import asyncio
 import json
 from aiohttp import web
 from typing import TYPE_CHECKING
 
+from metrics_registry import metrics_response
+
 if TYPE_CHECKING:
     from .health import HealthMonitor
 
@@ -25,6 +28,7 @@ class StatusServer:
         self.app = web.Application()
         self.app.router.add_get('/status', self.handle_status)
         self.app.router.add_get('/health', self.handle_status)  # Alias
+        self.app.router.add_get('/metrics', self.handle_metrics)
         
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
@@ -61,3 +65,7 @@ class StatusServer:
                 content_type='application/json',
                 status=500
             )
+    
+    async def handle_metrics(self, request):
+        """Handle GET /metrics requests"""
+        return metrics_response()
@@ -8,6 +8,14 @@ from datetime import datetime
 from typing import List
 from .schemas import FeedRow
 
+HEADER = [
+    'timestamp', 'symbol', 'oi', 'oi_pct', 'funding', 'basis',
+    'liq_long_usd', 'liq_short_usd', 'liq_ratio', 'obi_top',
+    'basis_pct', 'basis_provider',
+    'latency_ms', 'source_errors', 'provider_oi', 'provider_funding', 'provider_basis',
+    'obi_depth_ema'
+]
+
 
 class FeedWriter:
     """Append-only CSV writer with automatic rotation"""
@@ -28,18 +36,19 @@ class FeedWriter:
         
         # Initialize CSV with header if doesn't exist
         self._ensure_csv_exists()
+        
+        # A file written with an older column set is rotated out instead of appended to
+        with open(self.csv_path, 'r', newline='') as f:
+            existing_header = next(csv.reader(f), None)
+        if existing_header != HEADER:
+            self._rotate_file()
     
     def _ensure_csv_exists(self):
         """Create CSV with header if it doesn't exist"""
         if not self.csv_path.exists():
             with open(self.csv_path, 'w', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow([
-                    'timestamp', 'symbol', 'oi', 'oi_pct', 'funding', 'basis',
-                    'liq_long_usd', 'liq_short_usd', 'liq_ratio', 'obi_top',
-                    'basis_pct', 'basis_provider',
-                    'latency_ms', 'source_errors', 'provider_oi', 'provider_funding', 'provider_basis'
-                ])
+                writer.writerow(HEADER)
     
     def append_rows(self, rows: List[FeedRow]):
         """
@@ -75,7 +84,8 @@ class FeedWriter:
                     row.source_errors,
                     row.provider_oi,
                     row.provider_funding,
-                    row.provider_basis
+                    row.provider_basis,
+                    row.obi_depth_ema
                 ])
     
     def _check_rotation(self):
@@ -0,0 +1,7 @@
+"""
+Market Stream Service - one async process for all public Binance Futures streams.
+aggTrade (CVD), forceOrder (liquidations), bookTicker (OBI) and markPrice (basis/funding)
+share pooled combined-stream connections and publish one consolidated snapshot.
+"""
+
+__version__ = "1.0.0"
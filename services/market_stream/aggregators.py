@@ -0,0 +1,197 @@
+"""
+In-memory aggregators for the market stream service.
+
+Each aggregator declares the combined-stream names it consumes, folds decoded
+events into memory and renders one section of the consolidated snapshot:
+
+    streams()              -> ['btcusdt@aggTrade', ...]
+    on_event(data, now)    fold one decoded event (the combined stream's 'data')
+    snapshot(now)          -> JSON-ready section
+    restore(section)       reload counters from a previous section (optional)
+
+Aggregators with a legacy_path also keep the file layout of the single-stream
+service they replace (cvd_data.json, liquidation_data.json), so existing
+readers work unchanged.
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+from liquidation_service import LiquidationWindow, WINDOW_MINUTES
+from services.data_feeds.calculators import FeedCalculators
+
+
+class CvdAggregator:
+    """Cumulative volume delta per symbol from aggTrade (replaces cvd_service.py)"""
+
+    name = 'cvd'
+    legacy_path = 'cvd_data.json'
+
+    def __init__(self, symbols: List[str], history_size: int = 1000, history_step_sec: float = 1.0):
+        self.symbols = list(symbols)
+        self.history_step_sec = history_step_sec
+        self.cvd = {s: 0.0 for s in self.symbols}
+        self.trade_counts = {s: 0 for s in self.symbols}
+        # symbol -> deque of (timestamp, cvd), at most one point per history_step_sec
+        self.history = {s: deque(maxlen=history_size) for s in self.symbols}
+        self.last_reset = time.time()
+
+    def streams(self) -> List[str]:
+        return [f"{s.lower()}@aggTrade" for s in self.symbols]
+
+    def on_event(self, data: Dict[str, Any], now: float):
+        symbol = data.get('s')
+        if symbol not in self.cvd:
+            return
+        # m=true: seller is taker (aggressive sell) -> negative delta
+        usd_volume = float(data['p']) * float(data['q'])
+        self.cvd[symbol] += -usd_volume if data.get('m') else usd_volume
+        self.trade_counts[symbol] += 1
+
+        # Latest point always current; a new point opens once per history_step_sec
+        h = self.history[symbol]
+        if len(h) >= 2 and now - h[-2][0] < self.history_step_sec:
+            h[-1] = (now, self.cvd[symbol])
+        else:
+            h.append((now, self.cvd[symbol]))
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'cvd': dict(self.cvd),
+            'cvd_history': {s: [{'timestamp': ts, 'cvd': v} for ts, v in h] for s, h in self.history.items()},
+            'trade_counts': dict(self.trade_counts),
+            'last_reset': self.last_reset,
+            'last_update': now
+        }
+
+    def restore(self, section: Dict[str, Any]):
+        for symbol, value in section.get('cvd', {}).items():
+            if symbol in self.cvd:
+                self.cvd[symbol] = float(value)
+        for symbol, points in section.get('cvd_history', {}).items():
+            if symbol in self.history:
+                self.history[symbol].extend((p['timestamp'], p['cvd']) for p in points)
+        self.last_reset = section.get('last_reset', self.last_reset)
+
+
+class LiquidationAggregator:
+    """All-time and rolling-window liquidations from !forceOrder@arr (replaces liquidation_service.py)"""
+
+    name = 'liquidations'
+    legacy_path = 'liquidation_data.json'
+
+    def __init__(self, symbols: List[str], window_minutes=WINDOW_MINUTES):
+        self.symbols = list(symbols)
+        self.window_minutes = tuple(window_minutes)
+        self.totals = {s: {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0}
+                       for s in self.symbols}
+        self.window = LiquidationWindow()
+
+    def streams(self) -> List[str]:
+        return ['!forceOrder@arr']
+
+    def on_event(self, data: Dict[str, Any], now: float):
+        order = data.get('o')
+        if not order or order.get('s') not in self.totals:
+            return
+        usd = float(order['q']) * float(order['ap'])
+        # SELL = long position liquidated, BUY = short position liquidated
+        side = 'long' if order['S'] == 'SELL' else 'short'
+        totals = self.totals[order['s']]
+        totals[f'{side}_count'] += 1
+        totals[f'{side}_usd'] += usd
+        self.window.add(order['s'], side, usd, now)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        windows = {}
+        for symbol in self.symbols:
+            per_symbol = self.window.windows(symbol, self.window_minutes, now)
+            windows[symbol] = {str(m): per_symbol[m] for m in self.window_minutes}
+        return {
+            'last_update': now,
+            'liquidations': {s: dict(t) for s, t in self.totals.items()},
+            'window_minutes': list(self.window_minutes),
+            'windows': windows
+        }
+
+    def restore(self, section: Dict[str, Any]):
+        for symbol, totals in section.get('liquidations', {}).items():
+            if symbol in self.totals:
+                self.totals[symbol].update(totals)
+
+
+class BookTickerAggregator:
+    """Top-of-book order book imbalance and spread from bookTicker"""
+
+    name = 'book_ticker'
+    legacy_path = None
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = list(symbols)
+        self.books = {}
+
+    def streams(self) -> List[str]:
+        return [f"{s.lower()}@bookTicker" for s in self.symbols]
+
+    def on_event(self, data: Dict[str, Any], now: float):
+        # Only keep the raw quote per tick; derived fields are computed at publish time
+        self.books[data['s']] = (float(data['b']), float(data['B']), float(data['a']), float(data['A']), now)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        section = {}
+        for symbol, (bid, bid_qty, ask, ask_qty, updated) in self.books.items():
+            mid = (bid + ask) / 2
+            section[symbol] = {
+                'bid': bid,
+                'ask': ask,
+                'bid_qty': bid_qty,
+                'ask_qty': ask_qty,
+                'obi_top': FeedCalculators.calculate_obi_top([[bid, bid_qty]], [[ask, ask_qty]], depth_levels=1),
+                'spread_bps': (ask - bid) / mid * 10000 if mid > 0 else None,
+                'updated': updated
+            }
+        return section
+
+
+class MarkPriceAggregator:
+    """Mark/index price, basis and funding for all symbols from !markPrice@arr@1s"""
+
+    name = 'mark_price'
+    legacy_path = None
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = set(symbols)
+        self.marks = {}
+
+    def streams(self) -> List[str]:
+        return ['!markPrice@arr@1s']
+
+    def on_event(self, data, now: float):
+        for item in data:
+            symbol = item.get('s')
+            if symbol in self.symbols:
+                self.marks[symbol] = (float(item['p']), float(item['i']), float(item['r']), item.get('T'), now)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        section = {}
+        for symbol, (mark, index, funding, next_funding, updated) in self.marks.items():
+            basis = FeedCalculators.calculate_basis(mark, index)
+            section[symbol] = {
+                'mark_price': mark,
+                'index_price': index,
+                'basis': basis,
+                'basis_pct': basis / index * 100 if index > 0 else None,
+                'funding_rate': funding,
+                'next_funding_time': next_funding,
+                'updated': updated
+            }
+        return section
+
+
+AGGREGATORS = {
+    'cvd': CvdAggregator,
+    'liquidations': LiquidationAggregator,
+    'book_ticker': BookTickerAggregator,
+    'mark_price': MarkPriceAggregator
+}
@@ -0,0 +1,295 @@
+"""
+Market Stream Service Runner - Main entry point.
+
+One asyncio process for every public Binance Futures market stream the bot
+uses. All aggregator streams are multiplexed over combined-stream connections
+(up to max_streams_per_connection each, 24 streams -> one socket for 11
+symbols), decoded with orjson when installed, routed by stream name to the
+in-memory aggregators, and published as one consolidated snapshot
+(data/market_snapshot.json) at most once per publish_interval_sec.
+
+With legacy_files enabled the CVD and liquidation sections are also written to
+cvd_data.json / liquidation_data.json in their old layout, so this process
+replaces cvd_service.py and liquidation_service.py without touching readers.
+Run it instead of those two services, not next to them. The same two sections
+are published to the 'cvd' and 'liquidations' snapshot buses (snapshot_bus).
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytz
+import websockets
+import yaml
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from services.market_stream.aggregators import AGGREGATORS
+import metrics_registry
+import snapshot_bus
+
+try:
+    import orjson
+
+    def _loads(message):
+        return orjson.loads(message)
+
+    def _dumps(data) -> bytes:
+        return orjson.dumps(data)
+except ImportError:
+    def _loads(message):
+        return json.loads(message)
+
+    def _dumps(data) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+TZ = pytz.timezone('Etc/GMT-3')
+
+WS_BASE = "wss://fstream.binance.com"
+SNAPSHOT_PATH = "data/market_snapshot.json"
+MAX_STREAMS_PER_CONNECTION = 100  # Binance allows 200 per combined connection
+PUBLISH_INTERVAL_SEC = 1.0
+HEARTBEAT_SEC = 15.0  # Republish while quiet so windows decay and last_update stays fresh
+STATUS_INTERVAL_SEC = 60
+
+# Aggregator sections mirrored to the snapshot bus (same layout as their legacy files)
+BUS_PUBLISHERS = {
+    'cvd': snapshot_bus.publish_cvd,
+    'liquidations': snapshot_bus.publish_liquidations
+}
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]):
+    """tmp file + os.replace so readers never see a partial snapshot"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_dumps(data))
+    os.replace(tmp_path, path)
+
+
+class MarketStreamService:
+    """Multiplexes aggregator streams over pooled connections and publishes one snapshot"""
+
+    def __init__(self, aggregators: List[Any], snapshot_path: str = SNAPSHOT_PATH, legacy_files: bool = True,
+                 max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+                 publish_interval_sec: float = PUBLISH_INTERVAL_SEC, bus_dir: Optional[str] = snapshot_bus.BUS_DIR):
+        self.aggregators = aggregators
+        self.snapshot_path = snapshot_path
+        self.legacy_files = legacy_files
+        self.bus_dir = bus_dir  # None disables the snapshot bus
+        self.max_streams = max_streams_per_connection
+        self.publish_interval_sec = publish_interval_sec
+
+        # stream name -> aggregators consuming it
+        self.routes: Dict[str, List[Any]] = {}
+        for aggregator in aggregators:
+            for stream in aggregator.streams():
+                self.routes.setdefault(stream, []).append(aggregator)
+
+        self.message_count = 0
+        self.error_count = 0
+        self.connected = set()
+        self.dirty = False
+        self.pending_since: Optional[float] = None  # First message not yet published (publish lag)
+
+        # Per-stream message counters, bound once for the dispatch hot path
+        self._stream_messages = {stream: metrics_registry.WS_MESSAGES.labels(stream=stream) for stream in self.routes}
+        self._stream_errors = metrics_registry.WS_ERRORS.labels(stream='market_stream')
+        self._connections = metrics_registry.WS_CONNECTED.labels(stream='market_stream')
+
+    def connection_urls(self) -> List[str]:
+        """Combined-stream URLs, max_streams streams per connection"""
+        streams = list(self.routes)
+        return [
+            f"{WS_BASE}/stream?streams=" + '/'.join(streams[i:i + self.max_streams])
+            for i in range(0, len(streams), self.max_streams)
+        ]
+
+    def dispatch(self, message, now: Optional[float] = None):
+        """Decode one combined-stream message and fold it into its aggregators"""
+        now = time.time() if now is None else now
+        try:
+            envelope = _loads(message)
+            stream = envelope.get('stream')
+            for aggregator in self.routes.get(stream, ()):
+                aggregator.on_event(envelope['data'], now)
+            self.message_count += 1
+            if stream in self._stream_messages:
+                self._stream_messages[stream].inc()
+            if not self.dirty:
+                self.pending_since = now
+            self.dirty = True
+        except Exception as e:
+            self.error_count += 1
+            self._stream_errors.inc()
+            if self.error_count % 100 == 1:
+                print(f"[STREAM ERROR] Message processing ({self.error_count} errors): {e}")
+
+    def build_snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        snapshot = {
+            'ts': int(now),
+            'last_update': now,
+            'timestamp': datetime.now(TZ).isoformat(),
+            'connections': len(self.connected),
+            'messages': self.message_count
+        }
+        for aggregator in self.aggregators:
+            snapshot[aggregator.name] = aggregator.snapshot(now)
+        return snapshot
+
+    def publish(self, now: Optional[float] = None):
+        """Write the consolidated snapshot (and legacy per-service files)"""
+        snapshot = self.build_snapshot(now)
+        write_json_atomic(self.snapshot_path, snapshot)
+        if self.legacy_files:
+            for aggregator in self.aggregators:
+                if aggregator.legacy_path:
+                    section = dict(snapshot[aggregator.name], timestamp=snapshot['timestamp'])
+                    write_json_atomic(aggregator.legacy_path, section)
+        if self.bus_dir:
+            for aggregator in self.aggregators:
+                if aggregator.name in BUS_PUBLISHERS:
+                    BUS_PUBLISHERS[aggregator.name](snapshot[aggregator.name], bus_dir=self.bus_dir)
+        metrics_registry.observe_publish('market_stream', self.pending_since if self.dirty else None,
+                                         snapshot['last_update'])
+        self.dirty = False
+
+    def restore(self):
+        """Reload counters from the last consolidated snapshot, else from legacy files"""
+        previous = {}
+        if Path(self.snapshot_path).exists():
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    previous = _loads(f.read())
+            except Exception as e:
+                print(f"[WARN] Could not load {self.snapshot_path}: {e}")
+
+        for aggregator in self.aggregators:
+            if not hasattr(aggregator, 'restore'):
+                continue
+            section = previous.get(aggregator.name)
+            if section is None and aggregator.legacy_path and Path(aggregator.legacy_path).exists():
+                try:
+                    with open(aggregator.legacy_path, 'rb') as f:
+                        section = _loads(f.read())
+                except Exception as e:
+                    print(f"[WARN] Could not load {aggregator.legacy_path}: {e}")
+            if section:
+                aggregator.restore(section)
+                print(f"[STREAM] Restored {aggregator.name} state")
+
+    async def _connection_loop(self, url: str, index: int):
+        """One pooled connection with auto-reconnect"""
+        retry_delay = 1
+        max_retry_delay = 60
+        n_streams = url.count('/', url.index('streams=')) + 1
+
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=10, max_size=None) as ws:
+                    print(f"[WS] Connection {index} up ({n_streams} streams)")
+                    self.connected.add(index)
+                    self._connections.set(len(self.connected))
+                    retry_delay = 1
+                    async for message in ws:
+                        self.dispatch(message)
+            except (websockets.exceptions.WebSocketException, ConnectionRefusedError, OSError) as e:
+                print(f"[WS ERROR] Connection {index}: {e}")
+            except Exception as e:
+                print(f"[WS FATAL] Connection {index}: {e}")
+            finally:
+                self.connected.discard(index)
+                self._connections.set(len(self.connected))
+
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_retry_delay)
+
+    async def _publish_loop(self):
+        """Throttled publisher: at most one write per interval, heartbeat while quiet"""
+        last_publish = 0.0
+        while True:
+            await asyncio.sleep(self.publish_interval_sec)
+            now = time.time()
+            if self.dirty or now - last_publish >= HEARTBEAT_SEC:
+                try:
+                    self.publish(now)
+                except Exception as e:
+                    print(f"[SNAPSHOT ERROR] Failed to write {self.snapshot_path}: {e}")
+                last_publish = now
+
+    async def _status_loop(self):
+        last_count = 0
+        while True:
+            await asyncio.sleep(STATUS_INTERVAL_SEC)
+            rate = (self.message_count - last_count) / STATUS_INTERVAL_SEC
+            last_count = self.message_count
+            print(f"[STREAM] {datetime.now(TZ).strftime('%H:%M:%S')} | {len(self.connected)} connections | "
+                  f"{rate:.0f} msg/s | {self.message_count:,} total | {self.error_count} errors")
+
+    async def run(self):
+        urls = self.connection_urls()
+        print(f"[START] {len(self.routes)} streams over {len(urls)} connection(s)")
+        print(f"[START] Aggregators: {', '.join(a.name for a in self.aggregators)}")
+        print(f"[START] Snapshot: {self.snapshot_path} (max every {self.publish_interval_sec}s)"
+              f"{' + legacy files' if self.legacy_files else ''}")
+        self.restore()
+
+        tasks = [asyncio.create_task(self._connection_loop(url, i)) for i, url in enumerate(urls)]
+        tasks.append(asyncio.create_task(self._publish_loop()))
+        tasks.append(asyncio.create_task(self._status_loop()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.publish()
+
+
+def load_config() -> dict:
+    """Load configuration from config.yaml"""
+    config_path = Path(__file__).parent.parent.parent / 'config.yaml'
+
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def build_service(config: dict) -> MarketStreamService:
+    stream_config = config.get('market_stream', {})
+    symbols = stream_config.get('symbols') or config.get('symbols', [])
+    if not symbols:
+        raise ValueError("No symbols configured!")
+
+    names = stream_config.get('aggregators', list(AGGREGATORS))
+    return MarketStreamService(
+        [AGGREGATORS[name](symbols) for name in names],
+        snapshot_path=stream_config.get('snapshot_path', SNAPSHOT_PATH),
+        legacy_files=stream_config.get('legacy_files', True),
+        max_streams_per_connection=stream_config.get('max_streams_per_connection', MAX_STREAMS_PER_CONNECTION),
+        publish_interval_sec=stream_config.get('publish_interval_sec', PUBLISH_INTERVAL_SEC)
+    )
+
+
+async def main():
+    """Main entry point"""
+    print("=" * 60)
+    print("MARKET STREAM SERVICE - aggTrade, forceOrder, bookTicker, markPrice")
+    print("=" * 60)
+
+    config = load_config()
+    metrics_registry.start_metrics_server('market_stream', config)
+    service = build_service(config)
+    await service.run()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n[SHUTDOWN] Market Stream Service stopped by user")
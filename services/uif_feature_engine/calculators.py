@@ -6,11 +6,23 @@ Implements 4 indicators from 5-minute OHLCV data:
 - PSAR State: +1 (price > PSAR) or -1 (price < PSAR)
 - Momentum5: (close_t - close_t-5m) / close_t-5m
 - VolAccel: d(volRatio)/dt, where volRatio = quoteVol / EWMA50 (capped at 3.0)
+
+calculate_adx14/calculate_psar_state recompute from the first bar of the
+window. TrendState carries the same recursions (PSAR trend/EP/AF/SAR and
+Wilder-smoothed TR/+DM/-DM/ADX) across cycles instead: each new closed bar
+costs O(1), the still-forming last bar is evaluated without being committed,
+and a cold start (or a gap in the bars) seeds from the fetched history.
 """
 
 import numpy as np
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+ADX_PERIOD = 14
+ADX_MIN_BARS = 28  # Need ~2x period for stable ADX
+PSAR_MIN_BARS = 20
+PSAR_AF_STEP = 0.02
+PSAR_AF_MAX = 0.2
 
 
 def calculate_adx14(df: pd.DataFrame) -> Optional[float]:
@@ -23,7 +35,7 @@ def calculate_adx14(df: pd.DataFrame) -> Optional[float]:
     Returns:
         ADX value (0-100) or None if insufficient data
     """
-    if len(df) < 28:  # Need ~2x period for stable ADX
+    if len(df) < ADX_MIN_BARS:
         return None
     
     try:
@@ -72,7 +84,7 @@ def calculate_psar_state(df: pd.DataFrame) -> Optional[int]:
     Returns:
         +1 (bullish), -1 (bearish), or None if insufficient data
     """
-    if len(df) < 20:
+    if len(df) < PSAR_MIN_BARS:
         return None
     
     try:
@@ -189,19 +201,152 @@ def calculate_vol_accel(df: pd.DataFrame) -> Optional[float]:
         return None
 
 
-def calculate_all_indicators(df: pd.DataFrame) -> Dict[str, Optional[float]]:
+def _psar_step(state: tuple, high: float, low: float) -> tuple:
+    """One PSAR bar: state = (is_bull, sar, ep, af, prev_high, prev_low, prev2_high, prev2_low)"""
+    is_bull, sar, ep, af, h1, l1, h2, l2 = state
+    sar = sar + af * (ep - sar)
+    if is_bull:
+        sar = min(sar, l1) if l2 is None else min(sar, l1, l2)
+        if high > ep:
+            ep = high
+            af = min(af + PSAR_AF_STEP, PSAR_AF_MAX)
+        if low < sar:
+            is_bull, sar, ep, af = False, ep, low, PSAR_AF_STEP
+    else:
+        sar = max(sar, h1) if h2 is None else max(sar, h1, h2)
+        if low < ep:
+            ep = low
+            af = min(af + PSAR_AF_STEP, PSAR_AF_MAX)
+        if high > sar:
+            is_bull, sar, ep, af = True, ep, high, PSAR_AF_STEP
+    return (is_bull, sar, ep, af, high, low, h1, l1)
+
+
+def _adx_step(state: tuple, high: float, low: float, close: float) -> tuple:
+    """One ADX bar: state = (prev_high, prev_low, prev_close, atr, plus_dm, minus_dm, adx); smoothed values None until seeded"""
+    h1, l1, c1, atr, pdm, mdm, adx = state
+    tr = max(high - low, abs(high - c1), abs(low - c1))
+    up_move = high - h1
+    down_move = l1 - low
+    plus = up_move if up_move > down_move and up_move > 0 else 0.0
+    minus = down_move if down_move > up_move and down_move > 0 else 0.0
+
+    alpha = 1.0 / ADX_PERIOD
+    if atr is None:
+        atr, pdm, mdm = tr, plus, minus
+    else:
+        atr += alpha * (tr - atr)
+        pdm += alpha * (plus - pdm)
+        mdm += alpha * (minus - mdm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * np.float64(pdm) / atr
+        minus_di = 100 * np.float64(mdm) / atr
+    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di + 1e-10)
+    adx = dx if adx is None else adx + alpha * (dx - adx)
+    return (high, low, close, atr, pdm, mdm, adx)
+
+
+class TrendState:
+    """
+    Incremental ADX14 + PSAR for one symbol's bar series.
+    
+    update(df) commits every closed bar (all rows but the last) not seen
+    before and evaluates the last, still-forming row on a copy of the
+    state. The first call, or a call whose window no longer overlaps the
+    committed bars, re-seeds from the window - giving exactly what
+    calculate_adx14/calculate_psar_state return for that window.
+    """
+    
+    __slots__ = ('last_ts', 'bars', 'psar', 'adx')
+    
+    def __init__(self):
+        self.last_ts = None
+        self.bars = 0
+        self.psar = None
+        self.adx = None
+    
+    def seed(self, high, low, close, timestamps):
+        """Cold start: replay committed history from its first bar"""
+        self.last_ts = None
+        self.bars = 0
+        self.psar = None
+        self.adx = None
+        self._commit(high, low, close, timestamps)
+    
+    def _commit(self, high, low, close, timestamps):
+        for i in range(len(high)):
+            self.psar, self.adx = self._advance(self.psar, self.adx, high[i], low[i], close[i])
+            self.bars += 1
+            self.last_ts = timestamps[i]
+    
+    def _advance(self, psar, adx, high, low, close) -> Tuple[Optional[tuple], Optional[tuple]]:
+        if self.bars == 0:
+            # Bar 0 only sets previous values; PSAR direction needs bar 1's close
+            return ('init', high, low, close), (high, low, close, None, None, None, None)
+        if psar[0] == 'init':
+            _, h0, l0, c0 = psar
+            is_bull = close > c0
+            psar = (is_bull, l0 if is_bull else h0, h0 if is_bull else l0, PSAR_AF_STEP, h0, l0, None, None)
+        return _psar_step(psar, high, low), _adx_step(adx, high, low, close)
+    
+    def update(self, df: pd.DataFrame) -> Dict[str, Optional[float]]:
+        """
+        Args:
+            df: DataFrame with ['timestamp', 'high', 'low', 'close'], oldest first
+        
+        Returns:
+            Dict with keys: adx14, psar_state
+        """
+        if len(df) < 2:
+            return {'adx14': None, 'psar_state': None}
+        
+        ts = df['timestamp'].values
+        high = df['high'].values.astype(float)
+        low = df['low'].values.astype(float)
+        close = df['close'].values.astype(float)
+        
+        if self.last_ts is None or ts[0] > self.last_ts or ts[-2] < self.last_ts:
+            self.seed(high[:-1], low[:-1], close[:-1], ts[:-1])
+        else:
+            start = int(np.searchsorted(ts, self.last_ts, side='right'))
+            self._commit(high[start:-1], low[start:-1], close[start:-1], ts[start:-1])
+        
+        # Forming bar: evaluated, not committed
+        psar, adx = self._advance(self.psar, self.adx, high[-1], low[-1], close[-1])
+        bars = self.bars + 1
+        
+        adx14 = None
+        if bars >= ADX_MIN_BARS and np.isfinite(adx[6]):
+            adx14 = round(float(adx[6]), 2)
+        psar_state = None
+        if bars >= PSAR_MIN_BARS:
+            psar_state = +1 if close[-1] > psar[1] else -1
+        return {'adx14': adx14, 'psar_state': psar_state}
+
+
+def calculate_all_indicators(df: pd.DataFrame, trend: Optional[TrendState] = None) -> Dict[str, Optional[float]]:
     """
     Calculate all 4 UIF indicators from OHLCV dataframe.
     
     Args:
         df: DataFrame with columns ['high', 'low', 'close', 'quoteVolume']
+            (plus 'timestamp' when trend is given)
+        trend: Per-symbol TrendState carried between cycles; ADX14/PSAR are
+            then updated incrementally instead of recomputed from bar 0
     
     Returns:
         Dict with keys: adx14, psar_state, momentum5, vol_accel
     """
+    if trend is not None:
+        try:
+            trend_values = trend.update(df)
+        except Exception:
+            trend_values = {'adx14': None, 'psar_state': None}
+    else:
+        trend_values = {'adx14': calculate_adx14(df), 'psar_state': calculate_psar_state(df)}
     return {
-        'adx14': calculate_adx14(df),
-        'psar_state': calculate_psar_state(df),
+        'adx14': trend_values['adx14'],
+        'psar_state': trend_values['psar_state'],
         'momentum5': calculate_momentum5(df),
         'vol_accel': calculate_vol_accel(df)
     }
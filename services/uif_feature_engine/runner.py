@@ -3,28 +3,66 @@ UIF Feature Engine - Main Runner
 
 Collects 4 local indicators (ADX14, PSAR, Momentum5, VolAccel) every 5 minutes.
 Read-only preparation for ML feature engineering - no signal logic changes.
+
+Symbols are processed in a thread pool sharing one pooled HTTP session, and
+cycles start just after each interval boundary (bar close). Symbols still
+waiting on a slow response after partial_publish_sec are published with
+their previous values (and previous 'updated' time), so one slow request
+never holds back the rest of the snapshot.
 """
 
 import os
 import sys
+import threading
 import time
 import yaml
 import pandas as pd
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 from datetime import datetime
 from typing import Dict, Any, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from services.uif_feature_engine.calculators import calculate_all_indicators
+from services.uif_feature_engine.calculators import TrendState, calculate_all_indicators
 from services.uif_feature_engine.snapshot import write_snapshot
 from services.uif_feature_engine.writer import UIFWriter
 from services.uif_feature_engine.health import print_status
+import metrics_registry
+import snapshot_bus
 
 
 CONFIG_PATH = 'config.yaml'
 
+MAX_WORKERS = 8
+REQUEST_TIMEOUT_SEC = 10
+PARTIAL_PUBLISH_SEC = 5
+CLOSE_DELAY_SEC = 2  # Start a cycle this long after the bar close so the closed candle is served
+UIF_BUS_FIELDS = ('adx14', 'psar_state', 'momentum5', 'vol_accel')
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Last published entry per symbol (carried into partial snapshots)
+_latest_entries: Dict[str, Dict[str, Any]] = {}
+
+# Incremental ADX14/PSAR state per symbol, carried between cycles
+_trend_states: Dict[str, TrendState] = {}
+
+
+def get_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """Shared keep-alive session with one pooled connection per worker."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
 
 def load_config() -> Dict[str, Any]:
     """Load configuration from config.yaml."""
@@ -36,13 +74,16 @@ def load_config() -> Dict[str, Any]:
         sys.exit(1)
 
 
-def fetch_ohlcv(symbol: str, limit: int = 60) -> Optional[pd.DataFrame]:
+def fetch_ohlcv(symbol: str, limit: int = 60, session: Optional[requests.Session] = None,
+                timeout: float = REQUEST_TIMEOUT_SEC) -> Optional[pd.DataFrame]:
     """
     Fetch OHLCV data from CryptoCompare API (free, no regional restrictions).
     
     Args:
         symbol: Trading pair (e.g., BTCUSDT)
         limit: Number of 5-minute candles to fetch
+        session: HTTP session (default: shared pooled session)
+        timeout: Per-request timeout in seconds
     
     Returns:
         DataFrame with OHLCV data or None on error
@@ -59,13 +100,15 @@ def fetch_ohlcv(symbol: str, limit: int = 60) -> Optional[pd.DataFrame]:
             'aggregate': 5  # 5-minute candles
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = (session or get_session()).get(url, params=params, timeout=timeout)
         response.raise_for_status()
         
         data = response.json()
         
         if data.get('Response') != 'Success' or 'Data' not in data:
+            metrics_registry.API_REQUESTS.labels(api='cryptocompare', outcome='error').inc()
             return None
+        metrics_registry.API_REQUESTS.labels(api='cryptocompare', outcome='ok').inc()
         
         candles = data['Data']['Data']
         
@@ -88,17 +131,21 @@ def fetch_ohlcv(symbol: str, limit: int = 60) -> Optional[pd.DataFrame]:
         return df
     
     except Exception as e:
+        metrics_registry.API_REQUESTS.labels(api='cryptocompare', outcome='error').inc()
         print(f"[ERROR] Failed to fetch OHLCV for {symbol}: {e}")
         return None
 
 
-def process_symbol(symbol: str, writer: UIFWriter) -> Optional[Dict[str, Any]]:
+def process_symbol(symbol: str, writer: UIFWriter, session: Optional[requests.Session] = None,
+                   timeout: float = REQUEST_TIMEOUT_SEC) -> Optional[Dict[str, Any]]:
     """
     Process single symbol: fetch OHLCV and calculate indicators.
     
     Args:
         symbol: Trading pair
         writer: CSV writer instance
+        session: HTTP session (default: shared pooled session)
+        timeout: Per-request timeout in seconds
     
     Returns:
         Dict with indicator values or None on error
@@ -107,7 +154,7 @@ def process_symbol(symbol: str, writer: UIFWriter) -> Optional[Dict[str, Any]]:
     
     try:
         # Fetch OHLCV
-        df = fetch_ohlcv(symbol, limit=60)
+        df = fetch_ohlcv(symbol, limit=60, session=session, timeout=timeout)
         
         if df is None:
             writer.append(symbol, {}, 0, "OHLCV_FETCH_FAILED")
@@ -118,7 +165,7 @@ def process_symbol(symbol: str, writer: UIFWriter) -> Optional[Dict[str, Any]]:
             return None
         
         # Calculate indicators
-        indicators = calculate_all_indicators(df)
+        indicators = calculate_all_indicators(df, _trend_states.setdefault(symbol, TrendState()))
         
         latency_ms = int((time.time() - start_time) * 1000)
         
@@ -153,25 +200,39 @@ def process_symbol(symbol: str, writer: UIFWriter) -> Optional[Dict[str, Any]]:
         return None
 
 
-def run_collection_cycle(symbols: list, writer: UIFWriter) -> bool:
+def run_collection_cycle(symbols: list, writer: UIFWriter, max_workers: int = MAX_WORKERS,
+                         request_timeout: float = REQUEST_TIMEOUT_SEC,
+                         partial_publish_sec: float = PARTIAL_PUBLISH_SEC) -> bool:
     """
-    Run single collection cycle for all symbols.
+    Run single collection cycle for all symbols (in parallel).
     
     Args:
         symbols: List of trading pairs
         writer: CSV writer instance
+        max_workers: Symbols processed concurrently
+        request_timeout: Per-request HTTP timeout in seconds
+        partial_publish_sec: Publish what is ready after this many seconds
+            (pending symbols keep their previous entry) and again at the end
     
     Returns:
         True if cycle completed successfully
     """
     print(f"\n[{datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}] Starting UIF collection cycle")
     
+    if not symbols:
+        return False
+    
+    cycle_start = time.time()
+    session = get_session(max_workers)
     snapshot_data = {}
     success_count = 0
+    done = set()
     
-    for symbol in symbols:
-        result = process_symbol(symbol, writer)
-        
+    def collect(future):
+        nonlocal success_count
+        done.add(future)
+        symbol = futures[future]
+        result = future.result()
         if result:
             snapshot_data[symbol] = result
             success_count += 1
@@ -180,14 +241,50 @@ def run_collection_cycle(symbols: list, writer: UIFWriter) -> bool:
         else:
             print(f"  ✗ {symbol}: Failed")
     
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)), thread_name_prefix='uif') as pool:
+        futures = {pool.submit(process_symbol, symbol, writer, session, request_timeout): symbol
+                   for symbol in symbols}
+        try:
+            for future in as_completed(futures, timeout=partial_publish_sec):
+                collect(future)
+        except FuturesTimeout:
+            pending = [futures[f] for f in futures if f not in done]
+            _publish(snapshot_data)
+            print(f"[INFO] Partial snapshot published: {success_count}/{len(symbols)} fresh, "
+                  f"waiting on {', '.join(pending)}")
+            # Bounded by the per-request timeout
+            for future in as_completed([f for f in futures if f not in done]):
+                collect(future)
+    
+    # All symbols' rows reach uif_log.csv in one append
+    writer.flush()
+    
     # Write snapshot
     if snapshot_data:
-        write_snapshot(snapshot_data)
+        _publish(snapshot_data)
         print(f"[INFO] Snapshot updated with {success_count}/{len(symbols)} symbols")
     
+    metrics_registry.observe_cycle('uif_cycle', time.time() - cycle_start)
     return success_count > 0
 
 
+def _publish(fresh: Dict[str, Dict[str, Any]]):
+    """Write the snapshot: fresh entries over the last published ones."""
+    _latest_entries.update(fresh)
+    write_snapshot(dict(_latest_entries))
+    metrics_registry.observe_publish('uif', min((e['updated'] for e in fresh.values()), default=None))
+    try:
+        snapshot_bus.publish('uif', fresh, UIF_BUS_FIELDS)
+    except Exception as e:
+        print(f"[ERROR] Failed to publish UIF bus: {e}")
+
+
+def seconds_until_next_cycle(interval_sec: int, close_delay_sec: float = CLOSE_DELAY_SEC, now: Optional[float] = None) -> float:
+    """Sleep that lands close_delay_sec after the next interval boundary (bar close)."""
+    now = time.time() if now is None else now
+    return interval_sec - (now - close_delay_sec) % interval_sec
+
+
 def main():
     """Main runner loop."""
     print("="*60)
@@ -208,6 +305,7 @@ def main():
         sys.exit(1)
     
     print(f"[INFO] Monitoring {len(symbols)} symbols: {', '.join(symbols)}")
+    metrics_registry.start_metrics_server('uif_engine', config)
     
     # Initialize CSV writer
     writer = UIFWriter(
@@ -215,9 +313,17 @@ def main():
         keep_files=config.get('data_feeds', {}).get('sinks', {}).get('keep_files', 14)
     )
     
-    # Get interval
-    interval_sec = config.get('uif_engine', {}).get('interval_sec', 300)  # Default 5 minutes
-    print(f"[INFO] Collection interval: {interval_sec}s")
+    # Get interval and concurrency
+    engine_cfg = config.get('uif_engine', {})
+    interval_sec = engine_cfg.get('interval_sec', 300)  # Default 5 minutes
+    close_delay_sec = engine_cfg.get('close_delay_sec', CLOSE_DELAY_SEC)
+    cycle_kwargs = {
+        'max_workers': engine_cfg.get('max_workers', MAX_WORKERS),
+        'request_timeout': engine_cfg.get('request_timeout_sec', REQUEST_TIMEOUT_SEC),
+        'partial_publish_sec': engine_cfg.get('partial_publish_sec', PARTIAL_PUBLISH_SEC)
+    }
+    print(f"[INFO] Collection interval: {interval_sec}s (+{close_delay_sec}s after bar close), "
+          f"workers: {cycle_kwargs['max_workers']}")
     
     # Initial health check
     print("\n[INFO] Initial health status:")
@@ -228,20 +334,23 @@ def main():
     # Main loop
     while True:
         try:
-            run_collection_cycle(symbols, writer)
+            run_collection_cycle(symbols, writer, **cycle_kwargs)
             
-            print(f"[INFO] Sleeping {interval_sec}s until next cycle...")
-            time.sleep(interval_sec)
+            sleep_s = seconds_until_next_cycle(interval_sec, close_delay_sec)
+            print(f"[INFO] Sleeping {sleep_s:.1f}s until next cycle...")
+            time.sleep(sleep_s)
         
         except KeyboardInterrupt:
             print("\n[INFO] Shutdown requested")
             break
         
         except Exception as e:
+            metrics_registry.CYCLE_ERRORS.labels(loop='uif_cycle').inc()
             print(f"[ERROR] Cycle failed: {e}")
             print("[INFO] Retrying in 60s...")
             time.sleep(60)
     
+    writer.close()
     print("[INFO] UIF Feature Engine stopped")
 
 
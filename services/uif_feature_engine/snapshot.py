@@ -13,25 +13,26 @@ from typing import Dict, Any
 SNAPSHOT_PATH = "data/uif_snapshot.json"
 
 
-def write_snapshot(symbols_data: Dict[str, Dict[str, Any]]) -> bool:
+def write_snapshot(symbols_data: Dict[str, Dict[str, Any]], path: str = SNAPSHOT_PATH) -> bool:
     """
     Atomically write UIF features snapshot.
     
     Args:
         symbols_data: Dict[symbol -> {adx14, psar_state, momentum5, vol_accel, updated}]
+        path: Snapshot file (other feature services publish their own file in the same format)
     
     Returns:
         True if write successful, False otherwise
     """
     try:
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         
         snapshot = {
             "ts": int(time.time()),
             "symbols": symbols_data
         }
         
-        tmp_path = SNAPSHOT_PATH + ".tmp"
+        tmp_path = path + ".tmp"
         
         # Write to temp file
         with open(tmp_path, 'w') as f:
@@ -40,11 +41,11 @@ def write_snapshot(symbols_data: Dict[str, Dict[str, Any]]) -> bool:
             os.fsync(f.fileno())
         
         # Atomic replace
-        os.replace(tmp_path, SNAPSHOT_PATH)
+        os.replace(tmp_path, path)
         return True
     
     except Exception as e:
-        print(f"[ERROR] Failed to write UIF snapshot: {e}")
+        print(f"[ERROR] Failed to write snapshot {path}: {e}")
         return False
 
 
@@ -1,14 +1,14 @@
 """
 CSV Writer with Log Rotation for UIF Features
 
-Append-only CSV logging to data/uif_log.csv with automatic rotation.
+Append-only CSV logging to data/uif_log.csv with automatic rotation,
+buffered through the shared csv_log_writer.CsvLogWriter.
 """
 
-import csv
-import os
-import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Optional
+
+from csv_log_writer import CsvLogWriter
 
 
 CSV_PATH = "data/uif_log.csv"
@@ -38,72 +38,7 @@ class UIFWriter:
         self.csv_path = CSV_PATH
         self.rotate_mb = rotate_mb
         self.keep_files = keep_files
-        self._init_csv()
-    
-    def _init_csv(self):
-        """Initialize CSV file with headers if doesn't exist."""
-        try:
-            os.makedirs("data", exist_ok=True)
-            
-            if not os.path.exists(self.csv_path):
-                with open(self.csv_path, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(CSV_HEADERS)
-                print(f"[INFO] Created UIF log: {self.csv_path}")
-        
-        except Exception as e:
-            print(f"[ERROR] Failed to init UIF CSV: {e}")
-    
-    def _should_rotate(self) -> bool:
-        """Check if CSV should be rotated."""
-        try:
-            if not os.path.exists(self.csv_path):
-                return False
-            
-            size_mb = os.path.getsize(self.csv_path) / (1024 * 1024)
-            return size_mb >= self.rotate_mb
-        
-        except Exception:
-            return False
-    
-    def _rotate_csv(self):
-        """Rotate CSV file and cleanup old rotations."""
-        try:
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            rotated_path = f"{self.csv_path}.{timestamp}"
-            
-            os.rename(self.csv_path, rotated_path)
-            print(f"[INFO] Rotated UIF log to: {rotated_path}")
-            
-            # Recreate with headers
-            self._init_csv()
-            
-            # Cleanup old files
-            self._cleanup_old_rotations()
-        
-        except Exception as e:
-            print(f"[ERROR] Failed to rotate UIF CSV: {e}")
-    
-    def _cleanup_old_rotations(self):
-        """Keep only the most recent N rotated files."""
-        try:
-            data_dir = os.path.dirname(self.csv_path)
-            base_name = os.path.basename(self.csv_path)
-            
-            rotated_files = [
-                f for f in os.listdir(data_dir)
-                if f.startswith(base_name + ".")
-            ]
-            
-            rotated_files.sort(reverse=True)
-            
-            for old_file in rotated_files[self.keep_files:]:
-                old_path = os.path.join(data_dir, old_file)
-                os.remove(old_path)
-                print(f"[INFO] Deleted old rotation: {old_file}")
-        
-        except Exception as e:
-            print(f"[WARN] Failed to cleanup old rotations: {e}")
+        self.writer = CsvLogWriter(self.csv_path, CSV_HEADERS, rotate_mb=rotate_mb, keep_files=keep_files)
     
     def append(
         self,
@@ -122,10 +57,6 @@ class UIFWriter:
             source_errors: Any errors encountered during calculation
         """
         try:
-            # Rotate if needed
-            if self._should_rotate():
-                self._rotate_csv()
-            
             timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
             
             row = [
@@ -139,9 +70,15 @@ class UIFWriter:
                 source_errors
             ]
             
-            with open(self.csv_path, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(row)
+            self.writer.write_row(row)
         
         except Exception as e:
             print(f"[ERROR] Failed to append UIF CSV: {e}")
+    
+    def flush(self):
+        """Write buffered rows now (end of a collection cycle)."""
+        self.writer.flush()
+    
+    def close(self):
+        """Drain buffered rows at shutdown."""
+        self.writer.close()
@@ -4,12 +4,11 @@ Logs dual-formula predictions alongside current system decisions for A/B compari
 Outputs structured data to CSV for validation before full production release.
 """
 
-import csv
-import os
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional
 import threading
+from csv_log_writer import get_csv_writer
 
 class ShadowLogger:
     """Thread-safe logger for shadow mode predictions and comparisons."""
@@ -50,15 +49,8 @@ class ShadowLogger:
             'passed_filters', 'filter_reason'
         ]
         
-        # Initialize CSV file with headers if it doesn't exist
-        self._initialize_log_file()
-    
-    def _initialize_log_file(self):
-        """Create log file with headers if it doesn't exist."""
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writeheader()
+        # Buffered writer; creates the CSV file with headers if it doesn't exist
+        self.writer = get_csv_writer(self.log_file, self.headers)
     
     def log_prediction(self, data: Dict[str, Any]):
         """
@@ -75,10 +67,8 @@ class ShadowLogger:
             # Fill in missing fields with None
             row = {header: data.get(header, None) for header in self.headers}
             
-            # Append to CSV
-            with open(self.log_file, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writerow(row)
+            # Queue for the writer's background flush
+            self.writer.write_row(row)
     
     def log_signal_evaluation(
         self,
@@ -7,14 +7,15 @@ Tracks sent signals, monitors price movements, and logs results
 import json
 import time
 import csv
-import requests
+import http_client
 from datetime import datetime, timedelta
 from pathlib import Path
 import os
-import fcntl
 from dotenv import load_dotenv
-from alert_manager import enqueue_alert, process_alert_queue, get_queue_status, update_alert_extremes
+from alert_manager import enqueue_alert, process_alert_queue, get_queue_status, update_alert_extremes, AlertBatch
 from telegram_utils import send_telegram_message, send_to_trading_channel
+from state_store import get_sent_signals_store, get_active_signals_table, TableSession
+from metrics_registry import CYCLE_ERRORS, QUEUE_DEPTH, gauge, observe_cycle, start_metrics_server
 
 load_dotenv()
 
@@ -46,90 +47,24 @@ def _symbol_to_coinalyze(s):
     }
     return symbol_map.get(s, s)
 
-class ActiveSignalsManager:
+class ActiveSignalsManager(TableSession):
     """
-    Context manager for safe read-modify-write of active_signals.json.
-    Ensures entire operation is protected by exclusive lock to prevent race conditions.
-    """
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self.lock_path = file_path + '.lock'
-        self.lock_file = None
-        self.signals = []
-        
-    def __enter__(self):
-        """Acquire exclusive lock and load signals"""
-        import tempfile
-        
-        # Create lock file if it doesn't exist
-        Path(self.lock_path).touch(exist_ok=True)
-        
-        # Acquire exclusive lock for entire read-modify-write
-        self.lock_file = open(self.lock_path, 'r')
-        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
-        
-        # Now safely read the data
-        if Path(self.file_path).exists():
-            try:
-                with open(self.file_path, 'r') as f:
-                    self.signals = json.load(f)
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"[TRACKER WARN] JSON decode error: {e}, using empty list")
-                self.signals = []
-            except Exception as e:
-                print(f"[TRACKER WARN] Read error: {e}, using empty list")
-                self.signals = []
-        
-        return self.signals
+    Context manager for safe read-modify-write of active signals.
+    Backed by the active_signals table of the state store: on exit only the
+    signals that were added, changed or removed are written, in one transaction.
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Save signals and release lock"""
-        import tempfile
-        
-        try:
-            # Write to temp file
-            temp_fd, temp_path = tempfile.mkstemp(
-                dir=os.path.dirname(self.file_path) or '.',
-                prefix='.active_signals_tmp_',
-                suffix='.json'
-            )
-            try:
-                with os.fdopen(temp_fd, 'w') as f:
-                    json.dump(self.signals, f, indent=2)
-                
-                # Atomic rename
-                os.replace(temp_path, self.file_path)
-            except Exception as e:
-                # Clean up temp file on error
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                raise e
-        except Exception as e:
-            print(f"[TRACKER ERROR] Failed to save: {e}")
-        finally:
-            # Always release lock
-            if self.lock_file:
-                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
-                self.lock_file.close()
-        
-        return False  # Don't suppress exceptions
+    file_path is the legacy active_signals.json, imported once on first use.
+    """
+    def __init__(self, file_path=TRACKING_FILE):
+        super().__init__(get_active_signals_table(legacy_file=file_path))
 
 def load_active_signals():
     """
     Load currently tracked signals.
     DEPRECATED: Use ActiveSignalsManager context manager for read-modify-write.
     """
-    if not Path(TRACKING_FILE).exists():
-        return []
-    
     try:
-        with open(TRACKING_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f"[TRACKER WARN] JSON decode error: {e}, returning empty list")
-        return []
+        return get_active_signals_table(legacy_file=TRACKING_FILE).all()
     except Exception as e:
         print(f"[TRACKER WARN] Unexpected error loading signals: {e}")
         return []
@@ -139,33 +74,9 @@ def save_active_signals(signals):
     Save active signals.
     DEPRECATED: Use ActiveSignalsManager context manager for read-modify-write.
     """
-    import tempfile
-    
-    lock_file_path = TRACKING_FILE + '.lock'
-    Path(lock_file_path).touch(exist_ok=True)
-    
     try:
-        with open(lock_file_path, 'r') as lock_file:
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
-            try:
-                temp_fd, temp_path = tempfile.mkstemp(
-                    dir=os.path.dirname(TRACKING_FILE) or '.', 
-                    prefix='.active_signals_tmp_', 
-                    suffix='.json'
-                )
-                try:
-                    with os.fdopen(temp_fd, 'w') as f:
-                        json.dump(signals, f, indent=2)
-                    
-                    os.replace(temp_path, TRACKING_FILE)
-                except Exception as e:
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
-                    raise e
-            finally:
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        with ActiveSignalsManager(TRACKING_FILE) as active_signals:
+            active_signals[:] = signals
     except Exception as e:
         print(f"[TRACKER ERROR] Failed to save signals: {e}")
 
@@ -177,7 +88,7 @@ def get_current_price(symbol):
     try:
         # Try Binance Futures API first (unlimited, free, fast)
         binance_url = "https://fapi.binance.com/fapi/v1/ticker/price"
-        response = requests.get(binance_url, params={'symbol': symbol}, timeout=5)
+        response = http_client.get(binance_url, params={'symbol': symbol}, timeout=5, api='binance')
         
         if response.status_code == 200:
             data = response.json()
@@ -199,7 +110,7 @@ def get_current_price(symbol):
             params['api_key'] = COINALYZE_KEY
         
         url = f"{COINALYZE_API}/ohlcv-history"
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params, timeout=10, api='coinalyze')
         
         if response.status_code == 200:
             data = response.json()
@@ -227,7 +138,7 @@ def get_ohlcv_since(symbol, since_timestamp):
             'startTime': int(since_timestamp * 1000),  # Binance uses milliseconds
             'limit': 1000
         }
-        response = requests.get(binance_url, params=params, timeout=10)
+        response = http_client.get(binance_url, params=params, timeout=10, api='binance')
         
         if response.status_code == 200:
             klines = response.json()
@@ -256,7 +167,7 @@ def get_ohlcv_since(symbol, since_timestamp):
             params['api_key'] = COINALYZE_KEY
         
         url = f"{COINALYZE_API}/ohlcv-history"
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params, timeout=10, api='coinalyze')
         
         if response.status_code == 200:
             data = response.json()
@@ -326,30 +237,19 @@ def log_effectiveness(signal_data, result_data):
 
 def reconcile_active_signals_on_startup():
     """
-    STARTUP RECONCILIATION: Filter active_signals.json to only include signals that:
+    STARTUP RECONCILIATION: Filter active signals to only include signals that:
     1. Have telegram_msg_id > 0
-    2. Exist in sent_signals.json (successfully delivered to Telegram)
+    2. Exist in the sent signals store (successfully delivered to Telegram)
     
     This prevents orphaned signals with telegram_msg_id=0 from breaking reply-to chains.
     Called once at startup before normal tracking begins.
     """
     print("[RECONCILE] Starting startup reconciliation...")
     
-    # Load sent_signals.json to build valid signal_id set
-    valid_signal_ids = set()
-    sent_signals_file = 'sent_signals.json'
-    if Path(sent_signals_file).exists():
-        try:
-            with open(sent_signals_file, 'r') as f:
-                sent_data = json.load(f)
-                if isinstance(sent_data, list):
-                    for sig in sent_data:
-                        if sig.get('message_id', 0) > 0 and sig.get('signal_id'):
-                            valid_signal_ids.add(sig['signal_id'])
-        except Exception as e:
-            print(f"[RECONCILE WARN] Error reading sent_signals.json: {e}")
+    # Sent signals store gives indexed signal_id lookups (no full-file scan)
+    sent_store = get_sent_signals_store()
     
-    # Filter active_signals.json
+    # Filter active signals
     removed_count = 0
     kept_count = 0
     
@@ -358,11 +258,11 @@ def reconcile_active_signals_on_startup():
         filtered_signals = []
         
         for sig in active_signals:
-            # Keep only if: (1) telegram_msg_id > 0 AND (2) signal_id in sent_signals.json
+            # Keep only if: (1) telegram_msg_id > 0 AND (2) signal_id in sent signals store
             signal_id = sig.get('signal_id', '')
             telegram_msg_id = sig.get('telegram_msg_id', 0)
             
-            if telegram_msg_id > 0 and signal_id in valid_signal_ids:
+            if telegram_msg_id > 0 and sent_store.get_message_id(signal_id):
                 filtered_signals.append(sig)
                 kept_count += 1
             else:
@@ -384,37 +284,8 @@ def load_new_signals_from_log():
     if not Path(SIGNALS_LOG).exists():
         return []
     
-    # Load sent_signals.json to get telegram_msg_id for signals
-    # CRITICAL FIX: Use signal_id for reliable lookup (timestamp mismatch between CSV and JSON)
-    sent_signals_map = {}
-    sent_signals_file = 'sent_signals.json'  # List format: [{symbol, message_id, timestamp, verdict, signal_id, ...}, ...]
-    if Path(sent_signals_file).exists():
-        try:
-            with open(sent_signals_file, 'r') as f:
-                sent_data = json.load(f)
-                # Handle both old dict format and new list format
-                if isinstance(sent_data, dict):
-                    # Old format: {symbol: {message_id, timestamp, verdict, ...}}
-                    for symbol, sig_data in sent_data.items():
-                        # Try signal_id first, fallback to timestamp key for old data
-                        if 'signal_id' in sig_data and sig_data['signal_id']:
-                            key = sig_data['signal_id']
-                            sent_signals_map[key] = sig_data.get('message_id', 0)
-                        # Legacy timestamp-based key
-                        key_legacy = f"{sig_data['timestamp']}_{symbol}_{sig_data['verdict']}"
-                        sent_signals_map[key_legacy] = sig_data.get('message_id', 0)
-                else:
-                    # New list format: [{symbol, message_id, timestamp, verdict, signal_id, ...}, ...]
-                    for sig_data in sent_data:
-                        # Try signal_id first, fallback to timestamp key for old data
-                        if 'signal_id' in sig_data and sig_data['signal_id']:
-                            key = sig_data['signal_id']
-                            sent_signals_map[key] = sig_data.get('message_id', 0)
-                        # Legacy timestamp-based key
-                        key_legacy = f"{sig_data['timestamp']}_{sig_data['symbol']}_{sig_data['verdict']}"
-                        sent_signals_map[key_legacy] = sig_data.get('message_id', 0)
-        except Exception as e:
-            print(f"[TRACKER WARN] Error reading sent_signals.json: {e}")
+    # Sent signals store: indexed lookups by signal_id instead of rebuilding a full map
+    sent_store = get_sent_signals_store()
     
     # Load all tracked signals from effectiveness_log
     tracked_signals = set()
@@ -453,18 +324,17 @@ def load_new_signals_from_log():
                 
                 # Convert CSV row to signal format
                 try:
-                    # Get telegram_msg_id from sent_signals.json if available
+                    # Get telegram_msg_id from sent signals store if available
                     # CRITICAL FIX: Try signal_id first, fallback to timestamp-based key for old data
                     telegram_msg_id = 0
                     signal_id = row.get('signal_id', '')
                     if signal_id:
                         # New signal_id-based lookup (reliable)
-                        telegram_msg_id = sent_signals_map.get(signal_id, 0)
+                        telegram_msg_id = sent_store.get_message_id(signal_id) or 0
                     
                     if telegram_msg_id == 0:
                         # Fallback to legacy timestamp-based lookup for old data
-                        lookup_key = f"{row['timestamp']}_{row['symbol']}_{row['verdict']}"
-                        telegram_msg_id = sent_signals_map.get(lookup_key, 0)
+                        telegram_msg_id = sent_store.get_message_id_legacy(row['timestamp'], row['symbol'], row['verdict']) or 0
                     
                     # CRITICAL FILTER: Skip signals without valid telegram_msg_id
                     # These are signals where Telegram send failed - they should NOT be tracked
@@ -490,7 +360,7 @@ def load_new_signals_from_log():
                         'ema_long': None,
                         'adx': None,
                         'funding_rate': None,
-                        'telegram_msg_id': telegram_msg_id,  # Get from sent_signals.json
+                        'telegram_msg_id': telegram_msg_id,  # Get from sent signals store
                         'signal_id': signal_id,  # Store signal_id for future tracking
                         'regime': 'neutral'  # Default regime for old signals (for cancellation logic)
                     }
@@ -510,7 +380,7 @@ def log_cancelled_signal(signal_data):
     Log a cancelled signal with its PnL at the time of cancellation.
     
     Args:
-        signal_data: Signal dictionary from sent_signals.json or active_signals.json
+        signal_data: Signal dictionary from the sent signals store or active signals
                     Must contain: timestamp, symbol, verdict, confidence, entry_price
                     Optional: target_min, target_max, duration_minutes, market_strength
     
@@ -530,13 +400,12 @@ def log_cancelled_signal(signal_data):
     lowest_reached = signal_data['entry_price']
     
     try:
-        with ActiveSignalsManager(TRACKING_FILE.replace('sent_signals', 'active_signals')) as active_signals:
-            for sig in active_signals:
-                if (sig['symbol'] == signal_data['symbol'] and 
-                    sig.get('telegram_msg_id') == signal_data.get('message_id')):
-                    highest_reached = sig.get('highest_reached', signal_data['entry_price'])
-                    lowest_reached = sig.get('lowest_reached', signal_data['entry_price'])
-                    break
+        # Read-only indexed lookup by symbol (no rewrite needed)
+        for sig in get_active_signals_table(legacy_file=TRACKING_FILE).find(symbol=signal_data['symbol']):
+            if sig.get('telegram_msg_id') == signal_data.get('message_id'):
+                highest_reached = sig.get('highest_reached', signal_data['entry_price'])
+                lowest_reached = sig.get('lowest_reached', signal_data['entry_price'])
+                break
     except Exception as e:
         print(f"[CANCEL LOG WARN] Could not fetch extremes from active_signals: {e}")
     
@@ -678,11 +547,14 @@ def check_signal_completion(signal):
     
     return True, result_data
 
-def update_signal_extremes(signal):
+def update_signal_extremes(signal, alerts=None):
     """
     Update highest/lowest prices reached during signal lifetime using OHLCV data.
     This prevents missing price movements between checks.
     Also checks and sends alerts for target zone entry and final goal.
+    
+    alerts: optional AlertBatch; when given, alert queue mutations are staged
+    and written once per tracker tick instead of once per call.
     """
     from telegram_utils import send_telegram_message
     
@@ -724,10 +596,16 @@ def update_signal_extremes(signal):
     # Update the last check time to now (AFTER processing candles)
     signal['last_ohlcv_check'] = time.time()
     
+    # Stage into the tick's batch when provided, otherwise write immediately
+    queue_alert = alerts.enqueue_alert if alerts is not None else enqueue_alert
+    
     # CRITICAL: Update any pending/failed alerts with latest extremes
     # This ensures alert payloads stay fresh even if signal completes before alert is sent
     if signal.get('signal_id'):
-        update_alert_extremes(signal['signal_id'], current_highest, current_lowest)
+        if alerts is not None:
+            alerts.update_alert_extremes(signal['signal_id'], current_highest, current_lowest)
+        else:
+            update_alert_extremes(signal['signal_id'], current_highest, current_lowest)
     
     # Check for target zone alerts using EXTREMES, not current price
     # This ensures we alert even if price hit target intra-candle and rebounded
@@ -736,7 +614,7 @@ def update_signal_extremes(signal):
         # BUY: target_min is beginning of zone, target_max is final goal
         if current_highest >= target_min and not signal.get('target_zone_alerted'):
             # Entered target zone - enqueue alert
-            enqueue_alert(
+            queue_alert(
                 symbol=signal['symbol'],
                 verdict='BUY',
                 alert_type='target_zone',
@@ -748,7 +626,7 @@ def update_signal_extremes(signal):
         
         if current_highest >= target_max and not signal.get('final_goal_alerted'):
             # Hit final goal - enqueue alert
-            enqueue_alert(
+            queue_alert(
                 symbol=signal['symbol'],
                 verdict='BUY',
                 alert_type='final_goal',
@@ -762,7 +640,7 @@ def update_signal_extremes(signal):
         # SELL: target_max is beginning of zone, target_min is final goal
         if current_lowest <= target_max and not signal.get('target_zone_alerted'):
             # Entered target zone - enqueue alert
-            enqueue_alert(
+            queue_alert(
                 symbol=signal['symbol'],
                 verdict='SELL',
                 alert_type='target_zone',
@@ -774,7 +652,7 @@ def update_signal_extremes(signal):
         
         if current_lowest <= target_min and not signal.get('final_goal_alerted'):
             # Hit final goal - enqueue alert
-            enqueue_alert(
+            queue_alert(
                 symbol=signal['symbol'],
                 verdict='SELL',
                 alert_type='final_goal',
@@ -966,7 +844,11 @@ def main():
     next_report_time = calculate_next_report_time(REPORT_MINUTE)
     print(f"[REPORT] Next effectiveness report: {next_report_time.strftime('%H:%M:%S')}")
     
+    start_metrics_server('signal_tracker')
+    active_gauge = gauge('tracker_active_signals', 'Signals currently tracked')
+    
     while True:
+        cycle_start = time.time()
         try:
             # Periodically check for new signals from signals_log.csv (every 10 iterations)
             check_count += 1
@@ -1000,6 +882,8 @@ def main():
             with ActiveSignalsManager(TRACKING_FILE) as active_signals:
                 if not active_signals:
                     print(f"\n[TRACKER] {datetime.now().strftime('%H:%M:%S')} - No active signals to track")
+                    active_gauge.set(0)
+                    observe_cycle('tracker_loop', time.time() - cycle_start)
                     time.sleep(CHECK_INTERVAL)
                     continue
                 
@@ -1007,42 +891,46 @@ def main():
                 original_signals = list(active_signals)
                 active_signals.clear()
                 
-                for signal in original_signals:
-                    signal = update_signal_extremes(signal)
+                # All alert queue inserts/extreme updates of this tick are written once on exit
+                with AlertBatch() as alert_batch:
+                    for signal in original_signals:
+                        signal = update_signal_extremes(signal, alerts=alert_batch)
                     
-                    is_complete, result_data = check_signal_completion(signal)
+                        is_complete, result_data = check_signal_completion(signal)
                     
-                    if is_complete and result_data is not None:
-                        log_effectiveness(signal, result_data)
-                        completed_count += 1
+                        if is_complete and result_data is not None:
+                            log_effectiveness(signal, result_data)
+                            completed_count += 1
                         
-                        result_icon = "✅" if result_data['result'] == 'WIN' else "❌"
-                        print(f"\n{result_icon} {signal['symbol']} {signal['verdict']} @ {signal['confidence']:.0%}")
-                        print(f"   Entry: ${signal['entry_price']:,.2f}")
-                        print(f"   Target: ${signal['target_min']:,.2f} - ${signal['target_max']:,.2f}")
-                        print(f"   Result: {result_data['result']} | Profit: {result_data['profit_pct']:+.2f}%")
-                        print(f"   Duration: {result_data['duration_actual']} minutes")
-                    else:
-                        active_signals.append(signal)
+                            result_icon = "✅" if result_data['result'] == 'WIN' else "❌"
+                            print(f"\n{result_icon} {signal['symbol']} {signal['verdict']} @ {signal['confidence']:.0%}")
+                            print(f"   Entry: ${signal['entry_price']:,.2f}")
+                            print(f"   Target: ${signal['target_min']:,.2f} - ${signal['target_max']:,.2f}")
+                            print(f"   Result: {result_data['result']} | Profit: {result_data['profit_pct']:+.2f}%")
+                            print(f"   Duration: {result_data['duration_actual']} minutes")
+                        else:
+                            active_signals.append(signal)
                         
-                        time_left = signal['duration_minutes'] - ((datetime.now() - datetime.strptime(signal['timestamp'], '%Y-%m-%d %H:%M:%S')).total_seconds() / 60)
-                        current_price = signal.get('highest_reached', signal['entry_price']) if signal['verdict'] == 'BUY' else signal.get('lowest_reached', signal['entry_price'])
+                            time_left = signal['duration_minutes'] - ((datetime.now() - datetime.strptime(signal['timestamp'], '%Y-%m-%d %H:%M:%S')).total_seconds() / 60)
+                            current_price = signal.get('highest_reached', signal['entry_price']) if signal['verdict'] == 'BUY' else signal.get('lowest_reached', signal['entry_price'])
                         
-                        if signal['verdict'] == 'BUY':
-                            progress_pct = ((current_price - signal['entry_price']) / (signal['target_min'] - signal['entry_price'])) * 100
-                        else:
-                            progress_pct = ((signal['entry_price'] - current_price) / (signal['entry_price'] - signal['target_max'])) * 100
+                            if signal['verdict'] == 'BUY':
+                                progress_pct = ((current_price - signal['entry_price']) / (signal['target_min'] - signal['entry_price'])) * 100
+                            else:
+                                progress_pct = ((signal['entry_price'] - current_price) / (signal['entry_price'] - signal['target_max'])) * 100
                         
-                        print(f"⏳ {signal['symbol']} {signal['verdict']} @ {signal['confidence']:.0%} | {time_left:.0f}min left | Progress: {progress_pct:.0f}%")
+                            print(f"⏳ {signal['symbol']} {signal['verdict']} @ {signal['confidence']:.0%} | {time_left:.0f}min left | Progress: {progress_pct:.0f}%")
                 
                 # Context manager will save automatically on exit
                 print_status(len(active_signals), completed_count)
+                active_gauge.set(len(active_signals))
             
             # Process alert queue - send any pending alerts with retry logic
             # This runs outside the ActiveSignalsManager context to avoid lock conflicts
             sent_count = process_alert_queue()
             if sent_count > 0:
                 print(f"[ALERT] Successfully sent {sent_count} queued alert(s)")
+            QUEUE_DEPTH.labels(queue='alerts').set(get_queue_status()['pending'])
             
             # Check if it's time to send hourly effectiveness report
             now = datetime.now()
@@ -1069,12 +957,14 @@ def main():
                 next_report_time = calculate_next_report_time(REPORT_MINUTE)
                 print(f"[REPORT] Next report scheduled: {next_report_time.strftime('%H:%M:%S')}", flush=True)
             
+            observe_cycle('tracker_loop', time.time() - cycle_start)
             time.sleep(CHECK_INTERVAL)
             
         except KeyboardInterrupt:
             print("\n\n[TRACKER] Shutting down...")
             break
         except Exception as e:
+            CYCLE_ERRORS.labels(loop='tracker_loop').inc()
             print(f"\n[TRACKER ERROR] {e}")
             import traceback
             traceback.print_exc()
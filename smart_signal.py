@@ -1,4 +1,5 @@
-import time, requests, numpy as np, os, pandas as pd
+import time, numpy as np, os, pandas as pd
+from collections import namedtuple
 from dotenv import load_dotenv
 load_dotenv()
 COINALYZE_API='https://api.coinalyze.net/v1'
@@ -7,6 +8,16 @@ COINALYZE_KEY=os.getenv('COINALYZE_API_KEY')
 # Order Flow Indicators (Nov 15, 2025)
 from order_flow_indicators import calculate_bid_ask_aggression, detect_psychological_levels
 
+# Memory-mapped feature snapshots (JSON files remain the fallback)
+import snapshot_bus
+
+# Per-stage latency spans and cache hit counters (served on /latency)
+import stage_timing
+from metrics_registry import API_REQUESTS
+
+# Keep-alive sessions per host, retry/backoff and circuit breakers
+import http_client
+
 # Simple in-memory cache to reduce API calls (2.5-minute TTL)
 _API_CACHE = {}
 _CACHE_TTL = 150  # seconds
@@ -15,6 +26,9 @@ _CACHE_TTL = 150  # seconds
 _CALIBRATION_CACHE = {}
 _CALIBRATION_TTL = 300  # 5 minutes
 
+# BTC lead-lag snapshot: service heartbeat is 15s, so 30s without an update means it is down
+BTC_LEADLAG_MAX_AGE_SEC = 30
+
 # Rate-limited warning timestamps (UIF-30: prevent log spam)
 _WARN_LOG_TIMESTAMPS = {}
 
@@ -27,25 +41,11 @@ def _warn_once_per_minute(key, message):
         _WARN_LOG_TIMESTAMPS[key] = now
 
 def _get(u,p=None,t=20,retries=5):
-    """GET request with retry logic for 429 rate limit errors"""
+    """GET a Coinalyze endpoint over the pooled client; 429s back off 1.5s, 3s, 6s, 12s (or Retry-After)"""
     p=p or {}
     if COINALYZE_KEY: p['api_key']=COINALYZE_KEY
-    
-    for attempt in range(retries):
-        try:
-            r=requests.get(u,params=p,timeout=t)
-            r.raise_for_status()
-            return r.json()
-        except requests.exceptions.HTTPError as e:
-            # Handle 429 rate limit with longer exponential backoff
-            if e.response.status_code == 429 and attempt < retries - 1:
-                wait_time = (2 ** attempt) * 1.5  # 1.5s, 3s, 6s, 12s, 24s
-                time.sleep(wait_time)
-                continue
-            raise
-    
-    # Should never reach here, but just in case
-    raise Exception(f"Failed after {retries} retries")
+    return http_client.get_json(u, params=p, timeout=t, api='coinalyze',
+                                retry=http_client.RetryPolicy(attempts=retries, backoff=1.5, statuses=(429,)))
 
 def _symbol_to_coinalyze(s):
     symbol_map={
@@ -71,9 +71,11 @@ def fetch_klines(s,i,l=200):
     if cache_key in _API_CACHE:
         cached_data, cached_time = _API_CACHE[cache_key]
         if now - cached_time < _CACHE_TTL:
+            stage_timing.cache_hit('klines')
             return cached_data
     
     # Cache miss or expired - fetch from API
+    stage_timing.cache_miss('klines')
     interval_map={'1m':'1min','3m':'3min','5m':'5min','15m':'15min','30m':'30min','1h':'1hour','2h':'2hour','4h':'4hour','6h':'6hour','12h':'12hour','1d':'daily'}
     iv=interval_map.get(i,'15min')
     to_ts=int(time.time())
@@ -103,9 +105,11 @@ def fetch_open_interest(s):
     if cache_key in _API_CACHE:
         cached_data, cached_time = _API_CACHE[cache_key]
         if now - cached_time < _CACHE_TTL:
+            stage_timing.cache_hit('oi')
             return cached_data
     
     # Cache miss or expired - fetch from API
+    stage_timing.cache_miss('oi')
     sym=_symbol_to_coinalyze(s)
     data=_get(f"{COINALYZE_API}/open-interest",{'symbols':sym,'convert_to_usd':'true'})
     if data and isinstance(data,list) and len(data)>0:
@@ -126,9 +130,11 @@ def fetch_open_interest_hist(s,p='5min',l=30):
     if cache_key in _API_CACHE:
         cached_data, cached_time = _API_CACHE[cache_key]
         if now - cached_time < _CACHE_TTL:
+            stage_timing.cache_hit('oi_hist')
             return cached_data
     
     # Cache miss or expired - fetch from API
+    stage_timing.cache_miss('oi_hist')
     try:
         sym=_symbol_to_coinalyze(s)
         to_ts=int(time.time())
@@ -145,12 +151,19 @@ def fetch_open_interest_hist(s,p='5min',l=30):
     _API_CACHE[cache_key] = (result, now)
     return result
 
-def fetch_liquidations(s,st=None,en=None,l=1000):
+def fetch_liquidations(s,st=None,en=None,l=1000,minutes=None):
     """
     Read liquidation data from liquidation_service data file.
     Returns liquidation summary from Binance WebSocket stream.
+    
+    minutes: last-N-minute window from the service's rolling buckets (the
+    smallest published window covering N). None returns all-time totals.
     """
     try:
+        bus = _fresh_bus('liquidations', 300)
+        if bus is not None:
+            return _bus_liquidations(bus, s, minutes)
+        
         import json
         from pathlib import Path
         liq_file = Path('liquidation_data.json')
@@ -165,17 +178,68 @@ def fetch_liquidations(s,st=None,en=None,l=1000):
         if time.time() - last_update > 300:
             return {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0}
         
+        # Windowed summary (older snapshots without 'windows' fall back to all-time)
+        windows = data.get('windows', {}).get(s)
+        if minutes is not None and windows:
+            published = sorted(int(m) for m in windows)
+            window = next((m for m in published if m >= minutes), published[-1])
+            return windows[str(window)]
+        
         # Return liquidation summary for this symbol
         liquidations = data.get('liquidations', {})
         return liquidations.get(s, {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0})
     except Exception as e:
         return {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0}
 
+def _fresh_bus(name, max_age):
+    """
+    Snapshot bus `name` if its last publish is at most max_age seconds old, else
+    None so the caller falls back to the producer's JSON file (a producer whose
+    bus writes fail keeps updating the file).
+    """
+    bus = snapshot_bus.read(name)
+    if bus is None or time.time() - bus.published > max_age:
+        return None
+    return bus
+
+def _bus_liquidations(bus, symbol, minutes=None):
+    """fetch_liquidations() from a fresh 'liquidations' snapshot bus (same window rules)"""
+    empty = {'long_count': 0, 'short_count': 0, 'long_usd': 0.0, 'short_usd': 0.0}
+    prefix = ''
+    published = snapshot_bus.liquidation_windows(bus)
+    if minutes is not None and published:
+        prefix = f"w{next((m for m in published if m >= minutes), published[-1])}_"
+    summary = bus.symbol(symbol, [prefix + field for field in snapshot_bus.LIQUIDATION_SUMMARY_FIELDS])
+    if summary is None:
+        return empty
+    return {
+        field: (int if field.endswith('count') else float)(summary[prefix + field] or 0)
+        for field in snapshot_bus.LIQUIDATION_SUMMARY_FIELDS
+    }
+
+def _bus_snapshot(name, symbol, fields=None, int_fields=(), max_age=120):
+    """
+    {'symbols': {symbol: {..., 'updated'}}} read from a snapshot bus, shaped like
+    the JSON snapshot it mirrors; None (fall back to the JSON) when the bus is
+    missing, not published for max_age seconds or has no row for symbol.
+    The bus stores float64, so int_fields are cast back to int as in the JSON.
+    """
+    bus = _fresh_bus(name, max_age)
+    if bus is None:
+        return None
+    row = bus.symbol(symbol, fields)
+    if row is None:
+        return None
+    for field in int_fields:
+        if row.get(field) is not None:
+            row[field] = int(row[field])
+    return {'symbols': {symbol: row}}
+
 # TAAPI removed - using local VWAP calculation only (more reliable and free)
 
 def fetch_basis(symbol):
     """
-    Fetch basis_pct from feeds_snapshot.json (written by Data Feeds Service).
+    Fetch basis_pct from the feeds snapshot bus, else feeds_snapshot.json (written by Data Feeds Service).
     Implements 5-second cache and freshness validation.
     
     Returns:
@@ -188,20 +252,20 @@ def fetch_basis(symbol):
     cache_key = 'basis_snapshot'
     now = time.time()
     
+    # Snapshot bus first: no file parse, so no cache needed
+    snapshot = _bus_snapshot('feeds', symbol, ('basis_pct',))
+    
     # Check 5-second cache
-    if cache_key in _API_CACHE:
+    if snapshot is None and cache_key in _API_CACHE:
         cached_snapshot, cached_time = _API_CACHE[cache_key]
         if now - cached_time < 5:  # 5-second cache
             # Use cached snapshot
             snapshot = cached_snapshot
-        else:
-            # Cache expired, reload
-            snapshot = None
-    else:
-        snapshot = None
+            stage_timing.cache_hit(cache_key)
     
     # Load snapshot if not cached
     if snapshot is None:
+        stage_timing.cache_miss(cache_key)
         try:
             import json
             from pathlib import Path
@@ -249,6 +313,45 @@ def fetch_basis(symbol):
             f"Failed to extract basis for {symbol}: {e}")
         return None, None
 
+def _load_snapshot(cache_key, path, cache_sec, label):
+    """
+    Read a feature-service JSON snapshot ({"ts", "symbols": {sym: {..., "updated"}}})
+    with a short in-process cache, shared by all symbols of a cycle.
+    
+    Returns:
+        snapshot dict, or None if missing/corrupt
+    """
+    global _API_CACHE
+    now = time.time()
+    
+    if cache_key in _API_CACHE:
+        cached_snapshot, cached_time = _API_CACHE[cache_key]
+        if now - cached_time < cache_sec:
+            stage_timing.cache_hit(cache_key)
+            return cached_snapshot
+    
+    stage_timing.cache_miss(cache_key)
+    try:
+        import json
+        from pathlib import Path
+        snapshot_path = Path(path)
+        
+        if not snapshot_path.exists():
+            _warn_once_per_minute(f'{cache_key}_missing',
+                f"{label} snapshot not found: {snapshot_path}")
+            return None
+        
+        with open(snapshot_path, 'r') as f:
+            snapshot = json.load(f)
+        
+        _API_CACHE[cache_key] = (snapshot, now)
+        return snapshot
+        
+    except Exception as e:
+        _warn_once_per_minute(f'{cache_key}_read_error',
+            f"Failed to read {label} snapshot: {e}")
+        return None
+
 def fetch_uif_snapshot(symbol):
     """
     Fetch UIF features from uif_snapshot.json (written by UIF Feature Engine).
@@ -270,42 +373,10 @@ def fetch_uif_snapshot(symbol):
                - (None, age_sec) if stale (age > 120s)
                - (uif_dict, age_sec) if fresh and valid
     """
-    global _API_CACHE
-    cache_key = 'uif_snapshot'
     now = time.time()
-    
-    # Check 5-second cache
-    if cache_key in _API_CACHE:
-        cached_snapshot, cached_time = _API_CACHE[cache_key]
-        if now - cached_time < 5:
-            snapshot = cached_snapshot
-        else:
-            snapshot = None
-    else:
-        snapshot = None
-    
-    # Load snapshot if not cached
+    snapshot = _bus_snapshot('uif', symbol, int_fields=('psar_state',)) or _load_snapshot('uif_snapshot', 'data/uif_snapshot.json', 5, 'UIF')
     if snapshot is None:
-        try:
-            import json
-            from pathlib import Path
-            snapshot_path = Path('data/uif_snapshot.json')
-            
-            if not snapshot_path.exists():
-                _warn_once_per_minute('uif_snapshot_missing',
-                    f"UIF snapshot not found: {snapshot_path}")
-                return None, None
-            
-            with open(snapshot_path, 'r') as f:
-                snapshot = json.load(f)
-            
-            # Cache for 5 seconds
-            _API_CACHE[cache_key] = (snapshot, now)
-            
-        except Exception as e:
-            _warn_once_per_minute('uif_snapshot_read_error',
-                f"Failed to read UIF snapshot: {e}")
-            return None, None
+        return None, None
     
     # Extract symbol data
     try:
@@ -344,6 +415,46 @@ def fetch_uif_snapshot(symbol):
             f"Failed to extract UIF for {symbol}: {e}")
         return None, None
 
+def fetch_btc_leadlag(symbol):
+    """
+    Fetch the live BTC lead-lag feature from btc_leadlag_snapshot.json
+    (written by btc_leadlag_service.py every second while BTC trades).
+    
+    Returns for an alt:
+        - best_lag_min: lag (minutes) with the strongest |corr| vs BTC 1m returns
+          (>0 = alt follows BTC, <0 = alt leads BTC)
+        - best_corr / corr_0: correlation at that lag and at lag 0
+        - btc_impulse_pct: BTC move over the last best_lag_min minutes, not yet
+          priced into the alt (0 unless the alt follows BTC)
+        - impulse_score: btc_impulse_pct * best_corr
+    
+    Returns:
+        tuple: (leadlag_dict: dict|None, age_sec: float|None)
+               - (None, None) if snapshot missing/corrupt or no curve for symbol
+               - (None, age_sec) if stale (age > BTC_LEADLAG_MAX_AGE_SEC)
+    """
+    snapshot = _load_snapshot('btc_leadlag_snapshot', 'data/btc_leadlag_snapshot.json', 1, 'BTC lead-lag')
+    if snapshot is None:
+        return None, None
+    
+    symbol_data = snapshot.get('symbols', {}).get(symbol)
+    if not symbol_data or 'best_lag_min' not in symbol_data:
+        return None, None
+    
+    age_sec = round(time.time() - symbol_data.get('updated', 0), 1)
+    if age_sec > BTC_LEADLAG_MAX_AGE_SEC:
+        _warn_once_per_minute(f'btc_leadlag_stale_{symbol}',
+            f"BTC lead-lag data stale for {symbol}: {age_sec}s old (threshold: {BTC_LEADLAG_MAX_AGE_SEC}s)")
+        return None, age_sec
+    
+    return {
+        'best_lag_min': symbol_data.get('best_lag_min', 0),
+        'best_corr': symbol_data.get('best_corr', 0.0),
+        'corr_0': symbol_data.get('corr_0') or 0.0,
+        'btc_impulse_pct': symbol_data.get('btc_impulse_pct', 0.0),
+        'impulse_score': symbol_data.get('impulse_score', 0.0)
+    }, age_sec
+
 def fetch_funding_rate(symbol):
     """
     Fetch current funding rate using OKX API (geolocation-free alternative to Binance).
@@ -362,7 +473,8 @@ def fetch_funding_rate(symbol):
         okx_symbol = f'{base}-USDT-SWAP'
         url = 'https://www.okx.com/api/v5/public/funding-rate'
         params = {'instId': okx_symbol}
-        r = requests.get(url, params=params, timeout=10)
+        # HTTP outcomes are counted by the client; an error code in a 200 body as api_error
+        r = http_client.get(url, params=params, timeout=10, api='okx')
         r.raise_for_status()
         data = r.json()
         
@@ -370,6 +482,7 @@ def fetch_funding_rate(symbol):
             funding_rate = float(data['data'][0]['fundingRate'])
             return funding_rate
         else:
+            API_REQUESTS.labels(api='okx', outcome='api_error').inc()
             print(f"[FUNDING ERROR] {symbol}: OKX API returned code={data.get('code')}, msg={data.get('msg')}")
             return 0.0
     except Exception as e:
@@ -384,6 +497,11 @@ def compute_cvd(symbol, lookback_ms):
     Returns 0.0 if cvd_service is not running or data is unavailable.
     """
     try:
+        # Same 5-minute staleness rule as the file's last_update
+        bus = _fresh_bus('cvd', 300)
+        if bus is not None:
+            return bus.get(symbol, 'cvd')[0] or 0.0
+        
         import json
         from pathlib import Path
         cvd_file = Path('cvd_data.json')
@@ -1481,6 +1599,7 @@ def aggregate_recent_analysis(symbol, minutes=5):
         # Silently fail and return None - will fall back to instant values
         return None
 
+@stage_timing.timed('total')
 def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_window=30, volume_spike_mult=0.5, min_components=3, use_aggregation=False, aggregation_minutes=5):
     """
     Generate trading signal using weighted scoring system.
@@ -1502,6 +1621,9 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
     Note:
         When use_aggregation=True, aggregates last N minutes of analysis data
         for trend-based decisions (81.4% accuracy from optimizer vs instant values)
+        
+        Every data call and indicator block is timed with stage_timing.span
+        (per symbol); the Coinalyze rate-limit sleeps are outside the spans.
     """
     # Load coin-specific configuration
     if config:
@@ -1517,23 +1639,27 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
         }
     
     lb=lookback_minutes*60*1000
-    kl=fetch_klines(symbol, interval, max(vwap_window,60)); 
+    with stage_timing.span('klines', symbol):
+        kl=fetch_klines(symbol, interval, max(vwap_window,60))
     if not kl or len(kl)<2: 
-        return {
+        return SignalResult({
             'symbol':symbol,'interval':interval,'last_close':0,'vwap_ref':0,'cvd':0,
             'oi_now':0,'oi_prev':0,'oi_change':0,
             'liq_summary':{'long_count':0,'short_count':0,'long_usd':0,'short_usd':0},
             'volume':{'last':0,'median':0,'spike':False},'components':{},'verdict':'NO_TRADE',
             'confidence':0.0,'score':0.0,'min_score':0.0,'max_score':0.0
-        }
+        })
     
     # Try to use aggregated data if enabled
     agg_data = None
     if use_aggregation:
-        agg_data = aggregate_recent_analysis(symbol, aggregation_minutes)
+        with stage_timing.span('aggregation', symbol):
+            agg_data = aggregate_recent_analysis(symbol, aggregation_minutes)
     
     # Fetch indicator data (use aggregated if available, otherwise fetch instant)
-    last=float(kl[-1][4]); vwap,vwap_sigma=compute_vwap_sigma(kl, vwap_window)  # Local VWAP calculation with weighted sigma
+    last=float(kl[-1][4])
+    with stage_timing.span('vwap', symbol):
+        vwap,vwap_sigma=compute_vwap_sigma(kl, vwap_window)  # Local VWAP calculation with weighted sigma
     
     # SAFETY CHECK #1: If vwap_sigma < 1e-3, set dev_sigma to 0 (no boost)
     # Reasoning: Extremely low sigma indicates data quality issues or abnormal market conditions
@@ -1578,41 +1704,49 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
         oip = None
     else:
         # Fetch instant values (fallback or when aggregation disabled)
-        cvd=compute_cvd(symbol, lb)
+        with stage_timing.span('cvd', symbol):
+            cvd=compute_cvd(symbol, lb)
         
         # Add 1.0s delay before first Coinalyze API call to prevent burst
         # This spreads 3 API calls over 2s instead of <0.1s (reducing burst from 180/min to 20/min)
-        time.sleep(1.0)
-        oi=fetch_open_interest(symbol)
+        stage_timing.throttle(1.0, symbol)
+        with stage_timing.span('oi', symbol):
+            oi=fetch_open_interest(symbol)
         
         # Add 1.0s delay between Coinalyze API calls to prevent rate limit (40/min)
         # Total delays: 1.0s + 1.0s = 2s per symbol (adds 22s to full cycle, ~88s total)
-        time.sleep(1.0)
-        oih=fetch_open_interest_hist(symbol,'5min',12)
+        stage_timing.throttle(1.0, symbol)
+        with stage_timing.span('oi_hist', symbol):
+            oih=fetch_open_interest_hist(symbol,'5min',12)
         
         oip=oih[-2] if len(oih)>=2 else None
         d_oi=(oi-oip) if oip is not None else 0.0
         oi_change_pct = (d_oi / oip * 100) if oip and oip > 0 else 0.0
-        sp,vl,vm=compute_volume_spike(kl, min(30,len(kl)), volume_spike_mult)
-        rsi=compute_rsi(kl, period=14)
+        with stage_timing.span('volume_rsi', symbol):
+            sp,vl,vm=compute_volume_spike(kl, min(30,len(kl)), volume_spike_mult)
+            rsi=compute_rsi(kl, period=14)
     
     # Price-based indicators (always from klines, not aggregated)
-    liq=fetch_liquidations(symbol)
+    with stage_timing.span('liquidations', symbol):
+        liq=fetch_liquidations(symbol, minutes=config.get('liquidation_window_minutes', 15) if config else None)
     
     # Use strict two-point VWAP cross detection
     vwap_cross_up, vwap_cross_down = detect_strict_vwap_cross(kl, vwap)
     
-    funding_rate=fetch_funding_rate(symbol)
-    ema_short,ema_long,ema_cross_up,ema_cross_down=compute_ema_crossover(kl, short_period=5, long_period=20)
+    with stage_timing.span('funding', symbol):
+        funding_rate=fetch_funding_rate(symbol)
     
-    # Calculate ADX for trend strength detection
-    try:
-        adx = compute_adx(kl, period=14)
-    except Exception as e:
-        print(f"[ADX ERROR] {symbol}: ADX calculation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        adx = None
+    with stage_timing.span('ema_adx', symbol):
+        ema_short,ema_long,ema_cross_up,ema_cross_down=compute_ema_crossover(kl, short_period=5, long_period=20)
+        
+        # Calculate ADX for trend strength detection
+        try:
+            adx = compute_adx(kl, period=14)
+        except Exception as e:
+            print(f"[ADX ERROR] {symbol}: ADX calculation failed: {e}")
+            import traceback
+            traceback.print_exc()
+            adx = None
     
     # Build component dictionary
     # ASYMMETRIC VOLUME FILTER: DOWN movements happen on QUIET volume (pattern mining analysis)
@@ -1632,7 +1766,8 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
     enable_basis = config and config.get('feature_flags', {}).get('enable_basis_in_scoring', False) if config else False
     
     if enable_basis:
-        basis_pct_raw, basis_age_sec = fetch_basis(symbol)
+        with stage_timing.span('basis', symbol):
+            basis_pct_raw, basis_age_sec = fetch_basis(symbol)
         if basis_pct_raw is not None and basis_age_sec is not None and basis_age_sec <= 120:
             # basis_pct_raw is already in percentage (e.g., -0.0461 for -0.0461%)
             # Clamp to ±0.30% to prevent extreme outliers
@@ -1652,7 +1787,8 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
     enable_uif = config and config.get('feature_flags', {}).get('enable_uif_in_scoring', False) if config else False
     
     if enable_uif:
-        uif_data, uif_age_sec = fetch_uif_snapshot(symbol)
+        with stage_timing.span('uif', symbol):
+            uif_data, uif_age_sec = fetch_uif_snapshot(symbol)
         if uif_data is not None and uif_age_sec is not None and uif_age_sec <= 120:
             uif_features = uif_data
             
@@ -1690,7 +1826,8 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
         # BA ratio > 2.0 = aggressive buying (bullish)
         # BA ratio < 0.5 = aggressive selling (bearish)
         try:
-            of_ba_aggression = calculate_bid_ask_aggression(symbol, lookback_minutes=5)
+            with stage_timing.span('order_flow', symbol):
+                of_ba_aggression = calculate_bid_ask_aggression(symbol, lookback_minutes=5)
             weights = coin_cfg.get('weights', {})
             
             # Calculate weighted score component (zero by default for diagnostic phase)
@@ -1730,6 +1867,19 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
             of_psych_levels = {'in_danger_zone': False, 'risk_score': 0, 'nearest_level': 0.0}
             of_score_components['psych_level_risk'] = 0.0
     
+    # BTC LEAD-LAG: live BTC impulse not yet priced into this alt (btc_leadlag_service.py)
+    # DIAGNOSTIC ONLY: weight btc_impulse defaults to 0.0
+    btc_leadlag = None
+    btc_leadlag_age_sec = None
+    btc_impulse_score_component = 0.0
+    enable_btc_leadlag = config and config.get('feature_flags', {}).get('enable_btc_leadlag', False) if config else False
+    
+    if enable_btc_leadlag and symbol != 'BTCUSDT':
+        with stage_timing.span('btc_leadlag', symbol):
+            btc_leadlag, btc_leadlag_age_sec = fetch_btc_leadlag(symbol)
+        if btc_leadlag is not None:
+            btc_impulse_score_component = btc_leadlag['impulse_score'] * coin_cfg.get('weights', {}).get('btc_impulse', 0.0)
+    
     # OI threshold calculation
     # LOWERED TO 0.02% based on pattern mining: real movements occur at -0.02% to +0.03%
     # Previous 0.05% threshold blocked 32.1% of valid movements
@@ -1797,10 +1947,15 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
         for feature_name, score_value in of_score_components.items():
             comp[f'of_{feature_name}_score'] = score_value
     
+    # BTC LEAD-LAG: Add BTC impulse component if available (diagnostic logging only, weight = 0.0)
+    if btc_leadlag is not None:
+        comp['btc_impulse_score'] = btc_impulse_score_component
+    
     # PROFESSIONAL CONFLUENCE-BASED SCORING (replaces weighted sum approach)
     # Check BUY and SELL confluence separately
-    buy_signal, buy_score, buy_max, buy_aligned = calculate_confluence_score(comp, coin_cfg['weights'], direction='BUY')
-    sell_signal, sell_score, sell_max, sell_aligned = calculate_confluence_score(comp, coin_cfg['weights'], direction='SELL')
+    with stage_timing.span('scoring', symbol):
+        buy_signal, buy_score, buy_max, buy_aligned = calculate_confluence_score(comp, coin_cfg['weights'], direction='BUY')
+        sell_signal, sell_score, sell_max, sell_aligned = calculate_confluence_score(comp, coin_cfg['weights'], direction='SELL')
     
     # DEV_SIGMA FILTER: Professional institutional-grade VWAP deviation filter
     # Read per-symbol thresholds from config (with fallback to defaults)
@@ -1977,7 +2132,7 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
     # bear_warning/bull_warning enable early entry on reversals (2-4 minutes faster than old system)
     regime = detect_regime_hybrid(last, vwap, ema_short, ema_long, dev_sigma, adx, comp)
     
-    return {
+    return SignalResult({
         'symbol':symbol,
         'interval':interval,
         'last_close':last,
@@ -2049,8 +2204,14 @@ def decide_signal(symbol, interval, config=None, lookback_minutes=15, vwap_windo
         'of_ba_strength':of_ba_aggression.get('strength', 0) if of_ba_aggression else 0,
         'of_psych_risk':of_psych_levels.get('risk_score', 0) if of_psych_levels else 0,
         'of_in_danger_zone':of_psych_levels.get('in_danger_zone', False) if of_psych_levels else False,
-        'of_nearest_level':round(of_psych_levels.get('nearest_level', 0.0), 2) if of_psych_levels else 0.0
-    }
+        'of_nearest_level':round(of_psych_levels.get('nearest_level', 0.0), 2) if of_psych_levels else 0.0,
+        # BTC LEAD-LAG: live lead-lag feature tracking
+        'btc_leadlag_age_sec':btc_leadlag_age_sec,
+        'btc_lag_min':btc_leadlag['best_lag_min'] if btc_leadlag else None,
+        'btc_lag_corr':btc_leadlag['best_corr'] if btc_leadlag else None,
+        'btc_impulse_pct':btc_leadlag['btc_impulse_pct'] if btc_leadlag else 0.0,
+        'btc_impulse_score_component':round(btc_impulse_score_component, 6)
+    })
 
 def _human_int(n):
     try: return f"{int(round(float(n))):,}".replace(',',' ')
@@ -2240,7 +2401,10 @@ def calculate_dynamic_ttl(symbol, atr, price, volume_ratio, oi_change, oi_curren
     
     return (ttl_minutes, ttl_multiplier, base_interval)
 
-def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, klines=None, volume_data=None, oi_change=0, verdict='BUY', vwap=None):
+PriceTargets = namedtuple('PriceTargets', ['min_pct', 'max_pct', 'duration', 'move_str', 'multiplier',
+                                           'strength_icon', 'strength_label', 'ttl_minutes', 'base_interval'])
+
+def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, klines=None, volume_data=None, oi_change=0, verdict='BUY', vwap=None, atr=None):
     """
     DATA-DRIVEN target calculation using ATR + market strength multipliers.
     NOW WITH DYNAMIC TTL based on volatility and market conditions.
@@ -2249,7 +2413,9 @@ def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, kl
     - Scalping coins: ATR-based targets adjusted by volume/CVD/OI/VWAP strength
     - Intraday coins: Fixed config-based targets for positional trades
     
-    Returns (min_target, max_target, duration_str, move_pct_str, multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
+    atr: period-14 ATR of `klines` if already known (skips recomputing it)
+    
+    Returns PriceTargets (min_target, max_target, duration_str, move_pct_str, multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
     """
     # INTRADAY/POSITIONAL COINS - Use config-based targets for longer holds
     intraday_coins = ['YFIUSDT', 'LUMIAUSDT', 'ANIMEUSDT']
@@ -2261,8 +2427,8 @@ def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, kl
         final_max = targets[1] if len(targets) > 1 else 3.0
         
         # Calculate dynamic TTL for intraday coins too
-        atr_intraday = None
-        if klines and len(klines) >= 15:
+        atr_intraday = atr
+        if atr_intraday is None and klines and len(klines) >= 15:
             atr_intraday = calculate_atr(klines, period=14)
         
         volume_ratio = 1.0
@@ -2291,13 +2457,12 @@ def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, kl
         
         strength_icon = "📊"
         strength_label = "Intraday"
-        return (final_min, final_max, duration, f"{final_min:.1f}-{final_max:.1f}%", multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
+        return PriceTargets(final_min, final_max, duration, f"{final_min:.1f}-{final_max:.1f}%", multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
     
     # SCALPING COINS - ATR-based data-driven targets
     
     # Step 1: Calculate ATR baseline (actual market volatility)
-    atr = None
-    if klines and len(klines) >= 15:  # Need period+1 candles for period-14 ATR
+    if atr is None and klines and len(klines) >= 15:  # Need period+1 candles for period-14 ATR
         atr = calculate_atr(klines, period=14)
     
     # Fallback if ATR calculation fails: use default conservative targets
@@ -2452,7 +2617,74 @@ def calculate_price_targets(price, confidence, cvd, symbol, coin_config=None, kl
     final_min = max(0.2, final_min)
     final_max = max(0.4, final_max)
     
-    return (final_min, final_max, duration, f"{final_min:.1f}-{final_max:.1f}%", multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
+    return PriceTargets(final_min, final_max, duration, f"{final_min:.1f}-{final_max:.1f}%", multiplier, strength_icon, strength_label, ttl_minutes, base_interval)
+
+_UNSET = object()
+
+class SignalResult(dict):
+    """
+    decide_signal() result: the same dict every consumer reads, plus derived
+    values (ATR, price targets + TTL, VWAP distance) computed on first access
+    and cached for the rest of the pipeline (Telegram text, signal log,
+    tracking, AI context).
+    
+    Targets are cached against (verdict, last_close, confidence), so a later
+    gate that rewrites the verdict gets fresh targets instead of stale ones.
+    """
+    __slots__ = ('_atr', '_targets', '_targets_key')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._atr = _UNSET
+        self._targets = None
+        self._targets_key = None
+    
+    @property
+    def atr(self):
+        """Period-14 ATR of the signal klines (decide_signal's value when present)"""
+        if self._atr is _UNSET:
+            self._atr = self['atr'] if self.get('atr') is not None else calculate_atr(self.get('klines'), period=14)
+        return self._atr
+    
+    @property
+    def targets(self) -> PriceTargets:
+        """calculate_price_targets() for this signal, computed once"""
+        key = (self.get('verdict'), self.get('last_close'), self.get('confidence'))
+        if self._targets is None or self._targets_key != key:
+            self._targets = calculate_price_targets(
+                self['last_close'],
+                self['confidence'],
+                self['cvd'],
+                self['symbol'],
+                self.get('coin_config'),
+                klines=self.get('klines'),
+                volume_data=self.get('volume'),
+                oi_change=self.get('oi_change', 0),
+                verdict=self['verdict'],
+                vwap=self.get('vwap_ref'),
+                atr=self.atr
+            )
+            self._targets_key = key
+        return self._targets
+    
+    @property
+    def target_prices(self):
+        """(target_min, target_max) prices; SELL targets are below entry"""
+        t = self.targets
+        price = self['last_close']
+        if self['verdict'] == 'BUY':
+            return price * (1 + t.min_pct / 100), price * (1 + t.max_pct / 100)
+        return price * (1 - t.max_pct / 100), price * (1 - t.min_pct / 100)
+    
+    @property
+    def vwap_distance_pct(self):
+        """(price - VWAP) / VWAP in %, None without a VWAP"""
+        vwap = self.get('vwap_ref')
+        return (self['last_close'] - vwap) / vwap * 100 if vwap else None
+
+def signal_result(res) -> SignalResult:
+    """res as a SignalResult (no copy if it already is one)"""
+    return res if isinstance(res, SignalResult) else SignalResult(res)
 
 def format_signal_telegram(s: dict)->str:
     liq=s['liq_summary']; arr='🟢' if s['verdict']=='BUY' else ('🔴' if s['verdict']=='SELL' else '⚪️')
@@ -2521,18 +2753,8 @@ def format_signal_telegram(s: dict)->str:
     
     # Add price targets for BUY/SELL signals
     if s['verdict'] in ['BUY', 'SELL']:
-        min_pct, max_pct, duration, move_str, multiplier, strength_icon, strength_label, ttl_minutes, base_interval = calculate_price_targets(
-            s['last_close'], 
-            s['confidence'], 
-            s['cvd'], 
-            s['symbol'], 
-            s.get('coin_config'),
-            klines=s.get('klines'),
-            volume_data=s.get('volume'),
-            oi_change=s.get('oi_change', 0),
-            verdict=s['verdict'],  # Pass verdict for direction-aware CVD multiplier
-            vwap=s.get('vwap_ref')  # Pass VWAP for directional mean-reversion logic
-        )
+        # Computed once per signal and reused by the signal log and tracking
+        min_pct, max_pct, duration, move_str, multiplier, strength_icon, strength_label, ttl_minutes, base_interval = signal_result(s).targets
         
         # Store TTL and base_interval in signal dict for tracking and logging
         s['ttl_minutes'] = ttl_minutes
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Snapshot Bus - memory-mapped, versioned feature snapshots shared between processes
+
+Each producer (data feeds, UIF engine, CVD, liquidations) owns one file
+data/bus/<name>.bus with a fixed layout:
+
+    header   magic 'SBUS', layout version, seq (uint64), published (float64),
+             n_symbols, n_fields, names_len
+    names    JSON {"symbols": [...], "fields": [...]} (schema, fixed per file)
+    values   float64[n_symbols, n_fields]  (NaN = no value)
+    updated  float64[n_symbols, n_fields]  (per-field update time, 0 = never)
+
+Writers update the mapped arrays in place under a sequence lock: seq is made
+odd, the rows are written, and seq is made even again. Readers copy the arrays
+and retry if seq was odd or changed during the copy, so they never see a torn
+snapshot and never parse JSON. A schema change (new symbol or field) writes a
+fresh file and os.replace()s it in; readers notice the new inode and remap.
+
+The JSON snapshots stay the source of truth for everything else (replay,
+health checks, scripts); readers fall back to them when a bus is missing.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BUS_DIR = 'data/bus'
+BUS_SUFFIX = '.bus'
+MAGIC = b'SBUS'
+LAYOUT_VERSION = 1
+
+_HEADER = struct.Struct('<4sIQdIII4x')  # magic, version, seq, published, n_symbols, n_fields, names_len
+_SEQ_OFFSET = 8
+_PUBLISHED_OFFSET = 16
+READ_RETRIES = 100
+
+# Fixed schemas of the JSON-backed producers
+CVD_FIELDS = ('cvd',)
+LIQUIDATION_SUMMARY_FIELDS = ('long_count', 'short_count', 'long_usd', 'short_usd')
+
+
+def bus_path(name: str, bus_dir: str = BUS_DIR) -> str:
+    return os.path.join(bus_dir, name + BUS_SUFFIX)
+
+
+def _layout(n_symbols: int, n_fields: int, names_len: int) -> Tuple[int, int, int]:
+    """(values offset, updated offset, file size); arrays are 8-byte aligned"""
+    values_offset = _HEADER.size + (names_len + 7) // 8 * 8
+    array_bytes = n_symbols * n_fields * 8
+    return values_offset, values_offset + array_bytes, values_offset + 2 * array_bytes
+
+
+class _Mapping:
+    """One mapped bus file: header fields plus values/updated array views"""
+
+    def __init__(self, path: str, writable: bool = False):
+        self.inode = os.stat(path).st_ino
+        self.mm = np.memmap(path, dtype=np.uint8, mode='r+' if writable else 'r')
+        magic, version, _, _, n_symbols, n_fields, names_len = _HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise ValueError(f"{path}: not a v{LAYOUT_VERSION} snapshot bus")
+        names = json.loads(bytes(self.mm[_HEADER.size:_HEADER.size + names_len]).decode('utf-8'))
+        self.symbols: List[str] = names['symbols']
+        self.fields: List[str] = names['fields']
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.field_index = {f: j for j, f in enumerate(self.fields)}
+
+        values_offset, updated_offset, size = _layout(n_symbols, n_fields, names_len)
+        shape = (n_symbols, n_fields)
+        self.seq = self.mm[_SEQ_OFFSET:_SEQ_OFFSET + 8].view(np.uint64)
+        self.published = self.mm[_PUBLISHED_OFFSET:_PUBLISHED_OFFSET + 8].view(np.float64)
+        self.values = self.mm[values_offset:updated_offset].view(np.float64).reshape(shape)
+        self.updated = self.mm[updated_offset:size].view(np.float64).reshape(shape)
+
+
+class BusSnapshot:
+    """Consistent copy of one bus at sequence number seq"""
+
+    __slots__ = ('name', 'seq', 'published', 'symbol_index', 'field_index', 'values', 'updated')
+
+    def __init__(self, name, seq, published, symbol_index, field_index, values, updated):
+        self.name = name
+        self.seq = seq
+        self.published = published
+        self.symbol_index = symbol_index
+        self.field_index = field_index
+        self.values = values
+        self.updated = updated
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.field_index)
+
+    def get(self, symbol: str, field: str) -> Tuple[Optional[float], Optional[float]]:
+        """(value, updated) of one field; (None, None) if never published"""
+        i = self.symbol_index.get(symbol)
+        j = self.field_index.get(field)
+        if i is None or j is None or self.updated[i, j] <= 0:
+            return None, None
+        value = self.values[i, j]
+        return (None if np.isnan(value) else float(value)), float(self.updated[i, j])
+
+    def symbol(self, symbol: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Optional[float]]]:
+        """{field: value, ..., 'updated': newest field update} or None if the symbol was never published"""
+        i = self.symbol_index.get(symbol)
+        if i is None or not (self.updated[i] > 0).any():
+            return None
+        out = {}
+        for field in (self.field_index if fields is None else fields):
+            out[field] = self.get(symbol, field)[0]
+        out['updated'] = float(self.updated[i].max())
+        return out
+
+
+class BusWriter:
+    """Producer side of one bus; not shared between threads without external locking"""
+
+    def __init__(self, name: str, symbols: Sequence[str], fields: Sequence[str], bus_dir: str = BUS_DIR):
+        self.name = name
+        self.path = bus_path(name, bus_dir)
+        self.fields = list(fields)
+        self._map: Optional[_Mapping] = None
+        self._open(list(symbols))
+
+    def _open(self, symbols: List[str]):
+        """Map the existing file if its schema covers `symbols`, else create one (keeping current symbols and values)"""
+        try:
+            current = _Mapping(self.path, writable=True)
+            if current.fields == self.fields:
+                # Keep every symbol already on the bus: a restarted producer's first publish may be partial
+                symbols = current.symbols + [s for s in symbols if s not in current.symbol_index]
+            if current.symbols == symbols and current.fields == self.fields:
+                if int(current.seq[0]) & 1:
+                    current.seq[0] += 1  # A writer died mid-publish: make seq even again
+                self._map = current
+                return
+        except (OSError, ValueError):
+            current = None
+
+        names = json.dumps({'symbols': symbols, 'fields': self.fields}, separators=(',', ':')).encode('utf-8')
+        values_offset, updated_offset, size = _layout(len(symbols), len(self.fields), len(names))
+        values = np.full((len(symbols), len(self.fields)), np.nan)
+        updated = np.zeros_like(values)
+        seq, published = 0, 0.0
+        if current is not None:
+            seq, published = int(current.seq[0]) + 2 & ~1, float(current.published[0])
+            for i, symbol in enumerate(symbols):
+                for j, field in enumerate(self.fields):
+                    if symbol in current.symbol_index and field in current.field_index:
+                        values[i, j] = current.values[current.symbol_index[symbol], current.field_index[field]]
+                        updated[i, j] = current.updated[current.symbol_index[symbol], current.field_index[field]]
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, LAYOUT_VERSION, seq, published, len(symbols), len(self.fields), len(names)))
+            f.write(names.ljust(values_offset - _HEADER.size, b' '))
+            f.write(values.tobytes())
+            f.write(updated.tobytes())
+        os.replace(tmp_path, self.path)
+        self._map = _Mapping(self.path, writable=True)
+
+    def publish(self, rows: Dict[str, Dict[str, Optional[float]]], now: Optional[float] = None):
+        """
+        Write rows {symbol: {field: value, 'updated': ts?}}.
+
+        Fields present in a row get the row's 'updated' time (default now);
+        None is stored as NaN. Fields and symbols not in rows keep their value.
+        """
+        now = time.time() if now is None else now
+        m = self._map
+        new_symbols = [s for s in rows if s not in m.symbol_index]
+        if new_symbols:
+            self._open(m.symbols + new_symbols)
+            m = self._map
+
+        m.seq[0] += 1  # odd: write in progress
+        try:
+            for symbol, row in rows.items():
+                i = m.symbol_index[symbol]
+                ts = row.get('updated') or now
+                for field, value in row.items():
+                    j = m.field_index.get(field)
+                    if j is None:
+                        continue
+                    m.values[i, j] = np.nan if value is None else value
+                    m.updated[i, j] = ts
+            m.published[0] = now
+        finally:
+            m.seq[0] += 1  # even: consistent
+
+
+class BusReader:
+    """Reader side of one bus (cheap to keep per process)"""
+
+    def __init__(self, name: str, bus_dir: str = BUS_DIR):
+        self.name = name
+        self.path = bus_path(name, bus_dir)
+        self._map: Optional[_Mapping] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> Optional[BusSnapshot]:
+        """Consistent snapshot, or None if the bus does not exist / is being rewritten"""
+        with self._lock:
+            try:
+                inode = os.stat(self.path).st_ino
+                if self._map is None or self._map.inode != inode:
+                    self._map = _Mapping(self.path)
+            except (OSError, ValueError):
+                self._map = None
+                return None
+
+            m = self._map
+            for _ in range(READ_RETRIES):
+                seq = int(m.seq[0])
+                if seq & 1:
+                    continue
+                values = m.values.copy()
+                updated = m.updated.copy()
+                published = float(m.published[0])
+                if int(m.seq[0]) == seq:
+                    return BusSnapshot(self.name, seq, published, m.symbol_index, m.field_index, values, updated)
+            return None
+
+
+_writers: Dict[str, BusWriter] = {}
+_readers: Dict[str, BusReader] = {}
+_registry_lock = threading.Lock()
+
+
+def publish(name: str, rows: Dict[str, Dict[str, Optional[float]]], fields: Sequence[str],
+            now: Optional[float] = None, bus_dir: str = BUS_DIR):
+    """Publish rows to bus `name` with schema `fields` (writer created on first use)"""
+    with _registry_lock:
+        key = bus_path(name, bus_dir)
+        writer = _writers.get(key)
+        if writer is None or writer.fields != list(fields):
+            writer = _writers[key] = BusWriter(name, list(rows), fields, bus_dir)
+        writer.publish(rows, now)
+
+
+def read(name: str, bus_dir: str = BUS_DIR) -> Optional[BusSnapshot]:
+    """Latest consistent snapshot of bus `name` (None if unavailable)"""
+    key = bus_path(name, bus_dir)
+    reader = _readers.get(key)
+    if reader is None:
+        with _registry_lock:
+            reader = _readers.setdefault(key, BusReader(name, bus_dir))
+    return reader.read()
+
+
+def read_view(names: Iterable[str], bus_dir: str = BUS_DIR) -> Dict[str, Optional[BusSnapshot]]:
+    """One consistent snapshot per bus, read back to back (a decide_signal cycle's view)"""
+    return {name: read(name, bus_dir) for name in names}
+
+
+def liquidation_fields(window_minutes: Iterable[int]) -> Tuple[str, ...]:
+    """All-time summary fields plus w<N>_<field> per published window"""
+    return LIQUIDATION_SUMMARY_FIELDS + tuple(
+        f"w{m}_{field}" for m in window_minutes for field in LIQUIDATION_SUMMARY_FIELDS
+    )
+
+
+def liquidation_windows(snapshot: BusSnapshot) -> List[int]:
+    """Window lengths (minutes) published on a liquidations bus"""
+    return sorted({int(f[1:].split('_', 1)[0]) for f in snapshot.field_index if f.startswith('w')})
+
+
+def publish_cvd(data: dict, now: Optional[float] = None, bus_dir: str = BUS_DIR):
+    """Publish the cvd_data.json layout ({'cvd': {symbol: value}, 'last_update'})"""
+    now = data.get('last_update', now)
+    publish('cvd', {symbol: {'cvd': value} for symbol, value in data.get('cvd', {}).items()}, CVD_FIELDS, now, bus_dir)
+
+
+def publish_liquidations(data: dict, now: Optional[float] = None, bus_dir: str = BUS_DIR):
+    """Publish the liquidation_data.json layout ({'liquidations', 'windows', 'window_minutes', 'last_update'})"""
+    now = data.get('last_update', now)
+    minutes = data.get('window_minutes') or sorted({int(m) for w in data.get('windows', {}).values() for m in w})
+    rows = {}
+    for symbol, totals in data.get('liquidations', {}).items():
+        row = {field: totals.get(field) for field in LIQUIDATION_SUMMARY_FIELDS}
+        for m, summary in data.get('windows', {}).get(symbol, {}).items():
+            for field in LIQUIDATION_SUMMARY_FIELDS:
+                row[f"w{m}_{field}"] = summary.get(field)
+        rows[symbol] = row
+    publish('liquidations', rows, liquidation_fields(minutes), now, bus_dir)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Stage Timing - per-stage latency spans and cache counters for the signal loop
+
+decide_signal() makes about ten data calls (Coinalyze klines/OI, OKX
+funding, liquidation/CVD/basis/UIF snapshots, order flow) plus indicator
+math. Each one is wrapped in a span:
+
+    with stage_timing.span('oi', symbol):
+        oi = fetch_open_interest(symbol)
+
+Rate-limit pauses go through stage_timing.throttle(seconds, symbol): they are
+recorded as the 'throttle' stage and subtracted from the enclosing timed()
+stage ('total'), which therefore measures compute and I/O only.
+
+Durations go into a bounded reservoir per (symbol, stage), so p50/p95/p99
+reflect the most recent RESERVOIR_SIZE calls. Cache lookups in front of the
+API calls are counted per kind with cache_hit()/cache_miss().
+
+snapshot() returns everything as a dict, served as JSON on /latency next to
+the signal bot's /metrics (metrics_registry.MetricsServer). The same numbers
+are exported as Prometheus summaries by a registry collector, and
+daily_report.py adds a per-stage summary to the daily report.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+import metrics_registry
+
+RESERVOIR_SIZE = 1024  # Recent durations kept per (symbol, stage)
+PERCENTILES = (50, 95, 99)
+ALL_SYMBOLS = '*'
+
+
+def _percentiles(durations) -> dict:
+    values = np.fromiter(durations, dtype=float)
+    if not len(values):
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, PERCENTILES)
+    return {
+        'count': len(values),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+class StageTimer:
+    """Thread-safe span recorder with bounded per-stage reservoirs"""
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self._durations: Dict[tuple, deque] = {}
+        self._calls: Dict[tuple, int] = defaultdict(int)
+        self._errors: Dict[tuple, int] = defaultdict(int)
+        self._cache = defaultdict(lambda: [0, 0])  # kind -> [hits, misses]
+        self.started = time.time()
+
+    @contextmanager
+    def span(self, stage: str, symbol: str = ALL_SYMBOLS):
+        """Time the enclosed block as `stage` (exceptions are counted and re-raised)"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(stage, symbol, (time.perf_counter() - start) * 1000, failed)
+
+    def record(self, stage: str, symbol: str, duration_ms: float, failed: bool = False):
+        key = (symbol, stage)
+        with self._lock:
+            reservoir = self._durations.get(key)
+            if reservoir is None:
+                reservoir = self._durations[key] = deque(maxlen=self.reservoir_size)
+            reservoir.append(duration_ms)
+            self._calls[key] += 1
+            if failed:
+                self._errors[key] += 1
+
+    def cache_hit(self, kind: str):
+        with self._lock:
+            self._cache[kind][0] += 1
+
+    def cache_miss(self, kind: str):
+        with self._lock:
+            self._cache[kind][1] += 1
+
+    def stage_summary(self, symbol: Optional[str] = None) -> Dict[str, dict]:
+        """
+        {stage: {count, p50_ms, p95_ms, p99_ms, max_ms, calls, errors}} for one
+        symbol, or pooled over all symbols when symbol is None
+        """
+        pooled = defaultdict(list)
+        calls = defaultdict(int)
+        errors = defaultdict(int)
+        with self._lock:
+            for (sym, stage), reservoir in self._durations.items():
+                if symbol is None or sym == symbol:
+                    pooled[stage].extend(reservoir)
+                    calls[stage] += self._calls[(sym, stage)]
+                    errors[stage] += self._errors[(sym, stage)]
+        summary = {}
+        for stage, durations in pooled.items():
+            summary[stage] = _percentiles(durations)
+            summary[stage]['calls'] = calls[stage]
+            summary[stage]['errors'] = errors[stage]
+        return summary
+
+    def cache_summary(self) -> Dict[str, dict]:
+        """{kind: {hits, misses, hit_rate}}"""
+        with self._lock:
+            counts = {kind: tuple(c) for kind, c in self._cache.items()}
+        return {
+            kind: {'hits': hits, 'misses': misses,
+                   'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0}
+            for kind, (hits, misses) in counts.items()
+        }
+
+    def snapshot(self) -> dict:
+        """Everything recorded since start/reset, JSON-serializable"""
+        with self._lock:
+            symbols = sorted({sym for sym, _ in self._durations})
+        return {
+            'since': self.started,
+            'reservoir_size': self.reservoir_size,
+            'stages': self.stage_summary(),
+            'symbols': {sym: self.stage_summary(sym) for sym in symbols},
+            'cache': self.cache_summary()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._calls.clear()
+            self._errors.clear()
+            self._cache.clear()
+            self.started = time.time()
+
+
+_timer = StageTimer()
+_local = threading.local()  # Per-thread seconds spent in throttle()
+
+
+def get_timer() -> StageTimer:
+    """Process-wide timer used by the module-level helpers"""
+    return _timer
+
+
+def span(stage: str, symbol: str = ALL_SYMBOLS):
+    return _timer.span(stage, symbol)
+
+
+def throttle(seconds: float, symbol: str = ALL_SYMBOLS):
+    """
+    Deliberate rate-limit pause: timed as the 'throttle' stage and left out of
+    any enclosing timed() stage, so 'total' reflects compute and I/O only.
+    """
+    start = time.perf_counter()
+    with _timer.span('throttle', symbol):
+        time.sleep(seconds)
+    _local.paused = getattr(_local, 'paused', 0.0) + (time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """
+    Decorator: time every call as `stage`, keyed by the first positional
+    argument (symbol), minus the throttle() pauses made during the call
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            symbol = args[0] if args else ALL_SYMBOLS
+            paused_before = getattr(_local, 'paused', 0.0)
+            start = time.perf_counter()
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                paused = getattr(_local, 'paused', 0.0) - paused_before
+                _timer.record(stage, symbol, (time.perf_counter() - start - paused) * 1000, failed)
+        return wrapper
+    return decorator
+
+
+def cache_hit(kind: str):
+    _timer.cache_hit(kind)
+
+
+def cache_miss(kind: str):
+    _timer.cache_miss(kind)
+
+
+def snapshot() -> dict:
+    return _timer.snapshot()
+
+
+def format_report(stages: Optional[Dict[str, dict]] = None, cache: Optional[Dict[str, dict]] = None) -> str:
+    """Compact per-stage table (Telegram HTML) of pooled latencies and cache hit rates"""
+    stages = _timer.stage_summary() if stages is None else stages
+    cache = _timer.cache_summary() if cache is None else cache
+    if not stages:
+        return "<b>⏱ Signal Latency</b>\n<i>No spans recorded</i>"
+
+    lines = ["<b>⏱ Signal Latency (ms)</b>"]
+    lines.append(f"<code>{'Stage':<14} {'p50':>7} {'p95':>7} {'p99':>7} {'Err':>4}</code>")
+    lines.append("<code>" + "─" * 42 + "</code>")
+    for stage, s in sorted(stages.items(), key=lambda kv: -kv[1].get('p95_ms', 0)):
+        lines.append(f"<code>{stage:<14} {s['p50_ms']:>7.1f} {s['p95_ms']:>7.1f} {s['p99_ms']:>7.1f} "
+                     f"{s.get('errors', 0):>4}</code>")
+    if cache:
+        rates = ', '.join(f"{kind} {c['hit_rate'] * 100:.0f}%" for kind, c in sorted(cache.items()))
+        lines.append(f"<i>Cache hit rate: {rates}</i>")
+    return "\n".join(lines)
+
+
+def _collect():
+    """metrics_registry collector: pooled stage quantiles (ms -> s) and cache counters"""
+    stages = _timer.stage_summary()
+    cache = _timer.cache_summary()
+    quantiles = []
+    counts = []
+    for stage, s in stages.items():
+        for q in PERCENTILES:
+            quantiles.append(({'stage': stage, 'quantile': str(q / 100)}, s[f'p{q}_ms'] / 1000))
+        counts.append(({'stage': stage}, s['calls']))
+    yield ('signal_stage_seconds', 'summary', 'decide_signal stage latency over recent calls', quantiles)
+    yield ('signal_stage_calls_total', 'counter', 'decide_signal stage calls', counts)
+    yield ('signal_cache_hits_total', 'counter', '_API_CACHE hits by kind',
+           [({'kind': kind}, c['hits']) for kind, c in cache.items()])
+    yield ('signal_cache_misses_total', 'counter', '_API_CACHE misses by kind',
+           [({'kind': kind}, c['misses']) for kind, c in cache.items()])
+
+
+metrics_registry.REGISTRY.register_collector(_collect)
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+State Store - SQLite-backed persistent storage for bot state
+
+Replaces whole-file JSON rewrites (lock file + tempfile + fsync + rename)
+with a single transactional SQLite database in WAL mode. Shared by main.py,
+signal_tracker.py, alert_manager.py and the BingX trader.
+
+Tables:
+- sent_signals: every signal successfully delivered to Telegram, keyed by signal_id
+- active_signals: signals under effectiveness tracking (was active_signals.json)
+- alert_queue: pending/failed Telegram alerts (was alerts_queue.json)
+- positions: open trader positions (was bingx_trader/data/active_positions.json)
+"""
+
+import sqlite3
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+STATE_DB_FILE = 'bot_state.db'
+LEGACY_SENT_SIGNALS_FILE = 'sent_signals.json'
+LEGACY_ACTIVE_SIGNALS_FILE = 'active_signals.json'
+LEGACY_ALERTS_QUEUE_FILE = 'alerts_queue.json'
+LEGACY_POSITIONS_FILE = 'bingx_trader/data/active_positions.json'
+
+
+class StateStore:
+    """Shared SQLite connection (WAL mode) used by all state tables"""
+
+    def __init__(self, db_path=STATE_DB_FILE):
+        """Open database and create tables if they don't exist"""
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: readers never block the writer and vice versa (main.py + tracker + alerts)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._init_db()
+
+    def _init_db(self):
+        """Create tables if they don't exist"""
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS sent_signals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    signal_id TEXT UNIQUE,
+                    symbol TEXT NOT NULL,
+                    verdict TEXT NOT NULL,
+                    message_id INTEGER NOT NULL DEFAULT 0,
+                    timestamp TEXT NOT NULL,
+                    confidence REAL,
+                    entry_price REAL
+                )
+            ''')
+            # Legacy lookup for rows written before signal_id existed
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sent_signals_legacy
+                ON sent_signals(timestamp, symbol, verdict)
+            ''')
+
+    def transaction(self):
+        """Short write transaction (BEGIN IMMEDIATE ... COMMIT/ROLLBACK)"""
+        return _Transaction(self)
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class _Transaction:
+    """Context manager holding the store lock for one BEGIN IMMEDIATE transaction"""
+
+    def __init__(self, store: StateStore):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        try:
+            self.store.conn.execute('BEGIN IMMEDIATE')
+        except Exception:
+            self.store._lock.release()
+            raise
+        return self.store.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.store.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.store._lock.release()
+        return False
+
+
+class JsonRowTable:
+    """
+    Table of JSON documents with a few indexed columns.
+
+    Each row stores the full dict as JSON plus indexed columns extracted from
+    it, so callers keep working with plain dicts while reads can filter by
+    symbol/status and writes touch single rows. Row order follows insertion.
+    """
+
+    def __init__(self, store: StateStore, table: str, key_fn: Callable[[Dict], str],
+                 columns: Dict[str, Callable[[Dict], object]], indexes: List[tuple] = ()):
+        self.store = store
+        self.table = table
+        self.key_fn = key_fn
+        self.columns = columns
+        col_defs = ''.join(f', {name}' for name in columns)
+        with self.store._lock:
+            self.store.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE{col_defs},
+                    payload TEXT NOT NULL
+                )
+            ''')
+            for index_cols in indexes:
+                name = f"idx_{table}_{'_'.join(index_cols)}"
+                self.store.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(index_cols)})")
+
+    @staticmethod
+    def _dumps(item: Dict) -> str:
+        return json.dumps(item, sort_keys=True, default=str)
+
+    def _params(self, item: Dict):
+        return [self.key_fn(item)] + [fn(item) for fn in self.columns.values()] + [self._dumps(item)]
+
+    def _rows(self, where='', params=()):
+        with self.store._lock:
+            return self.store.conn.execute(
+                f'SELECT key, payload FROM {self.table} {where} ORDER BY seq', params
+            ).fetchall()
+
+    def all(self) -> List[Dict]:
+        """All documents in insertion order"""
+        return [json.loads(row['payload']) for row in self._rows()]
+
+    def _where(self, filters):
+        clauses, params = [], []
+        for name, value in filters.items():
+            if name not in self.columns:
+                raise ValueError(f"{self.table}: '{name}' is not an indexed column")
+            if isinstance(value, (tuple, list, set)):
+                clauses.append(f"{name} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f'{name} IS ?')
+                params.append(value)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+    def find(self, **filters) -> List[Dict]:
+        """Documents matching indexed column values (value may be a tuple for IN)"""
+        where, params = self._where(filters)
+        return [json.loads(row['payload']) for row in self._rows(where, params)]
+
+    def count(self, **filters) -> int:
+        where, params = self._where(filters)
+        with self.store._lock:
+            return self.store.conn.execute(f'SELECT COUNT(*) FROM {self.table} {where}', params).fetchone()[0]
+
+    def insert(self, item: Dict, conn=None):
+        """Insert a new document (replaces a document with the same key)"""
+        placeholders = ', '.join('?' * (len(self.columns) + 2))
+        col_names = ', '.join(['key'] + list(self.columns) + ['payload'])
+        updates = ', '.join(f'{name} = excluded.{name}' for name in list(self.columns) + ['payload'])
+        sql = (f'INSERT INTO {self.table} ({col_names}) VALUES ({placeholders}) '
+               f'ON CONFLICT(key) DO UPDATE SET {updates}')
+        self._execute(sql, self._params(item), conn)
+
+    def update(self, item: Dict, conn=None):
+        """Update an existing document in place (no-op if it was deleted meanwhile)"""
+        sets = ', '.join(f'{name} = ?' for name in list(self.columns) + ['payload'])
+        params = self._params(item)
+        self._execute(f'UPDATE {self.table} SET {sets} WHERE key = ?', params[1:] + [params[0]], conn)
+
+    def delete(self, key: str, conn=None):
+        self._execute(f'DELETE FROM {self.table} WHERE key = ?', (key,), conn)
+
+    def _execute(self, sql, params, conn=None):
+        if conn is not None:
+            conn.execute(sql, params)
+            return
+        with self.store.transaction() as tx:
+            tx.execute(sql, params)
+
+    def snapshot(self):
+        """Load all documents plus their serialized form for later diffing"""
+        rows = self._rows()
+        items = [json.loads(row['payload']) for row in rows]
+        return items, {row['key']: row['payload'] for row in rows}
+
+    def apply_changes(self, original: Dict[str, str], items: List[Dict]):
+        """
+        Persist the difference between a snapshot and the edited list.
+
+        Only changed rows are written. Rows deleted by another process since the
+        snapshot are not resurrected by an update, and rows added by another
+        process are left untouched.
+        """
+        current = {}
+        for item in items:
+            current[self.key_fn(item)] = item
+        deleted = [key for key in original if key not in current]
+        inserted = [item for key, item in current.items() if key not in original]
+        updated = [item for key, item in current.items()
+                   if key in original and self._dumps(item) != original[key]]
+        if not (deleted or inserted or updated):
+            return  # Nothing changed - no write transaction at all
+        with self.store.transaction() as tx:
+            for key in deleted:
+                self.delete(key, conn=tx)
+            for item in inserted:
+                self.insert(item, conn=tx)
+            for item in updated:
+                self.update(item, conn=tx)
+
+    def import_legacy_json(self, legacy_file):
+        """One-time import of a legacy JSON list file"""
+        flag = f'{self.table}_migrated'
+        if self.store.get_meta(flag) or not legacy_file or not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                items = json.load(f)
+            if isinstance(items, dict):
+                items = list(items.values())
+            with self.store.transaction() as tx:
+                for item in items:
+                    if isinstance(item, dict):
+                        self.insert(item, conn=tx)
+            print(f"[STATE] Imported {len(items)} entries from {legacy_file} into {self.table}")
+        except Exception as e:
+            print(f"[STATE WARN] Failed to import {legacy_file}: {e}")
+            return
+        self.store.set_meta(flag, 1)
+
+
+class TableSession:
+    """
+    Read-modify-write session over a JsonRowTable.
+
+    Yields a plain list like the old JSON-file managers did; on exit only the
+    rows that were added, changed or removed are written, in one transaction.
+    """
+
+    def __init__(self, table: JsonRowTable):
+        self.table = table
+        self.items = []
+        self._original = {}
+
+    def __enter__(self):
+        self.items, self._original = self.table.snapshot()
+        return self.items
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.table.apply_changes(self._original, self.items)
+        return False
+
+
+def _active_signal_key(sig: Dict) -> str:
+    if sig.get('signal_id'):
+        return sig['signal_id']
+    return f"{sig.get('timestamp', '')}_{sig.get('symbol', '')}_{sig.get('verdict', '')}"
+
+
+def _position_key(pos: Dict) -> str:
+    return f"{pos.get('symbol', '')}_{pos.get('timestamp_open', '')}"
+
+
+class SentSignalsStore:
+    """
+    Append-only index of signals delivered to Telegram.
+
+    Lookups by signal_id hit the UNIQUE index, so cost does not grow with
+    the number of signals sent over the bot's lifetime.
+    """
+
+    def __init__(self, store: StateStore, legacy_file=LEGACY_SENT_SIGNALS_FILE):
+        self.store = store
+        self._migrate_legacy_json(legacy_file)
+
+    def _migrate_legacy_json(self, legacy_file):
+        """One-time import of sent_signals.json (old dict or list format)"""
+        if self.store.get_meta('sent_signals_migrated') or not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            entries = list(data.values()) if isinstance(data, dict) else data
+            if isinstance(data, dict):
+                # Old dict format is keyed by symbol
+                for symbol, entry in data.items():
+                    entry.setdefault('symbol', symbol)
+            imported = self.record_many(entries)
+            print(f"[STATE] Imported {imported} entries from {legacy_file}")
+        except Exception as e:
+            print(f"[STATE WARN] Failed to import {legacy_file}: {e}")
+            return
+        self.store.set_meta('sent_signals_migrated', 1)
+
+    @staticmethod
+    def _row_params(entry: Dict):
+        return (
+            entry.get('signal_id') or None,
+            entry.get('symbol', ''),
+            entry.get('verdict', ''),
+            int(entry.get('message_id') or 0),
+            entry.get('timestamp', ''),
+            entry.get('confidence'),
+            entry.get('entry_price'),
+        )
+
+    def record(self, entry: Dict):
+        """Append one sent signal (symbol, message_id, timestamp, verdict, signal_id, ...)"""
+        with self.store._lock:
+            self.store.conn.execute('''
+                INSERT OR REPLACE INTO sent_signals
+                (signal_id, symbol, verdict, message_id, timestamp, confidence, entry_price)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', self._row_params(entry))
+
+    def record_many(self, entries: Iterable[Dict]) -> int:
+        """Append several sent signals in one transaction"""
+        rows = [self._row_params(e) for e in entries if isinstance(e, dict)]
+        with self.store._lock:
+            self.store.conn.execute('BEGIN')
+            try:
+                self.store.conn.executemany('''
+                    INSERT OR REPLACE INTO sent_signals
+                    (signal_id, symbol, verdict, message_id, timestamp, confidence, entry_price)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self.store.conn.execute('COMMIT')
+            except Exception:
+                self.store.conn.execute('ROLLBACK')
+                raise
+        return len(rows)
+
+    def get_message_id(self, signal_id) -> Optional[int]:
+        """Return telegram message_id for signal_id, or None if unknown/unsent"""
+        if not signal_id:
+            return None
+        with self.store._lock:
+            row = self.store.conn.execute(
+                'SELECT message_id FROM sent_signals WHERE signal_id = ?', (signal_id,)
+            ).fetchone()
+        if row and row[0] and row[0] > 0:
+            return row[0]
+        return None
+
+    def get_message_id_legacy(self, timestamp, symbol, verdict) -> Optional[int]:
+        """Fallback lookup by (timestamp, symbol, verdict) for rows without signal_id"""
+        with self.store._lock:
+            row = self.store.conn.execute('''
+                SELECT message_id FROM sent_signals
+                WHERE timestamp = ? AND symbol = ? AND verdict = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (timestamp, symbol, verdict)).fetchone()
+        if row and row[0] and row[0] > 0:
+            return row[0]
+        return None
+
+    def __len__(self):
+        with self.store._lock:
+            return self.store.conn.execute('SELECT COUNT(*) FROM sent_signals').fetchone()[0]
+
+
+_state_store = None
+_sent_signals_store = None
+_tables = {}
+_singleton_lock = threading.Lock()
+
+
+def get_state_store(db_path=STATE_DB_FILE) -> StateStore:
+    """Process-wide StateStore (one SQLite connection per process)"""
+    global _state_store
+    with _singleton_lock:
+        if _state_store is None:
+            _state_store = StateStore(db_path)
+        return _state_store
+
+
+def get_sent_signals_store() -> SentSignalsStore:
+    """Process-wide SentSignalsStore (imports sent_signals.json on first use)"""
+    global _sent_signals_store
+    store = get_state_store()
+    with _singleton_lock:
+        if _sent_signals_store is None:
+            _sent_signals_store = SentSignalsStore(store)
+        return _sent_signals_store
+
+
+def _get_table(name, factory, legacy_file):
+    store = get_state_store()
+    with _singleton_lock:
+        if name not in _tables:
+            table = factory(store)
+            table.import_legacy_json(legacy_file)
+            _tables[name] = table
+        return _tables[name]
+
+
+def get_active_signals_table(legacy_file=LEGACY_ACTIVE_SIGNALS_FILE) -> JsonRowTable:
+    """Active signals under effectiveness tracking, indexed by symbol/verdict and signal_id"""
+    return _get_table('active_signals', lambda store: JsonRowTable(
+        store, 'active_signals', _active_signal_key,
+        columns={
+            'symbol': lambda s: s.get('symbol'),
+            'verdict': lambda s: s.get('verdict'),
+            'signal_id': lambda s: s.get('signal_id') or None,
+        },
+        indexes=[('symbol', 'verdict'), ('signal_id',)],
+    ), legacy_file)
+
+
+def get_alert_queue_table(legacy_file=LEGACY_ALERTS_QUEUE_FILE) -> JsonRowTable:
+    """Persistent alert queue, indexed by status and signal_id"""
+    return _get_table('alert_queue', lambda store: JsonRowTable(
+        store, 'alert_queue', lambda a: a['id'],
+        columns={
+            'symbol': lambda a: a.get('symbol'),
+            'alert_type': lambda a: a.get('alert_type'),
+            'signal_id': lambda a: a.get('signal_id') or None,
+            'status': lambda a: a.get('status'),
+        },
+        indexes=[('status',), ('signal_id', 'status'), ('symbol', 'alert_type')],
+    ), legacy_file)
+
+
+def get_positions_table(legacy_file=LEGACY_POSITIONS_FILE) -> JsonRowTable:
+    """Open trader positions, indexed by symbol/side"""
+    return _get_table('positions', lambda store: JsonRowTable(
+        store, 'positions', _position_key,
+        columns={
+            'symbol': lambda p: p.get('symbol'),
+            'side': lambda p: p.get('side'),
+        },
+        indexes=[('symbol', 'side')],
+    ), legacy_file)
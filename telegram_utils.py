@@ -1,4 +1,5 @@
 import os, requests, time, json
+import http_client
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
@@ -54,7 +55,7 @@ def send_telegram_message(text, parse_mode='HTML', reply_to_message_id=None, max
     # Retry logic with exponential backoff
     for attempt in range(max_retries):
         try:
-            r=requests.post(u, json=payload, timeout=20)
+            r=http_client.post(u, json=payload, timeout=20, api='telegram', use_breaker=False)
             
             if r.status_code==200:
                 # Success - return message_id
@@ -228,7 +229,7 @@ def send_to_channel(text, channel_id, parse_mode='HTML', reply_to_message_id=Non
     
     for attempt in range(max_retries):
         try:
-            r=requests.post(u, json=payload, timeout=20)
+            r=http_client.post(u, json=payload, timeout=20, api='telegram', use_breaker=False)
             
             if r.status_code==200:
                 try:
@@ -300,7 +301,7 @@ def send_to_trading_channel(text, channel_id, parse_mode='HTML', reply_to_messag
     
     for attempt in range(max_retries):
         try:
-            r=requests.post(u, json=payload, timeout=20)
+            r=http_client.post(u, json=payload, timeout=20, api='telegram', use_breaker=False)
             
             if r.status_code==200:
                 try:
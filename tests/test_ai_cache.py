@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for AI completion cache - LRU bound, TTL and semantic keys
+"""
+
+import os
+import tempfile
+import unittest
+
+from services.ai_analyst.cache import CompletionCache, normalize_features, round_significant
+
+
+class TestCompletionCache(unittest.TestCase):
+    """Test suite for the persistent completion cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'ai_cache.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lru_eviction(self):
+        """Least recently used entry is evicted first"""
+        cache = CompletionCache(path=None, max_entries=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_shared_across_instances(self):
+        """A second process-level cache sees entries written by the first"""
+        CompletionCache(path=self.db_path).put('k', 'response')
+        other = CompletionCache(path=self.db_path)
+
+        self.assertEqual(other.get('k'), 'response')
+        self.assertEqual(other.stats()['cache_hits'], 1)
+
+    def test_expired_entries_miss(self):
+        """Entries older than the TTL are not returned"""
+        cache = CompletionCache(path=self.db_path, ttl_sec=0)
+        cache.put('k', 'response')
+
+        self.assertIsNone(cache.get('k'))
+
+    def test_disk_trim_counts_rows_only_past_margin(self):
+        """Puts do not COUNT(*) the table until the estimate passes max_entries + margin"""
+        cache = CompletionCache(path=self.db_path, max_entries=20)  # Margin: 2 rows
+        counts = []
+        cache.conn.set_trace_callback(lambda sql: counts.append(sql) if 'COUNT(*)' in sql else None)
+        for i in range(40):
+            cache.put(f'k{i}', 'response')
+        cache.conn.set_trace_callback(None)
+
+        self.assertLessEqual(len(counts), 40 // 3)
+        self.assertLessEqual(len(cache), 22)
+        self.assertEqual(cache.get('k39'), 'response')
+
+    def test_expiry_prune_uses_index(self):
+        """The created_at prune is an index range scan, not a full table scan"""
+        cache = CompletionCache(path=self.db_path)
+        plan = cache.conn.execute(
+            'EXPLAIN QUERY PLAN DELETE FROM ai_cache WHERE created_at < ?', (0,)
+        ).fetchall()
+
+        self.assertIn('idx_ai_cache_created_at', ' '.join(row[-1] for row in plan))
+
+    def test_semantic_key_normalization(self):
+        """Near-identical feature values round to the same key material"""
+        self.assertEqual(round_significant(0.012345, 2), 0.012)
+        self.assertEqual(round_significant(1234.5, 2), 1200)
+        self.assertEqual(normalize_features({'rsi': 55.04, 'side': 'BUY'}, 2),
+                         normalize_features({'rsi': 54.96, 'side': 'BUY'}, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for BTC Lead-Lag Feed - live 1m buffers and BTC impulse features
+"""
+
+import unittest
+
+import numpy as np
+
+from btc_leadlag_service import ReturnBuffers, LeadLagFeed
+
+
+class TestReturnBuffers(unittest.TestCase):
+    """Test suite for minute-aligned close buffers"""
+
+    def test_advance_and_gaps(self):
+        buffers = ReturnBuffers(['BTCUSDT', 'ETHUSDT'], minutes=4)
+        t0 = 1_700_000_040_000 // 60000 * 60000
+
+        self.assertEqual(buffers.update('BTCUSDT', t0, 100.0), 0)
+        self.assertEqual(buffers.update('BTCUSDT', t0, 101.0), 0)  # same minute: last price wins
+        self.assertEqual(buffers.update('BTCUSDT', t0 + 120000, 102.0), 2)  # one minute missing
+        buffers.update('ETHUSDT', t0 + 60000, 50.0)  # late kline lands in its own row
+        buffers.update('XRPUSDT', t0, 1.0)  # untracked symbol is ignored
+
+        np.testing.assert_array_equal(buffers.closes[:, 0], [np.nan, np.nan, 101.0, np.nan, 102.0])
+        self.assertEqual(buffers.closes[3, 1], 50.0)
+        self.assertTrue(np.isnan(buffers.returns()[-1, 0]))
+
+
+class TestLeadLagFeed(unittest.TestCase):
+    """Test suite for per-minute curves and per-tick impulse"""
+
+    def test_follower_gets_btc_impulse(self):
+        rng = np.random.default_rng(5)
+        btc = 100 * np.cumprod(1 + rng.normal(scale=0.002, size=120))
+        feed = LeadLagFeed(['BTCUSDT', 'ETHUSDT'], minutes=100, max_lag=5, min_periods=30)
+
+        t0 = 1_700_000_000_000 // 60000 * 60000
+        for i in range(2, 120):
+            feed.on_kline('BTCUSDT', t0 + i * 60000, btc[i])
+            feed.on_kline('ETHUSDT', t0 + i * 60000, btc[i - 2] / 40)  # ETH follows BTC by 2 minutes
+
+        curve = feed.curve['ETHUSDT']
+        self.assertEqual(curve['best_lag'], 2)
+        self.assertGreater(curve['best_corr'], 0.99)
+
+        # BTC jumps in the forming minute: the impulse is visible before the minute closes
+        feed.on_kline('BTCUSDT', t0 + 119 * 60000, btc[119] * 1.01)
+        features = feed.features(now=123.0)
+        expected = (btc[119] * 1.01 / btc[118] - 1 + btc[118] / btc[117] - 1) * 100
+
+        self.assertAlmostEqual(features['ETHUSDT']['btc_impulse_pct'], expected, places=3)
+        self.assertAlmostEqual(features['BTCUSDT']['ret_1m'], (btc[119] * 1.01 / btc[118] - 1) * 100, places=3)
+        self.assertEqual(features['ETHUSDT']['updated'], 123.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Compiled Model - NumPy-only inference matching sklearn
+"""
+
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+from compiled_model import CompiledModel, compile_model, compiled_path, load_compiled
+
+
+def _load_model_type(pkl):
+    return load_compiled(pkl).metadata['model_type']
+
+
+class TestCompiledModel(unittest.TestCase):
+    """Test suite for compiled inference artifacts"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        self.X = rng.normal(loc=5.0, scale=3.0, size=(300, 4))
+        self.y = self.X[:, 0] * 2 - np.sin(self.X[:, 1]) + rng.normal(scale=0.1, size=300)
+        self.scaler = StandardScaler().fit(self.X)
+        self.names = ['score', 'oi_change', 'vwap_dist', 'rsi']
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _roundtrip(self, model):
+        model.fit(self.scaler.transform(self.X), self.y)
+        path = compile_model(model, self.names, os.path.join(self.tmpdir, 'm.compiled'),
+                             scaler=self.scaler, metadata={'r2_test': np.float64(0.5), 'bad': object()})
+        return model, CompiledModel.load(path)
+
+    def test_matches_sklearn(self):
+        for model in (RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0),
+                      GradientBoostingRegressor(n_estimators=30, random_state=0),
+                      Ridge(alpha=1.0)):
+            model, compiled = self._roundtrip(model)
+            expected = model.predict(self.scaler.transform(self.X))
+            np.testing.assert_allclose(compiled.predict(self.X), expected, rtol=1e-9, atol=1e-9)
+            self.assertAlmostEqual(compiled.predict_one(self.X[7]), expected[7], places=9)
+
+    def test_dict_row_and_metadata(self):
+        model, compiled = self._roundtrip(RandomForestRegressor(n_estimators=5, random_state=0))
+        row = dict(zip(self.names, self.X[3]))
+        self.assertAlmostEqual(compiled.predict_one(row), compiled.predict_one(self.X[3]))
+        self.assertEqual(compiled.metadata, {'r2_test': 0.5})
+        with self.assertRaises(ValueError):
+            compiled.predict_one(self.X[3][:2])
+
+    def test_load_compiled_recompiles_stale_artifact(self):
+        pkl = os.path.join(self.tmpdir, 'model.pkl')
+
+        def dump(alpha):
+            model = Ridge(alpha=alpha).fit(self.scaler.transform(self.X), self.y)
+            with open(pkl, 'wb') as f:
+                pickle.dump({'model': model, 'scaler': self.scaler, 'feature_names': self.names,
+                             'model_type': f'Ridge {alpha}'}, f)
+
+        dump(1.0)
+        self.assertEqual(load_compiled(pkl).metadata['model_type'], 'Ridge 1.0')
+        self.assertTrue(os.path.isdir(compiled_path(pkl)))
+
+        dump(100.0)
+        future = time.time() + 10
+        os.utime(pkl, (future, future))
+        self.assertEqual(load_compiled(pkl).metadata['model_type'], 'Ridge 100.0')
+
+    def test_concurrent_loads_compile_once(self):
+        pkl = os.path.join(self.tmpdir, 'model.pkl')
+        model = RandomForestRegressor(n_estimators=20, random_state=0).fit(self.X, self.y)
+        with open(pkl, 'wb') as f:
+            pickle.dump({'model': model, 'feature_names': self.names, 'model_type': 'forest'}, f)
+
+        with multiprocessing.get_context('fork').Pool(6) as pool:
+            results = pool.map(_load_model_type, [pkl] * 12)
+        self.assertEqual(results, ['forest'] * 12)
+        leftovers = [f for f in os.listdir(self.tmpdir) if '.tmp.' in f or '.old.' in f]
+        self.assertEqual(leftovers, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
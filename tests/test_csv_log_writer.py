@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for CSV Log Writer - buffered rows, background flush and rotation
+"""
+
+import csv
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from csv_log_writer import CsvLogWriter
+
+HEADER = ['ts', 'symbol', 'verdict']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Buffers a row for 60s, then idles like a service loop until it is stopped
+BUFFERING_CHILD = (
+    "import sys, time, csv_log_writer\n"
+    "w = csv_log_writer.get_csv_writer(sys.argv[1], ['ts', 'symbol', 'verdict'], flush_interval=60)\n"
+    "w.write_row(['t1', 'BTCUSDT', 'BUY'])\n"
+    "print('ready', flush=True)\n"
+    "while True:\n"
+    "    time.sleep(0.05)\n"
+)
+
+
+class TestCsvLogWriter(unittest.TestCase):
+    """Test suite for the buffered CSV log writer"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'logs', 'test_log.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _rows(self, path=None):
+        with open(path or self.path, newline='') as f:
+            return list(csv.reader(f))
+
+    def test_rows_buffer_until_flush(self):
+        writer = CsvLogWriter(self.path, HEADER, flush_interval=60)
+        self.assertEqual(self._rows(), [HEADER])
+        writer.write_row(['t1', 'BTCUSDT', 'BUY'])
+        writer.write_row({'ts': 't2', 'symbol': 'ETHUSDT'})
+        self.assertEqual(self._rows(), [HEADER])
+        writer.close()
+        self.assertEqual(self._rows(), [HEADER, ['t1', 'BTCUSDT', 'BUY'], ['t2', 'ETHUSDT', '']])
+        self.assertEqual(writer.get_stats()['flushes'], 1)
+
+    def test_background_flush_on_size_and_interval(self):
+        writer = CsvLogWriter(self.path, HEADER, flush_interval=0.05, max_buffer_rows=3)
+        writer.write_rows([[i, 'BTCUSDT', 'BUY'] for i in range(3)])
+        writer.write_row([3, 'BTCUSDT', 'SELL'])
+        deadline = time.time() + 5
+        while len(self._rows()) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([r[0] for r in self._rows()[1:]], ['0', '1', '2', '3'])
+        writer.close()
+
+    def test_rotation_and_always_fsync(self):
+        writer = CsvLogWriter(self.path, HEADER, fsync='always', rotate_mb=100 / (1024 * 1024), keep_files=1)
+        writer.write_row(['x' * 120, 'BTCUSDT', 'BUY'])  # Synchronous, no flush needed
+        self.assertEqual(len(self._rows()), 2)
+        writer.write_row(['t2', 'ETHUSDT', 'SELL'])
+        rotated = [f for f in os.listdir(os.path.dirname(self.path)) if f.startswith('test_log_')]
+        self.assertEqual(len(rotated), 1)
+        self.assertEqual(self._rows(), [HEADER, ['t2', 'ETHUSDT', 'SELL']])
+
+        with self.assertRaises(ValueError):
+            CsvLogWriter(self.path, HEADER, fsync='sometimes')
+
+    def test_sigterm_drains_buffered_rows(self):
+        proc = subprocess.Popen([sys.executable, '-c', BUFFERING_CHILD, self.path],
+                                cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        self.assertEqual(proc.stdout.readline().strip(), 'ready')
+        self.assertEqual(self._rows(), [HEADER])
+        proc.send_signal(signal.SIGTERM)
+        self.assertEqual(proc.wait(timeout=10), 128 + signal.SIGTERM)
+        proc.stdout.close()
+        self.assertEqual(self._rows(), [HEADER, ['t1', 'BTCUSDT', 'BUY']])
+
+    def test_forked_child_dies_on_sigterm_as_before(self):
+        import csv_log_writer  # Handler installed in this process
+
+        writer = csv_log_writer.get_csv_writer(self.path, HEADER, flush_interval=60)
+        self.addCleanup(csv_log_writer._writers.pop, os.path.abspath(self.path), None)
+        writer.write_row(['t1', 'BTCUSDT', 'BUY'])
+        child = multiprocessing.get_context('fork').Process(target=time.sleep, args=(30,))
+        child.start()
+        child.terminate()
+        child.join(10)
+        self.assertEqual(child.exitcode, -signal.SIGTERM)
+        self.assertEqual(self._rows(), [HEADER])  # The parent's buffer is not touched by the child
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
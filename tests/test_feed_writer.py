@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Feed Writer - feeds_log.csv columns and header migration
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from services.data_feeds.schemas import FeedRow
+from services.data_feeds.writer import HEADER, FeedWriter
+
+
+class TestFeedWriter(unittest.TestCase):
+    """Test suite for the data feeds CSV writer"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'feeds_log.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_obi_columns_and_old_header_rotation(self):
+        with open(self.path, 'w', newline='') as f:
+            csv.writer(f).writerows([HEADER[:-1], ['2025-01-01 00:00:00', 'BTCUSDT'] + [''] * 15])
+
+        writer = FeedWriter(self.path)
+        rotated = [f for f in os.listdir(self.tmpdir.name) if f.startswith('feeds_log_')]
+        self.assertEqual(len(rotated), 1)
+
+        writer.append_rows([FeedRow(timestamp=datetime(2025, 1, 1), symbol='BTCUSDT',
+                                    obi_top=0.6, obi_depth_ema=0.45)])
+        with open(self.path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]['obi_top'], '0.6')
+        self.assertEqual(rows[0]['obi_depth_ema'], '0.45')
+
+        FeedWriter(self.path)  # Current header: appended to, not rotated
+        self.assertEqual(len([f for f in os.listdir(self.tmpdir.name) if f.startswith('feeds_log_')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for HTTP Client - keep-alive pooling, retry/backoff and circuit breakers
+"""
+
+import json
+import socket
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import http_client
+from http_client import CircuitOpenError, HttpClient, RetryPolicy
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            server.client_ports.append(self.client_address[1])
+            hits = server.hits[self.path]
+        if self.path.startswith('/flaky') and hits <= 2:
+            self._send(429, {'error': 'rate limited'}, {'Retry-After': '0'})
+        elif self.path.startswith('/boom'):
+            self._send(503, {'error': 'unavailable'})
+        else:
+            self._send(200, {'hits': hits})
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class TestHttpClient(unittest.TestCase):
+    """Test suite for the pooled HTTP client"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.server.lock = threading.Lock()
+        cls.server.hits = {}
+        cls.server.client_ports = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.hits.clear()
+        self.server.client_ports.clear()
+        self.client = HttpClient()
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_connections_are_reused(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.base + '/ok').status_code, 200)
+        self.assertEqual(len(set(self.server.client_ports)), 1)
+
+    def test_rate_limit_retry_and_metrics(self):
+        rate_limited = http_client.API_REQUESTS.labels(api='test_api', outcome='rate_limited')
+        before = rate_limited.value
+        data = self.client.get_json(self.base + '/flaky', api='test_api',
+                                    retry=RetryPolicy(attempts=5, backoff=0.01))
+        self.assertEqual(data, {'hits': 3})
+        self.assertEqual(rate_limited.value - before, 2)
+
+        # Out of attempts: the last 429 surfaces as HTTPError, like smart_signal._get always did
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.get_json(self.base + '/flaky2', retry=RetryPolicy(attempts=2, backoff=0.01))
+
+    def test_breaker_opens_and_recovers(self):
+        url = f"http://127.0.0.1:{_closed_port()}/x"
+        breaker = http_client.breaker_for(http_client._host(url))
+        for _ in range(breaker.threshold):
+            with self.assertRaises(requests.exceptions.ConnectionError) as ctx:
+                self.client.get(url, timeout=1)
+            self.assertNotIsInstance(ctx.exception, CircuitOpenError)
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(url, timeout=1)
+
+        # Half-open: one trial goes out, a failure re-opens immediately
+        breaker.opened_at -= breaker.reset_timeout
+        self.assertEqual(breaker.state, 'half_open')
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get(url, timeout=1)
+        self.assertEqual(breaker.state, 'open')
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_server_errors_count_towards_breaker(self):
+        breaker = http_client.breaker_for(http_client._host(self.base))
+        response = self.client.get(self.base + '/boom', retry=RetryPolicy(attempts=3, backoff=0.01, statuses=(503,)))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(breaker.failures, 3)
+        self.client.get(self.base + '/ok')
+        self.assertEqual(breaker.failures, 0)
+
+    def test_telegram_retries_are_not_cut_by_breaker(self):
+        import telegram_utils
+
+        breaker = http_client.breaker_for('api.telegram.org')
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        ok = requests.Response()
+        ok.status_code = 200
+        ok._content = json.dumps({'ok': True, 'result': {'message_id': 42}}).encode()
+        responses = [requests.exceptions.Timeout('slow'), ok]
+        with mock.patch.object(telegram_utils, 'T', 'token'), mock.patch.object(telegram_utils, 'C', 'chat'), \
+                mock.patch.object(telegram_utils, 'log_telegram_failure'), \
+                mock.patch.object(telegram_utils.time, 'sleep'), \
+                mock.patch.object(requests.Session, 'request', side_effect=responses) as request:
+            self.assertEqual(telegram_utils.send_telegram_message('hello'), 42)
+        self.assertEqual(request.call_count, 2)
+        breaker.record_success()
+
+    def test_interrupted_trial_is_released(self):
+        url = f"http://127.0.0.1:{_closed_port()}/trial"
+        breaker = http_client.breaker_for(http_client._host(url))
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        breaker.opened_at -= breaker.reset_timeout
+
+        with mock.patch.object(requests.Session, 'request', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.client.get(url)
+        # The half-open trial did not finish: the next call gets to try instead of failing fast
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Lead-Lag engine - vectorized BTC/altcoin lag correlations
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from lead_lag import lag_correlations, rolling_lag_correlations, best_lags, grid_returns, lag_curve_frame
+
+
+def reference_corr(btc, alt, lag):
+    """Plain per-lag Pearson on the overlapping, non-missing pairs"""
+    if lag >= 0:
+        x, y = btc[:len(btc) - lag], alt[lag:]
+    else:
+        x, y = btc[-lag:], alt[:len(alt) + lag]
+    valid = np.isfinite(x) & np.isfinite(y)
+    return np.corrcoef(x[valid], y[valid])[0, 1]
+
+
+class TestLagCorrelations(unittest.TestCase):
+    """Test suite for full-sample and rolling lag curves"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.btc = rng.normal(size=240)
+        # Coin k follows BTC by k steps
+        self.alts = np.stack([np.roll(self.btc, k) + rng.normal(size=240) * 0.5 for k in range(4)], axis=1)
+        self.alts[rng.random(self.alts.shape) < 0.1] = np.nan
+        self.btc[rng.random(240) < 0.05] = np.nan
+
+    def test_matches_per_lag_pearson(self):
+        """Every (lag, coin) equals np.corrcoef on the same pairs"""
+        lags, corr = lag_correlations(self.btc, self.alts, max_lag=6)
+
+        self.assertEqual(corr.shape, (13, 4))
+        for j, lag in enumerate(lags):
+            for k in range(4):
+                self.assertAlmostEqual(corr[j, k], reference_corr(self.btc, self.alts[:, k], lag), places=10)
+
+    def test_best_lag_sign(self):
+        """Followers get a positive lag, a leading coin a negative one"""
+        leader = np.roll(self.btc, -2)
+        lags, corr = lag_correlations(self.btc, np.column_stack([self.alts, leader]), max_lag=6)
+        best_lag, best_corr = best_lags(lags, corr)
+
+        self.assertEqual(list(best_lag), [0, 1, 2, 3, -2])
+        self.assertTrue(np.all(best_corr > 0.8))
+
+    def test_too_few_pairs_or_constant_is_nan(self):
+        lags, corr = lag_correlations(np.arange(12.0), np.ones(12), max_lag=3)
+        self.assertTrue(np.isnan(corr).all())
+
+        best_lag, best_corr = best_lags(lags, corr)
+        self.assertEqual(best_lag, 0)
+        self.assertTrue(np.isnan(best_corr))
+
+    def test_rolling_equals_trailing_window(self):
+        """Rolling value at t only uses the window ending at t"""
+        window = 60
+        lags, rolling = rolling_lag_correlations(self.btc, self.alts, max_lag=5, window=window)
+
+        self.assertEqual(rolling.shape, (240, 11, 4))
+        self.assertTrue(np.isnan(rolling[:window - 1]).all())
+        for t in (window - 1, 150, 239):
+            _, expected = lag_correlations(self.btc[t - window + 1:t + 1], self.alts[t - window + 1:t + 1], max_lag=5)
+            np.testing.assert_allclose(rolling[t], expected, atol=1e-9)
+
+
+class TestFrames(unittest.TestCase):
+    """Test suite for long-log -> grid returns -> lag curve helpers"""
+
+    def test_grid_returns_and_curve(self):
+        times = pd.date_range('2025-11-10 10:00', periods=60, freq='2min')
+        btc = 100 + np.cumsum(np.random.default_rng(3).normal(size=62))
+        rows = [(ts, 'BTCUSDT', btc[i + 2]) for i, ts in enumerate(times)]
+        # ETH follows BTC by one step and misses one sample
+        rows += [(ts + pd.Timedelta(seconds=30), 'ETHUSDT', btc[i + 1]) for i, ts in enumerate(times) if i != 20]
+        returns = grid_returns(pd.DataFrame(rows, columns=['timestamp', 'symbol', 'price']), step='2min')
+
+        self.assertEqual(len(returns), 60)
+        self.assertEqual(returns['ETHUSDT'].isna().sum(), 3)
+
+        curve = lag_curve_frame(returns, base='BTCUSDT', max_lag=3)
+        self.assertEqual(list(curve.columns), ['ETHUSDT'])
+        self.assertEqual(curve['ETHUSDT'].abs().idxmax(), 1)
+        self.assertAlmostEqual(curve.loc[1, 'ETHUSDT'], 1.0, places=9)
+
+
+if __name__ == '__main__':
+    unittest.main()
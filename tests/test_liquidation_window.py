@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Liquidation Window - rolling per-symbol liquidation buckets
+"""
+
+import unittest
+
+from liquidation_service import LiquidationWindow
+
+
+class TestLiquidationWindow(unittest.TestCase):
+    """Test suite for last-N-minute liquidation aggregates"""
+
+    def setUp(self):
+        self.window = LiquidationWindow(bucket_sec=1, window_sec=3600)
+        self.now = 1_700_000_000.0
+
+    def test_windows_split_by_age(self):
+        """Each lookback only counts liquidations inside it"""
+        self.window.add('BTCUSDT', 'short', 300.0, ts=self.now - 40 * 60)
+        self.window.add('BTCUSDT', 'short', 200.0, ts=self.now - 4 * 60)
+        self.window.add('BTCUSDT', 'long', 500.0, ts=self.now - 30.5)
+        self.window.add('BTCUSDT', 'long', 1000.0, ts=self.now - 30)
+
+        w = self.window.windows('BTCUSDT', (1, 5, 60), now=self.now)
+
+        self.assertEqual((w[1]['long_count'], w[1]['short_count']), (2, 0))
+        self.assertEqual(w[1]['long_usd'], 1500.0)
+        self.assertEqual((w[5]['long_count'], w[5]['short_count']), (2, 1))
+        self.assertEqual((w[60]['long_count'], w[60]['short_count']), (2, 2))
+        self.assertEqual(w[60]['short_usd'], 500.0)
+
+    def test_same_second_shares_a_bucket(self):
+        """Bursts within one bucket do not grow the deque"""
+        for i in range(100):
+            self.window.add('ETHUSDT', 'long', 10.0, ts=self.now + i / 1000)
+
+        self.assertEqual(len(self.window.buckets['ETHUSDT']), 1)
+        self.assertEqual(self.window.totals('ETHUSDT', 1, now=self.now + 1)['long_count'], 100)
+
+    def test_old_buckets_expire(self):
+        """Buckets older than the window are dropped and no longer counted"""
+        self.window.add('SOLUSDT', 'short', 50.0, ts=self.now - 3700)
+        self.window.add('SOLUSDT', 'short', 50.0, ts=self.now - 10)
+
+        self.assertEqual(self.window.totals('SOLUSDT', 60, now=self.now)['short_count'], 1)
+        self.assertEqual(len(self.window.buckets['SOLUSDT']), 1)
+        self.assertEqual(self.window.totals('XRPUSDT', 15, now=self.now)['long_count'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
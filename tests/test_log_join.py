@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Log Join - as-of matching of effectiveness and analysis rows
+"""
+
+import unittest
+
+import pandas as pd
+
+from log_join import asof_join
+
+
+class TestAsofJoin(unittest.TestCase):
+    """Test suite for per-(symbol, verdict) nearest-timestamp joins"""
+
+    def setUp(self):
+        self.eff = pd.DataFrame({
+            'timestamp_sent': ['2025-11-10 10:00:05', '2025-11-10 10:30:00', '2025-11-10 09:00:00', 'bad'],
+            'symbol': ['BTCUSDT', 'BTCUSDT', 'ETHUSDT', 'BTCUSDT'],
+            'verdict': ['BUY', 'SELL', 'BUY', 'BUY'],
+            'confidence': [0.8, 0.7, 0.9, 0.5],
+        }, index=[10, 11, 12, 13])
+        self.analysis = pd.DataFrame({
+            'timestamp': ['2025-11-10 10:01:00', '2025-11-10 09:59:59', '2025-11-10 10:00:00',
+                          '2025-11-10 10:32:00', '2025-11-10 09:00:30'],
+            'symbol': ['BTCUSDT', 'BTCUSDT', 'BTCUSDT', 'BTCUSDT', 'ETHUSDT'],
+            'verdict': ['BUY', 'BUY', 'SELL', 'SELL', 'SELL'],
+            'confidence': [0.1, 0.2, 0.3, 0.4, 0.5],
+            'cvd': [1.0, 2.0, 3.0, 4.0, 5.0],
+        })
+
+    def test_nearest_match_with_same_keys(self):
+        """Closest row with equal symbol and verdict wins; others are dropped"""
+        merged = asof_join(self.eff, self.analysis, suffixes=('', '_analysis'))
+
+        self.assertEqual(list(merged.index), [10, 11])
+        self.assertEqual(merged.loc[10, 'cvd'], 2.0)
+        self.assertEqual(merged.loc[10, 'confidence'], 0.8)
+        self.assertEqual(merged.loc[10, 'confidence_analysis'], 0.2)
+        self.assertEqual(merged.loc[11, 'cvd'], 4.0)
+
+    def test_exclusive_tolerance_and_left_join(self):
+        """inclusive=False drops matches exactly at the tolerance; how='left' keeps rows"""
+        merged = asof_join(self.eff, self.analysis, how='left', inclusive=False)
+
+        self.assertEqual(list(merged.index), [10, 11, 12, 13])
+        self.assertEqual(merged.loc[10, 'cvd'], 2.0)
+        self.assertTrue(pd.isna(merged.loc[11, 'cvd']))
+        self.assertTrue(pd.isna(merged.loc[12, 'cvd']))
+        self.assertTrue(pd.isna(merged.loc[13, 'cvd']))
+
+
+if __name__ == '__main__':
+    unittest.main()
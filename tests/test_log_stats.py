@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Log Stats - incremental counters over append-only CSV logs
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+import log_stats
+from log_stats import EffectivenessStats, AnalysisStats, RecentKeys, group_counts, read_tail_rows, total_counts
+
+EFF_HEADER = ['timestamp_sent', 'symbol', 'verdict', 'result', 'profit_pct']
+
+
+class TestEffectivenessStats(unittest.TestCase):
+    """Test suite for tail-following effectiveness counters"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'effectiveness_log.csv')
+        self._write([EFF_HEADER], mode='w')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, rows, mode='a'):
+        with open(self.path, mode, newline='') as f:
+            csv.writer(f).writerows(rows)
+
+    def test_appended_rows_are_folded_in(self):
+        """Counters follow rows appended after the first refresh"""
+        stats = EffectivenessStats(self.path).refresh()
+        self._write([['2025-11-10 10:00:00', 'BTCUSDT', 'BUY', 'WIN', '0.5'],
+                     ['2025-11-10 11:00:00', 'BTCUSDT', 'SELL', 'LOSS', '-0.3']])
+        stats.refresh()
+        self._write([['2025-11-11 09:00:00', 'ETHUSDT', 'BUY', 'CANCELLED', '0']])
+        stats.refresh()
+
+        self.assertEqual((stats.total.rows, stats.total.wins, stats.total.losses, stats.total.cancelled), (3, 1, 1, 1))
+        self.assertAlmostEqual(stats.total.pnl, 0.2)
+        self.assertEqual(stats.outcome_for('2025-11-10 11:00:00'), 'LOSS')
+
+        day = total_counts(stats.counts(day='2025-11-10'))
+        self.assertEqual(day.decided, 2)
+        self.assertEqual(set(group_counts(stats.counts(since='2025-11-11'), 0)), {'ETHUSDT'})
+        self.assertEqual(group_counts(stats.counts(), 1)['BUY'].rows, 2)
+
+    def test_recent_window_evicts_old_rows(self):
+        """Recent counters only cover the last RECENT_SIGNALS_WINDOW rows"""
+        n = log_stats.RECENT_SIGNALS_WINDOW
+        self._write([[f'2025-11-10 00:00:{i:02d}', 'OLDUSDT', 'BUY', 'LOSS', '-1'] for i in range(5)])
+        self._write([[f'2025-11-10 01:{i // 60:02d}:{i % 60:02d}', 'BTCUSDT', 'BUY', 'WIN', '1'] for i in range(n)])
+        stats = EffectivenessStats(self.path).refresh()
+
+        self.assertEqual(stats.recent_total.rows, n)
+        self.assertEqual(stats.recent_total.win_rate(), 100.0)
+        self.assertNotIn('OLDUSDT', stats.recent_by_symbol)
+        self.assertEqual(stats.total.rows, n + 5)
+
+    def test_outcome_index_is_bounded(self):
+        """outcome_for() keeps only the most recent closed signals"""
+        n = log_stats.RECENT_OUTCOMES_WINDOW
+        self._write([[f'2025-11-10 00:00:{i:06d}', 'BTCUSDT', 'BUY', 'WIN', '1'] for i in range(n + 10)])
+        stats = EffectivenessStats(self.path).refresh()
+
+        self.assertEqual(len(stats.outcome_by_ts), n)
+        self.assertIsNone(stats.outcome_for('2025-11-10 00:00:000009'))
+        self.assertEqual(stats.outcome_for(f'2025-11-10 00:00:{n + 9:06d}'), 'WIN')
+        with self.assertRaises(TypeError):
+            log_stats._LogStats(self.path)
+
+    def test_rewritten_file_is_rebuilt(self):
+        """A truncated log resets the counters instead of double counting"""
+        self._write([['2025-11-10 10:00:00', 'BTCUSDT', 'BUY', 'WIN', '0.5']] * 3)
+        stats = EffectivenessStats(self.path).refresh()
+        self.assertEqual(stats.total.rows, 3)
+
+        self._write([EFF_HEADER, ['2025-11-12 10:00:00', 'SOLUSDT', 'SELL', 'WIN', '0.4']], mode='w')
+        stats.refresh()
+        self.assertEqual(stats.total.rows, 1)
+        self.assertEqual(list(stats.by_key), [('SOLUSDT', 'SELL')])
+
+    def test_partial_last_line_is_deferred(self):
+        """A row still being written is picked up once its newline lands"""
+        stats = EffectivenessStats(self.path).refresh()
+        with open(self.path, 'a') as f:
+            f.write('2025-11-10 10:00:00,BTCUSDT,BUY,WI')
+        self.assertEqual(stats.refresh().total.rows, 0)
+        with open(self.path, 'a') as f:
+            f.write('N,0.5\n')
+        self.assertEqual(stats.refresh().total.wins, 1)
+
+
+class TestAnalysisStats(unittest.TestCase):
+    """Test suite for analysis_log.csv window and per-day counters"""
+
+    def test_day_counts_and_indicator_summary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'analysis_log.csv')
+            with open(path, 'w', newline='') as f:
+                w = csv.writer(f)
+                w.writerow(['timestamp', 'symbol', 'verdict', 'ttl_minutes', 'dev_sigma_blocked', 'rsi', 'regime'])
+                w.writerow(['2025-11-10 10:00:00', 'BTCUSDT', 'BUY', '30', '0', '40', 'trend'])
+                w.writerow(['2025-11-10 10:05:00', 'BTCUSDT', 'NO_TRADE', '0', '1', '60', 'trend'])
+
+            stats = AnalysisStats(path).refresh()
+            day = stats.day_counts('2025-11-10')['BTCUSDT']
+
+            self.assertEqual((day['blocked_count'], day['total_verdicts'], day['ttl_count']), (1, 2, 1))
+            self.assertEqual(stats.indicator_summary()['rsi'], {'avg': 50.0, 'min': 40.0, 'max': 60.0})
+
+
+class TestTailIndex(unittest.TestCase):
+    """Test suite for reverse tail reads and the bounded recent-key index"""
+
+    def test_read_tail_rows(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'signals_log.csv')
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['timestamp', 'symbol', 'verdict'])
+                writer.writerows([[f'2025-11-10 10:{i:02d}:00', 'BTCUSDT', 'BUY'] for i in range(50)])
+            # Small blocks force several backward reads across line boundaries
+            rows = read_tail_rows(path, 3, block_size=16)
+            self.assertEqual([r['timestamp'] for r in rows],
+                             ['2025-11-10 10:47:00', '2025-11-10 10:48:00', '2025-11-10 10:49:00'])
+            self.assertEqual(len(read_tail_rows(path, 500)), 50)
+            self.assertEqual(read_tail_rows(os.path.join(tmpdir, 'missing.csv'), 3), [])
+
+    def test_recent_keys_evicts_oldest(self):
+        keys = RecentKeys(2)
+        self.assertTrue(keys.add('a'))
+        self.assertFalse(keys.add('a'))
+        keys.add('b')
+        keys.add('c')
+        self.assertNotIn('a', keys)
+        self.assertEqual(len(keys), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Market Replay - record external inputs, replay them offline
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+from websocket._app import WebSocketApp
+
+import market_replay
+from market_replay import Recorder, Replayer, ReplayFinished, request_key
+
+# Target for the repeat test: wall-clock timestamp, random id and an append-only log
+REPLAY_TARGET = '''
+import datetime, time, uuid
+
+def run():
+    time.sleep(1)
+    with open('runs.log', 'a') as f:
+        f.write(f"{datetime.datetime.utcnow():%Y-%m-%d %H:%M:%S} {uuid.uuid4().hex}\\n")
+'''
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        body = json.dumps({'path': self.path, 'n': type(self).calls}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMarketReplay(unittest.TestCase):
+    """Test suite for the record/replay harness"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        self.log = os.path.join(self.tmpdir, 'session.jsonl.gz')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_request_key_ignores_signing_params(self):
+        a = request_key('get', 'https://x/api?b=2&timestamp=1', {'a': 1, 'signature': 'f'})
+        b = request_key('GET', 'https://x/api', {'b': '2', 'a': '1', 'timestamp': 9})
+        self.assertEqual(a, b)
+        self.assertEqual(a, 'GET https://x/api?a=1&b=2')
+
+    def test_http_and_files_round_trip(self):
+        server = HTTPServer(('127.0.0.1', 0), _CountingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/fapi/v1/klines"
+        os.makedirs('data')
+        with open('cvd_data.json', 'w') as f:
+            json.dump({'cvd': {'BTCUSDT': 1.0}}, f)
+
+        with Recorder(self.log, files=['cvd_data.json']):
+            live = [requests.get(url, params={'symbol': 'BTCUSDT', 'timestamp': i}).json() for i in range(2)]
+        server.shutdown()
+        os.remove('cvd_data.json')
+
+        with Replayer(self.log) as replayer:
+            replayed = [requests.get(url, params={'symbol': 'BTCUSDT', 'timestamp': 99}).json() for _ in range(3)]
+            self.assertAlmostEqual(time.time(), replayer.started + replayer.elapsed())
+            with self.assertRaises(requests.ConnectionError):
+                requests.get(url, params={'symbol': 'ETHUSDT'})
+            with open('cvd_data.json') as f:
+                self.assertEqual(json.load(f)['cvd']['BTCUSDT'], 1.0)
+
+        self.assertEqual(replayed[:2], live)
+        self.assertEqual(replayed[2], live[1])
+        self.assertEqual(dict(replayer.counts), {'http': 2, 'http_reused': 1, 'http_miss': 1, 'file': 1})
+
+    def test_websocket_stream_and_virtual_sleep(self):
+        url = 'wss://fstream.binance.com/ws/!forceOrder@arr'
+        with open(self.log.replace('.gz', ''), 'w') as f:
+            f.write(json.dumps({'format': 'market_replay', 'version': 1, 'started': 1000.0}) + '\n')
+            for i, t in enumerate((0.5, 2.0, 30.0)):
+                f.write(json.dumps({'k': 'ws', 'url': url, 'm': f'msg{i}', 't': t}) + '\n')
+
+        received = []
+        app = WebSocketApp(url, on_message=lambda ws, m: received.append((m, time.time())))
+        with Replayer(self.log.replace('.gz', '')):
+            with self.assertRaises(ReplayFinished):
+                app.run_forever()
+            started = time.perf_counter()
+            with self.assertRaises(ReplayFinished):
+                while True:
+                    time.sleep(60)  # Virtual: returns at once, ends past the recording
+            self.assertLess(time.perf_counter() - started, 1.0)
+
+        self.assertEqual(received, [('msg0', 1000.5), ('msg1', 1002.0), ('msg2', 1030.0)])
+        self.assertIs(time.time, market_replay._real_time)
+
+    def test_replay_without_workdir_leaves_cwd_untouched(self):
+        recorded = json.dumps({'cvd': {'BTCUSDT': 1.0}}).encode()
+        with open(self.log.replace('.gz', ''), 'w') as f:
+            f.write(json.dumps({'format': 'market_replay', 'version': 1, 'started': 1000.0}) + '\n')
+            f.write(json.dumps(dict({'k': 'file', 'path': 'cvd_data.json', 't': 0.0},
+                                    **market_replay._encode_body(recorded))) + '\n')
+        with open('cvd_data.json', 'w') as f:
+            json.dump({'cvd': {'BTCUSDT': 2.0}}, f)  # Live state
+
+        args = argparse.Namespace(log=self.log.replace('.gz', ''), target='os:getcwd', speed=0.0, workdir=None)
+        summary = market_replay.replay_once(args)
+        os.chdir(self.tmpdir)
+        self.addCleanup(shutil.rmtree, summary['workdir'], True)
+
+        self.assertNotEqual(os.path.realpath(summary['workdir']), os.path.realpath(self.tmpdir))
+        self.assertEqual(summary['counts'], {'file': 1})
+        with open('cvd_data.json') as f:
+            self.assertEqual(json.load(f)['cvd']['BTCUSDT'], 2.0)
+        with open(os.path.join(summary['workdir'], 'cvd_data.json')) as f:
+            self.assertEqual(json.load(f)['cvd']['BTCUSDT'], 1.0)
+
+    def _write_header(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps({'format': 'market_replay', 'version': 1, 'started': 1000.0}) + '\n')
+            f.write(json.dumps({'k': 'ws', 'url': 'wss://x', 'm': 'end', 't': 5.0}) + '\n')
+
+    def test_digest_covers_workdir_outputs(self):
+        log = self.log.replace('.gz', '')
+        self._write_header(log)
+        verdicts = iter(['BUY', 'BUY', 'SELL'])
+
+        def write_outputs():
+            import sqlite3
+            with open('signals_log.csv', 'a') as f:
+                f.write(f"{datetime.datetime.utcnow():%H:%M:%S},{next(verdicts)}\n")
+            conn = sqlite3.connect('bot_state.db')
+            conn.execute('CREATE TABLE IF NOT EXISTS sent (id TEXT)')
+            conn.execute('INSERT INTO sent VALUES (?)', (uuid.uuid4().hex,))
+            conn.commit()
+            conn.close()
+
+        summaries = []
+        with mock.patch.dict(market_replay.TARGETS, {'write': write_outputs}):
+            for n in range(3):
+                args = argparse.Namespace(log=log, target='write', speed=0.0,
+                                          workdir=os.path.join(self.tmpdir, f'run{n}'))
+                summaries.append(market_replay.replay_once(args))
+                os.chdir(self.tmpdir)
+
+        self.assertEqual(sorted(summaries[0]['outputs']), ['bot_state.db', 'signals_log.csv'])
+        self.assertEqual(summaries[0]['digest'], summaries[1]['digest'])
+        self.assertNotEqual(summaries[1]['digest'], summaries[2]['digest'])
+        self.assertEqual(summaries[1]['outputs']['bot_state.db'], summaries[2]['outputs']['bot_state.db'])
+
+    def test_repeats_start_from_fresh_workdirs(self):
+        log = self.log.replace('.gz', '')
+        self._write_header(log)
+        with open('replay_target.py', 'w') as f:
+            f.write(REPLAY_TARGET)
+        seed = os.path.join(self.tmpdir, 'seed')
+        os.makedirs(seed)
+
+        args = argparse.Namespace(log=log, target='replay_target:run', speed=0.0, repeat=2,
+                                  workdir=seed, child=False)
+        out = io.StringIO()
+        with mock.patch.dict(os.environ, {'PYTHONPATH': self.tmpdir}), contextlib.redirect_stdout(out):
+            market_replay.replay(args)
+
+        self.assertIn('(identical) over 1 files', out.getvalue())
+        runs_root = out.getvalue().split('Scratch directories: ')[1].split('/run1')[0]
+        self.addCleanup(shutil.rmtree, runs_root, True)
+        for n in (1, 2):
+            with open(os.path.join(runs_root, f'run{n}', 'runs.log')) as f:
+                self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(os.listdir(seed), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Market Stream - stream routing, aggregators and consolidated snapshot
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from services.market_stream.aggregators import (
+    BookTickerAggregator, CvdAggregator, LiquidationAggregator, MarkPriceAggregator
+)
+from services.market_stream.runner import MarketStreamService
+import snapshot_bus
+
+
+def _msg(stream, data):
+    return json.dumps({'stream': stream, 'data': data})
+
+
+class TestMarketStreamService(unittest.TestCase):
+    """Test suite for the multiplexed market stream service"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        symbols = ['BTCUSDT', 'ETHUSDT']
+        self.cvd = CvdAggregator(symbols)
+        self.cvd.legacy_path = os.path.join(self.tmpdir, 'cvd_data.json')
+        self.liq = LiquidationAggregator(symbols)
+        self.liq.legacy_path = os.path.join(self.tmpdir, 'liquidation_data.json')
+        self.service = MarketStreamService(
+            [self.cvd, self.liq, BookTickerAggregator(symbols), MarkPriceAggregator(symbols)],
+            snapshot_path=os.path.join(self.tmpdir, 'market_snapshot.json'),
+            max_streams_per_connection=4,
+            bus_dir=os.path.join(self.tmpdir, 'bus')
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_streams_are_pooled(self):
+        urls = self.service.connection_urls()
+        self.assertEqual(len(self.service.routes), 6)
+        self.assertEqual(len(urls), 2)
+        self.assertIn('btcusdt@aggTrade/ethusdt@aggTrade/!forceOrder@arr/btcusdt@bookTicker', urls[0])
+
+    def test_dispatch_and_publish(self):
+        s = self.service
+        s.dispatch(_msg('btcusdt@aggTrade', {'s': 'BTCUSDT', 'p': '100', 'q': '2', 'm': False}), now=1000.0)
+        s.dispatch(_msg('btcusdt@aggTrade', {'s': 'BTCUSDT', 'p': '100', 'q': '0.5', 'm': True}), now=1000.4)
+        s.dispatch(_msg('btcusdt@aggTrade', {'s': 'BTCUSDT', 'p': '100', 'q': '1', 'm': False}), now=1001.5)
+        s.dispatch(_msg('!forceOrder@arr', {'o': {'s': 'ETHUSDT', 'S': 'SELL', 'q': '2', 'ap': '50'}}), now=1001.0)
+        s.dispatch(_msg('!forceOrder@arr', {'o': {'s': 'DOGEUSDT', 'S': 'BUY', 'q': '2', 'ap': '50'}}), now=1001.0)
+        s.dispatch(_msg('ethusdt@bookTicker', {'s': 'ETHUSDT', 'b': '9', 'B': '3', 'a': '11', 'A': '1'}), now=1001.0)
+        s.dispatch(_msg('!markPrice@arr@1s', [{'s': 'BTCUSDT', 'p': '101', 'i': '100', 'r': '0.0001', 'T': 5},
+                                              {'s': 'XRPUSDT', 'p': '1', 'i': '1', 'r': '0', 'T': 5}]), now=1001.0)
+        s.dispatch('not json', now=1001.0)
+
+        self.assertEqual((s.message_count, s.error_count), (7, 1))
+        self.assertEqual(self.cvd.cvd['BTCUSDT'], 250.0)
+        # One history point per second; the latest point tracks the current CVD
+        self.assertEqual(list(self.cvd.history['BTCUSDT']), [(1000.0, 200.0), (1000.4, 150.0), (1001.5, 250.0)])
+
+        s.publish(now=1002.0)
+        with open(s.snapshot_path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['liquidations']['liquidations']['ETHUSDT']['long_usd'], 100.0)
+        self.assertNotIn('DOGEUSDT', snapshot['liquidations']['liquidations'])
+        self.assertEqual(snapshot['book_ticker']['ETHUSDT']['obi_top'], 0.75)
+        self.assertAlmostEqual(snapshot['mark_price']['BTCUSDT']['basis_pct'], 1.0)
+        self.assertEqual(set(snapshot['mark_price']), {'BTCUSDT'})
+
+        # Legacy files keep the old services' layout
+        with open(self.liq.legacy_path) as f:
+            legacy = json.load(f)
+        self.assertEqual(legacy['windows']['ETHUSDT']['5']['long_count'], 1)
+        self.assertEqual(legacy['last_update'], 1002.0)
+
+        # Same sections on the snapshot bus
+        bus = snapshot_bus.read('liquidations', bus_dir=s.bus_dir)
+        self.assertEqual(bus.get('ETHUSDT', 'w5_long_count'), (1.0, 1002.0))
+        self.assertEqual(snapshot_bus.read('cvd', bus_dir=s.bus_dir).get('BTCUSDT', 'cvd')[0], 250.0)
+
+        restored = CvdAggregator(['BTCUSDT'])
+        restored.restore(snapshot['cvd'])
+        self.assertEqual(restored.cvd['BTCUSDT'], 250.0)
+        self.assertEqual(len(restored.history['BTCUSDT']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
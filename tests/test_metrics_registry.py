@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Metrics Registry - counters, gauges, histograms and text exposition
+"""
+
+import unittest
+
+from metrics_registry import Registry, metrics_port, parse_exposition
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test suite for the in-process metrics registry"""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge_exposition(self):
+        requests_total = self.registry.counter('api_requests_total', 'Outbound API requests', ('api', 'outcome'))
+        requests_total.labels(api='coinalyze', outcome='ok').inc()
+        requests_total.labels('coinalyze', 'ok').inc(2)
+        depth = self.registry.gauge('queue_depth', 'Items waiting', ('queue',))
+        depth.labels(queue='alerts').set(4)
+
+        text = self.registry.render()
+        self.assertIn('# TYPE api_requests_total counter', text)
+        values = parse_exposition(text)
+        self.assertEqual(values['api_requests_total{api="coinalyze",outcome="ok"}'], 3)
+        self.assertEqual(values['queue_depth{queue="alerts"}'], 4)
+
+        # Same name returns the same family; a conflicting type is refused
+        self.assertIs(self.registry.counter('api_requests_total', '', ('api', 'outcome')), requests_total)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('api_requests_total', '', ('api', 'outcome'))
+        with self.assertRaises(ValueError):
+            requests_total.inc()  # Labelled family needs .labels()
+        with self.assertRaises(ValueError):
+            requests_total.labels(api='x', outcome='y').inc(-1)
+
+    def test_histogram_buckets_are_cumulative(self):
+        cycle = self.registry.histogram('service_cycle_seconds', 'Cycle duration', ('loop',), buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 0.5, 3.0):
+            cycle.labels(loop='uif_cycle').observe(seconds)
+
+        values = parse_exposition(self.registry.render())
+        self.assertEqual(values['service_cycle_seconds_bucket{loop="uif_cycle",le="0.1"}'], 1)
+        self.assertEqual(values['service_cycle_seconds_bucket{loop="uif_cycle",le="1"}'], 3)
+        self.assertEqual(values['service_cycle_seconds_bucket{loop="uif_cycle",le="+Inf"}'], 4)
+        self.assertEqual(values['service_cycle_seconds_count{loop="uif_cycle"}'], 4)
+        self.assertAlmostEqual(values['service_cycle_seconds_sum{loop="uif_cycle"}'], 4.05)
+
+    def test_collectors_run_at_scrape_time(self):
+        buffered = {'n': 1}
+
+        def collect():
+            yield ('csv_log_buffered_rows', 'gauge', 'Rows waiting', [({'file': 'a "b".csv'}, buffered['n'])])
+
+        def broken():
+            raise RuntimeError('boom')
+
+        self.registry.register_collector(collect)
+        self.registry.register_collector(broken)
+        buffered['n'] = 7
+        values = parse_exposition(self.registry.render())
+        self.assertEqual(values['csv_log_buffered_rows{file="a \\"b\\".csv"}'], 7)
+
+    def test_metrics_port_from_config(self):
+        config = {'metrics': {'enabled': True, 'ports': {'signal_bot': 8082}}}
+        self.assertEqual(metrics_port('signal_bot', config), 8082)
+        self.assertIsNone(metrics_port('trader', config))
+        self.assertIsNone(metrics_port('signal_bot', {'metrics': {'enabled': False, 'ports': {'signal_bot': 8082}}}))
+
+    def test_metric_base_is_abstract(self):
+        import metrics_registry
+        with self.assertRaises(TypeError):
+            metrics_registry._Metric('x_total', 'doc')
+
+
+if __name__ == '__main__':
+    unittest.main()
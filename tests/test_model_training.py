@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Model Training - parallel time-series CV and feature cache
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from model_training import (
+    FeatureCache, cross_val_scores, data_hash, expand_grid, time_series_holdout, train_candidates
+)
+
+
+class TestTrainCandidates(unittest.TestCase):
+    """Test suite for parallel candidate training"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'b', 'c'])
+        self.y = 2 * self.X['a'] - self.X['b'] + rng.normal(scale=0.1, size=200)
+
+    def test_matches_sequential_time_series_cv(self):
+        """Parallel fold scores equal a plain TimeSeriesSplit loop"""
+        scores = cross_val_scores({'lr': (LinearRegression(), self.X, self.y, r2_score)}, n_splits=4, n_jobs=2)
+
+        expected = []
+        for train_idx, test_idx in TimeSeriesSplit(n_splits=4).split(self.X):
+            model = LinearRegression().fit(self.X.iloc[train_idx], self.y.iloc[train_idx])
+            expected.append(r2_score(self.y.iloc[test_idx], model.predict(self.X.iloc[test_idx])))
+        np.testing.assert_allclose(scores['lr'], expected)
+
+    def test_holdout_is_most_recent(self):
+        train_idx, test_idx = time_series_holdout(10, holdout=0.2)
+        self.assertEqual(list(test_idx), [8, 9])
+        self.assertEqual(train_idx[-1], 7)
+
+    def test_candidates_report_cv_and_holdout(self):
+        candidates = expand_grid('Ridge', Ridge(), {'alpha': [0.1, 1000.0]})
+        results = train_candidates(candidates, self.X, self.y, n_splits=3, n_jobs=2)
+
+        self.assertEqual(set(results), {'Ridge (alpha=0.1)', 'Ridge (alpha=1000.0)'})
+        good = results['Ridge (alpha=0.1)']
+        self.assertEqual(len(good['cv_scores']), 3)
+        self.assertGreater(good['r2_test'], 0.95)
+        self.assertGreater(good['cv_mean'], results['Ridge (alpha=1000.0)']['cv_mean'])
+        self.assertAlmostEqual(good['scaler'].mean_[0], self.X['a'].iloc[:160].mean())
+
+
+class TestFeatureCache(unittest.TestCase):
+    """Test suite for the on-disk feature cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = FeatureCache(os.path.join(self.tmpdir, 'cache'), max_entries=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hit_on_same_data_and_miss_on_new_rows(self):
+        df = pd.DataFrame({'x': [1.0, 2.0], 's': ['a', 'b']})
+        calls = []
+
+        def build():
+            calls.append(1)
+            return df.assign(y=df['x'] * 2)
+
+        first = self.cache.get_or_build('f', data_hash(df), build)
+        second = self.cache.get_or_build('f', data_hash(df.copy()), build)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual((len(calls), self.cache.hits), (1, 1))
+
+        grown = pd.concat([df, df.iloc[:1]], ignore_index=True)
+        self.assertNotEqual(data_hash(grown), data_hash(df))
+        self.cache.get_or_build('f', data_hash(grown), build)
+        self.cache.get_or_build('f', data_hash(grown.iloc[:1]), build)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Order Book - diff-depth book, sequencing and depth metrics
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from services.data_feeds.order_book import OrderBook, load_recording, replay_depth
+
+
+def _event(first, final, prev, bids=(), asks=(), symbol='BTCUSDT'):
+    return {'e': 'depthUpdate', 's': symbol, 'U': first, 'u': final, 'pu': prev,
+            'b': [[str(p), str(q)] for p, q in bids], 'a': [[str(p), str(q)] for p, q in asks]}
+
+
+SNAPSHOT = {'lastUpdateId': 100, 'bids': [['99', '2'], ['98', '4'], ['97', '1']],
+            'asks': [['101', '1'], ['102', '3'], ['103', '5']]}
+
+
+class TestOrderBook(unittest.TestCase):
+    """Test suite for the local diff-depth order book"""
+
+    def test_levels_match_reference_dict(self):
+        rng = np.random.default_rng(3)
+        book = OrderBook('BTCUSDT', max_levels=50)
+        book.load_snapshot({'lastUpdateId': 0, 'bids': [], 'asks': []})
+        reference = {}
+        for i in range(2000):
+            price = float(rng.integers(1, 40))
+            qty = float(rng.choice([0.0, rng.uniform(0.1, 5)]))
+            book.bids.set(price, qty)
+            if qty > 0:
+                reference[price] = qty
+            else:
+                reference.pop(price, None)
+        prices, qty = book.bids.top(50)
+        expected = sorted(reference.items(), reverse=True)
+        np.testing.assert_array_equal(prices, [p for p, _ in expected])
+        np.testing.assert_array_equal(qty, [q for _, q in expected])
+
+    def test_capacity_drops_deepest_level(self):
+        book = OrderBook('BTCUSDT', max_levels=3)
+        book.load_snapshot(SNAPSHOT)
+        book.asks.set(100.5, 2.0)
+        prices, _ = book.asks.top(5)
+        np.testing.assert_array_equal(prices, [100.5, 101, 102])
+
+    def test_sequencing_and_metrics(self):
+        book = OrderBook('BTCUSDT', depth_levels=3)
+        self.assertEqual(book.apply(_event(90, 95, 89)), 'pending')
+        book.resync(SNAPSHOT)
+
+        self.assertEqual(book.apply(_event(96, 99, 95)), 'stale')
+        self.assertEqual(book.apply(_event(98, 105, 97, bids=[(99, 3)])), 'applied')
+        self.assertEqual(book.apply(_event(106, 107, 105, asks=[(101, 0)])), 'applied')
+
+        m = book.metrics
+        # bids 99x3, 98x4, 97x1; asks 102x3, 103x5; weights 1, 2/3
+        self.assertAlmostEqual(m['obi'], (3 + 4 * 2 / 3) / (3 + 4 * 2 / 3 + 3 + 5 * 2 / 3))
+        self.assertAlmostEqual(m['microprice'], (99 * 3 + 102 * 3) / 6)
+        self.assertAlmostEqual(m['obi_top'], 0.5)
+
+        self.assertEqual(book.apply(_event(110, 111, 109)), 'gap')
+        self.assertFalse(book.synced)
+        self.assertEqual(book.gaps, 1)
+
+    def test_resync_keeps_events_after_a_gap(self):
+        book = OrderBook('BTCUSDT')
+        buffered = [_event(98, 101, 97), _event(105, 106, 104),  # 104 != 101: gap
+                    _event(107, 108, 106, bids=[(99, 7)]), _event(109, 110, 108, asks=[(101, 2)])]
+        for event in buffered:
+            self.assertEqual(book.apply(event), 'pending')
+
+        self.assertEqual(book.resync(SNAPSHOT), 'gap')
+        self.assertEqual([e['u'] for e in book.pending], [106, 108, 110])
+
+        # The next snapshot lands inside the gap event: everything buffered behind it replays
+        self.assertEqual(book.resync(dict(SNAPSHOT, lastUpdateId=105)), 'applied')
+        self.assertEqual(book.last_update_id, 110)
+        self.assertEqual(float(book.bids.top(1)[1][0]), 7.0)
+        self.assertEqual(float(book.asks.top(1)[1][0]), 2.0)
+
+    def test_replay_recorded_stream(self):
+        records = [
+            {'t': 1.0, 'depth': _event(95, 101, 94, bids=[(99, 5)])},
+            {'t': 1.1, 'snapshot': dict(SNAPSHOT, s='BTCUSDT')},
+            {'t': 1.2, 'depth': _event(102, 103, 101, asks=[(101, 2)])},
+            {'t': 1.3, 'depth': _event(110, 112, 108)},  # gap: 104..109 missing
+            {'t': 1.4, 'snapshot': {'s': 'BTCUSDT', 'lastUpdateId': 111, 'bids': [['99', '1']], 'asks': [['100', '1']]}},
+            {'t': 1.5, 'depth': _event(113, 114, 112, bids=[(99, 3)])},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'depth.jsonl')
+            with open(path, 'w') as f:
+                f.write('\n'.join(json.dumps(r) for r in records) + '\n')
+            history = replay_depth(load_recording(path))['BTCUSDT']
+
+        self.assertEqual([h['status'] for h in history], ['pending', 'applied', 'gap', 'applied'])
+        self.assertAlmostEqual(history[1]['obi_top'], 5 / 7)
+        self.assertAlmostEqual(history[-1]['obi_top'], 0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Process Supervisor - heartbeat liveness, hang detection and restart backoff
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+import process_supervisor
+from process_supervisor import Supervisor, backoff_delay
+
+BEATING = "import time, heartbeat\nwhile True:\n    heartbeat.beat()\n    time.sleep(0.05)"
+HUNG = "import time\ntime.sleep(60)"
+CRASHING = "raise SystemExit(3)"
+
+
+class TestProcessSupervisor(unittest.TestCase):
+    """Test suite for the heartbeat-based process supervisor"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logs = []
+
+    def tearDown(self):
+        self.supervisor.shutdown(timeout=2)
+        self.tmpdir.cleanup()
+
+    def _supervise(self, code, seconds, **spec):
+        spec = dict({'name': 'child', 'args': ['-c', code], 'max_heartbeat_age': 0.5, 'startup_grace': 0.5}, **spec)
+        self.supervisor = Supervisor([spec], heartbeat_file=os.path.join(self.tmpdir.name, 'hb.bin'),
+                                     stop_timeout=1.0, backoff_base=0.1, backoff_max=0.4,
+                                     log=self.logs.append)
+        pids = []
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            self.supervisor.tick()
+            proc = self.supervisor.children[0].proc
+            if proc and proc.pid not in pids:
+                pids.append(proc.pid)
+            time.sleep(0.05)
+        return self.supervisor.children[0], pids
+
+    def test_beating_child_is_left_alone(self):
+        child, pids = self._supervise(BEATING, 1.5)
+        self.assertEqual(len(pids), 1)
+        self.assertEqual(child.restarts, 0)
+        self.assertGreater(self.supervisor.table.last(child.slot), 0)
+        self.assertTrue(self.supervisor.status()['child']['healthy'])
+
+    def test_hung_child_is_restarted(self):
+        child, pids = self._supervise(HUNG, 2.0)
+        self.assertGreaterEqual(len(pids), 2)
+        self.assertGreaterEqual(child.restarts, 1)
+        self.assertTrue(any('hung' in line for line in self.logs))
+        self.assertGreater(process_supervisor.RESTARTS.labels(child='child', reason='hung').value, 0)
+
+    def test_crashing_child_backs_off(self):
+        child, pids = self._supervise(CRASHING, 1.5)
+        # 0.1 + 0.2 + 0.4 + 0.4 ... between starts, so only a handful of launches
+        self.assertGreaterEqual(len(pids), 2)
+        self.assertLessEqual(len(pids), 6)
+        self.assertTrue(any('exited with code 3' in line for line in self.logs))
+        self.assertEqual([backoff_delay(n, 1, 60) for n in range(8)], [0, 1, 2, 4, 8, 16, 32, 60])
+
+    def test_config_overrides(self):
+        self.supervisor = Supervisor.from_config(
+            {'supervisor': {'backoff_max_sec': 5, 'children': {'trader': {'enabled': False},
+                                                              'cvd_service': {'max_heartbeat_age': 30}}}},
+            heartbeat_file=os.path.join(self.tmpdir.name, 'hb.bin'))
+        names = [c.name for c in self.supervisor.children]
+        self.assertNotIn('trader', names)
+        self.assertIn('signal_bot', names)
+        self.assertEqual(self.supervisor.backoff_max, 5)
+        cvd = next(c for c in self.supervisor.children if c.name == 'cvd_service')
+        self.assertEqual(cvd.max_heartbeat_age, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Quality Gates - columnar gate metrics and shadow thresholds
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from quality_gates import load_gate_frame
+
+YESTERDAY, TODAY = '2025-11-09', '2025-11-10'
+
+
+class TestGateFrame(unittest.TestCase):
+    """Test suite for single-pass regime metrics and shadow effects"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.analysis = os.path.join(self.tmpdir.name, 'analysis_log.csv')
+        self.effectiveness = os.path.join(self.tmpdir.name, 'effectiveness_log.csv')
+
+        with open(self.analysis, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['timestamp', 'symbol', 'verdict', 'confidence', 'regime', 'dev_sigma_blocked'])
+            w.writerow([f'{TODAY} 10:00:00', 'BTCUSDT', 'BUY', '0.80', 'sideways', '0'])
+            w.writerow([f'{TODAY} 10:05:00', 'BTCUSDT', 'NO_TRADE', '0.40', 'sideways', '1'])
+            w.writerow([f'{TODAY} 10:10:00', 'BTCUSDT', 'SELL', '0.90', 'bull_trend', '0'])
+            w.writerow([f'{YESTERDAY} 09:00:00', 'ETHUSDT', 'BUY', '0.70', 'sideways', '0'])
+            w.writerow([f'{YESTERDAY} 09:05:00', 'ETHUSDT', 'SELL', '0.90', 'sideways', '0'])
+            w.writerow(['2025-11-01 09:05:00', 'ETHUSDT', 'SELL', '0.90', 'sideways', '0'])
+
+        with open(self.effectiveness, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['timestamp_sent', 'symbol', 'verdict', 'result', 'profit_pct'])
+            w.writerow([f'{TODAY} 10:00:00', 'BTCUSDT', 'BUY', 'WIN', '0.6'])
+            w.writerow([f'{TODAY} 10:10:00', 'BTCUSDT', 'SELL', 'LOSS', '-0.3'])
+            w.writerow([f'{YESTERDAY} 09:00:00', 'ETHUSDT', 'BUY', 'LOSS', '-0.5'])
+            w.writerow([f'{YESTERDAY} 09:05:00', 'ETHUSDT', 'SELL', 'WIN', '0.4'])
+
+        self.frame = load_gate_frame(self.analysis, self.effectiveness, days=[YESTERDAY, TODAY])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_regime_metrics(self):
+        """Outcomes are attributed to the regime of the matching analysis row"""
+        metrics = self.frame.regime_metrics()
+
+        sideways = metrics['BTCUSDT']['sideways']
+        self.assertEqual(sideways['signals_total'], 1)
+        self.assertEqual(sideways['win_rate'], 1.0)
+        self.assertEqual(sideways['profit_factor'], 999.0)
+        self.assertEqual(sideways['blocked_share'], 0.5)
+        self.assertEqual(metrics['BTCUSDT']['other']['profit_factor'], 0.0)
+        self.assertNotIn('ETHUSDT', metrics)
+
+    def test_shadow_grid(self):
+        """Each threshold filters low-confidence signals and recomputes PF"""
+        grid = self.frame.shadow_grid([0.5, 0.8, 0.95], day=YESTERDAY)['ETHUSDT']
+
+        self.assertEqual(grid[0.5], {'shadow_filtered': 0, 'shadow_pf': 0.8, 'shadow_win_rate': 0.5})
+        self.assertEqual(grid[0.8]['shadow_filtered'], 1)
+        self.assertEqual(grid[0.8]['shadow_pf'], 999.0)
+        self.assertEqual(grid[0.95]['shadow_filtered'], 2)
+        self.assertEqual(self.frame.shadow_effect('BTCUSDT', 0.85, day=TODAY)['shadow_filtered'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
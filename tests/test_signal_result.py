@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for SignalResult - targets, TTL and ATR computed once per signal
+"""
+
+import unittest
+from unittest import mock
+
+import smart_signal
+from smart_signal import SignalResult, calculate_price_targets, signal_result
+
+
+def _klines(n=40, base=100.0):
+    rows = []
+    for i in range(n):
+        close = base + (i % 5) * 0.3
+        rows.append([i * 60000, close, close + 0.5, close - 0.5, close, 1000.0])
+    return rows
+
+
+class TestSignalResult(unittest.TestCase):
+    """Test suite for the compute-once signal result"""
+
+    def setUp(self):
+        kl = _klines()
+        self.res = SignalResult({
+            'symbol': 'BTCUSDT', 'last_close': 101.0, 'vwap_ref': 100.0, 'cvd': 5000.0,
+            'confidence': 0.8, 'verdict': 'BUY', 'oi_change': 0,
+            'volume': {'last': 1000.0, 'median': 1000.0, 'spike': False},
+            'klines': kl, 'coin_config': None, 'atr': smart_signal.calculate_atr(kl, period=14)
+        })
+
+    def test_targets_match_direct_call_and_are_cached(self):
+        expected = calculate_price_targets(
+            101.0, 0.8, 5000.0, 'BTCUSDT', None, klines=self.res['klines'],
+            volume_data=self.res['volume'], oi_change=0, verdict='BUY', vwap=100.0
+        )
+        with mock.patch.object(smart_signal, 'calculate_atr', wraps=smart_signal.calculate_atr) as atr:
+            self.assertEqual(tuple(self.res.targets), tuple(expected))
+            self.assertIs(self.res.targets, self.res.targets)
+            atr.assert_not_called()
+        low, high = self.res.target_prices
+        self.assertAlmostEqual(low, 101.0 * (1 + expected.min_pct / 100))
+        self.assertAlmostEqual(high, 101.0 * (1 + expected.max_pct / 100))
+        self.assertAlmostEqual(self.res.vwap_distance_pct, 1.0)
+
+    def test_verdict_change_recomputes(self):
+        buy = self.res.targets
+        self.res['verdict'] = 'SELL'
+        sell = self.res.targets
+        self.assertIsNot(buy, sell)
+        low, high = self.res.target_prices
+        self.assertLess(high, 101.0)
+        self.assertLess(low, high)
+
+    def test_plain_dict_is_wrapped(self):
+        self.assertIs(signal_result(self.res), self.res)
+        wrapped = signal_result(dict(self.res))
+        self.assertIsInstance(wrapped, SignalResult)
+        self.assertEqual(wrapped.targets.ttl_minutes, self.res.targets.ttl_minutes)
+
+
+if __name__ == '__main__':
+    unittest.main()
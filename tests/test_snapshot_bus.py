@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Snapshot Bus - memory-mapped snapshots with sequence-locked reads
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import snapshot_bus
+from snapshot_bus import BusReader, BusWriter
+
+
+class TestSnapshotBus(unittest.TestCase):
+    """Test suite for the memory-mapped snapshot bus"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.bus_dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_publish_and_read(self):
+        writer = BusWriter('feeds', ['BTCUSDT'], ('basis_pct', 'funding'), self.bus_dir)
+        reader = BusReader('feeds', self.bus_dir)
+        writer.publish({'BTCUSDT': {'basis_pct': 0.05, 'funding': None, 'updated': 100.0}}, now=101.0)
+
+        snap = reader.read()
+        self.assertEqual(snap.seq, 2)
+        self.assertEqual(snap.published, 101.0)
+        self.assertEqual(snap.get('BTCUSDT', 'basis_pct'), (0.05, 100.0))
+        self.assertEqual(snap.get('BTCUSDT', 'funding'), (None, 100.0))
+        self.assertEqual(snap.get('ETHUSDT', 'basis_pct'), (None, None))
+
+        # Only the fields in a row are touched
+        writer.publish({'BTCUSDT': {'funding': 0.0001}}, now=102.0)
+        snap = reader.read()
+        self.assertEqual(snap.symbol('BTCUSDT'), {'basis_pct': 0.05, 'funding': 0.0001, 'updated': 102.0})
+
+    def test_new_symbol_remaps_readers(self):
+        writer = BusWriter('uif', ['BTCUSDT'], ('adx14',), self.bus_dir)
+        reader = BusReader('uif', self.bus_dir)
+        writer.publish({'BTCUSDT': {'adx14': 20.0}}, now=1.0)
+        self.assertIsNotNone(reader.read())
+        writer.publish({'ETHUSDT': {'adx14': 30.0}}, now=2.0)
+
+        snap = reader.read()
+        self.assertEqual(snap.get('BTCUSDT', 'adx14'), (20.0, 1.0))
+        self.assertEqual(snap.get('ETHUSDT', 'adx14'), (30.0, 2.0))
+        self.assertEqual(snap.seq % 2, 0)
+
+        # A restarted producer with the same schema keeps the published values
+        BusWriter('uif', ['BTCUSDT', 'ETHUSDT'], ('adx14',), self.bus_dir)
+        self.assertEqual(reader.read().get('ETHUSDT', 'adx14'), (30.0, 2.0))
+
+    def test_partial_publish_after_restart_keeps_symbols(self):
+        snapshot_bus.publish('uif', {'BTCUSDT': {'adx14': 20.0}, 'ETHUSDT': {'adx14': 30.0}}, ('adx14',),
+                             now=1.0, bus_dir=self.bus_dir)
+        snapshot_bus._writers.clear()  # Producer restart
+        snapshot_bus.publish('uif', {'ETHUSDT': {'adx14': 31.0}}, ('adx14',), now=2.0, bus_dir=self.bus_dir)
+
+        snap = BusReader('uif', self.bus_dir).read()
+        self.assertEqual(snap.get('BTCUSDT', 'adx14'), (20.0, 1.0))
+        self.assertEqual(snap.get('ETHUSDT', 'adx14'), (31.0, 2.0))
+
+    def test_uif_psar_state_is_int(self):
+        import smart_signal
+
+        snapshot_bus.publish('uif', {'BTCUSDT': {'adx14': 20.0, 'psar_state': -1}}, ('adx14', 'psar_state'),
+                             bus_dir=self.bus_dir)
+        reader = BusReader('uif', self.bus_dir)
+        with mock.patch.object(smart_signal.snapshot_bus, 'read', lambda name: reader.read()):
+            uif, age = smart_signal.fetch_uif_snapshot('BTCUSDT')
+        self.assertEqual(uif['psar'], -1)
+        self.assertIsInstance(uif['psar'], int)
+
+    def test_stale_or_partial_bus_falls_back_to_json(self):
+        import smart_signal
+
+        snapshot_bus.publish('cvd', {'BTCUSDT': {'cvd': 1.0}}, ('cvd',), now=time.time() - 600,
+                             bus_dir=self.bus_dir)
+        snapshot_bus.publish('uif', {'ETHUSDT': {'adx14': 30.0}}, ('adx14',), bus_dir=self.bus_dir)
+        os.makedirs(os.path.join(self.bus_dir, 'data'))
+        with open(os.path.join(self.bus_dir, 'cvd_data.json'), 'w') as f:
+            json.dump({'last_update': time.time(), 'cvd': {'BTCUSDT': 5.0}}, f)
+        with open(os.path.join(self.bus_dir, 'data', 'uif_snapshot.json'), 'w') as f:
+            json.dump({'symbols': {'BTCUSDT': {'adx14': 25.0, 'psar_state': 1, 'updated': time.time()}}}, f)
+
+        cwd = os.getcwd()
+        os.chdir(self.bus_dir)
+        self.addCleanup(os.chdir, cwd)
+        readers = {name: BusReader(name, self.bus_dir) for name in ('cvd', 'uif')}
+        with mock.patch.object(smart_signal.snapshot_bus, 'read', lambda name: readers[name].read()), \
+                mock.patch.dict(smart_signal._API_CACHE, clear=True):
+            self.assertEqual(smart_signal.compute_cvd('BTCUSDT', 60000), 5.0)  # Bus stale for 10 min
+            uif, age = smart_signal.fetch_uif_snapshot('BTCUSDT')  # Not on the bus
+        self.assertEqual(uif['adx14'], 25.0)
+
+    def test_torn_write_is_not_returned(self):
+        writer = BusWriter('cvd', ['BTCUSDT'], ('cvd',), self.bus_dir)
+        writer.publish({'BTCUSDT': {'cvd': 1.0}}, now=1.0)
+        writer._map.seq[0] += 1  # Writer stopped mid-update
+        self.assertIsNone(BusReader('cvd', self.bus_dir).read())
+        self.assertIsNone(BusReader('missing', self.bus_dir).read())
+
+    def test_reopen_after_interrupted_publish(self):
+        writer = BusWriter('cvd', ['BTCUSDT'], ('cvd',), self.bus_dir)
+        writer.publish({'BTCUSDT': {'cvd': 1.0}}, now=1.0)
+        writer._map.seq[0] += 1  # Killed between the two seq increments
+        del writer
+
+        restarted = BusWriter('cvd', ['BTCUSDT'], ('cvd',), self.bus_dir)
+        reader = BusReader('cvd', self.bus_dir)
+        snap = reader.read()
+        self.assertEqual(snap.seq % 2, 0)
+        self.assertEqual(snap.get('BTCUSDT', 'cvd'), (1.0, 1.0))
+        restarted.publish({'BTCUSDT': {'cvd': 2.0}}, now=2.0)
+        snap = reader.read()
+        self.assertEqual(snap.seq % 2, 0)
+        self.assertEqual(snap.get('BTCUSDT', 'cvd'), (2.0, 2.0))
+
+    def test_liquidations_layout(self):
+        snapshot_bus.publish_liquidations({
+            'last_update': 50.0,
+            'liquidations': {'BTCUSDT': {'long_count': 3, 'short_count': 1, 'long_usd': 300.0, 'short_usd': 10.0}},
+            'window_minutes': [5, 15],
+            'windows': {'BTCUSDT': {'5': {'long_count': 1, 'short_count': 0, 'long_usd': 100.0, 'short_usd': 0.0},
+                                    '15': {'long_count': 2, 'short_count': 1, 'long_usd': 200.0, 'short_usd': 10.0}}}
+        }, bus_dir=self.bus_dir)
+        snap = snapshot_bus.read('liquidations', bus_dir=self.bus_dir)
+        self.assertEqual(snapshot_bus.liquidation_windows(snap), [5, 15])
+        self.assertEqual(snap.get('BTCUSDT', 'w15_long_usd'), (200.0, 50.0))
+        self.assertTrue(os.path.exists(os.path.join(self.bus_dir, 'liquidations.bus')))
+        self.assertFalse(np.isnan(snap.values).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Stage Timing - per-stage latency spans and cache counters
+"""
+
+import unittest
+
+import stage_timing
+from stage_timing import StageTimer
+
+
+class TestStageTimer(unittest.TestCase):
+    """Test suite for the per-stage span recorder"""
+
+    def test_percentiles_per_symbol_and_pooled(self):
+        timer = StageTimer(reservoir_size=100)
+        for ms in range(1, 101):
+            timer.record('oi', 'BTCUSDT', float(ms))
+        timer.record('oi', 'ETHUSDT', 1000.0)
+
+        btc = timer.stage_summary('BTCUSDT')['oi']
+        self.assertEqual(btc['count'], 100)
+        self.assertAlmostEqual(btc['p50_ms'], 50.5)
+        self.assertAlmostEqual(btc['p99_ms'], 99.01)
+
+        pooled = timer.stage_summary()['oi']
+        self.assertEqual(pooled['calls'], 101)
+        self.assertEqual(pooled['max_ms'], 1000.0)
+
+        # Reservoir keeps only the most recent durations
+        timer.record('oi', 'BTCUSDT', 500.0)
+        self.assertEqual(timer.stage_summary('BTCUSDT')['oi']['count'], 100)
+        self.assertEqual(timer.stage_summary('BTCUSDT')['oi']['calls'], 101)
+
+    def test_span_counts_errors_and_cache(self):
+        timer = StageTimer()
+        with timer.span('klines', 'BTCUSDT'):
+            pass
+        with self.assertRaises(RuntimeError):
+            with timer.span('klines', 'BTCUSDT'):
+                raise RuntimeError('api down')
+        timer.cache_hit('klines')
+        timer.cache_hit('klines')
+        timer.cache_miss('klines')
+
+        snap = timer.snapshot()
+        self.assertEqual(snap['symbols']['BTCUSDT']['klines']['calls'], 2)
+        self.assertEqual(snap['stages']['klines']['errors'], 1)
+        self.assertEqual(snap['cache']['klines'], {'hits': 2, 'misses': 1, 'hit_rate': 0.667})
+        self.assertIn('klines', stage_timing.format_report(snap['stages'], snap['cache']))
+
+    def test_timed_uses_first_argument_as_symbol(self):
+        stage_timing.get_timer().reset()
+
+        @stage_timing.timed('total')
+        def decide(symbol, interval):
+            return symbol + interval
+
+        self.assertEqual(decide('SOLUSDT', '15m'), 'SOLUSDT15m')
+        self.assertEqual(stage_timing.snapshot()['symbols']['SOLUSDT']['total']['count'], 1)
+
+    def test_throttle_is_excluded_from_total(self):
+        stage_timing.get_timer().reset()
+
+        @stage_timing.timed('total')
+        def decide(symbol):
+            stage_timing.throttle(0.2, symbol)
+            stage_timing.throttle(0.1, symbol)
+
+        decide('ADAUSDT')
+        stages = stage_timing.snapshot()['symbols']['ADAUSDT']
+        self.assertLess(stages['total']['max_ms'], 100)
+        self.assertEqual(stages['throttle']['calls'], 2)
+        self.assertGreaterEqual(stages['throttle']['max_ms'], 200)
+        stage_timing.get_timer().reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for State Store - SQLite-backed sent signals index and state tables
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from state_store import StateStore, SentSignalsStore, JsonRowTable, TableSession
+
+
+class TestSentSignalsStore(unittest.TestCase):
+    """Test suite for signal_id -> message_id lookups"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'state.db')
+        self.legacy_path = os.path.join(self.tmpdir.name, 'sent_signals.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_record_and_lookup(self):
+        """Recorded signals are found by signal_id and legacy key"""
+        sent = SentSignalsStore(StateStore(self.db_path), legacy_file=self.legacy_path)
+        sent.record({'symbol': 'BTCUSDT', 'message_id': 42, 'timestamp': '2025-11-01 10:00:00',
+                     'verdict': 'BUY', 'signal_id': 'abc'})
+
+        self.assertEqual(sent.get_message_id('abc'), 42)
+        self.assertEqual(sent.get_message_id_legacy('2025-11-01 10:00:00', 'BTCUSDT', 'BUY'), 42)
+        self.assertIsNone(sent.get_message_id('missing'))
+        self.assertIsNone(sent.get_message_id(''))
+        self.assertEqual(len(sent), 1)
+
+    def test_zero_message_id_is_not_found(self):
+        """Failed Telegram sends (message_id=0) are not valid reply targets"""
+        sent = SentSignalsStore(StateStore(self.db_path), legacy_file=self.legacy_path)
+        sent.record({'symbol': 'ETHUSDT', 'message_id': 0, 'timestamp': 't', 'verdict': 'SELL', 'signal_id': 'zero'})
+
+        self.assertIsNone(sent.get_message_id('zero'))
+
+    def test_legacy_json_imported_once(self):
+        """sent_signals.json (list format) is migrated on first open only"""
+        with open(self.legacy_path, 'w') as f:
+            json.dump([
+                {'symbol': 'SOLUSDT', 'message_id': 7, 'timestamp': 't1', 'verdict': 'BUY', 'signal_id': 's1'},
+                {'symbol': 'XRPUSDT', 'message_id': 8, 'timestamp': 't2', 'verdict': 'SELL'},
+            ], f)
+
+        sent = SentSignalsStore(StateStore(self.db_path), legacy_file=self.legacy_path)
+        self.assertEqual(sent.get_message_id('s1'), 7)
+        self.assertEqual(sent.get_message_id_legacy('t2', 'XRPUSDT', 'SELL'), 8)
+
+        reopened = SentSignalsStore(StateStore(self.db_path), legacy_file=self.legacy_path)
+        self.assertEqual(len(reopened), 2)
+
+
+class TestTableSession(unittest.TestCase):
+    """Test suite for row-level read-modify-write sessions"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        store = StateStore(os.path.join(self.tmpdir.name, 'state.db'))
+        self.table = JsonRowTable(store, 'alerts', lambda a: a['id'],
+                                  columns={'status': lambda a: a.get('status')},
+                                  indexes=[('status',)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_session_persists_changes(self):
+        """Appends, edits and removals made to the yielded list are saved"""
+        with TableSession(self.table) as rows:
+            rows.append({'id': 'a', 'status': 'pending'})
+            rows.append({'id': 'b', 'status': 'pending'})
+
+        with TableSession(self.table) as rows:
+            rows[0]['status'] = 'failed'
+            del rows[1]
+
+        self.assertEqual(self.table.all(), [{'id': 'a', 'status': 'failed'}])
+        self.assertEqual(self.table.count(status='failed'), 1)
+        self.assertEqual(self.table.find(status=('pending', 'failed'))[0]['id'], 'a')
+
+    def test_concurrent_insert_and_delete_are_not_lost(self):
+        """Rows added or deleted outside the session survive its write-back"""
+        self.table.insert({'id': 'a', 'status': 'pending'})
+
+        with TableSession(self.table) as rows:
+            self.table.insert({'id': 'new', 'status': 'pending'})
+            self.table.delete('a')
+            rows[0]['status'] = 'sent'
+
+        self.assertEqual([r['id'] for r in self.table.all()], ['new'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for UIF Calculators - incremental ADX14/PSAR state
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from services.uif_feature_engine.calculators import (
+    TrendState, calculate_adx14, calculate_all_indicators, calculate_psar_state
+)
+
+
+def _bars(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    return pd.DataFrame({'timestamp': np.arange(n) * 300, 'high': close + rng.uniform(0, 1, n),
+                         'low': close - rng.uniform(0, 1, n), 'close': close, 'quoteVolume': 1000.0})
+
+
+class TestTrendState(unittest.TestCase):
+    """Test suite for the state-carrying ADX14/PSAR"""
+
+    def test_cold_start_matches_window_recompute(self):
+        window = _bars().iloc[:60]
+        result = calculate_all_indicators(window, TrendState())
+        self.assertEqual(result['adx14'], calculate_adx14(window))
+        self.assertEqual(result['psar_state'], calculate_psar_state(window))
+
+    def test_sliding_windows_match_full_history(self):
+        df = _bars()
+        state = TrendState()
+        for end in range(60, len(df)):
+            result = state.update(df.iloc[end - 60:end])
+            history = df.iloc[:end]
+            self.assertAlmostEqual(result['adx14'], calculate_adx14(history), delta=0.011)
+            self.assertEqual(result['psar_state'], calculate_psar_state(history))
+        # Only closed bars are committed; the forming bar is re-evaluated next cycle
+        self.assertEqual(state.bars, len(df) - 2)
+
+    def test_gap_reseeds_from_window(self):
+        df = _bars()
+        state = TrendState()
+        state.update(df.iloc[:60])
+        window = df.iloc[200:260]
+        self.assertEqual(state.update(window)['psar_state'], calculate_psar_state(window))
+        self.assertEqual(state.bars, 59)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for UIF Runner - parallel collection cycle and partial snapshots
+"""
+
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from services.uif_feature_engine import runner
+
+
+class _Rows:
+    def __init__(self):
+        self.rows = []
+        self.flushes = 0
+
+    def append(self, symbol, indicators, latency_ms=0, source_errors=""):
+        self.rows.append((symbol, source_errors))
+
+    def flush(self):
+        self.flushes += 1
+
+
+def _ohlcv(symbol, limit=60, session=None, timeout=None):
+    if symbol == 'SLOWUSDT':
+        time.sleep(0.5)
+    if symbol == 'BADUSDT':
+        return None
+    close = 100 + np.cumsum(np.sin(np.arange(60)))
+    return pd.DataFrame({'timestamp': np.arange(60) * 300, 'open': close, 'high': close + 1,
+                         'low': close - 1, 'close': close, 'volume': 10.0, 'quoteVolume': 1000.0})
+
+
+class TestUIFRunner(unittest.TestCase):
+    """Test suite for the thread-pooled UIF collection cycle"""
+
+    def setUp(self):
+        runner._latest_entries.clear()
+        runner._latest_entries['SLOWUSDT'] = {'adx14': 1.0, 'updated': 1}
+
+    def test_partial_snapshot_then_full(self):
+        published = []
+        bus_rows = []
+        writer = _Rows()
+        with mock.patch.object(runner, 'fetch_ohlcv', _ohlcv), \
+                mock.patch.object(runner, 'write_snapshot', lambda data: published.append(data)), \
+                mock.patch.object(runner.snapshot_bus, 'publish', lambda name, rows, fields: bus_rows.append(set(rows))):
+            started = time.perf_counter()
+            ok = runner.run_collection_cycle(['BTCUSDT', 'ETHUSDT', 'SLOWUSDT', 'BADUSDT'], writer,
+                                             max_workers=4, partial_publish_sec=0.2)
+            elapsed = time.perf_counter() - started
+
+        self.assertTrue(ok)
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(len(published), 2)
+        # Partial: fresh symbols plus the slow symbol's previous entry
+        self.assertEqual(set(published[0]), {'BTCUSDT', 'ETHUSDT', 'SLOWUSDT'})
+        self.assertEqual(published[0]['SLOWUSDT']['updated'], 1)
+        self.assertGreater(published[1]['SLOWUSDT']['updated'], 1)
+        self.assertIn(('BADUSDT', 'OHLCV_FETCH_FAILED'), writer.rows)
+        self.assertEqual(writer.flushes, 1)
+        # The bus only gets fresh rows; the slow symbol's bus values are left as they were
+        self.assertEqual(bus_rows, [{'BTCUSDT', 'ETHUSDT'}, {'BTCUSDT', 'ETHUSDT', 'SLOWUSDT'}])
+
+    def test_cycle_starts_after_bar_close(self):
+        self.assertAlmostEqual(runner.seconds_until_next_cycle(300, 2, now=600.5), 1.5)
+        self.assertAlmostEqual(runner.seconds_until_next_cycle(300, 2, now=603.0), 299.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,39 +2,73 @@
 """
 Watchdog Service - Monitors and auto-restarts critical workflows
 Prevents extended downtime by detecting crashed or stalled processes
+
+Services with a metrics endpoint (config.yaml metrics.ports) are checked by
+scraping /metrics: a reachable endpoint whose heartbeat series is fresh is
+healthy, a stale one is stalled. pgrep is only the fallback when the endpoint
+is not configured or not reachable.
+
+`python watchdog.py --supervise` runs process_supervisor instead: the
+services are started as child processes, watched through shared-memory
+heartbeats and restarted within seconds when they exit or hang.
 """
 
 import os
+import sys
 import time
 import json
 import subprocess
+import yaml
 from datetime import datetime, timedelta
 
+from metrics_registry import metrics_port, scrape
+
 # Configuration
 MONITORED_SERVICES = [
     {
         'name': 'Smart Money Signal Bot',
         'process_name': 'main.py',
         'restart_command': 'python main.py',
-        'critical': True
+        'critical': True,
+        'metrics_service': 'signal_bot',
+        'heartbeat': 'service_last_cycle_timestamp_seconds{loop="signal_loop"}',
+        'max_heartbeat_age': 600  # One pass over all symbols takes ~2 minutes
     },
     {
         'name': 'CVD Service',
         'process_name': 'cvd_service.py',
         'restart_command': 'python cvd_service.py',
-        'critical': True
+        'critical': True,
+        'metrics_service': 'cvd_service',
+        'heartbeat': 'snapshot_last_publish_timestamp_seconds{snapshot="cvd"}',
+        'max_heartbeat_age': 120
     },
     {
         'name': 'Liquidation Service',
         'process_name': 'liquidation_service.py',
         'restart_command': 'python liquidation_service.py',
-        'critical': True
+        'critical': True,
+        'metrics_service': 'liquidation_service',
+        'heartbeat': 'snapshot_last_publish_timestamp_seconds{snapshot="liquidations"}',
+        'max_heartbeat_age': 120  # Republished every 15s even when quiet
+    },
+    {
+        'name': 'BTC Lead-Lag Service',
+        'process_name': 'btc_leadlag_service.py',
+        'restart_command': 'python btc_leadlag_service.py',
+        'critical': False,
+        'metrics_service': 'btc_leadlag',
+        'heartbeat': 'snapshot_last_publish_timestamp_seconds{snapshot="btc_leadlag"}',
+        'max_heartbeat_age': 120
     },
     {
         'name': 'Signal Tracker',
         'process_name': 'signal_tracker.py',
         'restart_command': 'python signal_tracker.py',
-        'critical': False
+        'critical': False,
+        'metrics_service': 'signal_tracker',
+        'heartbeat': 'service_last_cycle_timestamp_seconds{loop="tracker_loop"}',
+        'max_heartbeat_age': 600
     }
 ]
 
@@ -80,8 +114,35 @@ def get_process_count(process_name):
     except Exception:
         return 0
 
-def check_service_health(service):
-    """Check if a service is healthy based on running process"""
+def check_metrics_health(service, port):
+    """
+    Health from the service's /metrics endpoint.
+    
+    Returns:
+        dict like check_service_health, or None if the endpoint is unreachable
+    """
+    try:
+        metrics = scrape(f"http://127.0.0.1:{port}/metrics")
+    except Exception:
+        return None
+    
+    heartbeat = metrics.get(service.get('heartbeat', ''))
+    if heartbeat is None:
+        return {'healthy': True, 'reason': 'Metrics endpoint up (no heartbeat yet)', 'process_count': 1}
+    
+    age = time.time() - heartbeat
+    if age > service.get('max_heartbeat_age', 300):
+        return {'healthy': False, 'reason': f'Stalled: last heartbeat {age:.0f}s ago', 'process_count': 1}
+    return {'healthy': True, 'reason': f'Heartbeat {age:.0f}s ago', 'process_count': 1}
+
+def check_service_health(service, config=None):
+    """Check if a service is healthy: /metrics heartbeat when available, else running process"""
+    port = metrics_port(service['metrics_service'], config) if service.get('metrics_service') else None
+    if port is not None:
+        health = check_metrics_health(service, port)
+        if health is not None:
+            return health
+    
     process_name = service['process_name']
     
     is_running = is_process_running(process_name)
@@ -153,6 +214,11 @@ def main():
     
     while True:
         try:
+            try:
+                with open('config.yaml', 'r', encoding='utf-8') as f:
+                    config = yaml.safe_load(f) or {}
+            except Exception:
+                config = {}
             all_healthy = True
             status_report = {
                 'timestamp': datetime.now().isoformat(),
@@ -161,7 +227,7 @@ def main():
             
             for service in MONITORED_SERVICES:
                 name = service['name']
-                health = check_service_health(service)
+                health = check_service_health(service, config)
                 status_report['services'][name] = health
                 
                 if not health['healthy']:
@@ -206,5 +272,16 @@ def main():
             log_event(f"❌ Watchdog error: {str(e)}")
             time.sleep(CHECK_INTERVAL)
 
+def supervise():
+    """Supervisor mode: own the services as children instead of polling for them"""
+    import process_supervisor
+    
+    log_event("🟢 Watchdog started in supervisor mode")
+    process_supervisor.main(log=log_event, on_status=save_health_status)
+    log_event("🛑 Supervisor stopped")
+
 if __name__ == '__main__':
-    main()
+    if '--supervise' in sys.argv[1:]:
+        supervise()
+    else:
+        main()
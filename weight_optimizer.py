@@ -7,6 +7,7 @@ import yaml
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import cross_val_score, TimeSeriesSplit
+from log_join import asof_join
 
 class WeightOptimizer:
     """
@@ -82,44 +83,29 @@ class WeightOptimizer:
             
             print(f"[WEIGHT_OPT] Loaded {len(eff_df)} effectiveness entries, {len(analysis_df)} analysis entries")
             
-            # Merge on symbol + verdict + close timestamp (within 2 minutes)
-            merged_data = []
-            matched_count = 0
+            # Merge on symbol + verdict + closest timestamp (within 2 minutes), sorted as-of join
+            matched = asof_join(eff_df, analysis_df, left_on='timestamp_sent', right_on='timestamp',
+                                by=('symbol', 'verdict'), tolerance=timedelta(minutes=2), inclusive=False,
+                                suffixes=('', '_analysis'))
+            matched_count = len(matched)
             
-            for idx, eff_row in eff_df.iterrows():
-                time_diff = abs(analysis_df['timestamp'] - eff_row['timestamp_sent'])
-                matches = analysis_df[
-                    (analysis_df['symbol'] == eff_row['symbol']) &
-                    (analysis_df['verdict'] == eff_row['verdict']) &
-                    (time_diff < timedelta(minutes=2))
-                ]
-                
-                if len(matches) > 0:
-                    # Take closest match
-                    closest_match = matches.loc[time_diff[matches.index].idxmin()]
-                    
-                    # Extract raw indicator values
-                    merged_row = {
-                        'symbol': eff_row['symbol'],
-                        'verdict': eff_row['verdict'],
-                        'outcome': eff_row['outcome'],
-                        'confidence': eff_row['confidence'],
-                        
-                        # Raw indicators from analysis log
-                        'cvd': closest_match.get('cvd', 0),
-                        'oi_change_pct': closest_match.get('oi_change_pct', 0),
-                        'price_vs_vwap_pct': closest_match.get('price_vs_vwap_pct', 0),
-                        'volume_spike': int(closest_match.get('volume_spike', 0)),
-                        'liq_ratio': closest_match.get('liq_ratio', 0),
-                    }
-                    merged_data.append(merged_row)
-                    matched_count += 1
+            # Raw indicator values from analysis log + outcome from effectiveness log
+            df = pd.DataFrame({
+                'symbol': matched['symbol'],
+                'verdict': matched['verdict'],
+                'outcome': matched['outcome'],
+                'confidence': matched['confidence'],
+                'cvd': matched.get('cvd', 0),
+                'oi_change_pct': matched.get('oi_change_pct', 0),
+                'price_vs_vwap_pct': matched.get('price_vs_vwap_pct', 0),
+                'volume_spike': matched.get('volume_spike', pd.Series(0, index=matched.index)).fillna(0).astype(int),
+                'liq_ratio': matched.get('liq_ratio', 0),
+            }).reset_index(drop=True)
             
-            if len(merged_data) == 0:
+            if len(df) == 0:
                 print("[WEIGHT_OPT] ERROR: No matching data between logs")
                 return None
             
-            df = pd.DataFrame(merged_data)
             print(f"[WEIGHT_OPT] Successfully matched {matched_count} signals with indicator data")
             return df
             